@@ -0,0 +1,127 @@
+"""
+Fixtures for the orchestration overhead benchmarks.
+
+The benchmarks run against a stub `tofu` executable which only records its
+invocations and answers the commands cluster-builder parses, so that the
+measured time is the Python-side cost of cluster-builder plus one process
+spawn per OpenTofu command, without any cloud or state backend.
+"""
+
+import os
+import shutil
+import stat
+
+import pytest
+
+from cluster_builder import Swarmchestrate
+from cluster_builder.config import ClusterDocument
+
+# Cluster sizes, in node modules, the benchmarks are run at
+CLUSTER_SIZES = [1, 10, 100, 1000, 2000]
+
+STUB_TOFU = """#!/bin/sh
+echo "$@" >> "$STUB_TOFU_LOG"
+case "$1" in
+  init)
+    mkdir -p .terraform
+    touch .terraform.lock.hcl
+    ;;
+  workspace)
+    case "$2" in
+      list)
+        echo "* default"
+        [ -f .workspaces ] && sed 's/^/  /' .workspaces
+        ;;
+      new)
+        echo "$3" >> .workspaces
+        ;;
+      delete)
+        [ -f .workspaces ] && grep -vx "$4" .workspaces > .workspaces.tmp; mv -f .workspaces.tmp .workspaces 2>/dev/null
+        ;;
+    esac
+    ;;
+  output)
+    echo "{}"
+    ;;
+esac
+exit 0
+"""
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), "..", "cluster_builder", "templates")
+
+
+@pytest.fixture
+def stub_tofu(tmp_path, monkeypatch):
+    """Put the stub `tofu` on PATH and return the path of its invocation log."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    tofu = bin_dir / "tofu"
+    tofu.write_text(STUB_TOFU)
+    tofu.chmod(tofu.stat().st_mode | stat.S_IEXEC)
+    log = tmp_path / "tofu-calls.log"
+    log.touch()
+
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("STUB_TOFU_LOG", str(log))
+    monkeypatch.setenv("CLUSTER_BUILDER_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("CLUSTER_BUILDER_STATE_ACCESS", "cli")
+    for name in ("POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_HOST", "POSTGRES_DATABASE"):
+        monkeypatch.setenv(name, "bench")
+    return log
+
+
+@pytest.fixture
+def orchestrator(tmp_path, stub_tofu):
+    """A Swarmchestrate working on a private copy of the templates."""
+    templates_dir = tmp_path / "templates"
+    shutil.copytree(TEMPLATES_DIR, templates_dir)
+    orchestrator = Swarmchestrate(str(templates_dir), str(tmp_path / "output"))
+    # User data templates are copied next to the cloud templates, keep them private
+    orchestrator.template_manager.templates_dir = str(templates_dir)
+    return orchestrator
+
+
+def edge_config(cluster_name: str, resource_name: str = None, role: str = "worker") -> dict:
+    """Configuration of an edge node, which needs no cloud credentials."""
+    config = {
+        "cloud": "edge",
+        "k3s_role": role,
+        "cluster_name": cluster_name,
+        "edge_device_ip": "192.0.2.10",
+        "ssh_user": "bench",
+        "ssh_auth_method": "key",
+        "ssh_key": "/dev/null",
+    }
+    if role != "master":
+        config["master_ip"] = "192.0.2.1"
+    if resource_name:
+        config["resource_name"] = resource_name
+    return config
+
+
+def populate_cluster(orchestrator: Swarmchestrate, cluster_name: str, size: int) -> list[str]:
+    """
+    Write a cluster of `size` edge node modules, each with its own workspace.
+
+    Returns:
+        The module, and workspace, names
+    """
+    cluster_dir = orchestrator.get_cluster_output_dir(cluster_name)
+    names = [f"edge-node-{i:05d}" for i in range(size)]
+
+    config = orchestrator.cluster_config.prepare(edge_config(cluster_name, "template"))[1]
+    document = ClusterDocument.load(cluster_dir)
+    document.set_backend(orchestrator.pg_config.get_connection_string(), cluster_name)
+    for name in names:
+        document.add_module(name, dict(config, resource_name=name))
+    document.save()
+
+    with open(os.path.join(cluster_dir, ".workspaces"), "w") as f:
+        f.writelines(f"{name}\n" for name in names)
+    return names
+
+
+def tofu_calls(log) -> int:
+    """Number of stub `tofu` invocations recorded so far."""
+    with open(log) as f:
+        return sum(1 for _ in f)
@@ -0,0 +1,43 @@
+"""
+Benchmarks of cluster configuration editing.
+"""
+
+import os
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from cluster_builder.config import ClusterDocument  # noqa: E402
+
+from conftest import CLUSTER_SIZES  # noqa: E402
+
+NODE_CONFIG = {
+    "module_source": "/templates/edge/",
+    "k3s_role": "worker",
+    "master_ip": "192.0.2.1",
+    "edge_device_ip": "192.0.2.10",
+    "ssh_user": "bench",
+    "ssh_key": "/dev/null",
+    "k3s_token": "abcdefghijklmnop",
+    "ha": False,
+}
+
+
+@pytest.mark.parametrize("size", CLUSTER_SIZES)
+def test_document_add_and_remove_module(benchmark, tmp_path, size):
+    document = ClusterDocument.load(str(tmp_path))
+    for i in range(size):
+        document.add_module(f"node-{i:05d}", NODE_CONFIG)
+    document.save()
+
+    def add_and_remove():
+        document = ClusterDocument.load(str(tmp_path))
+        document.add_module("added", NODE_CONFIG)
+        document.save()
+        document.remove_module("added")
+        document.save()
+
+    benchmark(add_and_remove)
+    assert not ClusterDocument.load(str(tmp_path)).has_module("added")
+    assert os.path.exists(tmp_path / "main.tf.json")
@@ -0,0 +1,94 @@
+"""
+Benchmarks of the Swarmchestrate operations against a stub `tofu`.
+
+Each benchmark records the number of OpenTofu invocations per operation in
+its extra info, so that the cost of cluster-builder itself can be told apart
+from the process spawns that a real OpenTofu would add its own time to.
+"""
+
+import itertools
+import os
+import shutil
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from cluster_builder.config import ClusterDocument  # noqa: E402
+
+from conftest import CLUSTER_SIZES, edge_config, populate_cluster, tofu_calls  # noqa: E402
+
+# Destroying runs two OpenTofu commands per node, keep the rounds few
+DESTROY_ROUNDS = 3
+
+
+def _count_calls(benchmark, stub_tofu, rounds):
+    before = tofu_calls(stub_tofu)
+
+    def record():
+        benchmark.extra_info["tofu_calls_per_op"] = (tofu_calls(stub_tofu) - before) / rounds
+
+    return record
+
+
+@pytest.mark.parametrize("size", CLUSTER_SIZES)
+def test_prepare_infrastructure(benchmark, orchestrator, stub_tofu, size):
+    populate_cluster(orchestrator, "bench", size)
+    names = (f"prepared-{i}" for i in itertools.count())
+    record = _count_calls(benchmark, stub_tofu, 1)
+
+    benchmark(lambda: orchestrator.prepare_infrastructure(edge_config("bench", next(names))))
+    record()
+
+
+@pytest.mark.parametrize("size", CLUSTER_SIZES)
+def test_add_node(benchmark, orchestrator, stub_tofu, size):
+    populate_cluster(orchestrator, "bench", size)
+    names = (f"added-{i}" for i in itertools.count())
+    rounds = 10
+    record = _count_calls(benchmark, stub_tofu, rounds)
+
+    benchmark.pedantic(
+        lambda: orchestrator.add_node(edge_config("bench", next(names))), rounds=rounds
+    )
+    record()
+
+
+@pytest.mark.parametrize("size", CLUSTER_SIZES)
+def test_remove_node(benchmark, orchestrator, stub_tofu, size):
+    populate_cluster(orchestrator, "bench", size)
+    cluster_dir = orchestrator.get_cluster_output_dir("bench")
+    node = orchestrator.cluster_config.prepare(edge_config("bench", "removed"))[1]
+    rounds = 10
+
+    def setup():
+        document = ClusterDocument.load(cluster_dir)
+        document.add_module("removed", node)
+        document.save()
+        with open(os.path.join(cluster_dir, ".workspaces"), "a") as f:
+            f.write("removed\n")
+
+    record = _count_calls(benchmark, stub_tofu, rounds)
+    benchmark.pedantic(
+        lambda: orchestrator.remove_node("bench", "removed"), setup=setup, rounds=rounds
+    )
+    record()
+
+
+@pytest.mark.parametrize("size", CLUSTER_SIZES)
+def test_destroy(benchmark, orchestrator, stub_tofu, size, monkeypatch):
+    monkeypatch.setattr(orchestrator, "remove_cluster_schema_from_db", lambda name: None)
+    cluster_dir = orchestrator.get_cluster_output_dir("bench")
+    populate_cluster(orchestrator, "bench", size)
+    seed_dir = f"{cluster_dir}.seed"
+    shutil.copytree(cluster_dir, seed_dir)
+
+    def setup():
+        shutil.rmtree(cluster_dir, ignore_errors=True)
+        shutil.copytree(seed_dir, cluster_dir)
+
+    record = _count_calls(benchmark, stub_tofu, DESTROY_ROUNDS)
+    benchmark.pedantic(
+        lambda: orchestrator.destroy("bench", parallelism=10), setup=setup, rounds=DESTROY_ROUNDS
+    )
+    record()
@@ -2,9 +2,31 @@
 Cluster Builder - A tool for creating, managing, and destroying K3s clusters.
 """
 
-from cluster_builder.swarmchestrate import Swarmchestrate
+import importlib
+
 from cluster_builder.utils.logging import configure_logging
 
 configure_logging()
 
-__all__ = ["Swarmchestrate"]
+__all__ = ["Swarmchestrate", "OrchestrationEngine", "AsyncSwarmchestrate"]
+
+# The orchestrators pull in asyncio, the PostgreSQL driver and the template
+# machinery, so they are only imported when first accessed
+_LAZY_ATTRIBUTES = {
+    "Swarmchestrate": "cluster_builder.swarmchestrate",
+    "OrchestrationEngine": "cluster_builder.orchestration",
+    "AsyncSwarmchestrate": "cluster_builder.async_swarmchestrate",
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,624 @@
+"""
+AsyncSwarmchestrate - asyncio interface for K3s cluster management.
+"""
+
+import asyncio
+import filecmp
+import json
+import logging
+import os
+import shutil
+import tempfile
+from collections import defaultdict
+from pathlib import Path
+from typing import Optional
+
+from cluster_builder.config.document import ClusterDocument
+from cluster_builder.infrastructure import AsyncCommandExecutor
+from cluster_builder.infrastructure import CommandExecutor
+from cluster_builder.swarmchestrate import Swarmchestrate
+
+logger = logging.getLogger("swarmchestrate")
+
+
+class AsyncSwarmchestrate:
+    """
+    Awaitable counterpart of Swarmchestrate for asyncio applications.
+
+    OpenTofu runs in asyncio subprocesses, so hundreds of node operations can be
+    driven from one event loop without a thread each, and cancelling an
+    operation interrupts its OpenTofu process. Configuration preparation, the
+    PostgreSQL and OpenStack clients and SSH delivery are blocking and run in
+    worker threads.
+
+    Nodes use the namespaced root outputs of `Swarmchestrate.add_nodes` and
+    select their workspace through TF_WORKSPACE, so that operations on nodes of
+    the same cluster can overlap. Edits of the cluster files are always
+    serialised per cluster, while OpenTofu runs are limited by
+    `per_cluster_concurrency` and `max_concurrency`.
+    """
+
+    def __init__(
+        self,
+        template_dir: str,
+        output_dir: str,
+        variables: Optional[dict[str, any]] = None,
+        transport: Optional[str] = None,
+        max_concurrency: int = 100,
+        per_cluster_concurrency: int = 1,
+        state_access: Optional[str] = None,
+    ):
+        """
+        Initialise the AsyncSwarmchestrate class.
+
+        Args:
+            template_dir: Directory containing templates
+            output_dir: Directory for outputting generated files
+            variables: Optional additional variables for deployments
+            transport: How manifests and registry secrets are delivered to the
+                master, see `Swarmchestrate`
+            max_concurrency: Maximum number of OpenTofu runs at once overall
+            per_cluster_concurrency: Maximum number of OpenTofu runs at once
+                for a single cluster
+            state_access: How node outputs are read after a deployment, see
+                `Swarmchestrate`
+        """
+        self.swarmchestrate = Swarmchestrate(
+            template_dir, output_dir, variables, transport, state_access
+        )
+        self.max_concurrency = max_concurrency
+        self.per_cluster_concurrency = per_cluster_concurrency
+
+        self._global_limit = asyncio.Semaphore(max_concurrency)
+        self._cluster_limits = defaultdict(lambda: asyncio.Semaphore(per_cluster_concurrency))
+        self._cluster_edit_locks = defaultdict(asyncio.Lock)
+        self._manifest_locks = defaultdict(asyncio.Lock)
+
+        logger.debug(
+            f"Initialised AsyncSwarmchestrate with max_concurrency={max_concurrency}, "
+            f"per_cluster_concurrency={per_cluster_concurrency}"
+        )
+
+    @property
+    def output_callbacks(self) -> list:
+        """Extra callbacks receiving every line printed by OpenTofu applies and destroys."""
+        return self.swarmchestrate.output_callbacks
+
+    def get_cluster_output_dir(self, cluster_name: str) -> str:
+        """
+        Get the output directory path for a specific cluster.
+
+        Args:
+            cluster_name: Name of the cluster
+
+        Returns:
+            Path to the cluster output directory
+        """
+        return self.swarmchestrate.get_cluster_output_dir(cluster_name)
+
+    async def add_node(self, config: dict[str, any], dryrun: bool = False) -> dict:
+        """
+        Add a node to an existing cluster or create a new cluster, see
+        `Swarmchestrate.add_node`.
+
+        Args:
+            config: Configuration dictionary containing cloud, k3s_role, and
+                optionally cluster_name and master_ip
+            dryrun: If True, only validate the configuration without deploying
+
+        Returns:
+            The cluster name and other output values.
+
+        Raises:
+            ValueError: If required configuration is missing or invalid
+            RuntimeError: If preparation or deployment fails
+        """
+        config = config.copy()
+        if "cluster_name" not in config:
+            config["cluster_name"] = self.swarmchestrate.cluster_config.generate_random_name()
+            logger.info(f"Creating new cluster: {config['cluster_name']}")
+        cluster_name = config["cluster_name"]
+
+        async with self._cluster_edit_locks[cluster_name]:
+            cluster_dir, prepared_config = await asyncio.to_thread(
+                self.swarmchestrate.prepare_infrastructure, config
+            )
+            module_name = prepared_config["resource_name"]
+            output_names = self.swarmchestrate._output_names(prepared_config["cloud"])
+            floating_ip_ids = [prepared_config.get("floating_ip_id")]
+            try:
+                document = ClusterDocument.load(cluster_dir)
+                document.add_module_outputs(module_name, output_names)
+                document.save()
+            except Exception:
+                self.swarmchestrate.floating_ips.release(floating_ip_ids)
+                raise
+
+        role = prepared_config["k3s_role"]
+        logger.info(f"---------- Starting deployment of {module_name} ({role}) ----------")
+
+        try:
+            outputs = await self.deploy(cluster_dir, cluster_name, module_name, dryrun)
+        except asyncio.CancelledError:
+            self.swarmchestrate.floating_ips.release(floating_ip_ids)
+            logger.warning(f"⚠️ Deployment of '{module_name}' was cancelled")
+            raise
+        except Exception as e:
+            self.swarmchestrate.floating_ips.release(floating_ip_ids)
+            error_msg = f"❌ Failed to add node: {e}"
+            logger.error(error_msg)
+            raise RuntimeError(error_msg)
+        if dryrun:
+            self.swarmchestrate.floating_ips.release(floating_ip_ids)
+
+        result_outputs = self.swarmchestrate._extract_outputs(outputs, output_names, module_name)
+        logger.info(f"✅ Successfully added '{module_name}' for cluster '{cluster_name}'")
+        logger.debug(f"Deployment outputs: {result_outputs}")
+        return result_outputs
+
+    async def deploy(
+        self,
+        cluster_dir: str,
+        cluster_name: str,
+        workspace: str,
+        dryrun: bool = False,
+    ) -> dict:
+        """
+        Deploy the module of one node in its own workspace.
+
+        Args:
+            cluster_dir: Directory containing the Terraform files for the cluster
+            cluster_name: Name of the cluster
+            workspace: Workspace, and module, name of the node
+            dryrun: If True, only run init and validate without applying
+
+        Returns:
+            Parsed 'tofu output -json' of the workspace (empty when dryrun is set)
+
+        Raises:
+            RuntimeError: If OpenTofu commands fail
+        """
+        env_vars = self.swarmchestrate._tofu_env()
+
+        # Init and workspace creation change the shared working directory
+        async with self._cluster_edit_locks[cluster_name]:
+            init_args = ["-backend=false"] if dryrun else []
+            await self.swarmchestrate.tofu_initializer.init_async(
+                cluster_dir, env_vars, "cluster", init_args
+            )
+            if dryrun:
+                await AsyncCommandExecutor.run_command(
+                    ["tofu", "validate"], cluster_dir, "OpenTofu validate", env=env_vars
+                )
+                logger.info("✅ Infrastructure successfully validated")
+                return {}
+
+            existing = await self._list_workspaces(cluster_dir, env_vars)
+            new_workspace = workspace not in existing
+            # With SQL state access the backend creates it on first use instead
+            if new_workspace and not self.swarmchestrate._sql_schema(cluster_dir):
+                await AsyncCommandExecutor.run_command(
+                    ["tofu", "workspace", "new", workspace],
+                    cluster_dir,
+                    f"OpenTofu workspace new {workspace}",
+                    env=env_vars,
+                )
+
+        node_env = dict(env_vars, TF_WORKSPACE=workspace)
+        tofu_config = self.swarmchestrate.tofu_config
+        module_count = len(ClusterDocument.load(cluster_dir).modules)
+        plan_command, apply_command, plan_file = self.swarmchestrate.targeted_plan_commands(
+            workspace, new_workspace
+        )
+        async with self._limit(cluster_name):
+            try:
+                await AsyncCommandExecutor.run_command(
+                    plan_command,
+                    cluster_dir,
+                    f"OpenTofu plan for {workspace}",
+                    timeout=tofu_config.plan_timeout_for(module_count),
+                    env=node_env,
+                )
+                await self._stream_command(
+                    apply_command,
+                    cluster_dir,
+                    f"OpenTofu apply for {workspace}",
+                    timeout=tofu_config.apply_timeout_for(module_count),
+                    env=node_env,
+                )
+            finally:
+                # Saved plans hold the node variables in clear text, including secrets
+                try:
+                    os.remove(os.path.join(cluster_dir, plan_file))
+                except FileNotFoundError:
+                    pass
+            if self.swarmchestrate.state_access == "sql":
+                return await asyncio.to_thread(
+                    self.swarmchestrate.state_reader.outputs, cluster_name, workspace
+                )
+            output = await AsyncCommandExecutor.run_command(
+                ["tofu", "output", "-json"],
+                cluster_dir,
+                f"OpenTofu output for {workspace}",
+                env=node_env,
+            )
+        return json.loads(output)
+
+    async def remove_node(
+        self, cluster_name: str, resource_name: str, dryrun: bool = False
+    ) -> None:
+        """
+        Remove a specific node from a cluster, see `Swarmchestrate.remove_node`.
+
+        Args:
+            cluster_name: Name of the cluster
+            resource_name: Node name in K3s and module name in main.tf / OpenTofu
+            dryrun: If True, only simulate actions without executing
+
+        Raises:
+            RuntimeError: If node removal fails
+        """
+        logger.info(f"------------ Removing node '{resource_name}' from cluster '{cluster_name}' ------------")
+
+        cluster_dir = self.get_cluster_output_dir(cluster_name)
+        if not ClusterDocument.exists(cluster_dir):
+            error_msg = f"Cluster configuration not found in {cluster_dir}"
+            logger.error(error_msg)
+            raise RuntimeError(error_msg)
+
+        env_vars = os.environ.copy()
+        node_env = dict(env_vars, TF_WORKSPACE=resource_name)
+
+        try:
+            # The destroy only touches the workspace of the node, other edits
+            # of the cluster need not wait for it
+            if dryrun:
+                logger.info(f"Dryrun: would destroy infrastructure for '{resource_name}'")
+            else:
+                async with self._limit(cluster_name):
+                    await self._stream_command(
+                        ["tofu", "destroy", "-auto-approve"],
+                        cluster_dir,
+                        f"Destroying infrastructure for '{resource_name}'",
+                        env=node_env,
+                    )
+
+            async with self._cluster_edit_locks[cluster_name]:
+                document = ClusterDocument.load(cluster_dir)
+                document.remove_module(resource_name)
+                document.save()
+                logger.info(f"Removed module block and outputs for '{resource_name}'")
+
+                if dryrun:
+                    logger.info(f"Dryrun: would delete workspace '{resource_name}'")
+                    return
+
+                # The workspace of the node is empty once destroyed, nothing is
+                # applied in it: an untargeted apply would create every other
+                # module of the cluster in the workspace being deleted
+                await self._delete_workspace(cluster_dir, resource_name, env_vars)
+
+            logger.info(f"----------- Removal of node '{resource_name}' from cluster '{cluster_name}' complete -----------")
+
+        except RuntimeError as e:
+            error_msg = f"❌ Failed to remove node '{resource_name}' from cluster '{cluster_name}': {str(e)}"
+            logger.error(error_msg)
+            raise RuntimeError(error_msg)
+
+    async def destroy(self, cluster_name: str, dryrun: bool = False) -> dict:
+        """
+        Destroy a cluster, see `Swarmchestrate.destroy`.
+
+        The workspaces of the nodes are destroyed concurrently, within the
+        concurrency limits.
+
+        Args:
+            cluster_name: Name of the cluster to destroy
+            dryrun: If True, only deletes local cluster directory without touching infra
+
+        Returns:
+            Report with the "destroyed" node names and the "failed" nodes
+            mapped to their error
+
+        Raises:
+            RuntimeError: If destruction fails. When only some nodes could not
+                be destroyed, the report is attached as its `report` attribute
+                and the cluster state is kept for a retry.
+        """
+        logger.info(f"---------- Destroying the cluster '{cluster_name}' -----------")
+
+        cluster_dir = self.get_cluster_output_dir(cluster_name)
+        if not os.path.exists(cluster_dir):
+            error_msg = f"❌ Cluster directory '{cluster_dir}' not found. Cannot safely destroy."
+            logger.error(error_msg)
+            raise RuntimeError(error_msg)
+
+        report = {"destroyed": [], "failed": {}}
+
+        async with self._cluster_edit_locks[cluster_name]:
+            if dryrun:
+                logger.info("Dryrun: only removing local cluster directory")
+                await asyncio.to_thread(shutil.rmtree, cluster_dir, True)
+                return report
+
+            document = ClusterDocument.load(cluster_dir)
+            document.set_backend(self.swarmchestrate.pg_config.get_connection_string(), cluster_name)
+            document.save()
+
+            env_vars = os.environ.copy()
+            env_vars["TF_IN_AUTOMATION"] = "true"
+
+            await self.swarmchestrate.tofu_initializer.init_async(
+                cluster_dir, env_vars, "cluster", ["-reconfigure"], "initializing backend"
+            )
+            workspaces = [
+                ws for ws in await self._list_workspaces(cluster_dir, env_vars)
+                if ws and ws.lower() != "default"
+            ]
+            logger.debug(f"📋 Found workspaces for cluster '{cluster_name}': {workspaces}")
+
+            # Workspaces can only be deleted by OpenTofu while another one is selected
+            schema_name = self.swarmchestrate._sql_schema(cluster_dir)
+            if workspaces and not schema_name:
+                await AsyncCommandExecutor.run_command(
+                    ["tofu", "workspace", "select", "default"],
+                    cluster_dir,
+                    "switching back to default",
+                    env=env_vars,
+                )
+
+            async def destroy_workspace(ws: str) -> None:
+                try:
+                    async with self._limit(cluster_name):
+                        await self._stream_command(
+                            ["tofu", "destroy", "-auto-approve", "-input=false"],
+                            cluster_dir,
+                            f"OpenTofu destroy for {ws}",
+                            env=dict(env_vars, TF_WORKSPACE=ws),
+                        )
+                    if schema_name:
+                        await asyncio.to_thread(
+                            self.swarmchestrate._delete_workspace, cluster_dir, ws, env_vars, schema_name
+                        )
+                    else:
+                        await AsyncCommandExecutor.run_command(
+                            ["tofu", "workspace", "delete", "-force", ws],
+                            cluster_dir,
+                            f"deleting workspace {ws}",
+                            env=env_vars,
+                        )
+                    report["destroyed"].append(ws)
+                    logger.info(f"✅ Successfully destroyed node '{ws}'")
+                except RuntimeError as e:
+                    report["failed"][ws] = str(e)
+                    logger.warning(f"⚠️ Failed to destroy workspace '{ws}': {e}")
+
+            await asyncio.gather(*(destroy_workspace(ws) for ws in workspaces))
+
+            if report["failed"]:
+                error_msg = (
+                    f"❌ Failed to destroy {len(report['failed'])} of {len(workspaces)} nodes of cluster "
+                    f"'{cluster_name}': {', '.join(report['failed'])}. Keeping its state for a retry."
+                )
+                logger.error(error_msg)
+                error = RuntimeError(error_msg)
+                error.report = report
+                raise error
+
+            await asyncio.to_thread(self.swarmchestrate.remove_cluster_schema_from_db, cluster_name)
+            await asyncio.to_thread(shutil.rmtree, cluster_dir, True)
+            logger.info(f"🧹 Removed local cluster directory '{cluster_dir}'")
+
+        logger.info(f"----------- Destruction of cluster '{cluster_name}' complete -----------")
+        return report
+
+    async def deploy_manifests(
+        self,
+        manifest_folder: str,
+        master_ip: str,
+        ssh_key_path: str,
+        ssh_user: str,
+    ) -> None:
+        """
+        Copy and apply manifests to a cluster, see `Swarmchestrate.deploy_manifests`.
+
+        Args:
+            manifest_folder: Path to local manifest folder
+            master_ip: IP address of K3s master
+            ssh_key_path: Path to SSH private key
+            ssh_user: SSH username to connect to the master node
+        """
+        manifest_dir = Path(self.swarmchestrate.get_manifest_workspace_dir(master_ip))
+        manifest_dir.mkdir(parents=True, exist_ok=True)
+
+        async with self._manifest_locks[str(manifest_dir)]:
+            logger.info(f"------------ Applying manifest on node: {master_ip} -------------------")
+            if self.swarmchestrate.ssh_transport:
+                await asyncio.to_thread(
+                    self.swarmchestrate.ssh_transport.deploy_manifests,
+                    os.path.abspath(manifest_folder),
+                    master_ip,
+                    ssh_key_path,
+                    ssh_user,
+                    str(manifest_dir / "manifest-hashes.json"),
+                )
+                logger.info("------------ Successfully applied manifests -------------------")
+                return
+
+            tf_source_file = Path(self.swarmchestrate.template_manager.templates_dir) / "deploy_manifest.tf"
+            if not tf_source_file.exists():
+                raise RuntimeError(f"deploy_manifest.tf not found at: {tf_source_file}")
+            tf_target_file = manifest_dir / "deploy_manifest.tf"
+            if not tf_target_file.exists() or not filecmp.cmp(
+                tf_source_file, tf_target_file, shallow=False
+            ):
+                shutil.copy(tf_source_file, tf_target_file)
+
+            env_vars = self.swarmchestrate._tofu_env()
+            await self.swarmchestrate.tofu_initializer.init_async(
+                str(manifest_dir), env_vars, "deploy_manifest"
+            )
+            async with self._global_limit:
+                await self._stream_command(
+                    [
+                        "tofu",
+                        "apply",
+                        "-auto-approve",
+                        "-input=false",
+                        f"-var=manifest_folder={os.path.abspath(manifest_folder)}",
+                        f"-var=master_ip={master_ip}",
+                        f"-var=ssh_private_key_path={ssh_key_path}",
+                        f"-var=ssh_user={ssh_user}",
+                    ],
+                    str(manifest_dir),
+                    "OpenTofu apply",
+                    env=env_vars,
+                )
+            logger.info("------------ Successfully applied manifests -------------------")
+
+    async def create_registry_secrets(self, cluster_config: dict) -> list[str]:
+        """
+        Create Docker registry secrets in Kubernetes, see
+        `Swarmchestrate.create_registry_secrets`.
+
+        Args:
+            cluster_config: Cluster connection details
+
+        Returns:
+            Names of the secrets
+        """
+        request = self.swarmchestrate._registry_secret_request(cluster_config)
+
+        if self.swarmchestrate.ssh_transport:
+            secret_names_list = await asyncio.to_thread(
+                self.swarmchestrate.ssh_transport.create_registry_secrets,
+                request["registries"],
+                request["usernames"],
+                request["passwords"],
+                request["master_ip"],
+                request["ssh_user"],
+                request["ssh_key_path"],
+                request["namespace"],
+                request["secret_names"],
+            )
+            logger.info(f"Created registry secrets: {secret_names_list}")
+            return secret_names_list
+
+        tf_source_file = Path(self.swarmchestrate.template_manager.templates_dir) / "registry_secret.tf"
+        if not tf_source_file.exists():
+            raise RuntimeError(f"registry_secret.tf not found at: {tf_source_file}")
+
+        Path(self.swarmchestrate.output_dir).mkdir(parents=True, exist_ok=True)
+        temp_dir = tempfile.mkdtemp(prefix="registry-secret-", dir=self.swarmchestrate.output_dir)
+        try:
+            shutil.copy(tf_source_file, os.path.join(temp_dir, "registry_secret.tf"))
+
+            env_vars = os.environ.copy()
+            env_vars["TF_LOG"] = os.getenv("TF_LOG", "INFO")
+
+            await self.swarmchestrate.tofu_initializer.init_async(
+                temp_dir, env_vars, "registry_secret", description="Init OpenTofu"
+            )
+            async with self._global_limit:
+                await self._stream_command(
+                    ["tofu", "apply", "-auto-approve"]
+                    + self.swarmchestrate._registry_secret_apply_vars(request),
+                    temp_dir,
+                    "Apply registry secrets",
+                    env=env_vars,
+                )
+                output_result = await AsyncCommandExecutor.run_command(
+                    ["tofu", "output", "-json", "docker_registry_secret_names"],
+                    temp_dir,
+                    "Fetch registry secret names",
+                    env=env_vars,
+                )
+
+            lines = [line for line in output_result.splitlines() if line.strip()]
+            if not lines:
+                raise RuntimeError("No output received from OpenTofu for secret names")
+            secret_names_list = json.loads(lines[-1])
+            logger.info(f"Created registry secrets: {secret_names_list}")
+            return secret_names_list
+
+        finally:
+            logger.debug(f"Cleaning up temp dir: {temp_dir}")
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def _limit(self, cluster_name: str) -> "_Limits":
+        """Context manager holding a slot of both the cluster and global limits."""
+        return _Limits(self._cluster_limits[cluster_name], self._global_limit)
+
+    async def _stream_command(
+        self, command: list, cwd: str, description: str, env: dict, timeout: Optional[float] = None
+    ) -> str:
+        """Run a long OpenTofu command with its output handed to the callbacks line by line."""
+        return await AsyncCommandExecutor.run_command(
+            command,
+            cwd,
+            description,
+            timeout=timeout,
+            env=env,
+            callbacks=CommandExecutor.default_callbacks(description) + self.output_callbacks,
+            tail_lines=200,
+        )
+
+    async def _list_workspaces(self, cluster_dir: str, env_vars: dict) -> list[str]:
+        """List the OpenTofu workspaces of a cluster."""
+        schema_name = self.swarmchestrate._sql_schema(cluster_dir)
+        if schema_name:
+            return await asyncio.to_thread(self.swarmchestrate.workspaces.list, schema_name)
+        try:
+            output = await AsyncCommandExecutor.run_command(
+                ["tofu", "workspace", "list"], cluster_dir, "listing workspaces", env=env_vars
+            )
+        except RuntimeError as e:
+            error_msg = f"❌ Failed to list workspaces: {e}"
+            logger.error(error_msg)
+            raise RuntimeError(error_msg)
+        return [line.strip("* ").strip() for line in output.splitlines()]
+
+    async def _delete_workspace(self, cluster_dir: str, workspace: str, env_vars: dict) -> None:
+        """Delete the OpenTofu workspace of a node once its resources are destroyed."""
+        schema_name = self.swarmchestrate._sql_schema(cluster_dir)
+        if schema_name:
+            await asyncio.to_thread(
+                self.swarmchestrate._delete_workspace, cluster_dir, workspace, env_vars, schema_name
+            )
+            return
+        env_vars = {k: v for k, v in env_vars.items() if k != "TF_WORKSPACE"}
+        # The selected workspace cannot be deleted
+        await AsyncCommandExecutor.run_command(
+            ["tofu", "workspace", "select", "default"],
+            cluster_dir,
+            "switching back to default",
+            env=env_vars,
+        )
+        await AsyncCommandExecutor.run_command(
+            ["tofu", "workspace", "delete", "-force", workspace],
+            cluster_dir,
+            f"deleting workspace {workspace}",
+            env=env_vars,
+        )
+
+
+class _Limits:
+    """Acquires several semaphores in order and releases them in reverse."""
+
+    def __init__(self, *semaphores: asyncio.Semaphore):
+        self._semaphores = semaphores
+
+    async def __aenter__(self) -> None:
+        acquired = []
+        try:
+            for semaphore in self._semaphores:
+                await semaphore.acquire()
+                acquired.append(semaphore)
+        except BaseException:
+            for semaphore in reversed(acquired):
+                semaphore.release()
+            raise
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        for semaphore in reversed(self._semaphores):
+            semaphore.release()
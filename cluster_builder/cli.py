@@ -0,0 +1,142 @@
+"""
+Command line interface of the cluster builder.
+
+`cluster-builder serve` runs the daemon; every other command is a thin client
+forwarding to it, so routine operations skip the start-up of the orchestrator.
+"""
+
+import argparse
+import json
+import logging
+import sys
+from typing import Optional
+
+from cluster_builder.daemon import ClusterBuilderClient
+from cluster_builder.daemon import serve
+
+logger = logging.getLogger("swarmchestrate")
+
+
+def _load_json(path: str):
+    with open(path) as f:
+        return json.load(f)
+
+
+def _run_client(args) -> object:
+    client = ClusterBuilderClient(args.address, timeout=args.timeout)
+    if args.command == "health":
+        return client.health()
+    if args.command == "inventory":
+        return client.inventory(args.cluster_name)
+    if args.command == "jobs":
+        return client.jobs()
+    if args.command == "job":
+        return client.job(args.job_id, wait=args.wait)
+    if args.command == "add-node":
+        return client.add_node(_load_json(args.config), dryrun=args.dryrun)
+    if args.command == "add-nodes":
+        configs = [_load_json(path) for path in args.configs]
+        return client.add_nodes(configs, parallelism=args.parallelism, dryrun=args.dryrun)
+    if args.command == "remove-node":
+        return client.remove_node(args.cluster_name, args.resource_name, dryrun=args.dryrun)
+    if args.command == "destroy":
+        return client.destroy(args.cluster_name, dryrun=args.dryrun, parallelism=args.parallelism)
+    if args.command == "deploy-manifests":
+        return client.deploy_manifests(
+            args.manifest_folder, args.master_ip, args.ssh_key_path, args.ssh_user
+        )
+    if args.command == "create-registry-secrets":
+        return client.create_registry_secrets(_load_json(args.config))
+    raise ValueError(f"Unknown command '{args.command}'")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="cluster-builder", description="Create, manage and destroy K3s clusters"
+    )
+    parser.add_argument(
+        "--address",
+        help="Unix socket path or host:port of the daemon "
+        "(defaults to CLUSTER_BUILDER_DAEMON_ADDRESS or a socket in the cache directory)",
+    )
+    parser.add_argument(
+        "--timeout", type=float, help="Maximum time in seconds to wait for an operation"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    daemon = commands.add_parser("serve", help="Run the cluster-builder daemon")
+    daemon.add_argument("--template-dir", default="templates", help="Directory containing templates")
+    daemon.add_argument("--output-dir", default="output", help="Directory for generated cluster files")
+    daemon.add_argument("--max-workers", type=int, default=8, help="Maximum number of operations running at once")
+    daemon.add_argument("--transport", choices=["tofu", "ssh"], help="Delivery of manifests and registry secrets")
+    daemon.add_argument("--state-access", choices=["sql", "cli"], help="Access to node outputs and workspaces")
+
+    commands.add_parser("health", help="Show the status of the daemon")
+
+    inventory = commands.add_parser("inventory", help="List the nodes of every cluster or of one cluster")
+    inventory.add_argument("cluster_name", nargs="?")
+
+    commands.add_parser("jobs", help="List the jobs of the daemon")
+    job = commands.add_parser("job", help="Show a job of the daemon")
+    job.add_argument("job_id")
+    job.add_argument("--wait", type=float, default=0, help="Seconds to wait for the job to finish")
+
+    add_node = commands.add_parser("add-node", help="Add a node from a JSON configuration file")
+    add_node.add_argument("config")
+    add_node.add_argument("--dryrun", action="store_true")
+
+    add_nodes = commands.add_parser("add-nodes", help="Add several nodes of one cluster at once")
+    add_nodes.add_argument("configs", nargs="+")
+    add_nodes.add_argument("--parallelism", type=int, default=10)
+    add_nodes.add_argument("--dryrun", action="store_true")
+
+    remove_node = commands.add_parser("remove-node", help="Remove a node from a cluster")
+    remove_node.add_argument("cluster_name")
+    remove_node.add_argument("resource_name")
+    remove_node.add_argument("--dryrun", action="store_true")
+
+    destroy = commands.add_parser("destroy", help="Destroy a cluster")
+    destroy.add_argument("cluster_name")
+    destroy.add_argument("--parallelism", type=int, default=10)
+    destroy.add_argument("--dryrun", action="store_true")
+
+    manifests = commands.add_parser("deploy-manifests", help="Apply a folder of manifests to a cluster")
+    manifests.add_argument("manifest_folder")
+    manifests.add_argument("master_ip")
+    manifests.add_argument("ssh_key_path")
+    manifests.add_argument("ssh_user")
+
+    secrets = commands.add_parser(
+        "create-registry-secrets", help="Create registry secrets from a JSON configuration file"
+    )
+    secrets.add_argument("config")
+
+    return parser
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    if args.command == "serve":
+        serve(
+            args.address,
+            template_dir=args.template_dir,
+            output_dir=args.output_dir,
+            max_workers=args.max_workers,
+            transport=args.transport,
+            state_access=args.state_access,
+        )
+        return 0
+
+    try:
+        result = _run_client(args)
+    except (RuntimeError, OSError, ValueError) as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    if result is not None:
+        print(json.dumps(result, indent=2, default=str))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -3,6 +3,10 @@ Configuration management for the Cluster Builder.
 """
 
 from cluster_builder.config.postgres import PostgresConfig
+from cluster_builder.config.postgres import PostgresConnectionPool
 from cluster_builder.config.cluster import ClusterConfig
+from cluster_builder.config.document import ClusterDocument
+from cluster_builder.config.registry import RegistryCredentials
+from cluster_builder.config.tofu import TofuConfig
 
-__all__ = ["PostgresConfig", "ClusterConfig"]
+__all__ = ["PostgresConfig", "PostgresConnectionPool", "ClusterConfig", "ClusterDocument", "RegistryCredentials", "TofuConfig"]
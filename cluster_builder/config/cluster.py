@@ -6,9 +6,8 @@ import os
 import logging
 import secrets
 import string
-from names_generator import generate_name
 
-from cluster_builder.infrastructure import TemplateManager
+from cluster_builder.infrastructure.templates import TemplateManager
 
 logger = logging.getLogger("swarmchestrate")
 
@@ -50,6 +49,8 @@ class ClusterConfig:
         Returns:
             A randomly generated name
         """
+        from names_generator import generate_name
+
         name = generate_name()
         name = name.replace("_", "-")
         logger.debug(f"Generated random name: {name}")
@@ -96,6 +97,26 @@ class ClusterConfig:
             logger.error(error_msg)
             raise ValueError(error_msg)
 
+        provisioning = config.get("provisioning", "ssh")
+        if provisioning not in ("ssh", "cloud-init"):
+            error_msg = f"Unsupported provisioning '{provisioning}', expected 'ssh' or 'cloud-init'"
+            logger.error(error_msg)
+            raise ValueError(error_msg)
+        if provisioning == "cloud-init" and config["cloud"] == "edge":
+            error_msg = "Edge devices are pre-provisioned and cannot be provisioned with cloud-init"
+            logger.error(error_msg)
+            raise ValueError(error_msg)
+
+        # Registry credentials would be saved in the cluster configuration,
+        # they are passed when applying instead, see `ClusterDocument`
+        if "registry_auths" in config:
+            error_msg = (
+                "registry_auths cannot be set in a node configuration, the embedded registry "
+                "mirror reads them from DOCKER_REGISTRIES, DOCKER_USERNAMES and DOCKER_PASSWORDS"
+            )
+            logger.error(error_msg)
+            raise ValueError(error_msg)
+
         # Create a copy of the configuration
         prepared_config = config.copy()
 
@@ -0,0 +1,267 @@
+"""
+In-memory model of the OpenTofu configuration of a cluster.
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Optional
+
+from cluster_builder.utils.hcl import module_output_name
+
+logger = logging.getLogger("swarmchestrate")
+
+DOCUMENT_FILE_NAME = "main.tf.json"
+
+# Hand-written HCL files used before clusters were described by a ClusterDocument
+LEGACY_FILE_NAMES = ("backend.tf", "main.tf", "outputs.tf")
+
+# Root variable holding the credentials of the embedded registry mirror. Its
+# value is only passed to OpenTofu, as TF_VAR_registry_auths, when applying
+REGISTRY_AUTHS_VARIABLE = {
+    "type": "list(object({registry = string, username = string, password = string}))",
+    "default": [],
+    "sensitive": True,
+}
+
+
+class ClusterDocument:
+    """
+    Backend, providers, variables, modules and outputs of a cluster, saved as
+    main.tf.json.
+
+    The document mirrors OpenTofu's JSON configuration syntax, so it is loaded
+    with `json.load`, edited with plain dictionary operations and written back
+    in one pass. String values of module arguments are stored escaped, so that
+    they are passed to the module literally rather than as templates.
+
+    Secrets are kept out of the document: modules running the embedded registry
+    mirror refer to the sensitive `registry_auths` root variable instead.
+    """
+
+    def __init__(self, path: str, data: Optional[dict] = None):
+        """
+        Initialise the ClusterDocument.
+
+        Args:
+            path: Path of the main.tf.json file
+            data: Configuration in OpenTofu JSON syntax
+        """
+        data = data or {}
+        self.path = path
+        self.backend = data.get("terraform", {}).get("backend", {})
+        self.providers = data.get("provider", {})
+        self.variables = data.get("variable", {})
+        self.modules = data.get("module", {})
+        self.outputs = data.get("output", {})
+
+    @classmethod
+    def load(cls, cluster_dir: str) -> "ClusterDocument":
+        """
+        Load the document of a cluster, migrating legacy HCL files if needed.
+
+        Args:
+            cluster_dir: Directory of the cluster
+
+        Returns:
+            The document, empty for a new cluster
+        """
+        path = os.path.join(cluster_dir, DOCUMENT_FILE_NAME)
+        if os.path.exists(path):
+            with open(path) as f:
+                return cls(path, json.load(f))
+
+        document = cls(path)
+        if any(os.path.exists(os.path.join(cluster_dir, n)) for n in LEGACY_FILE_NAMES):
+            document._migrate(cluster_dir)
+        return document
+
+    @staticmethod
+    def exists(cluster_dir: str) -> bool:
+        """Return True if the cluster has a configuration, in either format."""
+        return any(
+            os.path.exists(os.path.join(cluster_dir, name))
+            for name in (DOCUMENT_FILE_NAME, "main.tf")
+        )
+
+    def set_backend(self, conn_str: str, schema_name: str, overwrite: bool = False) -> None:
+        """
+        Configure the PostgreSQL state backend.
+
+        Args:
+            conn_str: PostgreSQL connection string
+            schema_name: Schema name for the state
+            overwrite: Replace an existing backend configuration
+        """
+        if self.backend and not overwrite:
+            logger.debug(f"Backend config already exists, skipping: {self.path}")
+            return
+        self.backend = {"pg": {"conn_str": conn_str, "schema_name": schema_name}}
+
+    def module_names(self) -> list[str]:
+        """Return the names of the modules, in the order they were added."""
+        return list(self.modules)
+
+    def has_module(self, module_name: str) -> bool:
+        return module_name in self.modules
+
+    def add_module(self, module_name: str, config: dict[str, any]) -> bool:
+        """
+        Add a node module.
+
+        Args:
+            module_name: Name of the module
+            config: Node configuration, whose module_source becomes the module
+                source and whose other non-None values become its arguments
+
+        Returns:
+            False if the module already exists, True otherwise
+        """
+        if module_name in self.modules:
+            logger.warning(f"⚠️ Module '{module_name}' already exists, skipping in {self.path}")
+            return False
+        self.modules[module_name] = self._module_body(config)
+        self._declare_variables(self.modules[module_name])
+        return True
+
+    def replace_module(self, module_name: str, config: dict[str, any]) -> bool:
+        """
+        Replace the arguments of an existing module, keeping its position.
+
+        Returns:
+            False if the module does not exist, True otherwise
+        """
+        if module_name not in self.modules:
+            return False
+        self.modules[module_name] = self._module_body(config)
+        self._declare_variables(self.modules[module_name])
+        return True
+
+    def remove_module(self, module_name: str) -> bool:
+        """
+        Remove a module along with the outputs referring to it.
+
+        Returns:
+            False if the module does not exist, True otherwise
+        """
+        if self.modules.pop(module_name, None) is None:
+            logger.warning(f"⚠️ No module named '{module_name}' found in {self.path}")
+            return False
+        reference = f"${{module.{module_name}."
+        self.outputs = {
+            name: output
+            for name, output in self.outputs.items()
+            if not str(output.get("value", "")).startswith(reference)
+        }
+        return True
+
+    def set_outputs(self, module_name: str, output_names: list[str]) -> None:
+        """
+        Point the root outputs of the given names at a module.
+
+        Args:
+            module_name: Module whose outputs should be exposed
+            output_names: Output names exposed by the module
+        """
+        for output_name in output_names:
+            self.outputs[output_name] = {"value": f"${{module.{module_name}.{output_name}}}"}
+
+    def add_module_outputs(self, module_name: str, output_names: list[str]) -> None:
+        """
+        Expose the outputs of a module under names namespaced by the module,
+        see `hcl.module_output_name`.
+
+        Args:
+            module_name: Module whose outputs should be exposed
+            output_names: Output names exposed by the module
+        """
+        for output_name in output_names:
+            self.outputs.setdefault(
+                module_output_name(module_name, output_name),
+                {"value": f"${{module.{module_name}.{output_name}}}"},
+            )
+
+    def to_dict(self) -> dict:
+        """Return the configuration in OpenTofu JSON syntax."""
+        data = {}
+        if self.backend:
+            data["terraform"] = {"backend": self.backend}
+        if self.providers:
+            data["provider"] = self.providers
+        if self.variables:
+            data["variable"] = self.variables
+        if self.modules:
+            data["module"] = self.modules
+        if self.outputs:
+            data["output"] = self.outputs
+        return data
+
+    def save(self) -> None:
+        """Write the document atomically."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+            f.write("\n")
+        os.replace(tmp_path, self.path)
+        logger.debug(f"Saved cluster configuration to {self.path}")
+
+    @staticmethod
+    def _module_body(config: dict[str, any]) -> dict:
+        """Build the JSON body of a module from a node configuration."""
+        body = {"source": config["module_source"]}
+        for key, value in config.items():
+            if key == "module_source" or value is None:
+                continue
+            body[key] = _literal(value)
+        if config.get("embedded_registry"):
+            body["registry_auths"] = "${var.registry_auths}"
+        return body
+
+    def _declare_variables(self, body: dict) -> None:
+        """Declare the root variables a module body refers to."""
+        if body.get("registry_auths") == "${var.registry_auths}":
+            self.variables.setdefault("registry_auths", dict(REGISTRY_AUTHS_VARIABLE))
+
+    def _migrate(self, cluster_dir: str) -> None:
+        """
+        Import the legacy backend.tf, main.tf and outputs.tf of a cluster.
+
+        The HCL files are parsed once and then removed, since OpenTofu would
+        otherwise see every block twice once the document is saved.
+        """
+        import hcl2
+
+        for name in LEGACY_FILE_NAMES:
+            legacy_path = os.path.join(cluster_dir, name)
+            if not os.path.exists(legacy_path):
+                continue
+            with open(legacy_path) as f:
+                parsed = hcl2.load(f)
+
+            for terraform in parsed.get("terraform", []):
+                for backend in terraform.get("backend", []):
+                    self.backend.update(backend)
+            for module in parsed.get("module", []):
+                self.modules.update(module)
+            for output in parsed.get("output", []):
+                self.outputs.update(output)
+
+        self.save()
+        for name in LEGACY_FILE_NAMES:
+            legacy_path = os.path.join(cluster_dir, name)
+            if os.path.exists(legacy_path):
+                os.remove(legacy_path)
+        logger.info(f"Migrated the configuration of {cluster_dir} to {DOCUMENT_FILE_NAME}")
+
+
+def _literal(value):
+    """Escape template sequences so that a value is taken literally by OpenTofu."""
+    if isinstance(value, str):
+        return value.replace("${", "$${").replace("%{", "%%{")
+    if isinstance(value, list):
+        return [_literal(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _literal(v) for k, v in value.items()}
+    return value
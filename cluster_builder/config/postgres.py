@@ -4,7 +4,11 @@ PostgreSQL configuration for Terraform state backend.
 
 import os
 import logging
-from dataclasses import dataclass
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Optional
 
 logger = logging.getLogger("swarmchestrate")
 
@@ -18,6 +22,15 @@ class PostgresConfig:
     host: str
     database: str
     sslmode: str = "prefer"
+    pool_min_size: int = 1
+    pool_max_size: int = 10
+    pool_idle_timeout: float = 300.0
+    _pool: Optional["PostgresConnectionPool"] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    _pool_lock: threading.Lock = field(
+        default_factory=threading.Lock, init=False, repr=False, compare=False
+    )
 
     @classmethod
     def from_dict(cls, config: dict[str, str]) -> "PostgresConfig":
@@ -62,6 +75,9 @@ class PostgresConfig:
         - POSTGRES_HOST
         - POSTGRES_DATABASE
         - POSTGRES_SSLMODE (optional, defaults to 'prefer')
+        - POSTGRES_POOL_MIN_SIZE (optional, defaults to 1)
+        - POSTGRES_POOL_MAX_SIZE (optional, defaults to 10)
+        - POSTGRES_POOL_IDLE_TIMEOUT (optional, seconds, defaults to 300)
 
         Returns:
             PostgresConfig instance
@@ -91,6 +107,9 @@ class PostgresConfig:
             host=os.environ["POSTGRES_HOST"],
             database=os.environ["POSTGRES_DATABASE"],
             sslmode=os.environ.get("POSTGRES_SSLMODE", "prefer"),
+            pool_min_size=int(os.environ.get("POSTGRES_POOL_MIN_SIZE", "1")),
+            pool_max_size=int(os.environ.get("POSTGRES_POOL_MAX_SIZE", "10")),
+            pool_idle_timeout=float(os.environ.get("POSTGRES_POOL_IDLE_TIMEOUT", "300")),
         )
 
     def get_connection_string(self) -> str:
@@ -100,3 +119,217 @@ class PostgresConfig:
             f"{self.host}:5432/{self.database}?"
             f"sslmode={self.sslmode}"
         )
+
+    def pool(self) -> "PostgresConnectionPool":
+        """
+        Get the connection pool of this configuration, creating it on first use.
+
+        Returns:
+            The pool shared by every user of this configuration
+        """
+        with self._pool_lock:
+            if self._pool is None or self._pool.pid != os.getpid():
+                # Connections must not be shared with a forked child process
+                self._pool = PostgresConnectionPool(
+                    self.get_connection_string(),
+                    min_size=self.pool_min_size,
+                    max_size=self.pool_max_size,
+                    idle_timeout=self.pool_idle_timeout,
+                )
+            return self._pool
+
+
+class PostgresConnectionPool:
+    """
+    Thread-safe pool of reusable PostgreSQL connections.
+
+    Connections are borrowed with `connection()`, which commits the work done
+    with them, or rolls it back on error, before returning them to the pool.
+    At most `max_size` connections are open at once, idle connections beyond
+    `min_size` are closed after `idle_timeout` seconds, and connections which
+    were idle for a while are checked with a trivial query before being handed
+    out again.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        min_size: int = 1,
+        max_size: int = 10,
+        idle_timeout: float = 300.0,
+        health_check_interval: float = 30.0,
+        connect: Optional[Callable[[], any]] = None,
+    ):
+        """
+        Initialise the PostgresConnectionPool.
+
+        Args:
+            dsn: PostgreSQL connection string
+            min_size: Number of idle connections kept open regardless of idle_timeout
+            max_size: Maximum number of open connections
+            idle_timeout: Seconds after which surplus idle connections are closed
+            health_check_interval: Seconds of idleness after which a connection
+                is checked before being reused
+            connect: Optional factory for new connections, defaults to
+                `psycopg2.connect(dsn)`
+        """
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError(f"Invalid pool sizes min_size={min_size} max_size={max_size}")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.pid = os.getpid()
+        self._dsn = dsn
+        self._connect = connect or self._default_connect
+        self._condition = threading.Condition()
+        # (connection, time it was returned), most recently used last
+        self._idle = []
+        self._size = 0
+        self._closed = False
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = 30.0):
+        """
+        Borrow a connection for the duration of a `with` block.
+
+        The block runs in a single transaction, committed when it exits
+        normally and rolled back when it raises.
+
+        Args:
+            timeout: Seconds to wait for a free connection, None to wait forever
+
+        Yields:
+            An open psycopg2 connection
+
+        Raises:
+            RuntimeError: If no connection becomes free in time
+        """
+        connection = self._acquire(timeout)
+        try:
+            yield connection
+            connection.commit()
+        except BaseException:
+            self._rollback(connection)
+            self._release(connection)
+            raise
+        self._release(connection)
+
+    def close(self) -> None:
+        """Close every idle connection and refuse further borrowing."""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._condition.notify_all()
+        for connection, _ in idle:
+            self._close(connection)
+
+    def _acquire(self, timeout: Optional[float]):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            expired = []
+            with self._condition:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("❌ PostgreSQL connection pool is closed")
+                    expired = self._expire_idle()
+                    if self._idle:
+                        connection, returned_at = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        connection, returned_at = None, None
+                        break
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        error_msg = (
+                            f"❌ Timed out waiting for a PostgreSQL connection "
+                            f"({self.max_size} in use)"
+                        )
+                        logger.error(error_msg)
+                        raise RuntimeError(error_msg)
+                    self._condition.wait(remaining)
+
+            for stale in expired:
+                self._close(stale)
+
+            if connection is None:
+                try:
+                    connection = self._connect()
+                except BaseException:
+                    self._discard(None)
+                    raise
+                logger.debug(f"Opened PostgreSQL connection ({self._size}/{self.max_size})")
+                return connection
+
+            if self._is_healthy(connection, returned_at):
+                return connection
+            logger.debug("Discarding broken PostgreSQL connection")
+            self._discard(connection)
+
+    def _release(self, connection) -> None:
+        if connection.closed:
+            self._discard(connection)
+            return
+        with self._condition:
+            if self._closed:
+                self._size -= 1
+                connection_to_close = connection
+            else:
+                self._idle.append((connection, time.monotonic()))
+                connection_to_close = None
+            self._condition.notify()
+        if connection_to_close is not None:
+            self._close(connection_to_close)
+
+    def _discard(self, connection) -> None:
+        """Forget a connection, closing it if it is still open."""
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+        if connection is not None:
+            self._close(connection)
+
+    def _expire_idle(self) -> list:
+        """Take the surplus connections idle for longer than idle_timeout, to be closed."""
+        now = time.monotonic()
+        expired = []
+        while len(self._idle) > self.min_size and now - self._idle[0][1] > self.idle_timeout:
+            expired.append(self._idle.pop(0)[0])
+            self._size -= 1
+        return expired
+
+    def _is_healthy(self, connection, returned_at: float) -> bool:
+        if connection.closed:
+            return False
+        if time.monotonic() - returned_at < self.health_check_interval:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            connection.rollback()
+            return True
+        except Exception as e:
+            logger.debug(f"PostgreSQL connection failed its health check: {e}")
+            return False
+
+    def _rollback(self, connection) -> None:
+        try:
+            if not connection.closed:
+                connection.rollback()
+        except Exception as e:
+            logger.debug(f"Closing PostgreSQL connection which failed to roll back: {e}")
+            self._close(connection)
+
+    @staticmethod
+    def _close(connection) -> None:
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _default_connect(self):
+        import psycopg2
+
+        return psycopg2.connect(self._dsn)
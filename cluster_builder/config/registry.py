@@ -0,0 +1,64 @@
+"""
+Container registry credentials.
+"""
+
+import os
+import logging
+from dataclasses import dataclass, field
+
+logger = logging.getLogger("swarmchestrate")
+
+
+@dataclass
+class RegistryCredentials:
+    """
+    Credentials of private container registries, one username and password
+    per registry.
+
+    They are used both for the Kubernetes image pull secrets created by
+    `create_registry_secrets` and for the registries.yaml of nodes running the
+    embedded registry mirror.
+    """
+
+    registries: list[str] = field(default_factory=list)
+    usernames: list[str] = field(default_factory=list)
+    passwords: list[str] = field(default_factory=list)
+
+    @classmethod
+    def from_env(cls) -> "RegistryCredentials":
+        """
+        Create a RegistryCredentials instance from environment variables.
+
+        Environment variables used, comma separated and in the same order:
+        - DOCKER_REGISTRIES
+        - DOCKER_USERNAMES
+        - DOCKER_PASSWORDS
+
+        Returns:
+            RegistryCredentials instance
+
+        Raises:
+            RuntimeError: If the registry, username and password counts differ
+        """
+        registries = os.getenv("DOCKER_REGISTRIES", "").split(",")
+        usernames = os.getenv("DOCKER_USERNAMES", "").split(",")
+        passwords = os.getenv("DOCKER_PASSWORDS", "").split(",")
+
+        if not (len(registries) == len(usernames) == len(passwords)):
+            raise RuntimeError("Mismatch in registry, username, and password counts")
+
+        return cls(registries=registries, usernames=usernames, passwords=passwords)
+
+    def auths(self) -> list[dict[str, str]]:
+        """
+        Get the credentials of every configured registry.
+
+        Returns:
+            List of {"registry", "username", "password"} dicts, skipping empty
+            registry names
+        """
+        return [
+            {"registry": registry, "username": username, "password": password}
+            for registry, username, password in zip(self.registries, self.usernames, self.passwords)
+            if registry
+        ]
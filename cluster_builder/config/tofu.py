@@ -0,0 +1,79 @@
+"""
+OpenTofu execution settings.
+"""
+
+import os
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+logger = logging.getLogger("swarmchestrate")
+
+
+@dataclass
+class TofuConfig:
+    """
+    Timeouts and refresh behaviour of the OpenTofu commands deploying nodes.
+
+    Planning and applying read the whole configuration, so their timeouts are a
+    base plus an allowance for every module of the cluster.
+    """
+
+    plan_timeout: float = 60.0
+    apply_timeout: Optional[float] = None
+    timeout_per_module: float = 0.5
+    refresh_new_workspaces: bool = False
+
+    @classmethod
+    def from_env(cls) -> "TofuConfig":
+        """
+        Create a TofuConfig instance from environment variables.
+
+        Environment variables used (all optional):
+        - CLUSTER_BUILDER_PLAN_TIMEOUT (seconds, defaults to 60)
+        - CLUSTER_BUILDER_APPLY_TIMEOUT (seconds, defaults to no timeout)
+        - CLUSTER_BUILDER_TIMEOUT_PER_MODULE (seconds, defaults to 0.5)
+        - CLUSTER_BUILDER_REFRESH_NEW_WORKSPACES (defaults to false, as a new
+          workspace has no resources to refresh)
+
+        Returns:
+            TofuConfig instance
+
+        Raises:
+            ValueError: If a timeout is not a number
+        """
+        apply_timeout = os.getenv("CLUSTER_BUILDER_APPLY_TIMEOUT")
+        return cls(
+            plan_timeout=float(os.getenv("CLUSTER_BUILDER_PLAN_TIMEOUT", "60")),
+            apply_timeout=float(apply_timeout) if apply_timeout else None,
+            timeout_per_module=float(os.getenv("CLUSTER_BUILDER_TIMEOUT_PER_MODULE", "0.5")),
+            refresh_new_workspaces=os.getenv(
+                "CLUSTER_BUILDER_REFRESH_NEW_WORKSPACES", "false"
+            ).lower() in ("1", "true", "yes"),
+        )
+
+    def plan_timeout_for(self, module_count: int) -> float:
+        """
+        Get the timeout of planning a node.
+
+        Args:
+            module_count: Number of modules in the cluster configuration
+
+        Returns:
+            Timeout in seconds
+        """
+        return self.plan_timeout + self.timeout_per_module * module_count
+
+    def apply_timeout_for(self, module_count: int) -> Optional[float]:
+        """
+        Get the timeout of applying the plan of a node.
+
+        Args:
+            module_count: Number of modules in the cluster configuration
+
+        Returns:
+            Timeout in seconds, or None for no timeout
+        """
+        if self.apply_timeout is None:
+            return None
+        return self.apply_timeout + self.timeout_per_module * module_count
@@ -0,0 +1,10 @@
+"""
+Long-running cluster builder daemon and its client.
+"""
+
+from cluster_builder.daemon.client import ClusterBuilderClient
+from cluster_builder.daemon.server import ClusterBuilderServer
+from cluster_builder.daemon.server import default_address
+from cluster_builder.daemon.server import serve
+
+__all__ = ["ClusterBuilderClient", "ClusterBuilderServer", "default_address", "serve"]
@@ -0,0 +1,183 @@
+"""
+Client of the cluster builder daemon.
+"""
+
+import http.client
+import json
+import logging
+import socket
+import time
+from typing import Optional
+from urllib.parse import quote, urlencode
+
+from cluster_builder.daemon.server import default_address, parse_address, read_token, token_path
+
+logger = logging.getLogger("swarmchestrate")
+
+# Seconds a single request waits for a job before polling again, short enough
+# to stay clear of proxy and socket timeouts
+POLL_INTERVAL = 30.0
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: Optional[float] = None):
+        super().__init__("localhost", timeout=timeout)
+        self._path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self._path)
+
+
+class ClusterBuilderClient:
+    """
+    Forwards Swarmchestrate operations to a running cluster-builder daemon.
+
+    The client depends on the standard library alone, so a caller starts in
+    milliseconds and the daemon does the work with its warm caches. Operation
+    methods block until the job has finished and return its result, or raise
+    RuntimeError with the error of a failed job.
+    """
+
+    def __init__(self, address: Optional[str] = None, timeout: Optional[float] = None):
+        """
+        Initialise the ClusterBuilderClient.
+
+        Args:
+            address: Unix socket path or "host:port" of the daemon, defaults to
+                the CLUSTER_BUILDER_DAEMON_ADDRESS environment variable or the
+                socket in the cache directory
+            timeout: Maximum time in seconds to wait for an operation (None waits forever)
+        """
+        self.address = address or default_address()
+        self.timeout = timeout
+        self._family, self._server_address = parse_address(self.address)
+
+    def health(self) -> dict:
+        """Return the status, pid and uptime of the daemon."""
+        return self._request("GET", "/health")
+
+    def inventory(self, cluster_name: Optional[str] = None):
+        """
+        List the nodes of every cluster, or of one cluster.
+
+        Returns:
+            Node records as dicts, keyed by cluster name unless a cluster was given
+        """
+        if cluster_name:
+            return self._request("GET", f"/inventory/{quote(cluster_name)}")
+        return self._request("GET", "/inventory")
+
+    def jobs(self) -> list[dict]:
+        """Return all jobs the daemon has run."""
+        return self._request("GET", "/jobs")
+
+    def job(self, job_id: str, wait: float = 0) -> dict:
+        """Return a job of the daemon, waiting up to `wait` seconds for it to finish."""
+        return self._request("GET", f"/jobs/{quote(job_id)}?{urlencode({'wait': wait})}")
+
+    def add_node(self, config: dict[str, any], dryrun: bool = False):
+        """See `Swarmchestrate.add_node`."""
+        return self._run("POST", "/nodes", {"config": config, "dryrun": dryrun})
+
+    def add_nodes(
+        self, configs: list[dict[str, any]], parallelism: int = 10, dryrun: bool = False
+    ):
+        """See `Swarmchestrate.add_nodes`."""
+        return self._run(
+            "POST",
+            "/nodes/batch",
+            {"configs": configs, "parallelism": parallelism, "dryrun": dryrun},
+        )
+
+    def remove_node(self, cluster_name: str, resource_name: str, dryrun: bool = False):
+        """See `Swarmchestrate.remove_node`."""
+        return self._run(
+            "DELETE",
+            f"/clusters/{quote(cluster_name)}/nodes/{quote(resource_name)}",
+            {"dryrun": dryrun},
+        )
+
+    def destroy(self, cluster_name: str, dryrun: bool = False, parallelism: int = 10):
+        """See `Swarmchestrate.destroy`."""
+        return self._run(
+            "DELETE",
+            f"/clusters/{quote(cluster_name)}",
+            {"dryrun": dryrun, "parallelism": parallelism},
+        )
+
+    def deploy_manifests(
+        self, manifest_folder: str, master_ip: str, ssh_key_path: str, ssh_user: str
+    ):
+        """See `Swarmchestrate.deploy_manifests`."""
+        return self._run(
+            "POST",
+            "/manifests",
+            {
+                "manifest_folder": manifest_folder,
+                "master_ip": master_ip,
+                "ssh_key_path": ssh_key_path,
+                "ssh_user": ssh_user,
+            },
+        )
+
+    def create_registry_secrets(self, cluster_config: dict):
+        """See `Swarmchestrate.create_registry_secrets`."""
+        return self._run("POST", "/secrets", {"cluster_config": cluster_config})
+
+    def _run(self, method: str, path: str, body: dict):
+        """Submit an operation and wait for its job."""
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        job = self._request(method, path, {**body, "wait": self._wait()})
+        while job["status"] in ("pending", "running"):
+            if deadline is not None and time.monotonic() >= deadline:
+                error_msg = f"❌ Timed out waiting for job {job['id']}: {job['operation']} is still {job['status']}"
+                logger.error(error_msg)
+                raise RuntimeError(error_msg)
+            logger.debug(f"Waiting for job {job['id']}: {job['operation']} ({job['status']})")
+            job = self.job(job["id"], wait=self._wait())
+        if job["status"] == "failed":
+            error_msg = f"❌ {job['operation']} failed: {job.get('error')}"
+            logger.error(error_msg)
+            raise RuntimeError(error_msg)
+        return job.get("result")
+
+    def _wait(self) -> float:
+        return POLL_INTERVAL if self.timeout is None else min(POLL_INTERVAL, self.timeout)
+
+    def _request(self, method: str, path: str, body: Optional[dict] = None):
+        if self._family == socket.AF_UNIX:
+            connection = _UnixHTTPConnection(self._server_address, timeout=self._socket_timeout())
+        else:
+            host, port = self._server_address
+            connection = http.client.HTTPConnection(host, port, timeout=self._socket_timeout())
+
+        data = json.dumps(body).encode() if body is not None else None
+        headers = {"Content-Type": "application/json"} if data is not None else {}
+        # The daemon rewrites its token when it starts, read the current one
+        token = read_token(token_path(self.address))
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        try:
+            connection.request(method, path, body=data, headers=headers)
+            response = connection.getresponse()
+            payload = json.loads(response.read() or b"null")
+        except (OSError, http.client.HTTPException) as e:
+            error_msg = f"❌ Cannot reach the cluster-builder daemon at {self.address}: {e}"
+            logger.error(error_msg)
+            raise RuntimeError(error_msg)
+        finally:
+            connection.close()
+
+        if response.status >= 400:
+            error = payload.get("error") if isinstance(payload, dict) else payload
+            error_msg = f"❌ Daemon request {method} {path} failed: {error}"
+            logger.error(error_msg)
+            raise RuntimeError(error_msg)
+        return payload
+
+    def _socket_timeout(self) -> float:
+        # The server may hold the request for the full wait
+        return self._wait() + 30
@@ -0,0 +1,450 @@
+"""
+Long-running cluster builder daemon serving a local JSON API.
+"""
+
+import hmac
+import json
+import logging
+import os
+import secrets
+import signal
+import socket
+import socketserver
+import threading
+import time
+from dataclasses import asdict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+from cluster_builder.utils.cache import get_cache_dir
+
+logger = logging.getLogger("swarmchestrate")
+
+# Seconds a request waits for its job when the caller does not say
+DEFAULT_WAIT = 0.0
+
+# Host headers accepted from clients, others come through DNS rebinding
+LOCAL_HOSTS = ("localhost", "127.0.0.1")
+
+
+def default_address() -> str:
+    """
+    Get the address the daemon listens on by default.
+
+    The address can be set with the CLUSTER_BUILDER_DAEMON_ADDRESS environment
+    variable and defaults to a Unix socket in the cache directory.
+
+    Returns:
+        A Unix socket path or a "host:port" TCP address
+    """
+    return os.environ.get("CLUSTER_BUILDER_DAEMON_ADDRESS") or os.path.join(
+        get_cache_dir(), "daemon.sock"
+    )
+
+
+def parse_address(address: str):
+    """
+    Split a daemon address into its socket family and socket address.
+
+    Args:
+        address: A Unix socket path, or "host:port" for localhost HTTP
+
+    Returns:
+        (socket family, socket address) tuple
+
+    Raises:
+        ValueError: If a TCP address has no valid port
+    """
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[len("unix:"):]
+    if os.sep in address or address.endswith(".sock"):
+        return socket.AF_UNIX, address
+    address = address.removeprefix("http://").rstrip("/")
+    host, _, port = address.rpartition(":")
+    if not port.isdigit():
+        raise ValueError(f"Invalid daemon address '{address}', expected a socket path or host:port")
+    return socket.AF_INET, (host or "127.0.0.1", int(port))
+
+
+def token_path(address: str) -> str:
+    """
+    Get the file holding the API token of the daemon at an address.
+
+    Args:
+        address: A Unix socket path or a "host:port" TCP address
+
+    Returns:
+        Path to the token file, next to the socket or in the cache directory
+    """
+    family, server_address = parse_address(address)
+    if family == socket.AF_UNIX:
+        return f"{server_address}.token"
+    return os.path.join(get_cache_dir(), f"daemon-{server_address[1]}.token")
+
+
+def read_token(path: str) -> Optional[str]:
+    """Read an API token, None if the daemon has not written one."""
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+class _RequestRejected(Exception):
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        # Only the owner may talk to the daemon, it acts with their credentials,
+        # so the socket is created without access for anyone else
+        umask = os.umask(0o077)
+        try:
+            socketserver.UnixStreamServer.server_bind(self)
+        finally:
+            os.umask(umask)
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    server_version = "cluster-builder"
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.daemon.handle(self, "GET")
+
+    def do_POST(self):
+        self.server.daemon.handle(self, "POST")
+
+    def do_DELETE(self):
+        self.server.daemon.handle(self, "DELETE")
+
+    def address_string(self) -> str:
+        # Unix socket peers have no address
+        return self.client_address[0] if self.client_address else "local"
+
+    def log_message(self, format, *args):
+        logger.debug(f"Daemon request from {self.address_string()}: {format % args}")
+
+
+class ClusterBuilderServer:
+    """
+    Serves Swarmchestrate operations to local clients over HTTP.
+
+    A single Swarmchestrate instance lives as long as the daemon, so its caches
+    stay warm between requests: template schemas, the PostgreSQL connection
+    pool, initialised cluster directories, the OpenStack session and the SSH
+    connections to masters. Callers then pay for the operation alone instead
+    of starting Python, reading `.env` and setting everything up again.
+
+    Operations run as jobs on an OrchestrationEngine. A request returns the job
+    once it has finished or its `wait` seconds have passed, and unfinished jobs
+    can be polled under /jobs/<id>.
+
+    Requests must carry the token the daemon writes to `token_path(address)`,
+    readable by its owner alone, as "Authorization: Bearer <token>", a
+    localhost Host header and, unless they are GET requests, a JSON body.
+    Web pages can therefore neither submit operations nor read the inventory.
+
+    Endpoints:
+        GET    /health
+        GET    /inventory, /inventory/<cluster>
+        GET    /jobs, /jobs/<id>?wait=<seconds>
+        POST   /nodes                  {"config", "dryrun", "wait"}
+        POST   /nodes/batch            {"configs", "parallelism", "dryrun", "wait"}
+        DELETE /clusters/<cluster>/nodes/<resource>?dryrun=&wait=
+        DELETE /clusters/<cluster>?dryrun=&parallelism=&wait=
+        POST   /manifests              {"manifest_folder", "master_ip", "ssh_key_path", "ssh_user", "wait"}
+        POST   /secrets                {"cluster_config", "wait"}
+    """
+
+    def __init__(self, engine, address: Optional[str] = None):
+        """
+        Initialise the ClusterBuilderServer and bind its socket.
+
+        Args:
+            engine: OrchestrationEngine running the operations
+            address: Unix socket path or "host:port", defaults to `default_address()`
+
+        Raises:
+            RuntimeError: If the address is in use by a running daemon
+        """
+        self.engine = engine
+        self.address = address or default_address()
+        self.started_at = time.time()
+
+        family, server_address = parse_address(self.address)
+        self.allowed_hosts = set(LOCAL_HOSTS)
+        if family == socket.AF_INET and server_address[0] not in ("", "0.0.0.0"):
+            self.allowed_hosts.add(server_address[0])
+        if family == socket.AF_UNIX:
+            self._remove_stale_socket(server_address)
+            os.makedirs(os.path.dirname(os.path.abspath(server_address)), exist_ok=True)
+            self._server = _UnixHTTPServer(server_address, _RequestHandler)
+        else:
+            if server_address[0] not in ("127.0.0.1", "localhost"):
+                logger.warning(
+                    f"⚠️ The daemon API is served over plain HTTP, listening on {server_address[0]} "
+                    "exposes it and its token beyond this host"
+                )
+            self._server = ThreadingHTTPServer(server_address, _RequestHandler)
+        self._server.daemon = self
+        self.token = self._write_token(token_path(self.address))
+        logger.info(f"cluster-builder daemon listening on {self.address}")
+
+    def serve_forever(self) -> None:
+        """Handle requests until `shutdown` is called."""
+        self._server.serve_forever()
+
+    def shutdown(self) -> None:
+        """Stop `serve_forever`, from another thread."""
+        self._server.shutdown()
+
+    def close(self) -> None:
+        """Release the socket and the worker pool of the engine."""
+        self._server.server_close()
+        family, server_address = parse_address(self.address)
+        if family == socket.AF_UNIX and os.path.exists(server_address):
+            os.unlink(server_address)
+        if os.path.exists(token_path(self.address)):
+            os.unlink(token_path(self.address))
+        self.engine.shutdown(wait=True)
+
+    def __enter__(self) -> "ClusterBuilderServer":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def handle(self, request: BaseHTTPRequestHandler, method: str) -> None:
+        """Route a request and write its JSON response."""
+        url = urlsplit(request.path)
+        parts = [part for part in url.path.split("/") if part]
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        try:
+            self._authorize(request, method)
+            body = self._read_body(request)
+            status, payload = self._route(method, parts, query, body)
+        except _RequestRejected as e:
+            logger.warning(f"⚠️ Rejected daemon request {method} {url.path}: {e}")
+            status, payload = e.status, {"error": str(e)}
+        except KeyError as e:
+            status, payload = HTTPStatus.BAD_REQUEST, {"error": f"Missing field {e}"}
+        except (ValueError, TypeError) as e:
+            status, payload = HTTPStatus.BAD_REQUEST, {"error": str(e)}
+        except Exception as e:
+            logger.error(f"❌ Daemon request {method} {url.path} failed: {e}")
+            status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}
+
+        data = json.dumps(payload, default=str).encode()
+        request.send_response(status)
+        request.send_header("Content-Type", "application/json")
+        request.send_header("Content-Length", str(len(data)))
+        request.end_headers()
+        request.wfile.write(data)
+
+    def _route(self, method: str, parts: list[str], query: dict, body: dict):
+        swarmchestrate = self.engine.swarmchestrate
+        wait = float(body.get("wait", query.get("wait", DEFAULT_WAIT)))
+        dryrun = _flag(body.get("dryrun", query.get("dryrun", False)))
+
+        if method == "GET" and parts == ["health"]:
+            return HTTPStatus.OK, {
+                "status": "ok",
+                "pid": os.getpid(),
+                "uptime": time.time() - self.started_at,
+            }
+
+        if method == "GET" and parts[:1] == ["inventory"] and len(parts) <= 2:
+            if len(parts) == 2:
+                return HTTPStatus.OK, [asdict(r) for r in swarmchestrate.cluster_inventory(parts[1])]
+            return HTTPStatus.OK, {
+                name: [asdict(r) for r in records]
+                for name, records in swarmchestrate.inventory().items()
+            }
+
+        if method == "GET" and parts == ["jobs"]:
+            return HTTPStatus.OK, [self._job_payload(job) for job in self.engine.jobs()]
+
+        if method == "GET" and parts[:1] == ["jobs"] and len(parts) == 2:
+            job = self.engine.get_job(parts[1])
+            if job is None:
+                # Finished jobs are forgotten after a while, see OrchestrationEngine
+                return HTTPStatus.NOT_FOUND, {"error": f"Unknown or expired job '{parts[1]}'"}
+            return self._job_response(job, wait)
+
+        if method == "POST" and parts == ["nodes"]:
+            return self._job_response(self.engine.submit_add_node(body["config"], dryrun), wait)
+
+        if method == "POST" and parts == ["nodes", "batch"]:
+            job = self.engine.submit_add_nodes(
+                body["configs"], int(body.get("parallelism", 10)), dryrun
+            )
+            return self._job_response(job, wait)
+
+        if method == "DELETE" and len(parts) == 4 and parts[0] == "clusters" and parts[2] == "nodes":
+            return self._job_response(
+                self.engine.submit_remove_node(parts[1], parts[3], dryrun), wait
+            )
+
+        if method == "DELETE" and len(parts) == 2 and parts[0] == "clusters":
+            parallelism = int(body.get("parallelism", query.get("parallelism", 10)))
+            return self._job_response(
+                self.engine.submit_destroy(parts[1], dryrun, parallelism), wait
+            )
+
+        if method == "POST" and parts == ["manifests"]:
+            job = self.engine.submit_deploy_manifests(
+                body["manifest_folder"], body["master_ip"], body["ssh_key_path"], body["ssh_user"]
+            )
+            return self._job_response(job, wait)
+
+        if method == "POST" and parts == ["secrets"]:
+            return self._job_response(
+                self.engine.submit_create_registry_secrets(body["cluster_config"]), wait
+            )
+
+        return HTTPStatus.NOT_FOUND, {"error": f"No route for {method} /{'/'.join(parts)}"}
+
+    def _job_response(self, job, wait: float):
+        if wait > 0 and not job.done():
+            try:
+                job.result(timeout=wait)
+            except Exception:
+                # Reported in the job payload
+                pass
+        status = HTTPStatus.OK if job.done() else HTTPStatus.ACCEPTED
+        return status, self._job_payload(job)
+
+    @staticmethod
+    def _job_payload(job) -> dict:
+        payload = {
+            "id": job.id,
+            "operation": job.operation,
+            "cluster_name": job.cluster_name,
+            "status": job.status,
+        }
+        if job.done():
+            error = job.future.exception()
+            if error is not None:
+                payload["error"] = str(error)
+                # Partly failed teardowns report which nodes are left
+                if getattr(error, "report", None) is not None:
+                    payload["report"] = error.report
+            else:
+                payload["result"] = job.result()
+        return payload
+
+    def _authorize(self, request: BaseHTTPRequestHandler, method: str) -> None:
+        """
+        Reject requests which a web page could have sent to the daemon.
+
+        Raises:
+            _RequestRejected: If the Host, token or content type is not accepted
+        """
+        host = urlsplit(f"//{request.headers.get('Host', '')}").hostname
+        if host not in self.allowed_hosts:
+            raise _RequestRejected(HTTPStatus.FORBIDDEN, f"Host '{host}' is not served")
+
+        scheme, _, token = (request.headers.get("Authorization") or "").partition(" ")
+        if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), self.token.encode()):
+            raise _RequestRejected(HTTPStatus.UNAUTHORIZED, "Missing or invalid daemon token")
+
+        # Cross-origin JSON requests need a CORS preflight, which is never granted
+        has_body = int(request.headers.get("Content-Length") or 0) > 0
+        if (method != "GET" or has_body) and request.headers.get_content_type() != "application/json":
+            raise _RequestRejected(
+                HTTPStatus.UNSUPPORTED_MEDIA_TYPE, "Requests must have a JSON body"
+            )
+
+    @staticmethod
+    def _read_body(request: BaseHTTPRequestHandler) -> dict:
+        length = int(request.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        body = json.loads(request.rfile.read(length))
+        if not isinstance(body, dict):
+            raise ValueError("The request body must be a JSON object")
+        return body
+
+    @staticmethod
+    def _write_token(path: str) -> str:
+        """Write a new API token readable by the owner alone."""
+        token = secrets.token_urlsafe(32)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(token)
+        os.replace(tmp_path, path)
+        return token
+
+    @staticmethod
+    def _remove_stale_socket(path: str) -> None:
+        """Remove a socket left behind by a daemon which did not shut down cleanly."""
+        if not os.path.exists(path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except OSError:
+            logger.debug(f"Removing stale daemon socket {path}")
+            os.unlink(path)
+            return
+        finally:
+            probe.close()
+        error_msg = f"❌ A cluster-builder daemon is already listening on {path}"
+        logger.error(error_msg)
+        raise RuntimeError(error_msg)
+
+
+def _flag(value) -> bool:
+    if isinstance(value, str):
+        return value.lower() in ("1", "true", "yes")
+    return bool(value)
+
+
+def serve(
+    address: Optional[str] = None,
+    template_dir: str = "templates",
+    output_dir: str = "output",
+    max_workers: int = 8,
+    **swarmchestrate_kwargs,
+) -> None:
+    """
+    Run the daemon until interrupted.
+
+    Args:
+        address: Unix socket path or "host:port", defaults to `default_address()`
+        template_dir: Directory containing templates
+        output_dir: Directory for outputting generated files
+        max_workers: Maximum number of operations running at once
+        **swarmchestrate_kwargs: Further Swarmchestrate arguments, e.g. transport
+    """
+    from cluster_builder.orchestration import OrchestrationEngine
+    from cluster_builder.swarmchestrate import Swarmchestrate
+
+    swarmchestrate = Swarmchestrate(template_dir, output_dir, **swarmchestrate_kwargs)
+    engine = OrchestrationEngine(swarmchestrate, max_workers=max_workers)
+    with ClusterBuilderServer(engine, address) as server:
+
+        def stop(signum, frame):
+            logger.info("Shutting down the cluster-builder daemon")
+            # shutdown() blocks until serve_forever returns, which it cannot
+            # do while this handler runs on the serving thread
+            threading.Thread(target=server.shutdown, daemon=True).start()
+
+        signal.signal(signal.SIGTERM, stop)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            logger.info("Shutting down the cluster-builder daemon")
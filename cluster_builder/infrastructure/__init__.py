@@ -2,7 +2,38 @@
 Infrastructure management for the Cluster Builder.
 """
 
+from cluster_builder.infrastructure.artifacts import K3sArtifactCache
+from cluster_builder.infrastructure.async_executor import AsyncCommandExecutor
 from cluster_builder.infrastructure.executor import CommandExecutor
+from cluster_builder.infrastructure.executor import FileLineSink
+from cluster_builder.infrastructure.executor import LogLineHandler
+from cluster_builder.infrastructure.executor import TofuProgressParser
+from cluster_builder.infrastructure.floating_ips import FloatingIPAllocator
+from cluster_builder.infrastructure.initializer import TofuInitializer
+from cluster_builder.infrastructure.inventory import FleetInventory
+from cluster_builder.infrastructure.inventory import NodeRecord
+from cluster_builder.infrastructure.locking import ClusterLock
+from cluster_builder.infrastructure.readiness import NodeReadiness
+from cluster_builder.infrastructure.readiness import ReadinessTracker
+from cluster_builder.infrastructure.state import PostgresStateReader
 from cluster_builder.infrastructure.templates import TemplateManager
+from cluster_builder.infrastructure.workspaces import PostgresWorkspaces
 
-__all__ = ["CommandExecutor", "TemplateManager"]
+__all__ = [
+    "AsyncCommandExecutor",
+    "CommandExecutor",
+    "ClusterLock",
+    "FileLineSink",
+    "FleetInventory",
+    "FloatingIPAllocator",
+    "K3sArtifactCache",
+    "LogLineHandler",
+    "NodeReadiness",
+    "NodeRecord",
+    "PostgresStateReader",
+    "PostgresWorkspaces",
+    "ReadinessTracker",
+    "TemplateManager",
+    "TofuInitializer",
+    "TofuProgressParser",
+]
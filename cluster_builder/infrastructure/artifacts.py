@@ -0,0 +1,182 @@
+"""
+Control-host cache of the k3s binary and install script pushed to nodes.
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import urllib.request
+from typing import Callable, Optional
+from urllib.parse import quote
+
+from cluster_builder.infrastructure.locking import ClusterLock
+
+logger = logging.getLogger("swarmchestrate")
+
+DEFAULT_RELEASE_URL = "https://github.com/k3s-io/k3s/releases/download"
+DEFAULT_INSTALL_SCRIPT_URL = "https://raw.githubusercontent.com/k3s-io/k3s/{version}/install.sh"
+
+# Name of the k3s binary and of its checksum file in a release, per architecture
+_RELEASE_ASSETS = {
+    "amd64": ("k3s", "sha256sum-amd64.txt"),
+    "arm64": ("k3s-arm64", "sha256sum-arm64.txt"),
+    "arm": ("k3s-armhf", "sha256sum-arm.txt"),
+}
+
+BINARY_FILE_NAME = "k3s"
+INSTALL_SCRIPT_FILE_NAME = "install.sh"
+
+
+def _download_url(url: str, path: str) -> None:
+    with urllib.request.urlopen(url, timeout=60) as response, open(path, "wb") as f:
+        shutil.copyfileobj(response, f, length=1024 * 1024)
+
+
+class K3sArtifactCache:
+    """
+    Downloads pinned k3s releases once and keeps them on the control host.
+
+    The binary and the install script of a k3s version are stored under
+    `<cache_dir>/k3s/<version>/<arch>/` and uploaded to every node by the file
+    provisioners of the templates, so nodes install k3s without reaching the
+    internet and all run the same version. The install script is taken from
+    the same tag as the binary, and the binary is checked against the
+    checksums published with the release.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        release_url: Optional[str] = None,
+        install_script_url: Optional[str] = None,
+        download: Optional[Callable[[str, str], None]] = None,
+    ):
+        """
+        Initialise the K3sArtifactCache.
+
+        Args:
+            cache_dir: Root directory of the cache
+            release_url: Base URL of the k3s releases, defaults to the
+                CLUSTER_BUILDER_K3S_RELEASE_URL environment variable or GitHub,
+                e.g. to use a mirror in restricted networks
+            install_script_url: URL of the install script with a {version}
+                placeholder, defaults to the CLUSTER_BUILDER_K3S_INSTALL_SCRIPT_URL
+                environment variable or the script of the release tag
+            download: Optional function fetching a URL into a file
+        """
+        self.root = os.path.join(cache_dir, "k3s")
+        self.release_url = (
+            release_url or os.getenv("CLUSTER_BUILDER_K3S_RELEASE_URL", DEFAULT_RELEASE_URL)
+        ).rstrip("/")
+        self.install_script_url = install_script_url or os.getenv(
+            "CLUSTER_BUILDER_K3S_INSTALL_SCRIPT_URL", DEFAULT_INSTALL_SCRIPT_URL
+        )
+        self._download = download or _download_url
+
+    def paths(self, version: str, arch: str = "amd64") -> dict[str, str]:
+        """
+        Get the location of the cached artifacts of a k3s version.
+
+        Args:
+            version: k3s release, e.g. "v1.31.4+k3s1"
+            arch: Node architecture, one of amd64, arm64 or arm
+
+        Returns:
+            Dictionary with the "binary" and "install_script" paths
+
+        Raises:
+            ValueError: If the architecture is not supported
+        """
+        if arch not in _RELEASE_ASSETS:
+            raise ValueError(
+                f"Unsupported k3s architecture '{arch}', expected one of {', '.join(_RELEASE_ASSETS)}"
+            )
+        artifact_dir = os.path.join(self.root, version, arch)
+        return {
+            "binary": os.path.join(artifact_dir, BINARY_FILE_NAME),
+            "install_script": os.path.join(artifact_dir, INSTALL_SCRIPT_FILE_NAME),
+        }
+
+    def ensure(self, version: str, arch: str = "amd64") -> dict[str, str]:
+        """
+        Download the artifacts of a k3s version unless they are cached.
+
+        Concurrent callers, in this process or others, wait for a single
+        download.
+
+        Args:
+            version: k3s release, e.g. "v1.31.4+k3s1"
+            arch: Node architecture, one of amd64, arm64 or arm
+
+        Returns:
+            Dictionary with the "binary" and "install_script" paths
+
+        Raises:
+            ValueError: If the architecture is not supported
+            RuntimeError: If a download fails or the binary checksum does not match
+        """
+        paths = self.paths(version, arch)
+        if all(os.path.exists(path) for path in paths.values()):
+            return paths
+
+        artifact_dir = os.path.dirname(paths["binary"])
+        os.makedirs(artifact_dir, exist_ok=True)
+        with ClusterLock(artifact_dir):
+            if all(os.path.exists(path) for path in paths.values()):
+                return paths
+            logger.info(f"Downloading k3s {version} ({arch}) into the artifact cache")
+            try:
+                self._fetch(version, arch, paths)
+            except OSError as e:
+                error_msg = f"❌ Failed to download k3s {version} ({arch}): {e}"
+                logger.error(error_msg)
+                raise RuntimeError(error_msg)
+            logger.info(f"✅ Cached k3s {version} ({arch}) in {artifact_dir}")
+        return paths
+
+    def _fetch(self, version: str, arch: str, paths: dict[str, str]) -> None:
+        binary_name, checksum_name = _RELEASE_ASSETS[arch]
+        release_url = f"{self.release_url}/{quote(version, safe='')}"
+        artifact_dir = os.path.dirname(paths["binary"])
+
+        with tempfile.TemporaryDirectory(dir=artifact_dir) as temp_dir:
+            checksum_path = os.path.join(temp_dir, checksum_name)
+            self._download(f"{release_url}/{checksum_name}", checksum_path)
+            expected = self._expected_checksum(checksum_path, binary_name)
+
+            binary_path = os.path.join(temp_dir, BINARY_FILE_NAME)
+            self._download(f"{release_url}/{binary_name}", binary_path)
+            actual = self._sha256(binary_path)
+            if actual != expected:
+                error_msg = (
+                    f"❌ Checksum mismatch for k3s {version} ({arch}): expected {expected}, got {actual}"
+                )
+                logger.error(error_msg)
+                raise RuntimeError(error_msg)
+
+            script_path = os.path.join(temp_dir, INSTALL_SCRIPT_FILE_NAME)
+            self._download(self.install_script_url.format(version=quote(version, safe="")), script_path)
+
+            os.chmod(binary_path, 0o755)
+            os.chmod(script_path, 0o755)
+            os.replace(script_path, paths["install_script"])
+            os.replace(binary_path, paths["binary"])
+
+    @staticmethod
+    def _expected_checksum(checksum_path: str, binary_name: str) -> str:
+        with open(checksum_path) as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 2 and parts[1].lstrip("*") == binary_name:
+                    return parts[0]
+        raise RuntimeError(f"No checksum for {binary_name} in {os.path.basename(checksum_path)}")
+
+    @staticmethod
+    def _sha256(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
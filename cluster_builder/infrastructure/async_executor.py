@@ -0,0 +1,136 @@
+"""
+Asyncio command execution utilities for infrastructure management.
+"""
+
+import asyncio
+import logging
+import signal
+from collections import deque
+from typing import Optional
+
+from cluster_builder.infrastructure.executor import (
+    _ANSI_ESCAPE_RE,
+    CommandExecutor,
+    LineCallback,
+)
+from cluster_builder.utils import telemetry
+
+logger = logging.getLogger("swarmchestrate")
+
+# Longest output line accepted from a command, OpenTofu can print long JSON lines
+_LINE_LIMIT = 16 * 1024 * 1024
+
+
+class AsyncCommandExecutor:
+    """Asyncio counterpart of CommandExecutor, built on asyncio subprocesses."""
+
+    @staticmethod
+    async def run_command(
+        command: list,
+        cwd: str,
+        description: str = "command",
+        timeout: Optional[float] = None,
+        env: Optional[dict] = None,
+        callbacks: Optional[list[LineCallback]] = None,
+        tail_lines: Optional[int] = None,
+        kill_grace_period: float = 30,
+    ) -> str:
+        """
+        Execute a command without blocking the event loop.
+
+        Output is handed to the callbacks line by line as it is produced. If the
+        awaiting task is cancelled, the command is interrupted with SIGINT, which
+        lets OpenTofu stop gracefully and release its state lock, and killed if
+        it has not exited after `kill_grace_period` seconds.
+
+        Args:
+            command: List containing the command and its arguments
+            cwd: Working directory for the command
+            description: Description of the command for logging
+            timeout: Maximum execution time in seconds (None for no timeout)
+            env: Environment for the command
+            callbacks: Functions called with ("stdout" or "stderr", line) for each
+                output line (defaults to logging them at debug level)
+            tail_lines: Number of trailing lines of each stream to keep, or None
+                to keep the whole output
+            kill_grace_period: Seconds to wait after SIGINT before killing the command
+
+        Returns:
+            Command stdout output as string (only its tail if tail_lines is set)
+
+        Raises:
+            RuntimeError: If the command execution fails or times out
+            asyncio.CancelledError: If the awaiting task was cancelled
+        """
+        with telemetry.span(telemetry.command_phase(command), description=description):
+            cmd_str = " ".join(command)
+            logger.debug(f"Running {description}: {cmd_str}")
+
+            if callbacks is None:
+                callbacks = CommandExecutor.default_callbacks(description)[:1]
+
+            process = await asyncio.create_subprocess_exec(
+                *command,
+                cwd=cwd,
+                env=env,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                limit=_LINE_LIMIT,
+            )
+
+            lines = {"stdout": deque(maxlen=tail_lines), "stderr": deque(maxlen=tail_lines)}
+
+            async def pump(stream_name, reader):
+                while True:
+                    raw_line = await reader.readline()
+                    if not raw_line:
+                        break
+                    line = _ANSI_ESCAPE_RE.sub("", raw_line.decode(errors="replace").rstrip("\n"))
+                    lines[stream_name].append(line)
+                    for callback in callbacks:
+                        try:
+                            callback(stream_name, line)
+                        except Exception as e:
+                            logger.warning(f"⚠️ Output callback failed for {description}: {e}")
+
+            readers = asyncio.gather(
+                pump("stdout", process.stdout), pump("stderr", process.stderr)
+            )
+
+            try:
+                await asyncio.wait_for(asyncio.shield(process.wait()), timeout=timeout)
+                await readers
+            except asyncio.TimeoutError:
+                await AsyncCommandExecutor._stop(process, description, kill_grace_period)
+                readers.cancel()
+                raise RuntimeError(f"{description.capitalize()} timed out after {timeout} seconds")
+            except asyncio.CancelledError:
+                logger.warning(f"⚠️ {description.capitalize()} cancelled, stopping the process")
+                await AsyncCommandExecutor._stop(process, description, kill_grace_period)
+                readers.cancel()
+                raise
+
+            stdout = "\n".join(lines["stdout"])
+            if process.returncode != 0:
+                err = f"Error executing {description}: " + "\n".join(
+                    lines["stderr"] or lines["stdout"]
+                )
+                logger.error(err)
+                raise RuntimeError(err)
+            logger.debug(f"{description.capitalize()} completed")
+            return stdout
+
+    @staticmethod
+    async def _stop(process, description: str, grace_period: float) -> None:
+        """Interrupt a process, killing it if it does not exit within the grace period."""
+        if process.returncode is not None:
+            return
+        try:
+            process.send_signal(signal.SIGINT)
+            await asyncio.wait_for(asyncio.shield(process.wait()), timeout=grace_period)
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ {description.capitalize()} ignored SIGINT, killing it")
+            process.kill()
+            await process.wait()
+        except ProcessLookupError:
+            pass
@@ -2,14 +2,22 @@
 Command execution utilities for infrastructure management.
 """
 
+import re
 import subprocess
 import logging
+import threading
+from collections import deque
+from typing import Callable, Optional
 
-from yaspin import yaspin
-from yaspin.spinners import Spinners
+from cluster_builder.utils import telemetry
 
 logger = logging.getLogger("swarmchestrate")
 
+# Callback receiving each output line: callback(stream_name, line)
+LineCallback = Callable[[str, str], None]
+
+_ANSI_ESCAPE_RE = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+
 
 class CommandExecutor:
     """Utility for executing shell commands with proper logging and error handling."""
@@ -19,8 +27,8 @@ class CommandExecutor:
         command: list,
         cwd: str,
         description: str = "command",
-        timeout: int = None,
-        env: dict = None,  # <-- Add optional env param
+        timeout: Optional[int] = None,
+        env: Optional[dict] = None,  # <-- Add optional env param
     ) -> str:
         """
         Execute a shell command with proper logging and error handling.
@@ -37,46 +45,56 @@ class CommandExecutor:
         Raises:
             RuntimeError: If the command execution fails or times out
         """
-        cmd_str = " ".join(command)
-        logger.debug(f"Running {description}: {cmd_str}")
+        with telemetry.span(telemetry.command_phase(command), description=description):
+            cmd_str = " ".join(command)
+            logger.debug(f"Running {description}: {cmd_str}")
+
+            # Spinners only make sense on the main thread; concurrent commands
+            # run from worker threads would garble the terminal.
+            show_spinner = (timeout is None or timeout > 5) and (
+                threading.current_thread() is threading.main_thread()
+            )
 
-        show_spinner = timeout is None or timeout > 5
+            process = subprocess.Popen(
+                command,
+                cwd=cwd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                env=env,
+            )
 
-        process = subprocess.Popen(
-            command,
-            cwd=cwd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            env=env,
-        )
+            if show_spinner:
+                try:
+                    process.wait(timeout=5)
+                    stdout, stderr = process.communicate()
+                    return CommandExecutor._check_result(stdout, stderr, process.returncode, description)
+                except subprocess.TimeoutExpired:
+                    pass  # Still running → spinner starts
+
+            # Either timeout <= 5s, or process still running after 5s
+            spinner = None
+            if show_spinner:
+                from yaspin import yaspin
+                from yaspin.spinners import Spinners
+
+                spinner = yaspin(Spinners.point, text=f"Running {description}...", color="cyan")
+            if spinner:
+                spinner.start()
 
-        if show_spinner:
             try:
-                process.wait(timeout=5)
-                stdout, stderr = process.communicate()
-                return CommandExecutor._check_result(stdout, stderr, process.returncode, description)
+                stdout, stderr = process.communicate(timeout=timeout)
             except subprocess.TimeoutExpired:
-                pass  # Still running → spinner starts
-
-        # Either timeout <= 5s, or process still running after 5s
-        spinner = yaspin(Spinners.point, text=f"Running {description}...", color="cyan") if show_spinner else None
-        if spinner:
-            spinner.start()
-
-        try:
-            stdout, stderr = process.communicate(timeout=timeout)
-        except subprocess.TimeoutExpired:
-            process.kill()
-            stdout, stderr = process.communicate()
-            if spinner:
-                spinner.fail("⏰")
-            raise RuntimeError(f"{description.capitalize()} timed out after {timeout} seconds")
+                process.kill()
+                stdout, stderr = process.communicate()
+                if spinner:
+                    spinner.fail("⏰")
+                raise RuntimeError(f"{description.capitalize()} timed out after {timeout} seconds")
 
-        if spinner:
-            spinner.ok("✅") if process.returncode == 0 else spinner.fail("💥")
+            if spinner:
+                spinner.ok("✅") if process.returncode == 0 else spinner.fail("💥")
 
-        return CommandExecutor._check_result(stdout, stderr, process.returncode, description)
+            return CommandExecutor._check_result(stdout, stderr, process.returncode, description)
 
     @staticmethod
     def _check_result(stdout, stderr, returncode, description):
@@ -86,3 +104,173 @@ class CommandExecutor:
             raise RuntimeError(err)
         logger.debug(f"{description.capitalize()} output: {stdout}")
         return stdout
+
+    @staticmethod
+    def stream_command(
+        command: list,
+        cwd: str,
+        description: str = "command",
+        timeout: Optional[int] = None,
+        env: Optional[dict] = None,
+        callbacks: Optional[list[LineCallback]] = None,
+        tail_lines: int = 200,
+    ) -> str:
+        """
+        Execute a shell command, handing its output to callbacks line by line.
+
+        Both pipes are read incrementally while the command runs, so output is
+        visible in real time and memory stays bounded: only the last `tail_lines`
+        lines of each stream are kept, for the return value and error messages.
+
+        Args:
+            command: List containing the command and its arguments
+            cwd: Working directory for the command
+            description: Description of the command for logging
+            timeout: Maximum execution time in seconds (None for no timeout)
+            env: Environment for the command
+            callbacks: Functions called with ("stdout" or "stderr", line) for each
+                output line (defaults to logging them, see `default_callbacks`)
+            tail_lines: Number of trailing lines of each stream to keep
+
+        Returns:
+            The last `tail_lines` lines of stdout as string
+
+        Raises:
+            RuntimeError: If the command execution fails or times out
+        """
+        with telemetry.span(telemetry.command_phase(command), description=description):
+            cmd_str = " ".join(command)
+            logger.debug(f"Streaming {description}: {cmd_str}")
+
+            if callbacks is None:
+                callbacks = CommandExecutor.default_callbacks(description)
+
+            process = subprocess.Popen(
+                command,
+                cwd=cwd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                errors="replace",
+                bufsize=1,
+                env=env,
+            )
+
+            tails = {"stdout": deque(maxlen=tail_lines), "stderr": deque(maxlen=tail_lines)}
+
+            def pump(stream_name, pipe):
+                for raw_line in pipe:
+                    line = _ANSI_ESCAPE_RE.sub("", raw_line.rstrip("\n"))
+                    tails[stream_name].append(line)
+                    for callback in callbacks:
+                        try:
+                            callback(stream_name, line)
+                        except Exception as e:
+                            logger.warning(f"⚠️ Output callback failed for {description}: {e}")
+                pipe.close()
+
+            readers = [
+                threading.Thread(target=pump, args=("stdout", process.stdout), daemon=True),
+                threading.Thread(target=pump, args=("stderr", process.stderr), daemon=True),
+            ]
+            for reader in readers:
+                reader.start()
+
+            try:
+                process.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+                for reader in readers:
+                    reader.join()
+                raise RuntimeError(f"{description.capitalize()} timed out after {timeout} seconds")
+
+            for reader in readers:
+                reader.join()
+
+            stdout = "\n".join(tails["stdout"])
+            if process.returncode != 0:
+                # OpenTofu reports errors on stderr, fall back to stdout otherwise
+                tail = tails["stderr"] or tails["stdout"]
+                err = f"Error executing {description}: " + "\n".join(tail)
+                logger.error(err)
+                raise RuntimeError(err)
+            logger.debug(f"{description.capitalize()} completed")
+            return stdout
+
+    @staticmethod
+    def default_callbacks(description: str) -> list[LineCallback]:
+        """
+        Get the callbacks used when streaming without explicit callbacks.
+
+        Args:
+            description: Description of the command for logging
+
+        Returns:
+            Callbacks logging every line at debug level and OpenTofu progress at info level
+        """
+        return [LogLineHandler(description), TofuProgressParser()]
+
+
+class LogLineHandler:
+    """Output callback writing every line to the logger."""
+
+    def __init__(self, description: str, level: int = logging.DEBUG):
+        """
+        Initialise the LogLineHandler.
+
+        Args:
+            description: Description of the command, prefixed to every line
+            level: Logging level of the lines
+        """
+        self.description = description
+        self.level = level
+
+    def __call__(self, stream: str, line: str) -> None:
+        if line.strip():
+            logger.log(self.level, f"[{self.description}] {line}")
+
+
+class FileLineSink:
+    """Output callback appending every line to a file."""
+
+    def __init__(self, path: str):
+        """
+        Initialise the FileLineSink.
+
+        Args:
+            path: File to append the lines to
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, stream: str, line: str) -> None:
+        with self._lock, open(self.path, "a") as f:
+            f.write(f"{stream}: {line}\n")
+
+
+class TofuProgressParser:
+    """
+    Output callback following resource progress in OpenTofu apply/destroy output.
+
+    Lines such as `module.x.aws_instance.k3s_node: Creation complete after 42s`
+    are logged at info level and counted per action.
+    """
+
+    _PROGRESS_RE = re.compile(
+        r"^(?P<address>[\w.\[\]\"-]+): (?P<action>Creating|Modifying|Destroying|"
+        r"Creation complete|Modifications complete|Destruction complete|"
+        r"Still creating|Still modifying|Still destroying)"
+    )
+
+    def __init__(self):
+        """Initialise the TofuProgressParser."""
+        self.counts = {}
+
+    def __call__(self, stream: str, line: str) -> None:
+        match = self._PROGRESS_RE.match(line)
+        if not match:
+            return
+        action = match.group("action")
+        self.counts[action] = self.counts.get(action, 0) + 1
+        logger.info(line.strip())
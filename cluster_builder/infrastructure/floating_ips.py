@@ -0,0 +1,164 @@
+"""
+Allocation of OpenStack floating IPs to new nodes.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Optional
+
+if TYPE_CHECKING:
+    from openstack import connection
+
+logger = logging.getLogger("swarmchestrate")
+
+# Seconds a floating IP stays reserved for the node it was handed to, long
+# enough for the apply of the node to attach it
+DEFAULT_LEASE_SECONDS = 1800
+
+
+class FloatingIPAllocator:
+    """
+    Hands out unattached floating IPs of the OpenStack project to new nodes.
+
+    A single authenticated SDK connection is kept and reused, so its token is
+    reused until it expires instead of authenticating for every lookup, and
+    only unattached ("DOWN") floating IPs are listed, filtered by the server.
+
+    A floating IP remains unattached until the apply of its node associates it,
+    so every allocated IP is leased for a limited time, during which it is not
+    handed out again. Concurrent or batched node additions in the same process
+    therefore get distinct IPs.
+    """
+
+    def __init__(
+        self,
+        connect: Optional[Callable[[], "connection.Connection"]] = None,
+        lease_seconds: Optional[float] = None,
+    ):
+        """
+        Initialise the FloatingIPAllocator.
+
+        Args:
+            connect: Optional factory for the OpenStack connection, defaults to
+                application credentials from the TF_VAR_openstack_* environment
+                variables
+            lease_seconds: How long allocated IPs stay reserved, defaults to the
+                CLUSTER_BUILDER_FLOATING_IP_LEASE environment variable or 30 minutes
+        """
+        self._connect = connect or self._connect_from_env
+        self.lease_seconds = float(
+            lease_seconds
+            if lease_seconds is not None
+            else os.getenv("CLUSTER_BUILDER_FLOATING_IP_LEASE", DEFAULT_LEASE_SECONDS)
+        )
+        self._connection = None
+        self._lock = threading.Lock()
+        # floating IP id -> lease expiry
+        self._leases = {}
+
+    def available(self) -> list[dict]:
+        """
+        List the unattached floating IPs which are not leased.
+
+        Returns:
+            List of {"id": <floating_ip_id>, "address": <floating_ip_address>}
+
+        Raises:
+            RuntimeError: If OpenStack credentials are missing
+        """
+        with self._lock:
+            return self._available()
+
+    def allocate(self, count: int = 1) -> list[dict]:
+        """
+        Lease unattached floating IPs, distinct from any other active lease.
+
+        Args:
+            count: Number of floating IPs to allocate
+
+        Returns:
+            List of `count` {"id": <floating_ip_id>, "address": <floating_ip_address>}
+
+        Raises:
+            RuntimeError: If fewer than `count` floating IPs are available, in
+                which case none is leased, or OpenStack credentials are missing
+        """
+        with self._lock:
+            unused = self._available()
+            if len(unused) < count:
+                error_msg = (
+                    f"Deployment aborted: {count} floating IPs required but only {len(unused)} unused. "
+                    "Cloud admin must allocate floating IPs to the project."
+                )
+                logger.error(error_msg)
+                raise RuntimeError(error_msg)
+
+            allocated = unused[:count]
+            expiry = time.monotonic() + self.lease_seconds
+            for floating_ip in allocated:
+                self._leases[floating_ip["id"]] = expiry
+
+        logger.info(f"Allocated floating IPs: {', '.join(ip['address'] for ip in allocated)}")
+        return allocated
+
+    def release(self, floating_ip_ids: list[str]) -> None:
+        """
+        End the leases of floating IPs, e.g. after their node failed to deploy.
+
+        Args:
+            floating_ip_ids: IDs of the floating IPs, unknown ones are ignored
+        """
+        with self._lock:
+            for floating_ip_id in floating_ip_ids:
+                if self._leases.pop(floating_ip_id, None) is not None:
+                    logger.debug(f"Released floating IP {floating_ip_id}")
+
+    def _available(self) -> list[dict]:
+        now = time.monotonic()
+        self._leases = {ip_id: expiry for ip_id, expiry in self._leases.items() if expiry > now}
+
+        return [
+            {"id": ip.id, "address": ip.floating_ip_address}
+            for ip in self._list_unattached()
+            if ip.id not in self._leases
+        ]
+
+    def _list_unattached(self) -> list:
+        if self._connection is None:
+            logger.info("Connecting to OpenStack to fetch unused floating IPs")
+            self._connection = self._connect()
+        try:
+            ips = list(self._connection.network.ips(status="DOWN"))
+        except Exception as e:
+            # The session may be unusable, e.g. revoked credentials, start afresh next time
+            self._connection = None
+            error_msg = f"❌ Failed to list floating IPs: {e}"
+            logger.error(error_msg)
+            raise RuntimeError(error_msg)
+        # A port may be bound before the status catches up
+        return [ip for ip in ips if not ip.port_id]
+
+    @staticmethod
+    def _connect_from_env() -> "connection.Connection":
+        required_env_vars = [
+            "TF_VAR_openstack_auth_url",
+            "TF_VAR_openstack_application_credential_id",
+            "TF_VAR_openstack_application_credential_secret",
+        ]
+
+        missing = [v for v in required_env_vars if not os.environ.get(v)]
+        if missing:
+            raise RuntimeError(
+                f"Missing OpenStack environment variables: {', '.join(missing)}"
+            )
+
+        from openstack import connection
+
+        return connection.Connection(
+            auth_url=os.environ["TF_VAR_openstack_auth_url"],
+            auth_type="v3applicationcredential",
+            application_credential_id=os.environ["TF_VAR_openstack_application_credential_id"],
+            application_credential_secret=os.environ["TF_VAR_openstack_application_credential_secret"],
+        )
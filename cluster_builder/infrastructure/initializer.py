@@ -0,0 +1,263 @@
+"""
+OpenTofu initialisation with a shared provider cache.
+"""
+
+import asyncio
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import time
+from typing import Optional
+
+from cluster_builder.infrastructure.async_executor import AsyncCommandExecutor
+from cluster_builder.infrastructure.executor import CommandExecutor
+from cluster_builder.infrastructure.locking import ClusterLock
+
+logger = logging.getLogger("swarmchestrate")
+
+LOCK_FILE_NAME = ".terraform.lock.hcl"
+STAMP_FILE_NAME = "cluster-builder-init.json"
+
+# Files which never affect what `tofu init` installs
+_IGNORED_FILES = {"outputs.tf"}
+
+# Init arguments which make no difference once the backend is unchanged
+_NEUTRAL_ARGS = {"-reconfigure", "-input=false"}
+
+_MODULE_SOURCE_RE = re.compile(
+    r'module\s+"([^"]+)"\s*\{\s*source\s*=\s*"([^"]*)"', re.MULTILINE
+)
+
+
+class TofuInitializer:
+    """
+    Runs `tofu init` against a shared plugin cache and skips it when possible.
+
+    Providers are installed once into a plugin cache shared by every working
+    directory, and a dependency lock file is kept per kind of working directory
+    (e.g. clusters or manifest deployments) so that new directories start from
+    already resolved provider versions. When a directory is already initialised
+    and nothing affecting init has changed since, init is skipped entirely.
+    """
+
+    def __init__(self, cache_dir: str):
+        """
+        Initialise the TofuInitializer.
+
+        Args:
+            cache_dir: Root directory for the plugin cache and shared lock files
+        """
+        self.plugin_cache_dir = os.path.join(cache_dir, "plugins")
+        self.lock_files_dir = os.path.join(cache_dir, "locks")
+        self.time_saved = 0.0
+        logger.debug(
+            f"Initialised TofuInitializer with plugin_cache_dir={self.plugin_cache_dir}"
+        )
+
+    def init(
+        self,
+        cwd: str,
+        env: dict,
+        profile: str,
+        args: Optional[list[str]] = None,
+        description: str = "OpenTofu init",
+    ) -> bool:
+        """
+        Initialise an OpenTofu working directory unless it is already up to date.
+
+        Args:
+            cwd: Working directory to initialise
+            env: Environment for the OpenTofu subprocess
+            profile: Kind of working directory, used to share the lock file
+                between directories requiring the same providers
+            args: Additional arguments for `tofu init`
+            description: Description of the command for logging
+
+        Returns:
+            True if init was skipped, False if it was run
+
+        Raises:
+            RuntimeError: If `tofu init` fails
+        """
+        args = list(args or [])
+        if self._is_up_to_date(cwd, args, description):
+            return True
+
+        command, init_env = self._prepare(cwd, env, profile, args)
+
+        # The plugin cache is not safe for concurrent installs
+        start = time.monotonic()
+        with ClusterLock(self.plugin_cache_dir):
+            CommandExecutor.run_command(command, cwd, description, env=init_env)
+        self._record(cwd, profile, args, time.monotonic() - start)
+        return False
+
+    async def init_async(
+        self,
+        cwd: str,
+        env: dict,
+        profile: str,
+        args: Optional[list[str]] = None,
+        description: str = "OpenTofu init",
+    ) -> bool:
+        """
+        Asyncio variant of `init`, running `tofu init` without blocking the event loop.
+
+        Args:
+            cwd: Working directory to initialise
+            env: Environment for the OpenTofu subprocess
+            profile: Kind of working directory, used to share the lock file
+                between directories requiring the same providers
+            args: Additional arguments for `tofu init`
+            description: Description of the command for logging
+
+        Returns:
+            True if init was skipped, False if it was run
+
+        Raises:
+            RuntimeError: If `tofu init` fails
+        """
+        args = list(args or [])
+        if self._is_up_to_date(cwd, args, description):
+            return True
+
+        command, init_env = self._prepare(cwd, env, profile, args)
+
+        # The plugin cache is not safe for concurrent installs
+        start = time.monotonic()
+        lock = ClusterLock(self.plugin_cache_dir)
+        acquiring = asyncio.ensure_future(asyncio.to_thread(lock.acquire))
+        try:
+            await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            # The thread keeps waiting for the lock, release it once it gets it
+            acquiring.add_done_callback(lambda _: lock.release())
+            raise
+        try:
+            await AsyncCommandExecutor.run_command(command, cwd, description, env=init_env)
+        finally:
+            lock.release()
+        self._record(cwd, profile, args, time.monotonic() - start)
+        return False
+
+    def _is_up_to_date(self, cwd: str, args: list[str], description: str) -> bool:
+        """Check whether init can be skipped, accounting for the time saved."""
+        stamp = self._read_stamp(os.path.join(cwd, ".terraform", STAMP_FILE_NAME))
+        if stamp.get("fingerprint") != self.fingerprint(cwd, args) or not os.path.exists(
+            os.path.join(cwd, LOCK_FILE_NAME)
+        ):
+            return False
+
+        saved = stamp.get("duration", 0.0)
+        self.time_saved += saved
+        logger.info(f"⏩ Skipped {description} in {cwd}, unchanged (saved ~{saved:.1f}s)")
+        return True
+
+    def _prepare(
+        self, cwd: str, env: dict, profile: str, args: list[str]
+    ) -> tuple[list[str], dict]:
+        """Seed the shared lock file and build the init command and environment."""
+        lock_path = os.path.join(cwd, LOCK_FILE_NAME)
+        shared_lock_path = self._shared_lock_path(profile)
+        if not os.path.exists(lock_path) and os.path.exists(shared_lock_path):
+            shutil.copy2(shared_lock_path, lock_path)
+            logger.debug(f"Reusing dependency lock file {shared_lock_path}")
+
+        os.makedirs(self.plugin_cache_dir, exist_ok=True)
+        init_env = dict(env or os.environ)
+        init_env["TF_PLUGIN_CACHE_DIR"] = self.plugin_cache_dir
+        return ["tofu", "init", "-input=false"] + args, init_env
+
+    def _record(self, cwd: str, profile: str, args: list[str], duration: float) -> None:
+        """Share the resulting lock file and stamp the directory as initialised."""
+        self._share_lock_file(os.path.join(cwd, LOCK_FILE_NAME), self._shared_lock_path(profile))
+        self._write_stamp(
+            os.path.join(cwd, ".terraform", STAMP_FILE_NAME),
+            {"fingerprint": self.fingerprint(cwd, args), "duration": duration},
+        )
+
+    def _shared_lock_path(self, profile: str) -> str:
+        return os.path.join(self.lock_files_dir, f"{profile}{LOCK_FILE_NAME}")
+
+    @staticmethod
+    def fingerprint(cwd: str, args: list[str]) -> str:
+        """
+        Compute a hash of everything in a working directory that affects init.
+
+        This covers the backend and provider configuration, the module calls and
+        their sources, and the init arguments, but not module arguments or outputs.
+
+        Args:
+            cwd: Working directory
+            args: Arguments for `tofu init`
+
+        Returns:
+            Hex digest identifying the init inputs
+        """
+        digest = hashlib.sha256()
+        digest.update(json.dumps([a for a in args if a not in _NEUTRAL_ARGS]).encode())
+
+        paths = glob.glob(os.path.join(cwd, "*.tf")) + glob.glob(os.path.join(cwd, "*.tf.json"))
+        for path in sorted(paths):
+            name = os.path.basename(path)
+            if name in _IGNORED_FILES:
+                continue
+            with open(path, "rb") as f:
+                content = f.read()
+            # Only the module calls matter, not their arguments or the outputs
+            if name == "main.tf":
+                modules = _MODULE_SOURCE_RE.findall(content.decode(errors="replace"))
+                content = json.dumps(sorted(modules)).encode()
+            elif name == "main.tf.json":
+                document = json.loads(content or b"{}")
+                modules = {
+                    module: body.get("source")
+                    for module, body in document.get("module", {}).items()
+                }
+                content = json.dumps(
+                    [document.get("terraform"), document.get("provider"), modules],
+                    sort_keys=True,
+                ).encode()
+            digest.update(name.encode() + b"\0" + content + b"\0")
+
+        return digest.hexdigest()
+
+    def _share_lock_file(self, lock_path: str, shared_lock_path: str) -> None:
+        """Save a lock file as the shared one if it resolves providers the shared one lacks."""
+        if not os.path.exists(lock_path):
+            return
+
+        providers = self._locked_providers(lock_path)
+        if os.path.exists(shared_lock_path) and providers <= self._locked_providers(
+            shared_lock_path
+        ):
+            return
+
+        os.makedirs(self.lock_files_dir, exist_ok=True)
+        tmp_path = f"{shared_lock_path}.{os.getpid()}.tmp"
+        shutil.copy2(lock_path, tmp_path)
+        os.replace(tmp_path, shared_lock_path)
+        logger.debug(f"Updated shared dependency lock file {shared_lock_path}")
+
+    @staticmethod
+    def _locked_providers(lock_path: str) -> set[str]:
+        with open(lock_path) as f:
+            return set(re.findall(r'^provider\s+"([^"]+)"', f.read(), re.MULTILINE))
+
+    @staticmethod
+    def _read_stamp(stamp_path: str) -> dict:
+        try:
+            with open(stamp_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _write_stamp(stamp_path: str, stamp: dict) -> None:
+        os.makedirs(os.path.dirname(stamp_path), exist_ok=True)
+        with open(stamp_path, "w") as f:
+            json.dump(stamp, f)
@@ -0,0 +1,260 @@
+"""
+Fleet-wide inventory of clusters read from the PostgreSQL state backend.
+"""
+
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from cluster_builder.config.postgres import PostgresConfig
+from cluster_builder.config.postgres import PostgresConnectionPool
+from cluster_builder.utils.hcl import module_output_name
+
+logger = logging.getLogger("swarmchestrate")
+
+# Maximum number of cluster schemas read by a single UNION ALL query
+SCHEMAS_PER_QUERY = 100
+
+# Resource types of the node instance created by each cloud template
+_INSTANCE_TYPES = {
+    "aws_instance": "aws",
+    "openstack_compute_instance_v2": "openstack",
+}
+
+
+@dataclass(frozen=True)
+class NodeRecord:
+    """A node of a cluster, as recorded in its OpenTofu state."""
+
+    cluster_name: str
+    resource_name: str
+    role: Optional[str]
+    cloud: Optional[str]
+    public_ip: Optional[str] = None
+    private_ip: Optional[str] = None
+    master_ip: Optional[str] = None
+    instance_id: Optional[str] = None
+    power_state: Optional[str] = None
+
+
+class FleetInventory:
+    """
+    Lists the nodes of every cluster with a few bulk queries.
+
+    Each cluster has a schema in the state database holding a `states` table
+    with one row per workspace, and each node has its own workspace. The
+    schemas are discovered through `information_schema`, and the states of all
+    of them are read with UNION ALL queries, so the cost does not grow with
+    the number of clusters as running `tofu` per workspace would.
+
+    Results can be cached for a short time, for callers polling the inventory.
+    """
+
+    def __init__(
+        self,
+        pg_config: PostgresConfig,
+        pool: Optional[PostgresConnectionPool] = None,
+        ttl: float = 0.0,
+    ):
+        """
+        Initialise the FleetInventory.
+
+        Args:
+            pg_config: PostgreSQL configuration of the state backend
+            pool: Optional connection pool, defaults to the pool of `pg_config`
+            ttl: Seconds during which results are served from the cache,
+                0 disables caching
+        """
+        self.pg_config = pg_config
+        self.ttl = ttl
+        self._pool = pool
+        self._lock = threading.Lock()
+        # cluster name, or None for the whole fleet -> (expiry, result)
+        self._cache = {}
+
+    @property
+    def pool(self) -> PostgresConnectionPool:
+        return self._pool or self.pg_config.pool()
+
+    def inventory(self) -> dict[str, list[NodeRecord]]:
+        """
+        List the nodes of every cluster.
+
+        Returns:
+            Node records keyed by cluster name, including clusters without nodes
+
+        Raises:
+            RuntimeError: If the database cannot be queried
+        """
+        from psycopg2 import sql
+
+        cached = self._cached(None)
+        if cached is not None:
+            return cached
+
+        rows = self._fetch_all(
+            sql.SQL(
+                "SELECT table_schema FROM information_schema.tables "
+                "WHERE table_name = 'states' AND table_schema NOT IN ('pg_catalog', 'information_schema')"
+            ),
+            (),
+        )
+        schemas = sorted(row[0] for row in rows or [])
+
+        fleet = {schema: [] for schema in schemas}
+        for start in range(0, len(schemas), SCHEMAS_PER_QUERY):
+            batch = schemas[start:start + SCHEMAS_PER_QUERY]
+            for schema, workspace, data in self._fetch_states(batch):
+                record = self._node_record(schema, workspace, data)
+                if record is not None:
+                    fleet[schema].append(record)
+
+        logger.debug(
+            f"Read inventory of {len(schemas)} clusters with "
+            f"{sum(len(nodes) for nodes in fleet.values())} nodes"
+        )
+        self._store(None, fleet)
+        for schema, nodes in fleet.items():
+            self._store(schema, nodes)
+        return fleet
+
+    def cluster_inventory(self, cluster_name: str) -> list[NodeRecord]:
+        """
+        List the nodes of one cluster.
+
+        Args:
+            cluster_name: Name of the cluster
+
+        Returns:
+            Node records of the cluster, empty if it has no state
+
+        Raises:
+            RuntimeError: If the database cannot be queried
+        """
+        cached = self._cached(cluster_name)
+        if cached is not None:
+            return cached
+
+        nodes = []
+        for schema, workspace, data in self._fetch_states([cluster_name]):
+            record = self._node_record(schema, workspace, data)
+            if record is not None:
+                nodes.append(record)
+        self._store(cluster_name, nodes)
+        return nodes
+
+    def invalidate(self) -> None:
+        """Forget every cached result."""
+        with self._lock:
+            self._cache.clear()
+
+    def _fetch_states(self, schemas: list[str]) -> list[tuple]:
+        """Read the (schema, workspace, state) rows of several schemas in one query."""
+        from psycopg2 import sql
+
+        if not schemas:
+            return []
+        query = sql.SQL(" UNION ALL ").join(
+            sql.SQL("SELECT %s, name, data FROM {}").format(sql.Identifier(schema, "states"))
+            for schema in schemas
+        )
+        rows = self._fetch_all(query, tuple(schemas))
+        if rows is None and len(schemas) > 1:
+            # A cluster was destroyed meanwhile, read the others one by one
+            rows = []
+            for schema in schemas:
+                rows.extend(self._fetch_states([schema]))
+        return rows or []
+
+    @staticmethod
+    def _node_record(cluster_name: str, workspace: str, data) -> Optional[NodeRecord]:
+        """Build the record of the node deployed in a workspace, if any."""
+        state = json.loads(data) if isinstance(data, (str, bytes)) else data or {}
+        module = f"module.{workspace}"
+
+        instance = {}
+        cloud = None
+        for resource in state.get("resources", []):
+            if resource.get("module") != module or resource.get("mode") != "managed":
+                continue
+            if resource.get("type") in _INSTANCE_TYPES and resource.get("instances"):
+                cloud = _INSTANCE_TYPES[resource["type"]]
+                instance = resource["instances"][0].get("attributes", {})
+                break
+            if resource.get("type") == "null_resource" and resource.get("name") == "deploy_k3s_edge":
+                cloud = "edge"
+        if cloud is None:
+            # No node in this workspace, e.g. the default workspace
+            return None
+
+        outputs = state.get("outputs", {})
+
+        def output(name):
+            for key in (module_output_name(workspace, name), name):
+                value = outputs.get(key, {}).get("value")
+                if value is not None:
+                    return value
+            return None
+
+        role = _tag(instance.get("tags"), "Role")
+        if role is None:
+            role = "worker" if output("worker_ip") else "ha" if output("ha_ip") else "master"
+
+        public_ip = output(f"{role}_ip") or instance.get("public_ip")
+        return NodeRecord(
+            cluster_name=cluster_name,
+            resource_name=workspace,
+            role=role,
+            cloud=cloud,
+            public_ip=public_ip,
+            private_ip=instance.get("private_ip") or instance.get("access_ip_v4"),
+            master_ip=output("master_ip"),
+            instance_id=instance.get("id"),
+            power_state=instance.get("instance_state") or instance.get("power_state"),
+        )
+
+    def _cached(self, key: Optional[str]):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                return entry[1]
+        return None
+
+    def _store(self, key: Optional[str], result) -> None:
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._cache[key] = (time.monotonic() + self.ttl, result)
+
+    def _fetch_all(self, query, params: tuple) -> Optional[list[tuple]]:
+        """
+        Run a read-only query.
+
+        Returns None if a queried schema or table does not exist.
+        """
+        import psycopg2
+
+        try:
+            with self.pool.connection() as connection, connection.cursor() as cursor:
+                cursor.execute(query, params)
+                return cursor.fetchall()
+        except (psycopg2.errors.UndefinedTable, psycopg2.errors.InvalidSchemaName):
+            return None
+        except psycopg2.Error as e:
+            error_msg = f"❌ Failed to read inventory from PostgreSQL: {e}"
+            logger.error(error_msg)
+            raise RuntimeError(error_msg)
+
+
+def _tag(tags, key: str) -> Optional[str]:
+    """Read a tag of an AWS (mapping) or OpenStack ("key=value" list) instance."""
+    if isinstance(tags, dict):
+        return tags.get(key)
+    for tag in tags or []:
+        name, _, value = tag.partition("=")
+        if name == key:
+            return value
+    return None
@@ -0,0 +1,80 @@
+"""
+File locking for cluster directories.
+"""
+
+import fcntl
+import logging
+import os
+import time
+from typing import Optional
+
+logger = logging.getLogger("swarmchestrate")
+
+
+class ClusterLock:
+    """
+    Exclusive lock on a cluster directory, held across threads and processes.
+
+    The lock is an advisory `flock` on a `cluster_<name>.lock` file next to the
+    cluster directory, so it survives the directory being removed by `destroy`.
+    Every acquisition opens its own file descriptor, which makes two threads of
+    the same process exclude each other as well.
+    """
+
+    def __init__(self, cluster_dir: str, timeout: Optional[float] = None):
+        """
+        Initialise the ClusterLock.
+
+        Args:
+            cluster_dir: Path of the cluster directory to lock
+            timeout: Maximum time in seconds to wait for the lock (None waits forever)
+        """
+        self.cluster_dir = cluster_dir
+        self.lock_path = f"{os.path.normpath(cluster_dir)}.lock"
+        self.timeout = timeout
+        self._fd = None
+
+    def acquire(self) -> None:
+        """
+        Acquire the lock, blocking until it is free or the timeout expires.
+
+        Raises:
+            TimeoutError: If the lock could not be acquired within the timeout
+        """
+        os.makedirs(os.path.dirname(self.lock_path) or ".", exist_ok=True)
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+
+        if self.timeout is None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        else:
+            deadline = time.monotonic() + self.timeout
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        os.close(fd)
+                        raise TimeoutError(
+                            f"Timed out after {self.timeout} seconds waiting for lock on {self.cluster_dir}"
+                        )
+                    time.sleep(0.1)
+
+        self._fd = fd
+        logger.debug(f"Acquired lock {self.lock_path}")
+
+    def release(self) -> None:
+        """Release the lock if it is held."""
+        if self._fd is None:
+            return
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
+        logger.debug(f"Released lock {self.lock_path}")
+
+    def __enter__(self) -> "ClusterLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.release()
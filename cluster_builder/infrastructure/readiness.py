@@ -0,0 +1,197 @@
+"""
+Tracking of nodes installing k3s on their own, e.g. from cloud-init user data.
+"""
+
+import logging
+import shlex
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from cluster_builder.infrastructure.ssh import K3S_KUBECONFIG
+from cluster_builder.infrastructure.ssh import SSHTransport
+
+logger = logging.getLogger("swarmchestrate")
+
+# Seconds between two readiness checks of a node
+DEFAULT_INTERVAL = 10.0
+
+# Seconds a node may take from creation until it is Ready, including booting
+# and downloading k3s
+DEFAULT_TIMEOUT = 900.0
+
+
+@dataclass
+class NodeReadiness:
+    """Handle on the readiness tracking of a node, see `ReadinessTracker.track`."""
+
+    node_name: str
+    master_ip: str
+    future: Future = field(repr=False)
+
+    @property
+    def status(self) -> str:
+        """Current state of the node: pending, ready or failed."""
+        if not self.future.done():
+            return "pending"
+        if self.future.cancelled() or self.future.exception() is not None:
+            return "failed"
+        return "ready"
+
+    def done(self) -> bool:
+        """Return True once the node is ready or tracking gave up."""
+        return self.future.done()
+
+    def result(self, timeout: Optional[float] = None) -> float:
+        """
+        Wait for the node to become ready.
+
+        Args:
+            timeout: Maximum time in seconds to wait (None waits until the
+                tracker gives up)
+
+        Returns:
+            Seconds from the start of tracking until the node was ready
+
+        Raises:
+            TimeoutError: If the node did not become ready in time
+        """
+        return self.future.result(timeout=timeout)
+
+
+class ReadinessTracker:
+    """
+    Confirms that nodes joined their cluster and are Ready.
+
+    Nodes provisioned with cloud-init user data install k3s after `tofu apply`
+    has returned, so a short apply can create many nodes which then install in
+    parallel. The tracker polls the master over SSH for the Ready condition of
+    each node. `wait` blocks until a node is ready, while `track` returns a
+    handle at once and polls on a worker pool, so many nodes are tracked
+    concurrently.
+    """
+
+    def __init__(
+        self,
+        transport: Optional[SSHTransport] = None,
+        interval: float = DEFAULT_INTERVAL,
+        timeout: float = DEFAULT_TIMEOUT,
+        max_workers: int = 16,
+        check: Optional[Callable[[str, str, str, str], bool]] = None,
+    ):
+        """
+        Initialise the ReadinessTracker.
+
+        Args:
+            transport: SSH transport reaching the masters (a new one is created by default)
+            interval: Seconds between two checks of a node
+            timeout: Seconds after which tracking a node gives up
+            max_workers: Maximum number of nodes polled at once
+            check: Optional function `check(node_name, master_ip, ssh_user, ssh_key_path)`
+                returning True once the node is ready, defaults to querying the
+                master with kubectl
+        """
+        self.transport = transport or SSHTransport()
+        self.interval = interval
+        self.timeout = timeout
+        self._check = check or self.is_ready
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="readiness")
+
+    def is_ready(self, node_name: str, master_ip: str, ssh_user: str, ssh_key_path: str) -> bool:
+        """
+        Check once whether a node is registered and Ready.
+
+        A master which cannot be reached yet, or whose k3s is not running yet,
+        counts as not ready rather than as an error.
+
+        Args:
+            node_name: Name of the node in K3s, i.e. its resource_name
+            master_ip: IP address of the K3s master
+            ssh_user: SSH username on the master
+            ssh_key_path: Path to the SSH private key
+
+        Returns:
+            True if the Ready condition of the node is True
+        """
+        jsonpath = '{.status.conditions[?(@.type=="Ready")].status}'
+        command = (
+            f"sudo KUBECONFIG={K3S_KUBECONFIG} k3s kubectl get node {shlex.quote(node_name)} "
+            f"-o jsonpath={shlex.quote(jsonpath)}"
+        )
+        try:
+            client = self.transport.pool.get(master_ip, ssh_user, ssh_key_path)
+            return self.transport.run(client, command).strip() == "True"
+        except Exception as e:
+            logger.debug(f"Node '{node_name}' is not ready yet: {e}")
+            return False
+
+    def track(
+        self, node_name: str, master_ip: str, ssh_user: str, ssh_key_path: str
+    ) -> NodeReadiness:
+        """
+        Start tracking a node without waiting for it.
+
+        Args:
+            node_name: Name of the node in K3s, i.e. its resource_name
+            master_ip: IP address of the K3s master
+            ssh_user: SSH username on the master
+            ssh_key_path: Path to the SSH private key
+
+        Returns:
+            Handle on the readiness of the node
+        """
+        future = self._pool.submit(self._poll, node_name, master_ip, ssh_user, ssh_key_path)
+        logger.info(f"Tracking readiness of node '{node_name}' through master {master_ip}")
+        return NodeReadiness(node_name=node_name, master_ip=master_ip, future=future)
+
+    def wait(
+        self,
+        node_name: str,
+        master_ip: str,
+        ssh_user: str,
+        ssh_key_path: str,
+        timeout: Optional[float] = None,
+    ) -> float:
+        """
+        Block until a node is ready.
+
+        Args:
+            node_name: Name of the node in K3s, i.e. its resource_name
+            master_ip: IP address of the K3s master
+            ssh_user: SSH username on the master
+            ssh_key_path: Path to the SSH private key
+            timeout: Maximum time in seconds to wait, defaults to the tracker timeout
+
+        Returns:
+            Seconds until the node was ready
+
+        Raises:
+            TimeoutError: If the node did not become ready in time
+        """
+        return self._poll(node_name, master_ip, ssh_user, ssh_key_path, timeout)
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Stop the worker pool, abandoning pending tracking unless `wait` is set."""
+        self._pool.shutdown(wait=wait, cancel_futures=not wait)
+
+    def _poll(
+        self,
+        node_name: str,
+        master_ip: str,
+        ssh_user: str,
+        ssh_key_path: str,
+        timeout: Optional[float] = None,
+    ) -> float:
+        started = time.monotonic()
+        deadline = started + (self.timeout if timeout is None else timeout)
+        while True:
+            if self._check(node_name, master_ip, ssh_user, ssh_key_path):
+                elapsed = time.monotonic() - started
+                logger.info(f"✅ Node '{node_name}' is ready after {elapsed:.0f}s")
+                return elapsed
+            if time.monotonic() + self.interval > deadline:
+                error_msg = f"❌ Node '{node_name}' was not ready within {deadline - started:.0f} seconds"
+                logger.error(error_msg)
+                raise TimeoutError(error_msg)
+            time.sleep(self.interval)
@@ -0,0 +1,275 @@
+"""
+Native SSH transport for manifest and registry secret delivery.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import posixpath
+import shlex
+import threading
+from typing import Callable, Optional
+
+logger = logging.getLogger("swarmchestrate")
+
+K3S_MANIFEST_DIR = "/var/lib/rancher/k3s/server/manifests"
+K3S_KUBECONFIG = "/etc/rancher/k3s/k3s.yaml"
+REMOTE_STAGING_DIR = "/tmp/manifests_temp"
+
+
+def _paramiko_connect(host: str, user: str, key_path: str, timeout: float):
+    """Open an SSH connection with paramiko, the default connection factory."""
+    try:
+        import paramiko
+    except ImportError as e:
+        raise RuntimeError(
+            "The ssh transport requires paramiko, install it with 'pip install cluster-builder[ssh]'"
+        ) from e
+
+    client = paramiko.SSHClient()
+    # Nodes are recreated with new host keys, as with the OpenTofu provisioners
+    # host keys are not pinned
+    client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    client.connect(
+        host,
+        username=user,
+        key_filename=key_path,
+        timeout=timeout,
+        allow_agent=False,
+        look_for_keys=False,
+    )
+    client.get_transport().set_keepalive(30)
+    return client
+
+
+class SSHConnectionPool:
+    """
+    Keeps one authenticated SSH connection per master and user.
+
+    Commands and SFTP sessions are multiplexed as channels over the pooled
+    connection, so only the first operation on a master pays for the TCP and
+    SSH handshakes. Dead connections are transparently re-established.
+    """
+
+    def __init__(
+        self,
+        connect: Optional[Callable] = None,
+        timeout: float = 30,
+    ):
+        """
+        Initialise the SSHConnectionPool.
+
+        Args:
+            connect: Factory `connect(host, user, key_path, timeout)` returning a
+                connected paramiko-compatible SSHClient (defaults to paramiko)
+            timeout: Connection timeout in seconds
+        """
+        self._connect = connect or _paramiko_connect
+        self.timeout = timeout
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def get(self, host: str, user: str, key_path: str):
+        """
+        Get a connected client for a host, opening a connection if needed.
+
+        Args:
+            host: Host to connect to
+            user: SSH username
+            key_path: Path to the SSH private key
+
+        Returns:
+            A connected SSHClient
+        """
+        key = (host, user, key_path)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                transport = client.get_transport()
+                if transport is not None and transport.is_active():
+                    return client
+                logger.debug(f"SSH connection to {user}@{host} is closed, reconnecting")
+                client.close()
+
+            logger.debug(f"Opening SSH connection to {user}@{host}")
+            client = self._connect(host, user, key_path, self.timeout)
+            self._clients[key] = client
+            return client
+
+    def close_all(self) -> None:
+        """Close every pooled connection."""
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients.clear()
+
+
+class SSHTransport:
+    """Delivers manifests and registry secrets to a K3s master over SSH/SFTP."""
+
+    def __init__(self, pool: Optional[SSHConnectionPool] = None):
+        """
+        Initialise the SSHTransport.
+
+        Args:
+            pool: Connection pool to use (a new one is created by default)
+        """
+        self.pool = pool or SSHConnectionPool()
+
+    def run(self, client, command: str, stdin: Optional[str] = None) -> str:
+        """
+        Run a command on a connected client.
+
+        Args:
+            client: Connected SSHClient
+            command: Command line to run
+            stdin: Optional data written to the command's standard input
+
+        Returns:
+            Command stdout output as string
+
+        Raises:
+            RuntimeError: If the command exits with a non-zero status
+        """
+        channel_stdin, stdout, stderr = client.exec_command(command)
+        if stdin is not None:
+            channel_stdin.write(stdin)
+        channel_stdin.channel.shutdown_write()
+
+        # Drain both streams before waiting for the exit status: once either
+        # fills the channel window the remote command blocks until it is read
+        err_chunks = []
+        stderr_reader = threading.Thread(target=lambda: err_chunks.append(stderr.read()), daemon=True)
+        stderr_reader.start()
+        out = stdout.read().decode(errors="replace")
+        stderr_reader.join()
+        exit_status = stdout.channel.recv_exit_status()
+        if exit_status != 0:
+            err = b"".join(err_chunks).decode(errors="replace")
+            raise RuntimeError(f"Remote command failed with exit code {exit_status}: {err.strip()}")
+        return out
+
+    def deploy_manifests(
+        self,
+        manifest_folder: str,
+        master_ip: str,
+        ssh_key_path: str,
+        ssh_user: str,
+        index_path: Optional[str] = None,
+    ) -> list[str]:
+        """
+        Upload new or changed manifests into the K3s manifests folder.
+
+        Args:
+            manifest_folder: Path to local manifest folder
+            master_ip: IP address of K3s master
+            ssh_key_path: Path to SSH private key
+            ssh_user: SSH username to connect to the master node
+            index_path: Optional JSON file recording the hash of each manifest
+                already deployed; unchanged manifests are skipped
+
+        Returns:
+            Relative paths of the manifests which were uploaded
+        """
+        index = {}
+        if index_path and os.path.exists(index_path):
+            with open(index_path) as f:
+                index = json.load(f)
+
+        hashes = {}
+        for root, _, files in os.walk(manifest_folder):
+            for name in sorted(files):
+                local_path = os.path.join(root, name)
+                rel_path = os.path.relpath(local_path, manifest_folder).replace(os.sep, "/")
+                with open(local_path, "rb") as f:
+                    hashes[rel_path] = hashlib.sha256(f.read()).hexdigest()
+
+        changed = sorted(p for p, digest in hashes.items() if index.get(p) != digest)
+        if not changed:
+            logger.info(f"All manifests are already up to date on {master_ip}")
+            return []
+
+        client = self.pool.get(master_ip, ssh_user, ssh_key_path)
+
+        # Create every staging directory in one go, then stream the files
+        staging_dirs = sorted(
+            {posixpath.dirname(posixpath.join(REMOTE_STAGING_DIR, p)) for p in changed}
+        )
+        self.run(client, "mkdir -p " + " ".join(shlex.quote(d) for d in staging_dirs))
+
+        sftp = client.open_sftp()
+        try:
+            for rel_path in changed:
+                sftp.put(
+                    os.path.join(manifest_folder, *rel_path.split("/")),
+                    posixpath.join(REMOTE_STAGING_DIR, rel_path),
+                )
+                logger.debug(f"Uploaded manifest {rel_path} to {master_ip}")
+        finally:
+            sftp.close()
+
+        # Move all manifests into place with a single remote invocation
+        script = ["set -e"]
+        for rel_path in changed:
+            target = posixpath.join(K3S_MANIFEST_DIR, rel_path)
+            script.append(f"mkdir -p {shlex.quote(posixpath.dirname(target))}")
+            script.append(
+                f"mv {shlex.quote(posixpath.join(REMOTE_STAGING_DIR, rel_path))} {shlex.quote(target)}"
+            )
+        self.run(client, "sudo bash -s", stdin="\n".join(script) + "\n")
+
+        if index_path:
+            index.update({p: hashes[p] for p in changed})
+            with open(index_path, "w") as f:
+                json.dump(index, f, indent=2, sort_keys=True)
+
+        logger.info(f"Uploaded {len(changed)} manifests to {master_ip}")
+        return changed
+
+    def create_registry_secrets(
+        self,
+        registries: list[str],
+        usernames: list[str],
+        passwords: list[str],
+        master_ip: str,
+        ssh_user: str,
+        ssh_key_path: str,
+        namespace: str = "default",
+        secret_names: Optional[list[str]] = None,
+    ) -> list[str]:
+        """
+        Create or update Docker registry secrets with a single remote invocation.
+
+        Args:
+            registries: Registry servers
+            usernames: Username for each registry
+            passwords: Password for each registry
+            master_ip: IP address of K3s master
+            ssh_user: SSH username to connect to the master node
+            ssh_key_path: Path to SSH private key
+            namespace: Namespace of the secrets
+            secret_names: Optional secret name for each registry
+                (defaults to regcred-<index>)
+
+        Returns:
+            Names of the secrets
+        """
+        names = secret_names or [f"regcred-{i}" for i in range(len(registries))]
+
+        # The script, credentials included, goes over stdin rather than the command line
+        script = ["set -e", f"export KUBECONFIG={K3S_KUBECONFIG}"]
+        for name, registry, username, password in zip(names, registries, usernames, passwords):
+            script.append(
+                "kubectl create secret docker-registry "
+                f"{shlex.quote(name)} "
+                f"--docker-server={shlex.quote(registry)} "
+                f"--docker-username={shlex.quote(username)} "
+                f"--docker-password={shlex.quote(password)} "
+                f"--namespace={shlex.quote(namespace)} "
+                "--dry-run=client -o yaml | kubectl apply -f -"
+            )
+
+        client = self.pool.get(master_ip, ssh_user, ssh_key_path)
+        self.run(client, "sudo bash -s", stdin="\n".join(script) + "\n")
+        return names
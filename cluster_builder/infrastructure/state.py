@@ -0,0 +1,182 @@
+"""
+Direct reads of OpenTofu states stored by the PostgreSQL backend.
+"""
+
+import json
+import logging
+import threading
+from typing import Optional
+
+from cluster_builder.config.postgres import PostgresConfig
+from cluster_builder.config.postgres import PostgresConnectionPool
+
+logger = logging.getLogger("swarmchestrate")
+
+
+class PostgresStateReader:
+    """
+    Reads the state of a workspace straight from the PostgreSQL backend.
+
+    The pg backend keeps one row per workspace in the `states` table of the
+    schema named after the cluster, holding the state JSON. Reading the row is
+    much cheaper than running `tofu output -json`, which starts OpenTofu,
+    initialises the backend and decodes the whole state to print a few values.
+
+    Decoded states are cached along with their `serial`, which OpenTofu
+    increments on every change. A cached state is validated by fetching only
+    the serial, so repeated reads of an unchanged state do not transfer or
+    decode it again.
+    """
+
+    def __init__(
+        self, pg_config: PostgresConfig, pool: Optional[PostgresConnectionPool] = None
+    ):
+        """
+        Initialise the PostgresStateReader.
+
+        Args:
+            pg_config: PostgreSQL configuration of the state backend
+            pool: Optional connection pool, defaults to the pool of `pg_config`
+        """
+        self.pg_config = pg_config
+        self._pool = pool
+        self._lock = threading.Lock()
+        # (schema, workspace) -> (serial, state)
+        self._states = {}
+
+    @property
+    def pool(self) -> PostgresConnectionPool:
+        return self._pool or self.pg_config.pool()
+
+    def read_state(self, cluster_name: str, workspace: str = "default") -> Optional[dict]:
+        """
+        Read the decoded state of a workspace.
+
+        Args:
+            cluster_name: Name of the cluster, which is the backend schema
+            workspace: Name of the workspace
+
+        Returns:
+            The state, or None if the workspace has no state
+
+        Raises:
+            RuntimeError: If the database cannot be queried
+        """
+        import psycopg2
+        from psycopg2 import sql
+
+        key = (cluster_name, workspace)
+        table = sql.Identifier(cluster_name, "states")
+        with self._lock:
+            cached = self._states.get(key)
+
+        try:
+            with self.pool.connection() as connection, connection.cursor() as cursor:
+                if cached is not None:
+                    cursor.execute(
+                        sql.SQL("SELECT (data::json->>'serial')::bigint FROM {} WHERE name = %s").format(table),
+                        (workspace,),
+                    )
+                    row = cursor.fetchone()
+                    if row is not None and row[0] == cached[0]:
+                        logger.debug(f"State of {cluster_name}/{workspace} unchanged at serial {row[0]}")
+                        return cached[1]
+
+                cursor.execute(
+                    sql.SQL("SELECT data FROM {} WHERE name = %s").format(table), (workspace,)
+                )
+                row = cursor.fetchone()
+        except (psycopg2.errors.UndefinedTable, psycopg2.errors.InvalidSchemaName):
+            # No state was written to this cluster yet
+            row = None
+        except psycopg2.Error as e:
+            error_msg = f"❌ Failed to read state from PostgreSQL: {e}"
+            logger.error(error_msg)
+            raise RuntimeError(error_msg)
+
+        if row is None:
+            with self._lock:
+                self._states.pop(key, None)
+            return None
+
+        state = json.loads(row[0]) if isinstance(row[0], (str, bytes)) else row[0]
+        with self._lock:
+            self._states[key] = (state.get("serial"), state)
+        logger.debug(f"Read state of {cluster_name}/{workspace} at serial {state.get('serial')}")
+        return state
+
+    def outputs(self, cluster_name: str, workspace: str = "default") -> dict:
+        """
+        Read the root outputs of a workspace.
+
+        Args:
+            cluster_name: Name of the cluster, which is the backend schema
+            workspace: Name of the workspace
+
+        Returns:
+            Outputs in the format of `tofu output -json`, i.e. output names
+            mapped to dictionaries with a "value" key
+
+        Raises:
+            RuntimeError: If the workspace has no state or the database cannot be queried
+        """
+        state = self.read_state(cluster_name, workspace)
+        if state is None:
+            error_msg = f"❌ No state found for workspace '{workspace}' of cluster '{cluster_name}'"
+            logger.error(error_msg)
+            raise RuntimeError(error_msg)
+        return state.get("outputs", {})
+
+    def resource_attributes(
+        self, cluster_name: str, workspace: str = "default", module_name: Optional[str] = None
+    ) -> dict[str, dict]:
+        """
+        Read the attributes of the managed resources of a workspace.
+
+        Args:
+            cluster_name: Name of the cluster, which is the backend schema
+            workspace: Name of the workspace
+            module_name: If given, only include resources of this module
+
+        Returns:
+            Attributes of every resource instance keyed by its address, e.g.
+            "module.node.aws_instance.k3s_node" or "...k3s_node[0]" for counted
+            resources
+
+        Raises:
+            RuntimeError: If the workspace has no state or the database cannot be queried
+        """
+        state = self.read_state(cluster_name, workspace)
+        if state is None:
+            error_msg = f"❌ No state found for workspace '{workspace}' of cluster '{cluster_name}'"
+            logger.error(error_msg)
+            raise RuntimeError(error_msg)
+
+        module_prefix = f"module.{module_name}" if module_name else None
+        attributes = {}
+        for resource in state.get("resources", []):
+            if resource.get("mode") != "managed":
+                continue
+            module = resource.get("module")
+            if module_prefix and module != module_prefix:
+                continue
+            address = f"{resource['type']}.{resource['name']}"
+            if module:
+                address = f"{module}.{address}"
+            for instance in resource.get("instances", []):
+                index = instance.get("index_key")
+                if index is None:
+                    key = address
+                elif isinstance(index, str):
+                    key = f'{address}["{index}"]'
+                else:
+                    key = f"{address}[{index}]"
+                attributes[key] = instance.get("attributes", {})
+        return attributes
+
+    def invalidate(self, cluster_name: str, workspace: Optional[str] = None) -> None:
+        """Forget the cached states of a cluster, or of one of its workspaces."""
+        with self._lock:
+            for key in list(self._states):
+                if key[0] == cluster_name and workspace in (None, key[1]):
+                    del self._states[key]
@@ -2,9 +2,14 @@
 Template management for cluster deployments.
 """
 
+import filecmp
+import hashlib
+import json
 import os
 import shutil
 import logging
+import threading
+from typing import Optional
 
 from cluster_builder.utils.hcl import extract_template_variables
 
@@ -14,11 +19,22 @@ logger = logging.getLogger("swarmchestrate")
 class TemplateManager:
     """Manages template files and operations for cluster deployment."""
 
-    def __init__(self):
-        """Initialise the TemplateManager."""
+    def __init__(self, schema_cache_path: Optional[str] = None):
+        """
+        Initialise the TemplateManager.
+
+        Args:
+            schema_cache_path: Optional JSON file in which the variables parsed
+                from the templates are persisted across processes
+        """
         current_dir = os.path.dirname(os.path.abspath(__file__))  
         self.base_dir = os.path.dirname(current_dir) # templates directory
         self.templates_dir = os.path.join(self.base_dir, "templates")
+        self.schema_cache_path = schema_cache_path
+
+        # Template path -> {"mtime_ns", "sha256", "variables"}
+        self._schemas = None
+        self._schemas_lock = threading.Lock()
         logger.debug(
             f"Initialised TemplateManager with templates_dir={self.templates_dir}"
         )
@@ -99,7 +115,17 @@ class TemplateManager:
             raise RuntimeError(error_msg)
 
         try:
-            shutil.copy2(user_data_src, user_data_dst)
+            if os.path.exists(user_data_dst) and filecmp.cmp(
+                user_data_src, user_data_dst, shallow=False
+            ):
+                logger.debug(f"User data template already up to date: {user_data_dst}")
+                return
+
+            # Copy through a temporary file so that concurrent deployments
+            # reading the template never see a partially written file
+            tmp_dst = f"{user_data_dst}.{os.getpid()}.{threading.get_ident()}.tmp"
+            shutil.copy2(user_data_src, tmp_dst)
+            os.replace(tmp_dst, user_data_dst)
             logger.debug(
                 f"Copied user data template from {user_data_src} to {user_data_dst}"
             )
@@ -119,4 +145,92 @@ class TemplateManager:
             Dictionary of variable names to their configurations
         """
         template_path = os.path.join(self.templates_dir, cloud, "main.tf")
-        return extract_template_variables(template_path)
+        return self._get_template_variables(template_path)
+
+    def precompile_templates(self) -> list[str]:
+        """
+        Parse the variables of every cloud template up front, e.g. at service
+        startup, so that validating configurations never waits for a parse.
+
+        Returns:
+            Names of the clouds whose templates were compiled
+        """
+        clouds = sorted(
+            entry
+            for entry in os.listdir(self.templates_dir)
+            if os.path.isfile(os.path.join(self.templates_dir, entry, "main.tf"))
+        )
+        for cloud in clouds:
+            self.get_required_variables(cloud)
+        logger.debug(f"Precompiled template variables for: {clouds}")
+        return clouds
+
+    def _get_template_variables(self, template_path: str) -> dict:
+        """
+        Get the variables of a template, parsing it only when it changed.
+
+        Cached variables are reused while the template keeps its modification
+        time, or its content hash when only the modification time changed.
+        The returned dictionary is shared and must not be modified.
+
+        Args:
+            template_path: Path to the Terraform template file
+
+        Returns:
+            Dictionary of variable names to their configurations
+        """
+        try:
+            mtime_ns = os.stat(template_path).st_mtime_ns
+        except FileNotFoundError:
+            return extract_template_variables(template_path)
+
+        with self._schemas_lock:
+            if self._schemas is None:
+                self._schemas = self._load_schema_cache()
+            entry = self._schemas.get(template_path)
+            if entry is not None and entry["mtime_ns"] == mtime_ns:
+                return entry["variables"]
+
+        with open(template_path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+
+        if entry is not None and entry["sha256"] == digest:
+            variables = entry["variables"]
+        else:
+            logger.debug(f"Parsing template variables of {template_path}")
+            variables = extract_template_variables(template_path)
+
+        with self._schemas_lock:
+            self._schemas[template_path] = {
+                "mtime_ns": mtime_ns,
+                "sha256": digest,
+                "variables": variables,
+            }
+            self._save_schema_cache()
+        return variables
+
+    def _load_schema_cache(self) -> dict:
+        """Read the persisted template variables, if any."""
+        if not self.schema_cache_path:
+            return {}
+        try:
+            with open(self.schema_cache_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Ignoring unreadable template schema cache {self.schema_cache_path}: {e}")
+            return {}
+
+    def _save_schema_cache(self) -> None:
+        """Persist the template variables, if a cache file is configured."""
+        if not self.schema_cache_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.schema_cache_path) or ".", exist_ok=True)
+            tmp_path = f"{self.schema_cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._schemas, f)
+            os.replace(tmp_path, self.schema_cache_path)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not write template schema cache {self.schema_cache_path}: {e}")
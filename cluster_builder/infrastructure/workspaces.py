@@ -0,0 +1,145 @@
+"""
+OpenTofu workspace bookkeeping against the PostgreSQL backend tables.
+"""
+
+import logging
+from typing import Optional
+
+from cluster_builder.config.postgres import PostgresConfig
+from cluster_builder.config.postgres import PostgresConnectionPool
+
+logger = logging.getLogger("swarmchestrate")
+
+
+class PostgresWorkspaces:
+    """
+    Lists and deletes the workspaces of a cluster in the PostgreSQL backend.
+
+    The pg backend stores every workspace as a row of the `states` table of
+    the cluster schema, so `tofu workspace list` and `tofu workspace delete`
+    amount to a query each. Running them as SQL saves starting OpenTofu and
+    initialising the backend every time.
+
+    Workspaces are not created here: the pg backend creates the workspace
+    named by TF_WORKSPACE the first time a plan or apply uses it.
+    """
+
+    DEFAULT_WORKSPACE = "default"
+
+    def __init__(
+        self, pg_config: PostgresConfig, pool: Optional[PostgresConnectionPool] = None
+    ):
+        """
+        Initialise the PostgresWorkspaces.
+
+        Args:
+            pg_config: PostgreSQL configuration of the state backend
+            pool: Optional connection pool, defaults to the pool of `pg_config`
+        """
+        self.pg_config = pg_config
+        self._pool = pool
+
+    @property
+    def pool(self) -> PostgresConnectionPool:
+        return self._pool or self.pg_config.pool()
+
+    def list(self, cluster_name: str) -> list[str]:
+        """
+        List the workspaces of a cluster.
+
+        Args:
+            cluster_name: Name of the cluster, which is the backend schema
+
+        Returns:
+            Workspace names, always including "default" as OpenTofu does
+
+        Raises:
+            RuntimeError: If the database cannot be queried
+        """
+        import psycopg2
+        from psycopg2 import sql
+
+        query = sql.SQL("SELECT name FROM {} ORDER BY name").format(
+            sql.Identifier(cluster_name, "states")
+        )
+        try:
+            with self.pool.connection() as connection, connection.cursor() as cursor:
+                cursor.execute(query)
+                names = [row[0] for row in cursor.fetchall()]
+        except (psycopg2.errors.UndefinedTable, psycopg2.errors.InvalidSchemaName):
+            # The backend was not initialised for this cluster yet
+            names = []
+        except psycopg2.Error as e:
+            error_msg = f"❌ Failed to list workspaces of cluster '{cluster_name}': {e}"
+            logger.error(error_msg)
+            raise RuntimeError(error_msg)
+
+        if self.DEFAULT_WORKSPACE not in names:
+            names.insert(0, self.DEFAULT_WORKSPACE)
+        return names
+
+    def exists(self, cluster_name: str, workspace: str) -> bool:
+        """
+        Check whether a workspace of a cluster exists.
+
+        Args:
+            cluster_name: Name of the cluster, which is the backend schema
+            workspace: Name of the workspace
+
+        Returns:
+            True if the workspace exists
+
+        Raises:
+            RuntimeError: If the database cannot be queried
+        """
+        import psycopg2
+        from psycopg2 import sql
+
+        if workspace == self.DEFAULT_WORKSPACE:
+            return True
+        query = sql.SQL("SELECT 1 FROM {} WHERE name = %s").format(
+            sql.Identifier(cluster_name, "states")
+        )
+        try:
+            with self.pool.connection() as connection, connection.cursor() as cursor:
+                cursor.execute(query, (workspace,))
+                return cursor.fetchone() is not None
+        except (psycopg2.errors.UndefinedTable, psycopg2.errors.InvalidSchemaName):
+            return False
+        except psycopg2.Error as e:
+            error_msg = f"❌ Failed to look up workspace '{workspace}' of cluster '{cluster_name}': {e}"
+            logger.error(error_msg)
+            raise RuntimeError(error_msg)
+
+    def delete(self, cluster_name: str, workspace: str) -> None:
+        """
+        Delete a workspace of a cluster, as `tofu workspace delete -force` does.
+
+        Deleting a workspace which does not exist is not an error.
+
+        Args:
+            cluster_name: Name of the cluster, which is the backend schema
+            workspace: Name of the workspace
+
+        Raises:
+            ValueError: If asked to delete the default workspace
+            RuntimeError: If the database operation fails
+        """
+        import psycopg2
+        from psycopg2 import sql
+
+        if workspace == self.DEFAULT_WORKSPACE:
+            raise ValueError("The default workspace cannot be deleted")
+        query = sql.SQL("DELETE FROM {} WHERE name = %s").format(
+            sql.Identifier(cluster_name, "states")
+        )
+        try:
+            with self.pool.connection() as connection, connection.cursor() as cursor:
+                cursor.execute(query, (workspace,))
+        except (psycopg2.errors.UndefinedTable, psycopg2.errors.InvalidSchemaName):
+            return
+        except psycopg2.Error as e:
+            error_msg = f"❌ Failed to delete workspace '{workspace}' of cluster '{cluster_name}': {e}"
+            logger.error(error_msg)
+            raise RuntimeError(error_msg)
+        logger.debug(f"Deleted workspace '{workspace}' of cluster '{cluster_name}'")
@@ -0,0 +1,349 @@
+"""
+Orchestration engine - concurrent cluster operations on a worker pool.
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from cluster_builder.infrastructure import ClusterLock
+from cluster_builder.swarmchestrate import Swarmchestrate
+
+logger = logging.getLogger("swarmchestrate")
+
+# Seconds a finished job can still be looked up
+DEFAULT_JOB_TTL = 3600.0
+
+# Maximum number of finished jobs kept for lookup
+DEFAULT_MAX_FINISHED_JOBS = 1000
+
+
+@dataclass
+class Job:
+    """Handle on an operation submitted to the OrchestrationEngine."""
+
+    id: str
+    operation: str
+    cluster_name: Optional[str]
+    future: Future = field(repr=False)
+    finished_at: Optional[float] = field(default=None, repr=False)
+
+    @property
+    def status(self) -> str:
+        """Current state of the job: pending, running, succeeded or failed."""
+        if self.future.running():
+            return "running"
+        if not self.future.done():
+            return "pending"
+        if self.future.cancelled() or self.future.exception() is not None:
+            return "failed"
+        return "succeeded"
+
+    def done(self) -> bool:
+        """Return True if the job has finished, successfully or not."""
+        return self.future.done()
+
+    def result(self, timeout: Optional[float] = None):
+        """
+        Wait for the job and return the result of the operation.
+
+        Args:
+            timeout: Maximum time in seconds to wait (None waits forever)
+
+        Returns:
+            The return value of the underlying Swarmchestrate method
+
+        Raises:
+            Exception: Whatever the underlying operation raised
+        """
+        return self.future.result(timeout=timeout)
+
+
+class OrchestrationEngine:
+    """
+    Runs Swarmchestrate operations for many clusters concurrently.
+
+    Operations are executed on a thread pool. Operations on the same cluster are
+    serialised through a ClusterLock on its directory, which also excludes other
+    processes sharing the output directory, while operations on different
+    clusters proceed in parallel.
+
+    Finished jobs, and their results, can be looked up for `job_ttl` seconds;
+    at most `max_finished_jobs` are kept, so a long-running engine does not
+    grow without bound.
+    """
+
+    def __init__(
+        self,
+        swarmchestrate: Swarmchestrate,
+        max_workers: int = 8,
+        lock_timeout: Optional[float] = None,
+        job_ttl: Optional[float] = None,
+        max_finished_jobs: int = DEFAULT_MAX_FINISHED_JOBS,
+    ):
+        """
+        Initialise the OrchestrationEngine.
+
+        Args:
+            swarmchestrate: Swarmchestrate instance performing the operations
+            max_workers: Maximum number of operations running at once
+            lock_timeout: Maximum time in seconds a job waits for its cluster lock
+                (None waits forever)
+            job_ttl: Seconds a finished job can still be looked up, defaults to
+                the CLUSTER_BUILDER_JOB_TTL environment variable or one hour
+            max_finished_jobs: Maximum number of finished jobs kept for lookup,
+                the oldest are forgotten first
+        """
+        self.swarmchestrate = swarmchestrate
+        self.lock_timeout = lock_timeout
+        self.job_ttl = float(
+            job_ttl if job_ttl is not None else os.getenv("CLUSTER_BUILDER_JOB_TTL", DEFAULT_JOB_TTL)
+        )
+        self.max_finished_jobs = max_finished_jobs
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="swarmchestrate"
+        )
+        self._jobs: dict[str, Job] = {}
+        self._jobs_lock = threading.Lock()
+        logger.debug(f"Initialised OrchestrationEngine with max_workers={max_workers}")
+
+    def submit_add_node(self, config: dict[str, any], dryrun: bool = False) -> Job:
+        """
+        Submit a node addition, see `Swarmchestrate.add_node`.
+
+        A cluster name is generated up front when none is given so that the
+        new cluster can be locked before it is created.
+
+        Args:
+            config: Node configuration
+            dryrun: If True, only validate the configuration without deploying
+
+        Returns:
+            Handle on the submitted job
+        """
+        config = self._with_cluster_name(config)
+        return self._submit(
+            "add_node",
+            config["cluster_name"],
+            self.swarmchestrate.add_node,
+            config,
+            dryrun,
+        )
+
+    def submit_add_nodes(
+        self, configs: list[dict[str, any]], parallelism: int = 10, dryrun: bool = False
+    ) -> Job:
+        """
+        Submit a batch node addition, see `Swarmchestrate.add_nodes`.
+
+        Args:
+            configs: Node configurations, all for the same cluster
+            parallelism: Maximum number of nodes converged at once
+            dryrun: If True, only validate the configuration without deploying
+
+        Returns:
+            Handle on the submitted job
+        """
+        if not configs:
+            raise ValueError("At least one node configuration must be provided")
+        first = self._with_cluster_name(configs[0])
+        configs = [first] + [
+            {"cluster_name": first["cluster_name"], **config} for config in configs[1:]
+        ]
+        return self._submit(
+            "add_nodes",
+            first["cluster_name"],
+            self.swarmchestrate.add_nodes,
+            configs,
+            parallelism,
+            dryrun,
+        )
+
+    def submit_remove_node(
+        self, cluster_name: str, resource_name: str, dryrun: bool = False
+    ) -> Job:
+        """
+        Submit a node removal, see `Swarmchestrate.remove_node`.
+
+        Args:
+            cluster_name: Name of the cluster
+            resource_name: Name of the node to remove
+            dryrun: If True, only simulate actions without executing
+
+        Returns:
+            Handle on the submitted job
+        """
+        return self._submit(
+            "remove_node",
+            cluster_name,
+            self.swarmchestrate.remove_node,
+            cluster_name,
+            resource_name,
+            dryrun,
+        )
+
+    def submit_destroy(
+        self, cluster_name: str, dryrun: bool = False, parallelism: int = 10
+    ) -> Job:
+        """
+        Submit the destruction of a cluster, see `Swarmchestrate.destroy`.
+
+        Args:
+            cluster_name: Name of the cluster to destroy
+            dryrun: If True, only deletes the local cluster directory
+            parallelism: Maximum number of nodes destroyed at once
+
+        Returns:
+            Handle on the submitted job
+        """
+        return self._submit(
+            "destroy",
+            cluster_name,
+            self.swarmchestrate.destroy,
+            cluster_name,
+            dryrun,
+            parallelism,
+        )
+
+    def submit_deploy_manifests(
+        self, manifest_folder: str, master_ip: str, ssh_key_path: str, ssh_user: str
+    ) -> Job:
+        """
+        Submit a manifest deployment, see `Swarmchestrate.deploy_manifests`.
+
+        Returns:
+            Handle on the submitted job
+        """
+        return self._submit(
+            "deploy_manifests",
+            None,
+            self.swarmchestrate.deploy_manifests,
+            manifest_folder,
+            master_ip,
+            ssh_key_path,
+            ssh_user,
+        )
+
+    def submit_create_registry_secrets(self, cluster_config: dict) -> Job:
+        """
+        Submit registry secret creation, see `Swarmchestrate.create_registry_secrets`.
+
+        Returns:
+            Handle on the submitted job
+        """
+        return self._submit(
+            "create_registry_secrets",
+            None,
+            self.swarmchestrate.create_registry_secrets,
+            cluster_config,
+        )
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        """
+        Look up a submitted job.
+
+        Args:
+            job_id: Identifier of the job
+
+        Returns:
+            The job, or None if it is unknown or was forgotten after finishing
+        """
+        with self._jobs_lock:
+            self._evict_finished_jobs()
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> list[Job]:
+        """Return the pending and running jobs, and the finished ones still kept."""
+        with self._jobs_lock:
+            self._evict_finished_jobs()
+            return list(self._jobs.values())
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stop accepting jobs and release the worker pool.
+
+        Args:
+            wait: If True, block until running and pending jobs have finished
+        """
+        self._pool.shutdown(wait=wait)
+
+    def __enter__(self) -> "OrchestrationEngine":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.shutdown(wait=True)
+
+    def _with_cluster_name(self, config: dict[str, any]) -> dict[str, any]:
+        """Return a copy of the config with a cluster name, generating one if needed."""
+        config = config.copy()
+        if "cluster_name" not in config:
+            config["cluster_name"] = self.swarmchestrate.cluster_config.generate_random_name()
+            logger.info(f"Creating new cluster: {config['cluster_name']}")
+        return config
+
+    def _submit(
+        self,
+        operation: str,
+        cluster_name: Optional[str],
+        fn: Callable,
+        *args,
+    ) -> Job:
+        """
+        Queue an operation on the worker pool.
+
+        Args:
+            operation: Name of the operation, for logging and job handles
+            cluster_name: Cluster to lock while the operation runs, if any
+            fn: Callable performing the operation
+            *args: Arguments passed to `fn`
+
+        Returns:
+            Handle on the submitted job
+        """
+        job_id = uuid.uuid4().hex[:12]
+
+        def run():
+            logger.debug(f"Job {job_id}: starting {operation} for cluster '{cluster_name}'")
+            if cluster_name is None:
+                return fn(*args)
+            cluster_dir = self.swarmchestrate.get_cluster_output_dir(cluster_name)
+            with ClusterLock(cluster_dir, timeout=self.lock_timeout):
+                return fn(*args)
+
+        future = self._pool.submit(run)
+        job = Job(id=job_id, operation=operation, cluster_name=cluster_name, future=future)
+        with self._jobs_lock:
+            self._evict_finished_jobs()
+            self._jobs[job_id] = job
+
+        def finished(f: Future) -> None:
+            if job.finished_at is None:
+                job.finished_at = time.monotonic()
+            logger.debug(f"Job {job_id}: {operation} finished ({job.status})")
+
+        future.add_done_callback(finished)
+        logger.info(f"Submitted job {job_id}: {operation} for cluster '{cluster_name}'")
+        return job
+
+    def _evict_finished_jobs(self) -> None:
+        """Forget expired finished jobs and the oldest beyond the limit, holding the jobs lock."""
+        now = time.monotonic()
+        for job in self._jobs.values():
+            # The done callback may not have run yet
+            if job.finished_at is None and job.future.done():
+                job.finished_at = now
+        expired_before = now - self.job_ttl
+        finished = sorted(
+            (job for job in self._jobs.values() if job.finished_at is not None),
+            key=lambda job: job.finished_at,
+        )
+        excess = len(finished) - self.max_finished_jobs
+        for i, job in enumerate(finished):
+            if i < excess or job.finished_at <= expired_before:
+                del self._jobs[job.id]
+                logger.debug(f"Forgot finished job {job.id}: {job.operation}")
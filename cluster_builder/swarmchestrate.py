@@ -2,22 +2,41 @@
 Swarmchestrate - Main orchestration class for K3s cluster management.
 """
 
+import contextvars
+import filecmp
 import json
 import os
+import re
 import logging
 from pathlib import Path
 import shutil
 import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
-import psycopg2
-from openstack import connection
 from dotenv import load_dotenv
 
 from cluster_builder.config.postgres import PostgresConfig
 from cluster_builder.config.cluster import ClusterConfig
+from cluster_builder.config.document import ClusterDocument
+from cluster_builder.config.registry import RegistryCredentials
+from cluster_builder.config.tofu import TofuConfig
 from cluster_builder.infrastructure import TemplateManager
+from cluster_builder.infrastructure import ClusterLock
 from cluster_builder.infrastructure import CommandExecutor
+from cluster_builder.infrastructure import FleetInventory
+from cluster_builder.infrastructure import FloatingIPAllocator
+from cluster_builder.infrastructure import K3sArtifactCache
+from cluster_builder.infrastructure import NodeReadiness
+from cluster_builder.infrastructure import NodeRecord
+from cluster_builder.infrastructure import PostgresStateReader
+from cluster_builder.infrastructure import PostgresWorkspaces
+from cluster_builder.infrastructure import ReadinessTracker
+from cluster_builder.infrastructure import TofuInitializer
+from cluster_builder.infrastructure.ssh import SSHTransport
 from cluster_builder.utils import hcl
+from cluster_builder.utils import telemetry
+from cluster_builder.utils.cache import get_cache_dir
 
 logger = logging.getLogger("swarmchestrate")
 
@@ -32,6 +51,8 @@ class Swarmchestrate:
         template_dir: str,
         output_dir: str,
         variables: Optional[dict[str, any]] = None,
+        transport: Optional[str] = None,
+        state_access: Optional[str] = None,
     ):
         """
         Initialise the Swarmchestrate class.
@@ -40,12 +61,31 @@ class Swarmchestrate:
             template_dir: Directory containing templates
             output_dir: Directory for outputting generated files
             variables: Optional additional variables for deployments
+            transport: How manifests and registry secrets are delivered to the
+                master, either "tofu" (default) or "ssh" for a pooled native SSH
+                connection. Defaults to the CLUSTER_BUILDER_TRANSPORT environment
+                variable.
+            state_access: How node outputs and workspaces are accessed, either
+                "sql" (default) to query the PostgreSQL state backend directly
+                or "cli" to run `tofu output -json` and `tofu workspace`
+                commands. Defaults to the CLUSTER_BUILDER_STATE_ACCESS
+                environment variable.
         """
         self.template_dir = f"{template_dir}"
         self.output_dir = output_dir
 
         load_dotenv()
 
+        self.transport = transport or os.getenv("CLUSTER_BUILDER_TRANSPORT", "tofu")
+        if self.transport not in ("tofu", "ssh"):
+            raise ValueError(f"Unsupported transport '{self.transport}', expected 'tofu' or 'ssh'")
+
+        self.state_access = state_access or os.getenv("CLUSTER_BUILDER_STATE_ACCESS", "sql")
+        if self.state_access not in ("sql", "cli"):
+            raise ValueError(
+                f"Unsupported state access '{self.state_access}', expected 'sql' or 'cli'"
+            )
+
         try:
             logger.debug("Loading PostgreSQL configuration from environment...")
             self.pg_config = PostgresConfig.from_env()
@@ -54,8 +94,26 @@ class Swarmchestrate:
             raise
 
         # Initialise components
-        self.template_manager = TemplateManager()
+        cache_dir = get_cache_dir()
+        self.template_manager = TemplateManager(
+            schema_cache_path=os.path.join(cache_dir, "template-schemas.json")
+        )
         self.cluster_config = ClusterConfig(self.template_manager, output_dir)
+        self.tofu_initializer = TofuInitializer(cache_dir)
+        self.tofu_config = TofuConfig.from_env()
+        self.ssh_transport = SSHTransport() if self.transport == "ssh" else None
+        self.state_reader = PostgresStateReader(self.pg_config)
+        self.workspaces = PostgresWorkspaces(self.pg_config)
+        self.floating_ips = FloatingIPAllocator()
+        self.k3s_artifacts = K3sArtifactCache(cache_dir)
+        self.readiness = ReadinessTracker(self.ssh_transport)
+        self.fleet_inventory = FleetInventory(
+            self.pg_config, ttl=float(os.getenv("CLUSTER_BUILDER_INVENTORY_TTL", "0"))
+        )
+
+        # Extra callbacks receiving ("stdout" or "stderr", line) for every line
+        # printed by OpenTofu applies and destroys, e.g. a FileLineSink
+        self.output_callbacks = []
 
         logger.debug(
             f"Initialised with template_dir={template_dir}, output_dir={output_dir}"
@@ -73,43 +131,52 @@ class Swarmchestrate:
         """
         return self.cluster_config.get_cluster_output_dir(cluster_name)
 
+    def inventory(self) -> dict[str, list[NodeRecord]]:
+        """
+        List the nodes of every cluster from the state backend.
+
+        The states of all clusters are read with a few bulk queries, see
+        `FleetInventory`. Results are cached for CLUSTER_BUILDER_INVENTORY_TTL
+        seconds (no caching by default).
+
+        Returns:
+            Node records keyed by cluster name
+
+        Raises:
+            RuntimeError: If the state database cannot be queried
+        """
+        return self.fleet_inventory.inventory()
+
+    def cluster_inventory(self, cluster_name: str) -> list[NodeRecord]:
+        """
+        List the nodes of a cluster from the state backend.
+
+        Args:
+            cluster_name: Name of the cluster
+
+        Returns:
+            Node records of the cluster, empty if the cluster has no state
+
+        Raises:
+            RuntimeError: If the state database cannot be queried
+        """
+        return self.fleet_inventory.cluster_inventory(cluster_name)
+
     def get_unused_floating_ip(self, first_only: bool = True) -> str | list[str] | None:
         """
         Fetch unused floating IP(s) from OpenStack using application credentials
         loaded from environment variables.
 
+        IPs leased to nodes being deployed are not included. Use
+        `floating_ips.allocate` to reserve IPs for new nodes.
+
         Returns:
             - dict: {"id": <floating_ip_id>, "address": <floating_ip_address>} if first_only=True
             - list[dict]: list of unused IPs if first_only=False
             - None: if no unused IPs are available
         """
 
-        required_env_vars = [
-            "TF_VAR_openstack_auth_url",
-            "TF_VAR_openstack_application_credential_id",
-            "TF_VAR_openstack_application_credential_secret",
-        ]
-
-        missing = [v for v in required_env_vars if not os.environ.get(v)]
-        if missing:
-            raise RuntimeError(
-                f"Missing OpenStack environment variables: {', '.join(missing)}"
-            )
-
-        logger.info("Connecting to OpenStack to fetch unused floating IPs")
-
-        conn = connection.Connection(
-            auth_url=os.environ["TF_VAR_openstack_auth_url"],
-            auth_type="v3applicationcredential",
-            application_credential_id=os.environ["TF_VAR_openstack_application_credential_id"],
-            application_credential_secret=os.environ["TF_VAR_openstack_application_credential_secret"],
-        )
-
-        unused_ips = [
-            {"id": ip.id, "address": ip.floating_ip_address}
-            for ip in conn.network.ips()
-            if not ip.port_id
-        ]
+        unused_ips = self.floating_ips.available()
 
         if not unused_ips:
             logger.warning("No unused floating IPs found in the project")
@@ -137,9 +204,7 @@ class Swarmchestrate:
         if cloud == "openstack" and "floating_ip" not in config:
             logger.info("OpenStack detected and floating_ip not provided, attempting auto-discovery")
 
-            floating_ip_info = self.get_unused_floating_ip(first_only=True)
-            if not floating_ip_info:
-                raise RuntimeError("No unused floating IPs available in OpenStack for the project")
+            floating_ip_info = self.floating_ips.allocate(1)[0]
 
             # Inject separately
             config["floating_ip"] = floating_ip_info["address"]      # For SSH, outputs, scripts
@@ -180,6 +245,7 @@ class Swarmchestrate:
 
         return missing_vars
 
+    @telemetry.traced("prepare")
     def prepare_infrastructure(
         self, config: dict[str, any]
     ) -> tuple[str, dict[str, any]]:
@@ -200,54 +266,90 @@ class Swarmchestrate:
             ValueError: If required configuration is missing or invalid
             RuntimeError: If file operations fail
         """
+        leased_ip_ids = []
         try:
             logger.debug("Preparing infrastructure configuration...")
             # Prepare the configuration
             cluster_dir, prepared_config = self.cluster_config.prepare(config)
             logger.debug(f"Cluster directory prepared at: {cluster_dir}")
+            telemetry.current_span().set_attributes(**self._span_attributes(prepared_config))
         
             # Validate the configuration
             cloud = prepared_config["cloud"]
+            had_floating_ip = "floating_ip" in prepared_config
             missing_vars = self.validate_configuration(cloud, prepared_config)
+            if not had_floating_ip and prepared_config.get("floating_ip_id"):
+                leased_ip_ids.append(prepared_config["floating_ip_id"])
             if missing_vars:
                 raise ValueError(
                     f"Missing required variables for cloud provider '{cloud}': {', '.join(missing_vars)}"
                 )
             logger.debug(f"Configuration validated for cloud: {cloud}")
 
+            self._add_k3s_artifacts(prepared_config)
+
             # Create provider configuration
             
             self.template_manager.create_provider_config(cluster_dir, cloud)
             logger.debug(f"Created provider configuration for {cloud}")
             
-            # Create Terraform files
-            main_tf_path = os.path.join(cluster_dir, "main.tf")
-            backend_tf_path = os.path.join(cluster_dir, "backend.tf")
-
-            # Add backend configuration
+            # Add the backend and module to the cluster configuration
+            document = ClusterDocument.load(cluster_dir)
 
             # Add PostgreSQL connection string to config
             conn_str = self.pg_config.get_connection_string()
-            hcl.add_backend_config(
-                backend_tf_path,
-                conn_str,
-                prepared_config["cluster_name"],
-            )
-            logger.debug(f"Added backend configuration to {backend_tf_path}")
+            document.set_backend(conn_str, prepared_config["cluster_name"])
 
-            # Add module block
             target = prepared_config["resource_name"]
-            hcl.add_module_block(main_tf_path, target, prepared_config)
-            logger.debug(f"Added module block to {main_tf_path}")
+            document.add_module(target, prepared_config)
+            document.save()
+            logger.debug(f"Added module '{target}' to {document.path}")
             logger.debug("Infrastructure preparation complete.")
 
             return cluster_dir, prepared_config
 
         except Exception as e:
+            # The floating IP leased during validation is not used by any node
+            self.floating_ips.release(leased_ip_ids)
             error_msg = f"❌ Failed to prepare infrastructure: {e}"
             logger.error(error_msg)
             raise RuntimeError(error_msg)
 
+    def _add_k3s_artifacts(self, config: dict[str, any]) -> None:
+        """
+        Point a node at the cached k3s artifacts of its pinned version.
+
+        The version is the k3s_version of the node, or the CLUSTER_BUILDER_K3S_VERSION
+        environment variable. The artifacts are downloaded on first use. Without a
+        pinned version the node downloads the latest k3s itself.
+
+        Args:
+            config: Prepared node configuration, updated in place
+
+        Raises:
+            ValueError: If the version is pinned for an edge device without its k3s_arch
+        """
+        version = config.get("k3s_version") or os.getenv("CLUSTER_BUILDER_K3S_VERSION")
+        if not version:
+            return
+        if config.get("cloud") == "edge" and not config.get("k3s_arch"):
+            # Edge devices are often ARM boards, amd64 cannot be assumed for them
+            raise ValueError(
+                f"Edge device '{config.get('resource_name')}' must set k3s_arch (amd64, arm64 or arm) "
+                f"when k3s {version} is pinned"
+            )
+        config["k3s_version"] = version
+        if config.get("provisioning") == "cloud-init":
+            # Nothing is uploaded to nodes installing k3s from their user data,
+            # they download the pinned version themselves
+            return
+        with telemetry.span("k3s_artifacts", version=version):
+            paths = self.k3s_artifacts.ensure(version, config.get("k3s_arch", "amd64"))
+        config["k3s_binary_path"] = paths["binary"]
+        config["k3s_install_script_path"] = paths["install_script"]
+        logger.debug(f"Using cached k3s {version} from {os.path.dirname(paths['binary'])}")
+
+    @telemetry.traced("add_node")
     def add_node(self, config: dict[str, any], dryrun: bool = False) -> dict:
         """
         Add a node to an existing cluster or create a new cluster based on configuration.
@@ -271,89 +373,229 @@ class Swarmchestrate:
         
         cluster_dir, prepared_config = self.prepare_infrastructure(config)
         role = prepared_config["k3s_role"]
-        if prepared_config.get("cloud") == "openstack":
-            logger.info("OpenStack deployment detected, checking for unused floating IP")
+        telemetry.current_span().set_attributes(**self._span_attributes(prepared_config))
 
-            floating_ip = self.get_unused_floating_ip(first_only=True)
-
-            if not floating_ip:
-                raise RuntimeError(
-                    "Deployment aborted: no unused floating IPs available."
-                    "Cloud admin must allocate floating IPs to the project."
-                )
-
-            config["floating_ip"] = floating_ip["address"]
-            config["floating_ip_id"] = floating_ip["id"]         
-        
         # Add output blocks for the module you just added
         module_name = prepared_config["resource_name"]
         logger.info(f"---------- Starting deployment of {module_name} ({role}) ----------")
-        outputs_file = os.path.join(cluster_dir, "outputs.tf")
-        
-        # Define common output names
-        output_names = ["cluster_name", "master_ip", "worker_ip", "ha_ip", "k3s_token", "resource_name"]
-        
-        # Include additional outputs based on the cloud type
-        if "aws" in cluster_dir:
-            output_names.append("instance_status")
-        elif "openstack" in cluster_dir:
-            output_names.append("instance_power_state")
+        output_names = self._output_names(prepared_config["cloud"])
 
-        # Add output blocks
-        hcl.add_output_blocks(outputs_file, module_name, output_names)
+        try:
+            # Point the root outputs at the new module
+            document = ClusterDocument.load(cluster_dir)
+            document.set_outputs(module_name, output_names)
+            document.save()
 
-        logger.info(f"Adding node to cluster '{prepared_config['cluster_name']}'")
+            logger.info(f"Adding node to cluster '{prepared_config['cluster_name']}'")
 
-        # Deploy the infrastructure
-        try:
+            # Deploy the infrastructure
             self.deploy(cluster_dir, module_name, dryrun)
             cluster_name = prepared_config["cluster_name"]
             resource_name = prepared_config["resource_name"]
             logger.info(
                 f"✅ Successfully added '{resource_name}' for cluster '{cluster_name}'"
             )
-            # Run 'tofu output -json' to get outputs
-            result = subprocess.run(
-                ["tofu", "output", "-json"],
-                cwd=cluster_dir,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                check=True,
-            )
-            outputs = json.loads(result.stdout)
+            if dryrun:
+                self.floating_ips.release([prepared_config.get("floating_ip_id")])
+            outputs = {} if dryrun else self.read_outputs(cluster_dir, module_name)
 
             # Extract output values for all required fields
-            result_outputs = {
-                "cluster_name": outputs.get("cluster_name", {}).get("value"),
-                "master_ip": outputs.get("master_ip", {}).get("value"),
-                "k3s_token": outputs.get("k3s_token", {}).get("value"),
-                "worker_ip": outputs.get("worker_ip", {}).get("value"),
-                "ha_ip": outputs.get("ha_ip", {}).get("value"),
-                "resource_name": outputs.get("resource_name", {}).get("value")
-            }
-            # Add cloud-specific output
-            if "aws" in cluster_dir:
-                result_outputs["instance_status"] = outputs.get("instance_status", {}).get("value")
-            elif "openstack" in cluster_dir:
-                result_outputs["instance_power_state"] = outputs.get("instance_power_state", {}).get("value")
+            result_outputs = self._extract_outputs(outputs, output_names)
 
             logger.info(f"----------- Deployment of {role} node successful -----------")
             logger.debug(f"Deployment outputs: {result_outputs}")
 
             return result_outputs
 
-        except subprocess.CalledProcessError as e:
-            error_msg = f"❌ Failed to get outputs: {e.stderr.strip()}"
+        except Exception as e:
+            self.floating_ips.release([prepared_config.get("floating_ip_id")])
+            error_msg = f"❌ Failed to add node: {e}"
             logger.error(error_msg)
             raise RuntimeError(error_msg)
-        
+
+    def track_readiness(self, config: dict[str, any], outputs: dict) -> NodeReadiness:
+        """
+        Start tracking whether a node added by `add_node` joined its cluster.
+
+        Nodes with "provisioning": "cloud-init" install k3s after `add_node`
+        has returned. The returned handle can be polled or waited on with
+        `result(timeout)`. The master is reached with the SSH credentials of
+        the node configuration.
+
+        Args:
+            config: Configuration the node was added with
+            outputs: Outputs returned by `add_node` for the node
+
+        Returns:
+            Handle on the readiness of the node
+        """
+        return self.readiness.track(
+            outputs["resource_name"],
+            outputs["master_ip"],
+            config["ssh_user"],
+            config["ssh_key"],
+        )
+
+    @telemetry.traced("add_nodes")
+    def add_nodes(
+        self,
+        configs: list[dict[str, any]],
+        parallelism: int = 10,
+        dryrun: bool = False,
+    ) -> list[dict]:
+        """
+        Add several nodes to a cluster in one batch.
+
+        Every node is prepared exactly as in `add_node`, then all of them are
+        converged together: OpenTofu is initialised once and the targeted applies
+        of the node workspaces run concurrently, so scale-out time is bound by the
+        slowest node rather than the sum of all nodes.
+
+        Args:
+            configs: Configuration dictionaries of the nodes, all for the same
+                cluster. Nodes without a cluster_name join the cluster of the
+                first node, which may create a new cluster.
+            parallelism: Maximum number of nodes converged at once, also passed
+                to OpenTofu as -parallelism
+            dryrun: If True, only validate the configuration without deploying
+
+        Returns:
+            The output values of each node, in the same order as `configs`
+
+        Raises:
+            ValueError: If no configuration is given or they span several clusters
+            RuntimeError: If preparation or deployment of any node fails
+        """
+        if not configs:
+            raise ValueError("At least one node configuration must be provided")
+
+        cluster_names = {c["cluster_name"] for c in configs if "cluster_name" in c}
+        if len(cluster_names) > 1:
+            raise ValueError(
+                f"All nodes added together must belong to the same cluster, got: {', '.join(sorted(cluster_names))}"
+            )
+
+        configs = [config.copy() for config in configs]
+
+        # Hand out distinct floating IPs up front, none of them is attached
+        # until the apply so a per-node lookup would return the same one
+        pending_ips = [
+            c for c in configs if c.get("cloud") == "openstack" and "floating_ip" not in c
+        ]
+        if pending_ips:
+            for config, floating_ip in zip(pending_ips, self.floating_ips.allocate(len(pending_ips))):
+                config["floating_ip"] = floating_ip["address"]
+                config["floating_ip_id"] = floating_ip["id"]
+
+        prepared_configs = []
+        cluster_dir = None
+        try:
+            for config in configs:
+                if prepared_configs and "cluster_name" not in config:
+                    config["cluster_name"] = prepared_configs[0]["cluster_name"]
+                cluster_dir, prepared_config = self.prepare_infrastructure(config)
+                prepared_configs.append(prepared_config)
+
+            # Expose the outputs of every node under its own names
+            document = ClusterDocument.load(cluster_dir)
+            for prepared_config in prepared_configs:
+                document.add_module_outputs(
+                    prepared_config["resource_name"],
+                    self._output_names(prepared_config["cloud"]),
+                )
+            document.save()
+        except Exception:
+            self.floating_ips.release([c["floating_ip_id"] for c in pending_ips])
+            raise
+
+        cluster_name = prepared_configs[0]["cluster_name"]
+        workspaces = [c["resource_name"] for c in prepared_configs]
+        telemetry.current_span().set_attribute("cluster", cluster_name)
+        logger.info(
+            f"---------- Adding {len(workspaces)} nodes to cluster '{cluster_name}' ----------"
+        )
+
+        allocated_ips = [c.get("floating_ip_id") for c in prepared_configs]
+        try:
+            node_outputs = self.deploy_nodes(cluster_dir, workspaces, parallelism, dryrun)
         except Exception as e:
-            error_msg = f"❌ Failed to add node: {e}"
+            self.floating_ips.release(allocated_ips)
+            error_msg = f"❌ Failed to add nodes: {e}"
             logger.error(error_msg)
             raise RuntimeError(error_msg)
+        if dryrun:
+            self.floating_ips.release(allocated_ips)
+
+        results = []
+        for prepared_config in prepared_configs:
+            module_name = prepared_config["resource_name"]
+            results.append(
+                self._extract_outputs(
+                    node_outputs.get(module_name, {}),
+                    self._output_names(prepared_config["cloud"]),
+                    module_name,
+                )
+            )
 
+        logger.info(
+            f"----------- Added {len(workspaces)} nodes to cluster '{cluster_name}' -----------"
+        )
+        return results
+
+    @staticmethod
+    def _span_attributes(prepared_config: dict) -> dict:
+        """Get the telemetry span attributes of a prepared node configuration."""
+        return {
+            "cluster": prepared_config.get("cluster_name"),
+            "node": prepared_config.get("resource_name"),
+            "cloud": prepared_config.get("cloud"),
+            "role": prepared_config.get("k3s_role"),
+        }
+
+    @staticmethod
+    def _output_names(cloud: str) -> list[str]:
+        """
+        Get the names of the outputs exposed by a node of the given cloud.
 
+        Args:
+            cloud: Cloud provider name
+
+        Returns:
+            List of output names
+        """
+        # Define common output names
+        output_names = ["cluster_name", "master_ip", "worker_ip", "ha_ip", "k3s_token", "resource_name"]
+
+        # Include additional outputs based on the cloud type
+        if cloud == "aws":
+            output_names.append("instance_status")
+        elif cloud == "openstack":
+            output_names.append("instance_power_state")
+
+        return output_names
+
+    @staticmethod
+    def _extract_outputs(
+        outputs: dict, output_names: list[str], module_name: Optional[str] = None
+    ) -> dict:
+        """
+        Extract output values from the result of 'tofu output -json'.
+
+        Args:
+            outputs: Parsed 'tofu output -json' result
+            output_names: Names of the outputs to extract
+            module_name: If given, read the outputs namespaced by this module
+
+        Returns:
+            Dictionary of output names to their values
+        """
+        result_outputs = {}
+        for name in output_names:
+            key = hcl.module_output_name(module_name, name) if module_name else name
+            result_outputs[name] = outputs.get(key, {}).get("value")
+        return result_outputs
+
+    @telemetry.traced("remove_node", cluster="cluster_name", node="resource_name")
     def remove_node(
         self, cluster_name: str, resource_name: str, dryrun: bool = False
     ) -> None:
@@ -386,39 +628,42 @@ class Swarmchestrate:
         
         env_vars = os.environ.copy()
 
-        # Path to main.tf
-        main_tf_path = os.path.join(cluster_dir, "main.tf")
-
-        if not os.path.exists(main_tf_path):
-            error_msg = f"Main Terraform file not found: {main_tf_path}"
+        if not ClusterDocument.exists(cluster_dir):
+            error_msg = f"Cluster configuration not found in {cluster_dir}"
             logger.error(error_msg)
             raise RuntimeError(error_msg)
 
+        # With SQL state access the workspace is only selected through TF_WORKSPACE
+        schema_name = self._sql_schema(cluster_dir)
+        node_env = dict(env_vars, TF_WORKSPACE=resource_name) if schema_name else env_vars
+
         try:
             # Select the workspace
-            if not dryrun:
+            if not dryrun and not schema_name:
                 CommandExecutor.run_command(
                     ["tofu", "workspace", "select", resource_name],
                     cwd=cluster_dir,
                     description=f"Selecting workspace '{resource_name}'",
                     env=env_vars,
                 )
-            else:
+            elif dryrun:
                 logger.info(f"Dryrun: select workspace '{resource_name}'")
             
             # Destroy the infrastructure
             if not dryrun:
-                CommandExecutor.run_command(
+                self._stream_command(
                     ["tofu", "destroy", "-auto-approve"],
                     cwd=cluster_dir,
                     description=f"Destroying infrastructure for '{resource_name}'",
-                    env=env_vars,
+                    env=node_env,
                 )
             else:
                 logger.info(f"Dryrun: would destroy infrastructure for '{resource_name}'")
 
             # Switch back to default workspace
-            if not dryrun:
+            if schema_name:
+                logger.debug("Workspace selected through TF_WORKSPACE, nothing to switch back")
+            elif not dryrun:
                 CommandExecutor.run_command(
                     ["tofu", "workspace", "select", "default"],
                     cwd=cluster_dir,
@@ -428,19 +673,20 @@ class Swarmchestrate:
             else:
                 logger.info("Dryrun: would switch back to default workspace")
 
-            # Remove module block from main.tf
-            hcl.remove_module_block(main_tf_path, resource_name)
-            logger.info(f"Removed module block for '{resource_name}'")
-
-            # Delete outputs.tf entirely (optional, safer for decentralized setup)
-            outputs_tf_path = os.path.join(cluster_dir, "outputs.tf")
-            if os.path.exists(outputs_tf_path):
-                os.remove(outputs_tf_path)
-                logger.debug(f"Deleted outputs.tf to ensure stale outputs do not affect 'tofu apply' for '{resource_name}'")
+            # Remove the module along with its outputs, the outputs of the other
+            # nodes stay in place for their next apply
+            document = ClusterDocument.load(cluster_dir)
+            document.remove_module(resource_name)
+            document.save()
+            logger.info(f"Removed module block and outputs for '{resource_name}'")
 
             # Apply OpenTofu configuration to update state
-            if not dryrun:
-                CommandExecutor.run_command(
+            if schema_name:
+                # The workspace of the node is empty once destroyed and is
+                # deleted below, there is nothing left to apply
+                logger.debug(f"Skipping apply of the emptied workspace '{resource_name}'")
+            elif not dryrun:
+                self._stream_command(
                     ["tofu", "apply", "-auto-approve"],
                     cwd=cluster_dir,
                     description=f"Applying OpenTofu configuration after removing node {resource_name}", env=env_vars
@@ -450,12 +696,7 @@ class Swarmchestrate:
 
             # Delete the workspace
             if not dryrun:
-                CommandExecutor.run_command(
-                    ["tofu", "workspace", "delete", "-force", resource_name],
-                    cwd=cluster_dir,
-                    description=f"Deleting workspace '{resource_name}'",
-                    env=env_vars,
-                )
+                self._delete_workspace(cluster_dir, resource_name, env_vars, schema_name)
             else:
                 logger.info(f"Dryrun: would delete workspace '{resource_name}'")
 
@@ -466,6 +707,7 @@ class Swarmchestrate:
             logger.error(error_msg)
             raise RuntimeError(error_msg)
 
+    @telemetry.traced("deploy", node="workspace")
     def deploy(self, cluster_dir: str,workspace: str = "default", dryrun: bool = False) -> None:
         """
         Execute OpenTofu commands to deploy the K3s component with error handling.
@@ -484,69 +726,30 @@ class Swarmchestrate:
             logger.error(error_msg)
             raise RuntimeError(error_msg)
 
-        # Retrieve the environment variables for tofu logs
-        tf_log = os.getenv("TF_LOG", "INFO")
-        tf_log_path = os.getenv("TF_LOG_PATH", "/tmp/opentofu.log")
-
-        # Check if the environment variables are set
-        if not tf_log or not tf_log_path:
-            print("❌ Error: Missing required environment variables.")
-            exit(1)
-
-        # Prepare environment variables for subprocess
-        env_vars = os.environ.copy()
-        env_vars["TF_LOG"] = tf_log
-        env_vars["TF_LOG_PATH"] = tf_log_path
+        env_vars = self._tofu_env()
 
         try:
             # Initialise OpenTofu
-            init_command = ["tofu", "init"]
+            init_args = []
             if dryrun:
                 logger.info("Dryrun: will init without backend and validate only")
-                init_command.append("-backend=false")
-            CommandExecutor.run_command(init_command, cluster_dir, "OpenTofu init", env=env_vars)
+                init_args.append("-backend=false")
+            with telemetry.span("init"):
+                self.tofu_initializer.init(cluster_dir, env_vars, "cluster", init_args)
             
-            # Create/select workspace
-            try:
-                result = subprocess.run(
-                    ["tofu", "workspace", "list"],
-                    cwd=cluster_dir,
-                    capture_output=True,
-                    text=True,
-                    check=True,
-                    env=env_vars,
-                )
-                existing_workspaces = [line.strip("* ").strip() for line in result.stdout.splitlines()]
-            except subprocess.CalledProcessError as e:
-                error_msg = f"❌ Failed to list workspaces: {e.stderr or str(e)}"
-                logger.error(error_msg)
-                raise RuntimeError(error_msg)
-
-            if workspace not in existing_workspaces:
-                try:
-                    CommandExecutor.run_command(
-                        ["tofu", "workspace", "new", workspace],
-                        cluster_dir,
-                        f"OpenTofu workspace new {workspace}",
-                        env=env_vars,
-                    )
-                except RuntimeError as e:
-                    error_msg = f"❌ Failed to create workspace '{workspace}': {str(e)}"
-                    logger.error(error_msg)
-                    raise RuntimeError(error_msg)
-
-            # Select workspace
-            try:
-                CommandExecutor.run_command(
-                    ["tofu", "workspace", "select", workspace],
-                    cluster_dir,
-                    f"OpenTofu workspace select {workspace}",
-                    env=env_vars,
-                )
-            except RuntimeError as e:
-                error_msg = f"❌ Failed to select workspace '{workspace}': {str(e)}"
-                logger.error(error_msg)
-                raise RuntimeError(error_msg)
+            schema_name = self._sql_schema(cluster_dir)
+            with telemetry.span("workspace"):
+                if schema_name:
+                    # Selected through TF_WORKSPACE, the backend creates it on first use
+                    env_vars["TF_WORKSPACE"] = workspace
+                    new_workspace = dryrun or not self.workspaces.exists(schema_name, workspace)
+                else:
+                    # Create/select workspace
+                    existing_workspaces = self._list_workspaces(cluster_dir, env_vars)
+                    new_workspace = workspace not in existing_workspaces
+                    if new_workspace:
+                        self._create_workspace(cluster_dir, workspace, env_vars)
+                    self._select_workspace(cluster_dir, workspace, env_vars)
 
             # Validate the deployment
             if dryrun:
@@ -556,36 +759,455 @@ class Swarmchestrate:
                 logger.info("✅ Infrastructure successfully validated")
                 return
 
-            # Plan the deployment
+            # Plan and apply the deployment
+            module_count = len(ClusterDocument.load(cluster_dir).modules)
+            self._apply_targeted(cluster_dir, workspace, env_vars, new_workspace, module_count)
+            logger.info("Infrastructure successfully updated")
+
+        except RuntimeError as e:
+            error_msg = f"❌ Failed to deploy infrastructure: {str(e)}"
+            logger.error(error_msg)
+            raise RuntimeError(error_msg)
+
+    @telemetry.traced("deploy_nodes")
+    def deploy_nodes(
+        self,
+        cluster_dir: str,
+        workspaces: list[str],
+        parallelism: int = 10,
+        dryrun: bool = False,
+    ) -> dict[str, dict]:
+        """
+        Deploy several node modules of a cluster with a single OpenTofu init.
+
+        Each node keeps its own workspace, as with `deploy`, but the workspaces are
+        driven through TF_WORKSPACE rather than `tofu workspace select` so that
+        their targeted applies can run side by side in the same directory.
+
+        Args:
+            cluster_dir: Directory containing the Terraform files for the cluster
+            workspaces: Workspace, and module, names of the nodes to deploy
+            parallelism: Maximum number of nodes converged at once, also passed
+                to OpenTofu as -parallelism
+            dryrun: If True, only run init and validate without applying
+
+        Returns:
+            Parsed 'tofu output -json' of each workspace, keyed by workspace
+            (empty when dryrun is set)
+
+        Raises:
+            RuntimeError: If OpenTofu commands fail for any of the nodes
+        """
+        logger.debug(f"Updating infrastructure for {len(workspaces)} nodes in {cluster_dir}")
+
+        if not os.path.exists(cluster_dir):
+            error_msg = f"❌ Cluster directory '{cluster_dir}' not found"
+            logger.error(error_msg)
+            raise RuntimeError(error_msg)
+
+        env_vars = self._tofu_env()
+
+        # Initialise OpenTofu once for all nodes
+        init_args = []
+        if dryrun:
+            logger.info("Dryrun: will init without backend and validate only")
+            init_args.append("-backend=false")
+        with telemetry.span("init"):
+            self.tofu_initializer.init(cluster_dir, env_vars, "cluster", init_args)
+
+        if dryrun:
             CommandExecutor.run_command(
-                ["tofu", "plan", "-input=false"],
+                ["tofu", "validate"], cluster_dir, "OpenTofu validate", env=env_vars
+            )
+            logger.info("✅ Infrastructure successfully validated")
+            return {}
+
+        # Workspaces are created one by one, the backend serialises them anyway
+        # With SQL state access the backend creates them on first use instead
+        with telemetry.span("workspace"):
+            existing_workspaces = self._list_workspaces(cluster_dir, env_vars)
+            new_workspaces = set(workspaces) - set(existing_workspaces)
+            if not self._sql_schema(cluster_dir):
+                for workspace in workspaces:
+                    if workspace in new_workspaces:
+                        self._create_workspace(cluster_dir, workspace, env_vars)
+        module_count = len(ClusterDocument.load(cluster_dir).modules)
+
+        @telemetry.traced("converge", node="workspace")
+        def converge(workspace: str) -> dict:
+            node_env = dict(env_vars, TF_WORKSPACE=workspace)
+            self._apply_targeted(
                 cluster_dir,
-                "OpenTofu plan",
-                timeout=30,
+                workspace,
+                node_env,
+                workspace in new_workspaces,
+                module_count,
+                [f"-parallelism={parallelism}"],
+            )
+            return self.read_outputs(cluster_dir, workspace, node_env)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(parallelism, len(workspaces)))) as pool:
+            # Each node runs in a copy of the context, to nest its spans under this one
+            futures = {
+                ws: pool.submit(contextvars.copy_context().run, converge, ws) for ws in workspaces
+            }
+
+        node_outputs = {}
+        failures = {}
+        for workspace, future in futures.items():
+            try:
+                node_outputs[workspace] = future.result()
+                logger.info(f"✅ Successfully deployed node '{workspace}'")
+            except (RuntimeError, ValueError) as e:
+                failures[workspace] = str(e)
+                logger.error(f"❌ Failed to deploy node '{workspace}': {e}")
+
+        if failures:
+            raise RuntimeError(
+                f"❌ Failed to deploy {len(failures)} of {len(workspaces)} nodes: {', '.join(failures)}"
+            )
+
+        logger.info("Infrastructure successfully updated")
+        return node_outputs
+
+    def targeted_plan_commands(
+        self, workspace: str, new_workspace: bool, extra_args: Optional[list[str]] = None
+    ) -> tuple[list, list, str]:
+        """
+        Build the commands planning only the module of a node and applying that plan.
+
+        The plan is saved to a file and applied as is, so the apply neither
+        refreshes nor plans again.
+
+        Args:
+            workspace: Workspace, and module, name of the node
+            new_workspace: Whether the workspace was just created, in which case
+                there is nothing to refresh (see `TofuConfig.refresh_new_workspaces`)
+            extra_args: Arguments added to both commands, e.g. -parallelism
+
+        Returns:
+            The plan command, the apply command and the plan file, relative to
+            the cluster directory
+        """
+        extra_args = extra_args or []
+        plan_file = f"{workspace}.tfplan"
+        plan_command = [
+            "tofu",
+            "plan",
+            "-input=false",
+            f"-target=module.{workspace}",
+            f"-out={plan_file}",
+        ] + extra_args
+        if new_workspace and not self.tofu_config.refresh_new_workspaces:
+            plan_command.append("-refresh=false")
+        apply_command = ["tofu", "apply", "-input=false"] + extra_args + [plan_file]
+        return plan_command, apply_command, plan_file
+
+    def _apply_targeted(
+        self,
+        cluster_dir: str,
+        workspace: str,
+        env_vars: dict,
+        new_workspace: bool,
+        module_count: int,
+        extra_args: Optional[list[str]] = None,
+    ) -> None:
+        """
+        Plan the module of a node to a file and apply that saved plan.
+
+        Args:
+            cluster_dir: Directory containing the Terraform files for the cluster
+            workspace: Workspace, and module, name of the node
+            env_vars: Environment for OpenTofu, selecting the workspace
+            new_workspace: Whether the workspace was just created
+            module_count: Number of modules in the cluster, scaling the timeouts
+            extra_args: Arguments added to both commands
+
+        Raises:
+            RuntimeError: If planning or applying fails or times out
+        """
+        plan_command, apply_command, plan_file = self.targeted_plan_commands(
+            workspace, new_workspace, extra_args
+        )
+        try:
+            with telemetry.span("plan"):
+                CommandExecutor.run_command(
+                    plan_command,
+                    cluster_dir,
+                    f"OpenTofu plan for {workspace}",
+                    timeout=self.tofu_config.plan_timeout_for(module_count),
+                    env=env_vars,
+                )
+            with telemetry.span("apply"):
+                self._stream_command(
+                    apply_command,
+                    cluster_dir,
+                    f"OpenTofu apply for {workspace}",
+                    timeout=self.tofu_config.apply_timeout_for(module_count),
+                    env=env_vars,
+                )
+        finally:
+            # Saved plans hold the node variables in clear text, including secrets
+            try:
+                os.remove(os.path.join(cluster_dir, plan_file))
+            except FileNotFoundError:
+                pass
+
+    @telemetry.traced("outputs", node="workspace")
+    def read_outputs(
+        self, cluster_dir: str, workspace: str, env_vars: Optional[dict] = None
+    ) -> dict:
+        """
+        Read the root outputs of a workspace after it was applied.
+
+        With the "sql" state access the outputs come straight from the state
+        backend, otherwise from `tofu output -json`.
+
+        Args:
+            cluster_dir: Directory containing the Terraform files for the cluster
+            workspace: Workspace of the node
+            env_vars: Environment for OpenTofu, used with the "cli" state access
+
+        Returns:
+            Outputs in the format of `tofu output -json`
+
+        Raises:
+            RuntimeError: If the outputs cannot be read
+        """
+        schema_name = self._sql_schema(cluster_dir)
+        if schema_name:
+            return self.state_reader.outputs(schema_name, workspace)
+
+        env_vars = dict(env_vars or self._tofu_env(), TF_WORKSPACE=workspace)
+        output = CommandExecutor.run_command(
+            ["tofu", "output", "-json"],
+            cluster_dir,
+            f"OpenTofu output for {workspace}",
+            env=env_vars,
+        )
+        return json.loads(output)
+
+    def _stream_command(
+        self,
+        command: list,
+        cwd: str,
+        description: str = "command",
+        timeout: Optional[int] = None,
+        env: Optional[dict] = None,
+    ) -> str:
+        """
+        Run a long OpenTofu command with its output streamed line by line.
+
+        Lines go to the default logging callbacks plus any registered in
+        `output_callbacks`.
+
+        Args:
+            command: List containing the command and its arguments
+            cwd: Working directory for the command
+            description: Description of the command for logging
+            timeout: Maximum execution time in seconds (None for no timeout)
+            env: Environment for the command
+
+        Returns:
+            The tail of the command stdout output
+
+        Raises:
+            RuntimeError: If the command execution fails or times out
+        """
+        return CommandExecutor.stream_command(
+            command,
+            cwd,
+            description,
+            timeout=timeout,
+            env=env,
+            callbacks=CommandExecutor.default_callbacks(description) + self.output_callbacks,
+        )
+
+    def _tofu_env(self) -> dict[str, str]:
+        """
+        Build the environment for OpenTofu subprocesses.
+
+        Returns:
+            A copy of the process environment with OpenTofu logging and the
+            embedded registry credentials configured
+
+        Raises:
+            RuntimeError: If TF_LOG or TF_LOG_PATH is set to an empty value, or
+                the registry credentials do not match up
+        """
+        # Retrieve the environment variables for tofu logs
+        tf_log = os.getenv("TF_LOG", "INFO")
+        tf_log_path = os.getenv("TF_LOG_PATH", "/tmp/opentofu.log")
+
+        # Check if the environment variables are set
+        if not tf_log or not tf_log_path:
+            error_msg = "❌ Missing required environment variables TF_LOG and TF_LOG_PATH"
+            logger.error(error_msg)
+            raise RuntimeError(error_msg)
+
+        # Prepare environment variables for subprocess
+        env_vars = os.environ.copy()
+        env_vars["TF_LOG"] = tf_log
+        env_vars["TF_LOG_PATH"] = tf_log_path
+
+        # Credentials of the embedded registry mirror are only handed to
+        # OpenTofu, they are never written to the cluster configuration
+        if "TF_VAR_registry_auths" not in env_vars and os.getenv("DOCKER_REGISTRIES"):
+            env_vars["TF_VAR_registry_auths"] = json.dumps(RegistryCredentials.from_env().auths())
+        return env_vars
+
+    def _list_workspaces(self, cluster_dir: str, env_vars: dict) -> list[str]:
+        """
+        List the OpenTofu workspaces of a cluster.
+
+        Args:
+            cluster_dir: Directory containing the Terraform files for the cluster
+            env_vars: Environment for the OpenTofu subprocess
+
+        Returns:
+            List of workspace names
+
+        Raises:
+            RuntimeError: If the workspaces cannot be listed
+        """
+        schema_name = self._sql_schema(cluster_dir)
+        if schema_name:
+            return self.workspaces.list(schema_name)
+        try:
+            result = subprocess.run(
+                ["tofu", "workspace", "list"],
+                cwd=cluster_dir,
+                capture_output=True,
+                text=True,
+                check=True,
                 env=env_vars,
             )
+            return [line.strip("* ").strip() for line in result.stdout.splitlines()]
+        except subprocess.CalledProcessError as e:
+            error_msg = f"❌ Failed to list workspaces: {e.stderr or str(e)}"
+            logger.error(error_msg)
+            raise RuntimeError(error_msg)
 
-            # Apply the deployment
+    def _select_workspace(self, cluster_dir: str, workspace: str, env_vars: dict) -> None:
+        """
+        Select an OpenTofu workspace.
+
+        Args:
+            cluster_dir: Directory containing the Terraform files for the cluster
+            workspace: Name of the workspace to select
+            env_vars: Environment for the OpenTofu subprocess
+
+        Raises:
+            RuntimeError: If the workspace cannot be selected
+        """
+        try:
             CommandExecutor.run_command(
-                ["tofu", "apply", "-auto-approve", f"-target=module.{workspace}"], cluster_dir, f"OpenTofu apply for {workspace}", env=env_vars
+                ["tofu", "workspace", "select", workspace],
+                cluster_dir,
+                f"OpenTofu workspace select {workspace}",
+                env=env_vars,
             )
-            logger.info("Infrastructure successfully updated")
+        except RuntimeError as e:
+            error_msg = f"❌ Failed to select workspace '{workspace}': {str(e)}"
+            logger.error(error_msg)
+            raise RuntimeError(error_msg)
+
+    def _delete_workspace(
+        self, cluster_dir: str, workspace: str, env_vars: dict, schema_name: Optional[str]
+    ) -> None:
+        """
+        Delete the OpenTofu workspace of a node, with its state.
+
+        With SQL state access the row of the workspace is deleted from the
+        backend, otherwise `tofu workspace delete -force` is run, which needs
+        another workspace to be selected.
+
+        Args:
+            cluster_dir: Directory containing the Terraform files for the cluster
+            workspace: Name of the workspace to delete
+            env_vars: Environment for the OpenTofu subprocess
+            schema_name: Backend schema of the cluster with SQL state access,
+                see `_sql_schema`
+
+        Raises:
+            RuntimeError: If the workspace cannot be deleted
+        """
+        if schema_name:
+            self.workspaces.delete(schema_name, workspace)
+            self.state_reader.invalidate(schema_name, workspace)
+            return
+        CommandExecutor.run_command(
+            ["tofu", "workspace", "delete", "-force", workspace],
+            cwd=cluster_dir,
+            description=f"Deleting workspace '{workspace}'",
+            env=env_vars,
+        )
+
+    def _sql_schema(self, cluster_dir: str) -> Optional[str]:
+        """
+        Get the backend schema of a cluster when its state is accessed with SQL.
+
+        Args:
+            cluster_dir: Directory containing the Terraform files for the cluster
+
+        Returns:
+            The schema name, or None with the "cli" state access or without a
+            pg backend
+        """
+        if self.state_access != "sql":
+            return None
+        return ClusterDocument.load(cluster_dir).backend.get("pg", {}).get("schema_name")
+
+    def _create_workspace(self, cluster_dir: str, workspace: str, env_vars: dict) -> None:
+        """
+        Create a new OpenTofu workspace.
 
+        Args:
+            cluster_dir: Directory containing the Terraform files for the cluster
+            workspace: Name of the workspace to create
+            env_vars: Environment for the OpenTofu subprocess
+
+        Raises:
+            RuntimeError: If the workspace cannot be created
+        """
+        try:
+            CommandExecutor.run_command(
+                ["tofu", "workspace", "new", workspace],
+                cluster_dir,
+                f"OpenTofu workspace new {workspace}",
+                env=env_vars,
+            )
         except RuntimeError as e:
-            error_msg = f"❌ Failed to deploy infrastructure: {str(e)}"
+            error_msg = f"❌ Failed to create workspace '{workspace}': {str(e)}"
             logger.error(error_msg)
             raise RuntimeError(error_msg)
 
-    def destroy(self, cluster_name: str, dryrun: bool = False) -> None:
+    @telemetry.traced("destroy", cluster="cluster_name")
+    def destroy(
+        self, cluster_name: str, dryrun: bool = False, parallelism: int = 10
+    ) -> dict:
         """
         Destroy the deployed K3s cluster for the specified cluster_name using OpenTofu.
 
+        The node workspaces are destroyed concurrently, each driven through
+        TF_WORKSPACE so that they do not contend for the workspace selected in
+        the shared working directory. The database schema and local directory
+        are only removed once every node was destroyed, so that a failed
+        teardown can be retried.
+
         Args:
             cluster_name: Name of the cluster to destroy
             dryrun: If True, only deletes local cluster directory without touching infra
+            parallelism: Maximum number of nodes destroyed at once
+
+        Returns:
+            Report with the "destroyed" node names and the "failed" nodes
+            mapped to their error
 
         Raises:
-            RuntimeError: If destruction fails
+            RuntimeError: If destruction fails. When only some nodes could not
+                be destroyed, the report is attached as its `report` attribute
+                and the cluster state is kept for a retry.
         """
         logger.info(f"---------- Destroying the cluster '{cluster_name}' -----------")
 
@@ -598,74 +1220,83 @@ class Swarmchestrate:
             logger.error(error_msg)
             raise RuntimeError(error_msg)
 
+        report = {"destroyed": [], "failed": {}}
+
         # Dry-run mode
         if dryrun:
             logger.info("Dryrun: only removing local cluster directory")
             shutil.rmtree(cluster_dir, ignore_errors=True)
-            return
+            return report
 
         # Ensure backend exists
-        backend_tf_path = os.path.join(cluster_dir, "backend.tf")
-
-        conn_str = self.pg_config.get_connection_string()
-        hcl.add_backend_config(backend_tf_path, conn_str, schema_name=cluster_name)
+        document = ClusterDocument.load(cluster_dir)
+        document.set_backend(self.pg_config.get_connection_string(), cluster_name)
+        document.save()
 
         env_vars = os.environ.copy()
         env_vars["TF_IN_AUTOMATION"] = "true"
 
         # Initialize OpenTofu
         try:
-            CommandExecutor.run_command(
-                ["tofu", "init", "-reconfigure"],
-                cluster_dir, "initializing backend", env=env_vars
+            self.tofu_initializer.init(
+                cluster_dir, env_vars, "cluster", ["-reconfigure"], "initializing backend"
             )
             logger.debug(" Backend initialized successfully.")
         except subprocess.CalledProcessError as e:
             raise RuntimeError(f"❌ Backend init failed: {e.stderr or e}")
 
         # List all workspaces
-        try:
-            result = CommandExecutor.run_command(
-                ["tofu", "workspace", "list"],
-                cluster_dir, "listing workspaces", env=env_vars
-            )
-            workspaces = [line.strip("* ").strip() 
-                          for line in result.splitlines() 
-                          if line.strip()]
-            logger.debug(f"📋 Found workspaces for cluster '{cluster_name}': {workspaces}")
-        except subprocess.CalledProcessError as e:
-            raise RuntimeError(f"❌ Failed to list workspaces: {e.stderr or e}")
+        workspaces = [
+            ws for ws in self._list_workspaces(cluster_dir, env_vars)
+            if ws and ws.lower() != "default"
+        ]
+        logger.debug(f"📋 Found workspaces for cluster '{cluster_name}': {workspaces}")
 
-        # Destroy all non-default workspaces
-        for ws in workspaces:
-            if ws.lower() == "default":
-                continue
+        # Workspaces can only be deleted by OpenTofu while another one is selected
+        schema_name = self._sql_schema(cluster_dir)
+        if workspaces and not schema_name:
+            CommandExecutor.run_command(
+                ["tofu", "workspace", "select", "default"],
+                cluster_dir, "switching back to default", env=env_vars,
+            )
 
+        @telemetry.traced("destroy_node", node="ws")
+        def destroy_workspace(ws: str) -> None:
             logger.debug(f" Destroying workspace: {ws}")
-            try:
-
-                CommandExecutor.run_command(
-                    ["tofu", "workspace", "select", ws],
-                    cluster_dir,
-                    f"select workspace for node {ws}",
-                    env=env_vars,
-                )
-
-                CommandExecutor.run_command(
-                    ["tofu", "destroy", "-auto-approve"],
-                    cluster_dir,
-                    f"OpenTofu destroy for {ws}",
-                    env=env_vars,
-                )
+            self._stream_command(
+                ["tofu", "destroy", "-auto-approve", "-input=false"],
+                cluster_dir,
+                f"OpenTofu destroy for {ws}",
+                env=dict(env_vars, TF_WORKSPACE=ws),
+            )
+            self._delete_workspace(cluster_dir, ws, env_vars, schema_name)
+
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(parallelism, len(workspaces) or 1))
+        ) as pool:
+            futures = {
+                ws: pool.submit(contextvars.copy_context().run, destroy_workspace, ws)
+                for ws in workspaces
+            }
 
+        for ws, future in futures.items():
+            try:
+                future.result()
+                report["destroyed"].append(ws)
                 logger.info(f"✅ Successfully destroyed node '{ws}'")
-
-                CommandExecutor.run_command(["tofu", "workspace", "select", "default"],
-                            cluster_dir, "switching back to default", env=env_vars)
-                CommandExecutor.run_command(["tofu", "workspace", "delete", "-force", ws],
-                            cluster_dir, f"deleting workspace {ws}", env=env_vars)
             except RuntimeError as e:
-                logger.warning(f"⚠️ Failed to destroy workspace '{ws}': {e.stderr or e}")
+                report["failed"][ws] = str(e)
+                logger.warning(f"⚠️ Failed to destroy workspace '{ws}': {e}")
+
+        if report["failed"]:
+            error_msg = (
+                f"❌ Failed to destroy {len(report['failed'])} of {len(workspaces)} nodes of cluster "
+                f"'{cluster_name}': {', '.join(report['failed'])}. Keeping its state for a retry."
+            )
+            logger.error(error_msg)
+            error = RuntimeError(error_msg)
+            error.report = report
+            raise error
 
         # Drop schema from db and Cleanup local directory
         self.remove_cluster_schema_from_db(cluster_name)
@@ -673,47 +1304,57 @@ class Swarmchestrate:
         logger.info(f"🧹 Removed local cluster directory '{cluster_dir}'")
 
         logger.info(f"----------- Destruction of cluster '{cluster_name}' complete -----------")
+        return report
 
     def remove_cluster_schema_from_db(self, cluster_name: str) -> None:
-            """
-            Removes the schema and the entry for the cluster from the PostgreSQL database.
+        """
+        Removes the schema and the entry for the cluster from the PostgreSQL database.
 
-            Args:
-                cluster_name: The name of the cluster to remove from the database
+        Args:
+            cluster_name: The name of the cluster to remove from the database
 
-            Raises:
-                RuntimeError: If the database operation fails
-            """
-            logger.debug(f"Removing schema for cluster '{cluster_name}' from the PostgreSQL database...")
+        Raises:
+            RuntimeError: If the database operation fails
+        """
+        self.remove_cluster_schemas_from_db([cluster_name])
 
-            # Create a PostgreSQL connection string using the config
-            connection_string = self.pg_config.get_connection_string()
+    def remove_cluster_schemas_from_db(self, cluster_names: list[str]) -> None:
+        """
+        Removes the schemas of several clusters from the PostgreSQL database.
 
-            try:
-                # Connect to the PostgreSQL database
-                connection = psycopg2.connect(connection_string)
-                cursor = connection.cursor()
+        All schemas are dropped in a single transaction, so either all of them
+        or none are removed.
 
-                # Define the SQL query to delete the cluster schema
-                drop_schema_query = f'DROP SCHEMA IF EXISTS "{cluster_name}" CASCADE'
-                cursor.execute(drop_schema_query)
+        Args:
+            cluster_names: The names of the clusters to remove from the database
 
-                # Commit the transaction
-                connection.commit()
+        Raises:
+            RuntimeError: If the database operation fails
+        """
+        if not cluster_names:
+            return
+        import psycopg2
+        from psycopg2 import sql
 
-                logger.info(f"🧹 Dropped schema for cluster '{cluster_name}' from the database")
+        logger.debug(f"Removing schemas for clusters {', '.join(cluster_names)} from the PostgreSQL database...")
 
-            except psycopg2.Error as e:
-                logger.error(f"❌ Failed to remove schema for cluster '{cluster_name}' from the database: {e}")
-                raise RuntimeError(f" ❌Failed to remove schema for cluster '{cluster_name}' from the database")
+        try:
+            with self.pg_config.pool().connection() as connection, connection.cursor() as cursor:
+                for cluster_name in cluster_names:
+                    cursor.execute(
+                        sql.SQL("DROP SCHEMA IF EXISTS {} CASCADE").format(sql.Identifier(cluster_name))
+                    )
+        except psycopg2.Error as e:
+            error_msg = f"❌ Failed to remove schemas for clusters {', '.join(cluster_names)} from the database: {e}"
+            logger.error(error_msg)
+            raise RuntimeError(error_msg)
 
-            finally:
-                # Close the database connection
-                if cursor:
-                    cursor.close()
-                if connection:
-                    connection.close()
+        for cluster_name in cluster_names:
+            self.state_reader.invalidate(cluster_name)
+            logger.info(f"🧹 Dropped schema for cluster '{cluster_name}' from the database")
+        self.fleet_inventory.invalidate()
 
+    @telemetry.traced("deploy_manifests", master_ip="master_ip")
     def deploy_manifests(
         self,
         manifest_folder: str,
@@ -722,7 +1363,11 @@ class Swarmchestrate:
         ssh_user: str,
     ):
         """
-        Copy and apply manifests to a cluster using copy_manifest.tf in a temporaryfolder.
+        Copy and apply manifests to a cluster using deploy_manifest.tf.
+
+        Each master has a long-lived manifest workspace which stays initialised
+        between calls and whose state records a hash of every manifest already
+        deployed, so only new or changed manifest files are uploaded.
 
         Args:
             manifest_folder: Path to local manifest folder
@@ -730,65 +1375,88 @@ class Swarmchestrate:
             ssh_key_path: Path to SSH private key
             ssh_user: SSH username to connect to the master node
         """
-        # Dedicated folder for copy-manifest operations
-        copy_dir = Path(self.output_dir) / "copy-manifest"
-        copy_dir.mkdir(parents=True, exist_ok=True)
-
-        logger.debug(f"Using copy-manifest folder: {copy_dir}")
-
-        try:
-            # Copy copy_manifest.tf from templates
-            tf_source_file = Path(self.template_manager.templates_dir) / "deploy_manifest.tf"
-            if not tf_source_file.exists():
-                logger.debug(f"deploy_manifest.tf not found at: {tf_source_file}")
-                raise RuntimeError(f"deploy_manifest.tf not found at: {tf_source_file}")
-            shutil.copy(tf_source_file, copy_dir)
-            logger.debug(f"Copied copy_manifest.tf to {copy_dir}")
-
-            # Prepare environment for OpenTofu
-            env_vars = os.environ.copy()
-            env_vars["TF_LOG"] = os.getenv("TF_LOG", "INFO")
-            env_vars["TF_LOG_PATH"] = os.getenv("TF_LOG_PATH", "/tmp/opentofu.log")
+        manifest_dir = Path(self.get_manifest_workspace_dir(master_ip))
+        manifest_dir.mkdir(parents=True, exist_ok=True)
+
+        logger.debug(f"Using manifest workspace: {manifest_dir}")
+
+        # Only one deployment at a time may use the workspace of a master
+        with ClusterLock(str(manifest_dir)):
+            if self.ssh_transport:
+                logger.info(f"------------ Applying manifest on node: {master_ip} -------------------")
+                self.ssh_transport.deploy_manifests(
+                    os.path.abspath(manifest_folder),
+                    master_ip,
+                    ssh_key_path,
+                    ssh_user,
+                    index_path=str(manifest_dir / "manifest-hashes.json"),
+                )
+                logger.info("------------ Successfully applied manifests -------------------")
+                return
 
-            logger.info(f"------------ Applying manifest on node: {master_ip} -------------------")
+            try:
+                # Refresh deploy_manifest.tf from templates if it changed
+                tf_source_file = Path(self.template_manager.templates_dir) / "deploy_manifest.tf"
+                if not tf_source_file.exists():
+                    logger.debug(f"deploy_manifest.tf not found at: {tf_source_file}")
+                    raise RuntimeError(f"deploy_manifest.tf not found at: {tf_source_file}")
+                tf_target_file = manifest_dir / "deploy_manifest.tf"
+                if not tf_target_file.exists() or not filecmp.cmp(
+                    tf_source_file, tf_target_file, shallow=False
+                ):
+                    shutil.copy(tf_source_file, tf_target_file)
+                    logger.debug(f"Copied deploy_manifest.tf to {manifest_dir}")
+
+                # Prepare environment for OpenTofu
+                env_vars = os.environ.copy()
+                env_vars["TF_LOG"] = os.getenv("TF_LOG", "INFO")
+                env_vars["TF_LOG_PATH"] = os.getenv("TF_LOG_PATH", "/tmp/opentofu.log")
+
+                logger.info(f"------------ Applying manifest on node: {master_ip} -------------------")
+
+                # Run tofu init, skipped once the workspace is initialised
+                self.tofu_initializer.init(str(manifest_dir), env_vars, "deploy_manifest")
+
+                # Run tofu apply with spinner
+                self._stream_command(
+                    [
+                        "tofu",
+                        "apply",
+                        "-auto-approve",
+                        "-input=false",
+                        f"-var=manifest_folder={os.path.abspath(manifest_folder)}",
+                        f"-var=master_ip={master_ip}",
+                        f"-var=ssh_private_key_path={ssh_key_path}",
+                        f"-var=ssh_user={ssh_user}"
+                    ],
+                    cwd=str(manifest_dir),
+                    description="OpenTofu apply",
+                    env=env_vars,
+                )
 
-            # Run tofu init with spinner
-            CommandExecutor.run_command(
-                ["tofu", "init"],
-                cwd=str(copy_dir),
-                description="OpenTofu init",
-                env=env_vars,
-            )
+                logger.info("------------ Successfully applied manifests -------------------")
 
-            # Run tofu apply with spinner
-            CommandExecutor.run_command(
-                [
-                    "tofu",
-                    "apply",
-                    "-auto-approve",
-                    f"-var=manifest_folder={manifest_folder}",
-                    f"-var=master_ip={master_ip}",
-                    f"-var=ssh_private_key_path={ssh_key_path}",
-                    f"-var=ssh_user={ssh_user}"
-                ],
-                cwd=str(copy_dir),
-                description="OpenTofu apply",
-                env=env_vars,
-            )
+            except RuntimeError as e:
+                logger.error(f"❌ Failed to apply manifests on {master_ip}: {e}")
+                raise
 
-            logger.info("------------ Successfully applied manifests -------------------")
+    def get_manifest_workspace_dir(self, master_ip: str) -> str:
+        """
+        Get the manifest workspace directory for a K3s master.
 
-        except RuntimeError as e:
-            print(f"\n---------- ERROR ----------\n{e}\n")
-            raise
+        Args:
+            master_ip: IP address of K3s master
 
-        finally:
-            if copy_dir.exists():
-                shutil.rmtree(copy_dir)
+        Returns:
+            Path to the manifest workspace directory
+        """
+        safe_name = re.sub(r"[^A-Za-z0-9._-]", "_", master_ip)
+        return os.path.join(self.output_dir, "manifests", f"master_{safe_name}")
 
     def create_registry_secrets(self, cluster_config: dict):
         """
-        Create Docker registry secrets in Kubernetes using OpenTofu.
+        Create Docker registry secrets in Kubernetes using OpenTofu, or a single
+        remote invocation over SSH with the ssh transport.
 
         :param cluster_config: dict with keys:
             {
@@ -799,33 +1467,33 @@ class Swarmchestrate:
                 "secret_names": ["optional-name1", "optional-name2"]
             }
         """
-        load_dotenv()
-
-        # Read registry creds from env
-        registries = os.getenv("DOCKER_REGISTRIES", "").split(",")
-        usernames = os.getenv("DOCKER_USERNAMES", "").split(",")
-        passwords = os.getenv("DOCKER_PASSWORDS", "").split(",")
-
-        if not (len(registries) == len(usernames) == len(passwords)):
-            raise RuntimeError("Mismatch in registry, username, and password counts")
-
-        # Get cluster connection from method input
-        master_ip = cluster_config.get("master_ip")
-        ssh_user = cluster_config.get("ssh_user")
-        ssh_key_path = cluster_config.get("ssh_private_key_path")
-        namespace = cluster_config.get("namespace", "default")
-        secret_names = cluster_config.get("secret_names", [])
-
-        if not all([master_ip, ssh_user, ssh_key_path]):
-            raise ValueError("Cluster config missing required keys")
-
-        # Validate secret_names length if provided
-        if secret_names and len(secret_names) != len(registries):
-            raise RuntimeError("Length of secret_names must match number of registries")
+        request = self._registry_secret_request(cluster_config)
+        registries = request["registries"]
+        usernames = request["usernames"]
+        passwords = request["passwords"]
+        master_ip = request["master_ip"]
+        ssh_user = request["ssh_user"]
+        ssh_key_path = request["ssh_key_path"]
+        namespace = request["namespace"]
+        secret_names = request["secret_names"]
+
+        if self.ssh_transport:
+            secret_names_list = self.ssh_transport.create_registry_secrets(
+                registries,
+                usernames,
+                passwords,
+                master_ip,
+                ssh_user,
+                ssh_key_path,
+                namespace=namespace,
+                secret_names=secret_names,
+            )
+            logger.info(f"Created registry secrets: {secret_names_list}")
+            return secret_names_list
 
-        # Create temp dir for TF
-        temp_dir = Path(self.output_dir) / "registry-secret"
-        temp_dir.mkdir(parents=True, exist_ok=True)
+        # Create temp dir for TF, unique to this operation
+        Path(self.output_dir).mkdir(parents=True, exist_ok=True)
+        temp_dir = Path(tempfile.mkdtemp(prefix="registry-secret-", dir=self.output_dir))
 
         try:
             # Copy template tf file into temp dir
@@ -843,28 +1511,13 @@ class Swarmchestrate:
             env_vars["TF_LOG"] = os.getenv("TF_LOG", "INFO")
 
             # tofu init
-            CommandExecutor.run_command(
-                ["tofu", "init"],
-                cwd=str(temp_dir),
-                description="Init OpenTofu",
-                env=env_vars,
+            self.tofu_initializer.init(
+                str(temp_dir), env_vars, "registry_secret", description="Init OpenTofu"
             )
 
             # Apply registry secrets
-            apply_vars = [
-                f"-var=registries={json.dumps(registries)}",
-                f"-var=usernames={json.dumps(usernames)}",
-                f"-var=passwords={json.dumps(passwords)}",
-                f"-var=master_ip={master_ip}",
-                f"-var=ssh_user={ssh_user}",
-                f"-var=ssh_private_key_path={ssh_key_path}",
-                f"-var=namespace={namespace}"
-            ]
-            if secret_names:
-                apply_vars.append(f"-var=secret_names={json.dumps(secret_names)}")
-
-            CommandExecutor.run_command(
-                ["tofu", "apply", "-auto-approve"] + apply_vars,
+            self._stream_command(
+                ["tofu", "apply", "-auto-approve"] + self._registry_secret_apply_vars(request),
                 cwd=str(temp_dir),
                 description="Apply registry secrets",
                 env=env_vars,
@@ -888,4 +1541,77 @@ class Swarmchestrate:
 
         finally:
             logger.debug(f"Cleaning up temp dir: {temp_dir}")
-            shutil.rmtree(temp_dir)
\ No newline at end of file
+            shutil.rmtree(temp_dir)
+
+    @staticmethod
+    def _registry_secret_request(cluster_config: dict) -> dict:
+        """
+        Read registry credentials from the environment and validate a registry
+        secret request.
+
+        Args:
+            cluster_config: Cluster connection details, see `create_registry_secrets`
+
+        Returns:
+            Dictionary with the registries, credentials and connection details
+
+        Raises:
+            ValueError: If the cluster config misses required keys
+            RuntimeError: If the credential or secret name counts do not match
+        """
+        load_dotenv()
+
+        # Read registry creds from env
+        credentials = RegistryCredentials.from_env()
+        registries = credentials.registries
+        usernames = credentials.usernames
+        passwords = credentials.passwords
+
+        # Get cluster connection from method input
+        master_ip = cluster_config.get("master_ip")
+        ssh_user = cluster_config.get("ssh_user")
+        ssh_key_path = cluster_config.get("ssh_private_key_path")
+        namespace = cluster_config.get("namespace", "default")
+        secret_names = cluster_config.get("secret_names", [])
+
+        if not all([master_ip, ssh_user, ssh_key_path]):
+            raise ValueError("Cluster config missing required keys")
+
+        # Validate secret_names length if provided
+        if secret_names and len(secret_names) != len(registries):
+            raise RuntimeError("Length of secret_names must match number of registries")
+
+        return {
+            "registries": registries,
+            "usernames": usernames,
+            "passwords": passwords,
+            "master_ip": master_ip,
+            "ssh_user": ssh_user,
+            "ssh_key_path": ssh_key_path,
+            "namespace": namespace,
+            "secret_names": secret_names,
+        }
+
+    @staticmethod
+    def _registry_secret_apply_vars(request: dict) -> list[str]:
+        """
+        Build the `tofu apply` variables of registry_secret.tf.
+
+        Args:
+            request: Registry secret request, see `_registry_secret_request`
+
+        Returns:
+            List of -var arguments
+        """
+        apply_vars = [
+            f"-var=registries={json.dumps(request['registries'])}",
+            f"-var=usernames={json.dumps(request['usernames'])}",
+            f"-var=passwords={json.dumps(request['passwords'])}",
+            f"-var=master_ip={request['master_ip']}",
+            f"-var=ssh_user={request['ssh_user']}",
+            f"-var=ssh_private_key_path={request['ssh_key_path']}",
+            f"-var=namespace={request['namespace']}"
+        ]
+        if request["secret_names"]:
+            apply_vars.append(f"-var=secret_names={json.dumps(request['secret_names'])}")
+        return apply_vars
@@ -17,6 +17,42 @@ variable "ha" {
 variable "security_group_id" {
   default = ""
 }
+variable "provisioning" {
+  description = "How k3s is installed, by ssh provisioners during the apply or by cloud-init after it"
+  default     = "ssh"
+  validation {
+    condition     = contains(["ssh", "cloud-init"], var.provisioning)
+    error_message = "The provisioning must be ssh or cloud-init."
+  }
+}
+variable "k3s_version" {
+  default = ""
+}
+variable "k3s_arch" {
+  default = "amd64"
+}
+variable "k3s_binary_path" {
+  default = ""
+}
+variable "k3s_install_script_path" {
+  default = ""
+}
+variable "embedded_registry" {
+  default = false
+}
+variable "registry_mirrors" {
+  type    = list(string)
+  default = ["docker.io", "registry.k8s.io"]
+}
+variable "registry_auths" {
+  type = list(object({
+    registry = string
+    username = string
+    password = string
+  }))
+  default   = []
+  sensitive = true
+}
 variable "custom_ingress_ports" {
   type = list(object({
     from   = number
@@ -38,6 +74,31 @@ variable "custom_egress_ports" {
 
 #main.tf
 locals {
+  # registries.yaml of the embedded registry mirror: images of the mirrored
+  # registries, including those with credentials, are pulled from peers first
+  registries_yaml = yamlencode({
+    mirrors = {
+      for registry in distinct(concat(var.registry_mirrors, [for auth in var.registry_auths : auth.registry])) :
+      registry => {}
+    }
+    configs = {
+      for auth in var.registry_auths :
+      auth.registry => { auth = { username = auth.username, password = auth.password } }
+    }
+  })
+
+  # Variables of the role script, apart from the public IP
+  user_data_vars = {
+    ha                = var.ha
+    k3s_token         = var.k3s_token
+    master_ip         = var.master_ip
+    cluster_name      = var.cluster_name
+    resource_name     = var.resource_name
+    embedded_registry = var.embedded_registry
+    registries_yaml   = local.registries_yaml
+    k3s_version       = var.k3s_version
+  }
+
   # Default ingress rules for master/ha/worker nodes
   default_rules = [
     { from = 2379, to = 2380, protocol = "tcp", desc = "etcd communication", roles = ["master", "ha"] },
@@ -46,7 +107,7 @@ locals {
     { from = 10250, to = 10250, protocol = "tcp", desc = "Kubelet metrics", roles = ["master", "ha", "worker"] },
     { from = 51820, to = 51820, protocol = "udp", desc = "Wireguard IPv4", roles = ["master", "ha", "worker"] },
     { from = 51821, to = 51821, protocol = "udp", desc = "Wireguard IPv6", roles = ["master", "ha", "worker"] },
-    { from = 5001, to = 5001, protocol = "tcp", desc = "Embedded registry", roles = ["master", "ha"] },
+    { from = 5001, to = 5001, protocol = "tcp", desc = "Embedded registry", roles = var.embedded_registry ? ["master", "ha", "worker"] : ["master", "ha"] },
     { from = 22, to = 22, protocol = "tcp", desc = "SSH access", roles = ["master", "ha", "worker"] },
     { from = 80, to = 80, protocol = "tcp", desc = "HTTP access", roles = ["master", "ha", "worker"] },
     { from = 443, to = 443, protocol = "tcp", desc = "HTTPS access", roles = ["master", "ha", "worker"] },
@@ -123,23 +184,42 @@ resource "aws_instance" "k3s_node" {
   # Use the provided security group ID if available or the one created by the security group resource.
   vpc_security_group_ids = var.security_group_id != "" ? [var.security_group_id] : [aws_security_group.k3s_sg[0].id]
 
+  # With cloud-init provisioning the instance installs k3s on first boot, the
+  # script detects its public IP from the instance metadata
+  user_data = var.provisioning == "cloud-init" ? templatefile(
+    "${path.module}/${var.k3s_role}_user_data.sh.tpl", merge(local.user_data_vars, { public_ip = "" })
+  ) : null
+
   tags = {
     Name        = "${var.resource_name}"
     k3sToken    = var.k3s_token
     ClusterName = var.cluster_name
     Role        = var.k3s_role
   }
+}
+
+# Provisioning via SSH
+resource "null_resource" "k3s_provision" {
+  count = var.provisioning == "ssh" ? 1 : 0
+
+  # Upload the k3s binary and install script from the artifact cache of the
+  # control host, or empty placeholders to download them on the node instead
+  provisioner "file" {
+    source      = var.k3s_binary_path != "" ? var.k3s_binary_path : "${path.module}/../k3s_placeholder"
+    destination = "/tmp/k3s"
+  }
+
+  provisioner "file" {
+    source      = var.k3s_install_script_path != "" ? var.k3s_install_script_path : "${path.module}/../k3s_placeholder"
+    destination = "/tmp/k3s_install.sh"
+  }
 
   # Upload the rendered user data script to the VM
   provisioner "file" {
-    content = templatefile("${path.module}/${var.k3s_role}_user_data.sh.tpl", {
-      ha           = var.ha,
-      k3s_token    = var.k3s_token,
-      master_ip    = var.master_ip,
-      cluster_name = var.cluster_name,
-      public_ip  = self.public_ip,
-      resource_name = "${var.resource_name}"
-    })
+    content = templatefile(
+      "${path.module}/${var.k3s_role}_user_data.sh.tpl",
+      merge(local.user_data_vars, { public_ip = aws_instance.k3s_node.public_ip })
+    )
     destination = "/tmp/k3s_user_data.sh"
   }
 
@@ -156,7 +236,7 @@ resource "aws_instance" "k3s_node" {
     type        = "ssh"
     user        = var.ssh_user
     private_key = file(var.ssh_key)
-    host        = self.public_ip
+    host        = aws_instance.k3s_node.public_ip
   }
 }
 
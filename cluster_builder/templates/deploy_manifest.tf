@@ -5,7 +5,20 @@ variable "ssh_private_key_path" {}
 variable "master_ip" {}
 variable "ssh_user" {}
 
+locals {
+  manifest_dir   = "/var/lib/rancher/k3s/server/manifests"
+  manifest_files = fileset(var.manifest_folder, "**")
+}
+
+# One resource per manifest file, replaced only when the file content changes,
+# so unchanged manifests are never uploaded again
 resource "null_resource" "copy_manifests" {
+  for_each = local.manifest_files
+
+  triggers = {
+    sha256 = filesha256("${var.manifest_folder}/${each.value}")
+  }
+
   connection {
     type        = "ssh"
     user        = var.ssh_user
@@ -13,16 +26,23 @@ resource "null_resource" "copy_manifests" {
     host        = var.master_ip
   }
 
-  # Copy manifest folder to a temporary location first
+  provisioner "remote-exec" {
+    inline = [
+      "mkdir -p '/tmp/manifests_temp/${dirname(each.value)}'"
+    ]
+  }
+
+  # Copy the manifest to a temporary location first
   provisioner "file" {
-    source      = var.manifest_folder
-    destination = "/tmp/manifests_temp/"
+    source      = "${var.manifest_folder}/${each.value}"
+    destination = "/tmp/manifests_temp/${each.value}"
   }
 
-  # Move manifests into K3s manifests folder atomically
+  # Move the manifest into the K3s manifests folder atomically
   provisioner "remote-exec" {
     inline = [
-      "sudo mv /tmp/manifests_temp/* /var/lib/rancher/k3s/server/manifests/"
+      "sudo mkdir -p '${local.manifest_dir}/${dirname(each.value)}'",
+      "sudo mv '/tmp/manifests_temp/${each.value}' '${local.manifest_dir}/${each.value}'"
     ]
   }
 }
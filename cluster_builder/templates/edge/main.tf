@@ -21,22 +21,64 @@ variable "master_ip" {
 variable "ha" {
   default = false
 }
+variable "k3s_version" {
+  default = ""
+}
+variable "k3s_arch" {
+  default = "amd64"
+}
+variable "k3s_binary_path" {
+  default = ""
+}
+variable "k3s_install_script_path" {
+  default = ""
+}
+variable "embedded_registry" {
+  default = false
+}
+variable "registry_mirrors" {
+  type    = list(string)
+  default = ["docker.io", "registry.k8s.io"]
+}
+variable "registry_auths" {
+  type = list(object({
+    registry = string
+    username = string
+    password = string
+  }))
+  default   = []
+  sensitive = true
+}
 
 #main.tf
-data "template_file" "user_data" {
-  template = file("${path.module}/${var.k3s_role}_user_data.sh.tpl")
-  vars = {
+locals {
+  # registries.yaml of the embedded registry mirror: images of the mirrored
+  # registries, including those with credentials, are pulled from peers first
+  registries_yaml = yamlencode({
+    mirrors = {
+      for registry in distinct(concat(var.registry_mirrors, [for auth in var.registry_auths : auth.registry])) :
+      registry => {}
+    }
+    configs = {
+      for auth in var.registry_auths :
+      auth.registry => { auth = { username = auth.username, password = auth.password } }
+    }
+  })
+}
+
+# Rendered in memory and uploaded as is: it holds the k3s token and registry
+# credentials, which must not land in the shared template directory
+locals {
+  user_data = templatefile("${path.module}/${var.k3s_role}_user_data.sh.tpl", {
     k3s_token = var.k3s_token
     ha        = var.ha
     public_ip = var.edge_device_ip
     master_ip = var.master_ip
     resource_name = "${var.resource_name}"
-  }
-}
-
-resource "local_file" "rendered_user_data" {
-  content  = data.template_file.user_data.rendered
-  filename = "${path.module}/${var.k3s_role}_user_data.sh"
+    embedded_registry = var.embedded_registry
+    registries_yaml = local.registries_yaml
+    k3s_version = var.k3s_version
+  })
 }
 
 resource "null_resource" "deploy_k3s_edge" {
@@ -48,8 +90,20 @@ resource "null_resource" "deploy_k3s_edge" {
     private_key = var.ssh_auth_method == "key" ? file(var.ssh_key) : null
   }
 
+   # Upload the k3s binary and install script from the artifact cache of the
+   # control host, or empty placeholders to download them on the node instead
+   provisioner "file" {
+    source      = var.k3s_binary_path != "" ? var.k3s_binary_path : "${path.module}/../k3s_placeholder"
+    destination = "/tmp/k3s"
+   }
+
+   provisioner "file" {
+    source      = var.k3s_install_script_path != "" ? var.k3s_install_script_path : "${path.module}/../k3s_placeholder"
+    destination = "/tmp/k3s_install.sh"
+   }
+
    provisioner "file" {
-    source      = "${path.module}/${var.k3s_role}_user_data.sh"
+    content     = local.user_data
     destination = "/tmp/edge_user_data.sh"
    }
 
@@ -69,7 +123,6 @@ resource "null_resource" "deploy_k3s_edge" {
     resource_name = var.resource_name
     edge_ip       = var.edge_device_ip
   }
-  depends_on = [local_file.rendered_user_data]
 }
 
 # Local variables for outputs
@@ -10,20 +10,86 @@ log_message() {
     echo "$(date) - $1"
 }
 
+# Check that a binary was built for the architecture of this node, from the
+# machine field of its ELF header
+binary_matches_node() {
+    local machine binary
+    machine=$(uname -m)
+    case "$machine" in
+        armv*) machine=arm ;;
+        arm64) machine=aarch64 ;;
+    esac
+    case "$(od -An -t x1 -j 18 -N 2 "$1" | tr -d ' \n')" in
+        3e00) binary=x86_64 ;;
+        b700) binary=aarch64 ;;
+        2800) binary=arm ;;
+        *) binary=unknown ;;
+    esac
+    if [[ "$binary" != "$machine" ]]; then
+        log_message "WARNING: The uploaded K3s binary is built for $binary but this node is $machine, downloading K3s instead"
+        return 1
+    fi
+}
+
+# Install K3s from the binary and install script uploaded from the artifact
+# cache of cluster-builder, or download them when only placeholders, or a
+# binary for another architecture, were uploaded
+install_k3s() {
+    if [[ -s /tmp/k3s && -s /tmp/k3s_install.sh ]] && binary_matches_node /tmp/k3s; then
+        log_message "Installing K3s from the uploaded binary..."
+        install -m 755 /tmp/k3s /usr/local/bin/k3s
+        INSTALL_K3S_SKIP_DOWNLOAD=true sh /tmp/k3s_install.sh "$@"
+    else
+        curl -sfL https://get.k3s.io | INSTALL_K3S_VERSION="${k3s_version}" sh -s - "$@"
+    fi
+}
+
+# Use the provided public IP, or detect it from the instance metadata when the
+# script runs as cloud-init user data and the IP was not known beforehand
+PUBLIC_IP="${public_ip}"
+if [[ -z "$PUBLIC_IP" ]]; then
+    # Failed lookups must not abort the script under set -e before anything is logged
+    IMDS_TOKEN=$(curl -sf --max-time 5 -X PUT "http://169.254.169.254/latest/api/token" -H "X-aws-ec2-metadata-token-ttl-seconds: 300" || true)
+    PUBLIC_IP=$(curl -sf --max-time 5 -H "X-aws-ec2-metadata-token: $IMDS_TOKEN" "http://169.254.169.254/latest/meta-data/public-ipv4" || true)
+    if [[ -z "$PUBLIC_IP" ]]; then
+        log_message "WARNING: No public IPv4 in the instance metadata, using the private IP"
+        PUBLIC_IP=$(curl -sf --max-time 5 -H "X-aws-ec2-metadata-token: $IMDS_TOKEN" "http://169.254.169.254/latest/meta-data/local-ipv4" || true)
+    fi
+    if [[ -z "$PUBLIC_IP" ]]; then
+        log_message "ERROR: Could not detect the IP of this node from the instance metadata"
+        exit 1
+    fi
+fi
+log_message "Using public IP: $PUBLIC_IP"
+
 # Check if K3s server is already running
 if systemctl is-active --quiet k3s; then
     log_message "K3s is already running. Skipping installation."
     exit 0
 fi
 
+# Configure the embedded registry mirror, so images are pulled from peers in the cluster
+if [[ "${embedded_registry}" == "true" ]]; then
+    log_message "Writing the registry mirror configuration..."
+    mkdir -p /etc/rancher/k3s
+    cat > /etc/rancher/k3s/registries.yaml <<'EOF'
+${registries_yaml}
+EOF
+    chmod 600 /etc/rancher/k3s/registries.yaml
+    REGISTRY_ARGS="--embedded-registry"
+else
+    REGISTRY_ARGS=""
+fi
+
 # Install K3s HA server and join the cluster
 log_message "Installing K3s HA Server and joining the cluster..."
-if ! curl -sfL https://get.k3s.io | K3S_TOKEN="${k3s_token}" sh -s - server \
+if ! K3S_TOKEN="${k3s_token}" install_k3s server \
     --server "https://${master_ip}:6443" \
-    --node-external-ip="${public_ip}" \
+    --node-external-ip="$PUBLIC_IP" \
     --node-name="${resource_name}" \
     --flannel-backend=wireguard-native \
-    --flannel-external-ip; then
+    --flannel-external-ip \
+    $REGISTRY_ARGS; then
     log_message "ERROR: K3s server installation failed!"
     exit 1
 else
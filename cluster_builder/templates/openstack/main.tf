@@ -25,6 +25,42 @@ variable "use_block_device" {
 variable "security_group_id" {
   default = ""
 }
+variable "provisioning" {
+  description = "How k3s is installed, by ssh provisioners during the apply or by cloud-init after it"
+  default     = "ssh"
+  validation {
+    condition     = contains(["ssh", "cloud-init"], var.provisioning)
+    error_message = "The provisioning must be ssh or cloud-init."
+  }
+}
+variable "k3s_version" {
+  default = ""
+}
+variable "k3s_arch" {
+  default = "amd64"
+}
+variable "k3s_binary_path" {
+  default = ""
+}
+variable "k3s_install_script_path" {
+  default = ""
+}
+variable "embedded_registry" {
+  default = false
+}
+variable "registry_mirrors" {
+  type    = list(string)
+  default = ["docker.io", "registry.k8s.io"]
+}
+variable "registry_auths" {
+  type = list(object({
+    registry = string
+    username = string
+    password = string
+  }))
+  default   = []
+  sensitive = true
+}
 variable "custom_ingress_ports" {
   type = list(object({
     from   = number
@@ -58,6 +94,34 @@ resource "openstack_networking_port_v2" "port_1" {
   network_id = var.network_id
 }
 
+locals {
+  # registries.yaml of the embedded registry mirror: images of the mirrored
+  # registries, including those with credentials, are pulled from peers first
+  registries_yaml = yamlencode({
+    mirrors = {
+      for registry in distinct(concat(var.registry_mirrors, [for auth in var.registry_auths : auth.registry])) :
+      registry => {}
+    }
+    configs = {
+      for auth in var.registry_auths :
+      auth.registry => { auth = { username = auth.username, password = auth.password } }
+    }
+  })
+
+  # Variables of the role script, the floating IP is known before the instance exists
+  user_data = templatefile("${path.module}/${var.k3s_role}_user_data.sh.tpl", {
+    ha                = var.ha
+    k3s_token         = var.k3s_token
+    master_ip         = var.master_ip
+    cluster_name      = var.cluster_name
+    public_ip         = var.floating_ip
+    resource_name     = var.resource_name
+    embedded_registry = var.embedded_registry
+    registries_yaml   = local.registries_yaml
+    k3s_version       = var.k3s_version
+  })
+}
+
 # Security group rules
 locals {
   ingress_rules = var.security_group_id == "" ? concat(
@@ -68,7 +132,7 @@ locals {
       { from = 10250, to = 10250, proto = "tcp", desc = "Kubelet metrics", roles = ["master", "ha", "worker"], source = "0.0.0.0/0", ethertype = "IPv4" },
       { from = 51820, to = 51820, proto = "udp", desc = "Wireguard IPv4", roles = ["master", "ha", "worker"], source = "0.0.0.0/0", ethertype = "IPv4" },
       { from = 51821, to = 51821, proto = "udp", desc = "Wireguard IPv6", roles = ["master", "ha", "worker"], source = "::/0", ethertype = "IPv6" },
-      { from = 5001, to = 5001, proto = "tcp", desc = "Embedded registry", roles = ["master", "ha"], source = "0.0.0.0/0", ethertype = "IPv4" },
+      { from = 5001, to = 5001, proto = "tcp", desc = "Embedded registry", roles = var.embedded_registry ? ["master", "ha", "worker"] : ["master", "ha"], source = "0.0.0.0/0", ethertype = "IPv4" },
       { from = 22, to = 22, proto = "tcp", desc = "SSH access", roles = ["master", "ha", "worker"], source = "0.0.0.0/0", ethertype = "IPv4" },
       { from = 80, to = 80, proto = "tcp", desc = "HTTP access", roles = ["master", "ha", "worker"], source = "0.0.0.0/0", ethertype = "IPv4" },
       { from = 443, to = 443, proto = "tcp", desc = "HTTPS access", roles = ["master", "ha", "worker"], source = "0.0.0.0/0", ethertype = "IPv4" },
@@ -177,6 +241,9 @@ resource "openstack_compute_instance_v2" "k3s_node" {
     port = openstack_networking_port_v2.port_1.id
   }
 
+  # With cloud-init provisioning the instance installs k3s on first boot
+  user_data = var.provisioning == "cloud-init" ? local.user_data : null
+
   tags = [
     "Name=${var.resource_name}",
     "k3sToken=${var.k3s_token}",
@@ -196,17 +263,23 @@ resource "openstack_networking_floatingip_associate_v2" "fip_association" {
 
 # Provisioning via SSH
 resource "null_resource" "k3s_provision" {
+  count      = var.provisioning == "ssh" ? 1 : 0
   depends_on = [openstack_networking_floatingip_associate_v2.fip_association]
 
+  # Upload the k3s binary and install script from the artifact cache of the
+  # control host, or empty placeholders to download them on the node instead
   provisioner "file" {
-    content = templatefile("${path.module}/${var.k3s_role}_user_data.sh.tpl", {
-      ha           = var.ha,
-      k3s_token    = var.k3s_token,
-      master_ip    = var.master_ip,
-      cluster_name = var.cluster_name,
-      public_ip    = var.floating_ip
-      resource_name    = "${var.resource_name}"
-    })
+    source      = var.k3s_binary_path != "" ? var.k3s_binary_path : "${path.module}/../k3s_placeholder"
+    destination = "/tmp/k3s"
+  }
+
+  provisioner "file" {
+    source      = var.k3s_install_script_path != "" ? var.k3s_install_script_path : "${path.module}/../k3s_placeholder"
+    destination = "/tmp/k3s_install.sh"
+  }
+
+  provisioner "file" {
+    content     = local.user_data
     destination = "/tmp/k3s_user_data.sh"
   }
 
@@ -227,6 +300,12 @@ resource "null_resource" "k3s_provision" {
   }
 }
 
+# Nodes created before the provisioning mode existed keep their provisioning resource
+moved {
+  from = null_resource.k3s_provision
+  to   = null_resource.k3s_provision[0]
+}
+
 # outputs.tf
 output "cluster_name" {
   value = [for t in openstack_compute_instance_v2.k3s_node.tags : split("=", t)[1] if startswith(t, "ClusterName=")][0]
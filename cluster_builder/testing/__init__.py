@@ -0,0 +1,7 @@
+"""
+Test doubles for exercising the Cluster Builder without any cloud.
+"""
+
+from cluster_builder.testing.tofu_emulator import TofuEmulator, install_emulator
+
+__all__ = ["TofuEmulator", "install_emulator"]
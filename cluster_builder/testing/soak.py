@@ -0,0 +1,239 @@
+"""
+Soak test driving Swarmchestrate end to end against the OpenTofu emulator.
+
+Each cluster goes through the whole lifecycle: a master is added, workers
+join it in one batch, one worker is removed and the cluster is destroyed.
+Clusters run concurrently and the latency of every operation is recorded, so
+that throughput and tail latency can be compared across changes or emulator
+settings (see `tofu_emulator`).
+
+Usage:
+    python -m cluster_builder.testing.soak --clusters 20 --concurrency 5 --config emulator.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Optional
+
+from cluster_builder.testing.tofu_emulator import install_emulator
+
+logger = logging.getLogger("swarmchestrate")
+
+# Operations of the cluster lifecycle, in order
+OPERATIONS = ["add_master", "add_workers", "remove_node", "destroy"]
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates")
+
+
+@dataclass
+class SoakReport:
+    """Latencies and failures of the operations run during a soak test."""
+
+    duration: float = 0.0
+    latencies: dict[str, list[float]] = field(default_factory=dict)
+    failures: dict[str, list[str]] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def record(self, operation: str, latency: float, error: Optional[str] = None) -> None:
+        with self._lock:
+            self.latencies.setdefault(operation, []).append(latency)
+            if error is not None:
+                self.failures.setdefault(operation, []).append(error)
+
+    def summary(self) -> dict:
+        """
+        Summarise the soak test.
+
+        Returns:
+            Per operation: the number of runs and failures, the throughput in
+            operations per second over the whole test, and the p50, p95, p99
+            and maximum latencies in seconds
+        """
+        summary = {"duration": round(self.duration, 3), "operations": {}}
+        for operation in OPERATIONS:
+            latencies = sorted(self.latencies.get(operation, []))
+            if not latencies:
+                continue
+            summary["operations"][operation] = {
+                "count": len(latencies),
+                "failures": len(self.failures.get(operation, [])),
+                "throughput": round(len(latencies) / self.duration, 3) if self.duration else None,
+                "p50": round(_percentile(latencies, 50), 3),
+                "p95": round(_percentile(latencies, 95), 3),
+                "p99": round(_percentile(latencies, 99), 3),
+                "max": round(latencies[-1], 3),
+            }
+        return summary
+
+
+def run_soak(
+    clusters: int = 4,
+    workers_per_cluster: int = 2,
+    concurrency: int = 4,
+    emulator_config: Optional[dict] = None,
+    work_dir: Optional[str] = None,
+) -> SoakReport:
+    """
+    Run the cluster lifecycle for several clusters against the OpenTofu emulator.
+
+    Args:
+        clusters: Number of clusters to create and destroy
+        workers_per_cluster: Number of workers added to each cluster
+        concurrency: Number of clusters going through their lifecycle at once
+        emulator_config: Emulator configuration, see `tofu_emulator`
+        work_dir: Directory for the emulator, states and cluster directories,
+            a temporary one is used and removed when not given
+
+    Returns:
+        The report of the soak test
+    """
+    # Imported here so that the emulator can be used without the package dependencies
+    from cluster_builder import Swarmchestrate
+
+    own_work_dir = work_dir is None
+    work_dir = work_dir or tempfile.mkdtemp(prefix="cluster-builder-soak-")
+    bin_dir = os.path.join(work_dir, "bin")
+    state_root = os.path.join(work_dir, "states")
+    install_emulator(bin_dir, emulator_config or {})
+
+    templates_dir = os.path.join(work_dir, "templates")
+    shutil.copytree(TEMPLATES_DIR, templates_dir, dirs_exist_ok=True)
+
+    environ = {
+        "PATH": f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}",
+        "TOFU_EMULATOR_ROOT": state_root,
+        "CLUSTER_BUILDER_CACHE_DIR": os.path.join(work_dir, "cache"),
+        "TF_LOG_PATH": os.path.join(work_dir, "opentofu.log"),
+    }
+    for name in ("POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_HOST", "POSTGRES_DATABASE"):
+        environ[name] = os.environ.get(name, "soak")
+
+    report = SoakReport()
+    try:
+        with _environ(environ):
+            orchestrator = Swarmchestrate(
+                templates_dir, os.path.join(work_dir, "output"), state_access="cli"
+            )
+            # User data templates are copied next to the cloud templates, keep them private
+            orchestrator.template_manager.templates_dir = templates_dir
+            # There is no database behind the emulator, its states stand in for the schemas
+            orchestrator.remove_cluster_schemas_from_db = lambda names: [
+                shutil.rmtree(os.path.join(state_root, name), ignore_errors=True) for name in names
+            ]
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+                for i in range(clusters):
+                    pool.submit(_cluster_lifecycle, orchestrator, f"soak-{i:04d}", workers_per_cluster, report)
+            report.duration = time.perf_counter() - start
+    finally:
+        if own_work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return report
+
+
+def _cluster_lifecycle(orchestrator, cluster_name: str, workers: int, report: SoakReport) -> None:
+    """Take one cluster through its lifecycle, stopping at the first failure."""
+    def timed(operation: str, func) -> bool:
+        start = time.perf_counter()
+        try:
+            func()
+        except Exception as e:
+            report.record(operation, time.perf_counter() - start, str(e))
+            logger.warning(f"⚠️ Soak operation '{operation}' failed for cluster '{cluster_name}': {e}")
+            return False
+        report.record(operation, time.perf_counter() - start)
+        return True
+
+    master = {}
+    worker_names = [f"{cluster_name}-worker-{i}" for i in range(workers)]
+    steps = [
+        ("add_master", lambda: master.update(
+            orchestrator.add_node(_edge_config(cluster_name, f"{cluster_name}-master", "master"))
+        )),
+        ("add_workers", lambda: orchestrator.add_nodes(
+            [_edge_config(cluster_name, name, "worker", master.get("master_ip")) for name in worker_names]
+        )),
+        ("remove_node", lambda: orchestrator.remove_node(cluster_name, worker_names[0])),
+    ]
+    if not workers:
+        steps = steps[:1]
+
+    for operation, func in steps:
+        if not timed(operation, func):
+            break
+    # Always tear down, so that a failed cluster does not leak into the next ones
+    timed("destroy", lambda: orchestrator.destroy(cluster_name))
+
+
+def _edge_config(
+    cluster_name: str, resource_name: str, role: str, master_ip: Optional[str] = None
+) -> dict:
+    """Configuration of an edge node, which needs no cloud credentials."""
+    config = {
+        "cloud": "edge",
+        "k3s_role": role,
+        "cluster_name": cluster_name,
+        "resource_name": resource_name,
+        "edge_device_ip": "192.0.2.10",
+        "ssh_user": "soak",
+        "ssh_auth_method": "key",
+        "ssh_key": "/dev/null",
+    }
+    if master_ip:
+        config["master_ip"] = master_ip
+    return config
+
+
+def _percentile(values: list[float], percentile: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    rank = max(1, -(-len(values) * percentile // 100))
+    return values[int(rank) - 1]
+
+
+@contextmanager
+def _environ(values: dict):
+    """Set environment variables for the duration of the soak test."""
+    previous = {name: os.environ.get(name) for name in values}
+    os.environ.update(values)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Soak test cluster-builder against the OpenTofu emulator")
+    parser.add_argument("--clusters", type=int, default=4, help="Number of clusters to create and destroy")
+    parser.add_argument("--workers", type=int, default=2, help="Number of workers per cluster")
+    parser.add_argument("--concurrency", type=int, default=4, help="Number of clusters deployed at once")
+    parser.add_argument("--config", help="Path of the emulator JSON configuration")
+    parser.add_argument("--work-dir", help="Directory to keep the emulator states and cluster directories in")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    config = None
+    if args.config:
+        with open(args.config) as f:
+            config = json.load(f)
+
+    report = run_soak(args.clusters, args.workers, args.concurrency, config, args.work_dir)
+    print(json.dumps(report.summary(), indent=2))
+    return 1 if report.failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
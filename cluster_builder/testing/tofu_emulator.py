@@ -0,0 +1,512 @@
+"""
+Deterministic stand-in for the `tofu` executable, for load and soak testing.
+
+The emulator understands the subcommands cluster-builder runs (`init`,
+`workspace list/show/new/select/delete`, `validate`, `plan`, `apply`,
+`destroy` and `output -json`) and keeps one state per workspace. Applying a
+module records a fake node instance and computes the root outputs of
+main.tf.json which refer to that module, so the orchestrator sees realistic
+outputs without any cloud.
+
+States are kept as JSON files under a root directory shared by every working
+directory, one directory per backend schema, mirroring the PostgreSQL
+backend. Latency, failure rate and output size can be configured per
+subcommand in a JSON file:
+
+    {
+        "seed": 42,
+        "default": {"latency": 0.01},
+        "apply": {"latency": [0.5, 2.0], "failure_rate": 0.05, "output_bytes": 20000},
+        "workspace new": {"latency": 0.1}
+    }
+
+where a latency is a number of seconds or a [min, max] range. Results are
+deterministic for a given seed: the latency and outcome of a command depend
+only on the command, its workspace and how many times it was run before.
+
+The emulator only uses the standard library and is run as a script, so that
+each invocation stays cheap. Use `install_emulator` to put it on PATH.
+
+Environment variables:
+    TOFU_EMULATOR_ROOT: Directory holding the states, defaults to
+        `.tofu-emulator` in the working directory
+    TOFU_EMULATOR_CONFIG: Path of the JSON configuration
+    TF_WORKSPACE: Workspace to use instead of the selected one
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import random
+import stat
+import sys
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+EMULATED_VERSION = "1.8.0"
+
+DEFAULT_WORKSPACE = "default"
+
+
+def install_emulator(bin_dir: str, config: Optional[dict] = None) -> str:
+    """
+    Install a `tofu` executable running the emulator.
+
+    Args:
+        bin_dir: Directory to create the executable in, to be put on PATH
+        config: Optional emulator configuration, written next to the executable
+            and used unless TOFU_EMULATOR_CONFIG is set
+
+    Returns:
+        Path of the executable
+    """
+    os.makedirs(bin_dir, exist_ok=True)
+    config_line = ""
+    if config is not None:
+        config_path = os.path.join(bin_dir, "tofu-emulator.json")
+        with open(config_path, "w") as f:
+            json.dump(config, f)
+        config_line = f'export TOFU_EMULATOR_CONFIG="${{TOFU_EMULATOR_CONFIG:-{config_path}}}"\n'
+
+    path = os.path.join(bin_dir, "tofu")
+    with open(path, "w") as f:
+        f.write(
+            "#!/bin/sh\n"
+            + config_line
+            + f'exec "{sys.executable}" "{os.path.abspath(__file__)}" "$@"\n'
+        )
+    os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC | stat.S_IXGRP | stat.S_IXOTH)
+    return path
+
+
+class EmulatorError(Exception):
+    """An error reported by the emulated command, exiting with status 1."""
+
+
+class TofuEmulator:
+    """Runs one emulated OpenTofu command in a working directory."""
+
+    def __init__(self, cwd: str, env: dict):
+        self.cwd = cwd
+        self.env = env
+        self.root = env.get("TOFU_EMULATOR_ROOT") or os.path.join(cwd, ".tofu-emulator")
+        self.config = self._load_config(env.get("TOFU_EMULATOR_CONFIG"))
+        self.document = self._load_document()
+        backend = self.document.get("terraform", {}).get("backend", {}).get("pg", {})
+        self.schema = backend.get("schema_name") or "local"
+        self.schema_dir = os.path.join(self.root, self.schema)
+
+    def run(self, args: list[str]) -> int:
+        if not args or args[0] in ("-version", "version", "--version"):
+            print(f"OpenTofu v{EMULATED_VERSION} (emulated)")
+            return 0
+
+        command = args[0]
+        if command == "workspace" and len(args) > 1:
+            command = f"workspace {args[1]}"
+            args = args[2:]
+        else:
+            args = args[1:]
+        flags, positional = _split_args(args)
+
+        handler = {
+            "init": self.init,
+            "validate": self.validate,
+            "workspace list": self.workspace_list,
+            "workspace show": self.workspace_show,
+            "workspace new": self.workspace_new,
+            "workspace select": self.workspace_select,
+            "workspace delete": self.workspace_delete,
+            "plan": self.plan,
+            "apply": self.apply,
+            "destroy": self.destroy,
+            "output": self.output,
+        }.get(command)
+        if handler is None:
+            print(f"Error: unsupported command '{command}' in the OpenTofu emulator", file=sys.stderr)
+            return 1
+
+        behaviour = self._behaviour(command)
+        rng = self._rng(command, flags, positional)
+        latency = behaviour.get("latency", 0)
+        if isinstance(latency, (list, tuple)):
+            latency = rng.uniform(*latency)
+        if latency:
+            time.sleep(latency)
+
+        if rng.random() < behaviour.get("failure_rate", 0):
+            print(f"Error: emulated failure of '{command}' in workspace '{self.workspace}'", file=sys.stderr)
+            return 1
+
+        try:
+            handler(flags, positional)
+        except EmulatorError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+
+        _emit_padding(command, behaviour.get("output_bytes", 0))
+        return 0
+
+    @property
+    def workspace(self) -> str:
+        if self.env.get("TF_WORKSPACE"):
+            return self.env["TF_WORKSPACE"]
+        try:
+            with open(os.path.join(self.cwd, ".terraform", "environment")) as f:
+                return f.read().strip() or DEFAULT_WORKSPACE
+        except OSError:
+            return DEFAULT_WORKSPACE
+
+    # Commands
+
+    def init(self, flags: dict, positional: list) -> None:
+        os.makedirs(os.path.join(self.cwd, ".terraform"), exist_ok=True)
+        lock_path = os.path.join(self.cwd, ".terraform.lock.hcl")
+        if not os.path.exists(lock_path):
+            with open(lock_path, "w") as f:
+                f.write("# Emulated dependency lock file\n")
+        print("OpenTofu has been successfully initialized!")
+
+    def validate(self, flags: dict, positional: list) -> None:
+        print("Success! The configuration is valid.")
+
+    def workspace_list(self, flags: dict, positional: list) -> None:
+        current = self.workspace
+        for name in self._workspaces():
+            print(f"{'*' if name == current else ' '} {name}")
+        print()
+
+    def workspace_show(self, flags: dict, positional: list) -> None:
+        print(self.workspace)
+
+    def workspace_new(self, flags: dict, positional: list) -> None:
+        name = self._workspace_arg(positional)
+        with self._locked():
+            if name in self._workspaces():
+                raise EmulatorError(f'Workspace "{name}" already exists')
+            self._write_state(name, _empty_state())
+        if not self.env.get("TF_WORKSPACE"):
+            self._select(name)
+        print(f'Created and switched to workspace "{name}"!')
+
+    def workspace_select(self, flags: dict, positional: list) -> None:
+        name = self._workspace_arg(positional)
+        if self.env.get("TF_WORKSPACE"):
+            raise EmulatorError(
+                "The selected workspace is currently overridden using the TF_WORKSPACE environment variable"
+            )
+        if name not in self._workspaces():
+            raise EmulatorError(f'Workspace "{name}" doesn\'t exist.')
+        self._select(name)
+        print(f'Switched to workspace "{name}".')
+
+    def workspace_delete(self, flags: dict, positional: list) -> None:
+        name = self._workspace_arg(positional)
+        if name == DEFAULT_WORKSPACE:
+            raise EmulatorError("Can't delete default workspace")
+        if name == self.workspace:
+            raise EmulatorError(f'Workspace "{name}" is your active workspace')
+        with self._locked():
+            state = self._read_state(name)
+            if state is None:
+                raise EmulatorError(f'Workspace "{name}" doesn\'t exist.')
+            if state["resources"] and "force" not in flags:
+                raise EmulatorError(f'Workspace "{name}" is currently tracking resources')
+            os.remove(self._state_path(name))
+        print(f'Deleted workspace "{name}"!')
+
+    def plan(self, flags: dict, positional: list) -> None:
+        targets = _targets(flags)
+        modules = self._planned_modules(targets)
+        state = self._read_state(self.workspace) or _empty_state()
+        applied = {r["module"][len("module."):] for r in state["resources"]}
+        to_add = len([m for m in modules if m not in applied])
+        to_destroy = len([m for m in applied if m not in self.document.get("module", {})])
+        if "out" in flags:
+            with open(os.path.join(self.cwd, flags["out"]), "w") as f:
+                json.dump({"workspace": self.workspace, "targets": targets, "serial": state["serial"]}, f)
+        print(f"Plan: {to_add} to add, 0 to change, {to_destroy} to destroy.")
+
+    def apply(self, flags: dict, positional: list) -> None:
+        targets = _targets(flags)
+        if positional:
+            plan = self._load_plan(positional[0])
+            targets = plan["targets"]
+
+        with self._locked():
+            # Like the pg backend, a workspace selected with TF_WORKSPACE is created on first use
+            state = self._read_state(self.workspace) or _empty_state()
+            modules = self.document.get("module", {})
+            if not targets:
+                # Untargeted applies also remove the modules no longer configured
+                state["resources"] = [
+                    r for r in state["resources"] if r["module"][len("module."):] in modules
+                ]
+            applied = {r["module"][len("module."):] for r in state["resources"]}
+            added = 0
+            for name in self._planned_modules(targets):
+                if name not in applied:
+                    state["resources"].append(self._node_resource(name, modules[name]))
+                    print(f"module.{name}: Creation complete")
+                    added += 1
+            self._update_outputs(state)
+            self._write_state(self.workspace, state)
+        print(f"Apply complete! Resources: {added} added, 0 changed, 0 destroyed.")
+
+    def destroy(self, flags: dict, positional: list) -> None:
+        targets = _targets(flags)
+        with self._locked():
+            state = self._read_state(self.workspace) or _empty_state()
+            kept = [
+                r for r in state["resources"]
+                if targets and r["module"][len("module."):] not in targets
+            ]
+            destroyed = len(state["resources"]) - len(kept)
+            state["resources"] = kept
+            self._update_outputs(state)
+            self._write_state(self.workspace, state)
+        print(f"Destroy complete! Resources: {destroyed} destroyed.")
+
+    def output(self, flags: dict, positional: list) -> None:
+        state = self._read_state(self.workspace) or _empty_state()
+        outputs = state["outputs"]
+        if positional:
+            name = positional[0]
+            if name not in outputs:
+                raise EmulatorError(f'Output "{name}" not found')
+            print(json.dumps(outputs[name]["value"]))
+        else:
+            print(json.dumps(outputs, indent=2))
+
+    # Emulated resources
+
+    def _node_resource(self, name: str, module: dict) -> dict:
+        """Fake the node instance of a module, as the cloud templates would create it."""
+        digest = hashlib.sha256(f"{self.schema}/{name}".encode()).digest()
+        source = module.get("source", "")
+        role = module.get("k3s_role", "worker")
+        ip = module.get("edge_device_ip") or f"10.{digest[0]}.{digest[1]}.{digest[2]}"
+        attributes = {"id": digest[:8].hex(), "public_ip": ip, "k3s_role": role}
+
+        if "/aws" in source:
+            resource_type = "aws_instance"
+            attributes.update(
+                id=f"i-{digest[:8].hex()}",
+                private_ip=f"172.31.{digest[3]}.{digest[4]}",
+                instance_state="running",
+                tags={"Name": name, "Role": role, "ClusterName": module.get("cluster_name")},
+            )
+        elif "/openstack" in source:
+            resource_type = "openstack_compute_instance_v2"
+            attributes.update(
+                access_ip_v4=f"192.168.{digest[3]}.{digest[4]}",
+                power_state="active",
+                tags=[f"Name={name}", f"Role={role}"],
+            )
+        else:
+            resource_type = "null_resource"
+        return {
+            "module": f"module.{name}",
+            "mode": "managed",
+            "type": resource_type,
+            "name": "deploy_k3s_edge" if resource_type == "null_resource" else "k3s_node",
+            "instances": [{"attributes": attributes}],
+        }
+
+    def _update_outputs(self, state: dict) -> None:
+        """Compute the root outputs referring to the modules applied in a workspace."""
+        instances = {
+            r["module"][len("module."):]: r["instances"][0]["attributes"] for r in state["resources"]
+        }
+        modules = self.document.get("module", {})
+        outputs = {}
+        for output_name, output in self.document.get("output", {}).items():
+            value = output.get("value")
+            if not (isinstance(value, str) and value.startswith("${module.") and value.endswith("}")):
+                continue
+            module_name, _, attribute = value[len("${module."):-1].partition(".")
+            if module_name not in instances:
+                continue
+            outputs[output_name] = {
+                "value": _module_output(attribute, modules.get(module_name, {}), instances[module_name], module_name),
+                "type": "string",
+            }
+        state["outputs"] = outputs
+
+    # State storage
+
+    def _workspaces(self) -> list[str]:
+        names = set()
+        if os.path.isdir(self.schema_dir):
+            names = {f[:-len(".json")] for f in os.listdir(self.schema_dir) if f.endswith(".json")}
+        names.add(DEFAULT_WORKSPACE)
+        return sorted(names)
+
+    def _state_path(self, workspace: str) -> str:
+        return os.path.join(self.schema_dir, f"{workspace}.json")
+
+    def _read_state(self, workspace: str) -> Optional[dict]:
+        try:
+            with open(self._state_path(workspace)) as f:
+                return json.load(f)
+        except OSError:
+            return _empty_state() if workspace == DEFAULT_WORKSPACE else None
+
+    def _write_state(self, workspace: str, state: dict) -> None:
+        os.makedirs(self.schema_dir, exist_ok=True)
+        state["serial"] = state.get("serial", 0) + 1
+        path = self._state_path(workspace)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+
+    @contextmanager
+    def _locked(self):
+        """Serialise changes to the states of the schema across processes."""
+        os.makedirs(self.schema_dir, exist_ok=True)
+        with open(os.path.join(self.schema_dir, ".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _select(self, name: str) -> None:
+        os.makedirs(os.path.join(self.cwd, ".terraform"), exist_ok=True)
+        with open(os.path.join(self.cwd, ".terraform", "environment"), "w") as f:
+            f.write(name)
+
+    # Helpers
+
+    def _workspace_arg(self, positional: list) -> str:
+        if not positional:
+            raise EmulatorError("Expected a single argument: NAME.")
+        return positional[0]
+
+    def _planned_modules(self, targets: list[str]) -> list[str]:
+        modules = self.document.get("module", {})
+        if not targets:
+            return list(modules)
+        missing = [t for t in targets if t not in modules]
+        if missing:
+            raise EmulatorError(f"Reference to undeclared module: module.{missing[0]}")
+        return targets
+
+    def _load_plan(self, plan_path: str) -> dict:
+        try:
+            with open(os.path.join(self.cwd, plan_path)) as f:
+                plan = json.load(f)
+        except (OSError, ValueError):
+            raise EmulatorError(f"Failed to load \"{plan_path}\" as a plan file")
+        if plan.get("workspace") != self.workspace:
+            raise EmulatorError("The plan was created for a different workspace")
+        state = self._read_state(self.workspace) or _empty_state()
+        if plan.get("serial") != state["serial"]:
+            raise EmulatorError("Saved plan is stale")
+        return plan
+
+    def _load_document(self) -> dict:
+        path = os.path.join(self.cwd, "main.tf.json")
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    @staticmethod
+    def _load_config(path: Optional[str]) -> dict:
+        if not path:
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def _behaviour(self, command: str) -> dict:
+        behaviour = dict(self.config.get("default", {}))
+        behaviour.update(self.config.get(command.split(" ")[0], {}))
+        behaviour.update(self.config.get(command, {}))
+        return behaviour
+
+    def _rng(self, command: str, flags: dict, positional: list) -> random.Random:
+        """Random source depending only on the command and how often it ran before."""
+        key = json.dumps(
+            [command, self.schema, self.workspace, _targets(flags), positional[:1]]
+        )
+        attempt = 0
+        if self.config:
+            with self._locked():
+                counters_path = os.path.join(self.schema_dir, ".attempts.json")
+                try:
+                    with open(counters_path) as f:
+                        counters = json.load(f)
+                except (OSError, ValueError):
+                    counters = {}
+                attempt = counters.get(key, 0)
+                counters[key] = attempt + 1
+                with open(counters_path, "w") as f:
+                    json.dump(counters, f)
+        return random.Random(f"{self.config.get('seed', 0)}:{key}:{attempt}")
+
+
+def _module_output(attribute: str, module: dict, instance: dict, module_name: str):
+    """Value of an output of a node module, following the cloud templates."""
+    role = module.get("k3s_role", instance.get("k3s_role"))
+    ip = instance.get("public_ip")
+    values = {
+        "cluster_name": module.get("cluster_name"),
+        "master_ip": ip if role == "master" else module.get("master_ip"),
+        "worker_ip": ip if role == "worker" else None,
+        "ha_ip": ip if role == "ha" else None,
+        "k3s_token": module.get("k3s_token"),
+        "resource_name": module.get("resource_name", module_name),
+        "instance_status": instance.get("id"),
+        "instance_power_state": instance.get("power_state", "active"),
+    }
+    return values.get(attribute)
+
+
+def _empty_state() -> dict:
+    return {"version": 4, "serial": 0, "outputs": {}, "resources": []}
+
+
+def _split_args(args: list[str]) -> tuple[dict, list]:
+    """Split arguments into flags, e.g. {"target": [...], "out": "plan"}, and positionals."""
+    flags, positional = {}, []
+    for arg in args:
+        if not arg.startswith("-"):
+            positional.append(arg)
+            continue
+        name, _, value = arg.lstrip("-").partition("=")
+        if name == "target":
+            flags.setdefault("target", []).append(value)
+        else:
+            flags[name] = value
+    return flags, positional
+
+
+def _targets(flags: dict) -> list[str]:
+    return [t[len("module."):] if t.startswith("module.") else t for t in flags.get("target", [])]
+
+
+def _emit_padding(command: str, output_bytes: int) -> None:
+    """Print filler progress lines, emulating verbose provisioner output."""
+    written, n = 0, 0
+    while written < output_bytes:
+        line = f"emulated.{command.replace(' ', '_')}: Still running... [{n}s elapsed]"
+        print(line)
+        written += len(line) + 1
+        n += 1
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    try:
+        return TofuEmulator(os.getcwd(), dict(os.environ)).run(argv)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,6 +2,8 @@
 Utility functions for the Cluster Builder.
 """
 
+from cluster_builder.utils.cache import get_cache_dir
 from cluster_builder.utils.logging import configure_logging
+from cluster_builder.utils.telemetry import configure_telemetry
 
-__all__ = ["configure_logging"]
+__all__ = ["configure_logging", "configure_telemetry", "get_cache_dir"]
@@ -0,0 +1,24 @@
+"""
+Location of the cluster builder's local caches.
+"""
+
+import os
+
+
+def get_cache_dir() -> str:
+    """
+    Get the root directory for caches shared by all clusters on this host.
+
+    The location can be set with the CLUSTER_BUILDER_CACHE_DIR environment
+    variable and defaults to ~/.cache/cluster-builder (or $XDG_CACHE_HOME).
+
+    Returns:
+        Path to the cache directory
+    """
+    cache_dir = os.environ.get("CLUSTER_BUILDER_CACHE_DIR")
+    if not cache_dir:
+        xdg_cache = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+            os.path.expanduser("~"), ".cache"
+        )
+        cache_dir = os.path.join(xdg_cache, "cluster-builder")
+    return cache_dir
@@ -1,7 +1,5 @@
 import json
 import os
-import hcl2
-from lark import Tree, Token
 import logging
 import re
 
@@ -43,6 +41,8 @@ def add_backend_config(backend_tf_path, conn_str, schema_name):
 def add_module_block(main_tf_path, module_name, config):
     """
     Appends a new module block to main.tf for this RA+cluster.
+    Legacy helper for hand-written main.tf files, clusters are edited through
+    `ClusterDocument`.
     - `main_tf_path`: path to `main.tf` for this RA+cluster
     - `module_name`: e.g. "master_xyz123"
     - `config`: dict of configuration and module-specific variables
@@ -79,10 +79,12 @@ def add_module_block(main_tf_path, module_name, config):
     logger.debug("✅ Added module '%s' to %s", module_name, main_tf_path)
 
 
-def is_target_module_block(tree: Tree, module_name: str) -> bool:
+def is_target_module_block(tree: "Tree", module_name: str) -> bool:
     """
     Check if the tree is a module block with the specified name.
     """
+    from lark import Token, Tree
+
     logger.debug(f"Checking tree with data: {tree.data}, children count: {len(tree.children)}")
     logger.debug(f"Children types and values: {[ (type(c), getattr(c, 'value', None)) for c in tree.children ]}")
 
@@ -126,6 +128,8 @@ def simple_remove_module(tree, module_name, removed=False):
     A simpler function to remove module blocks that maintains the exact Tree structure
     that the write function expects.
     """
+    from lark import Tree
+
     # Don't remove the root node
     if tree.data == "start":
         # Process only the body of the start rule
@@ -176,11 +180,15 @@ def simple_remove_module(tree, module_name, removed=False):
 def remove_module_block(main_tf_path, module_name: str):
     """
     Removes a module block by name from main.tf for this cluster.
+    Legacy helper for hand-written main.tf files, clusters are edited through
+    `ClusterDocument`.
     """
     if not os.path.exists(main_tf_path):
         logger.warning("⚠️ No main.tf found at %s", main_tf_path)
         return
 
+    import hcl2
+
     try:
         with open(main_tf_path, "r") as f:
             tree = hcl2.parse(f)
@@ -231,6 +239,8 @@ def extract_template_variables(template_path):
     Raises:
         ValueError: If the template cannot be parsed or variables cannot be extracted
     """
+    import hcl2
+
     try:
         with open(template_path, "r") as f:
             parsed = hcl2.load(f)
@@ -304,4 +314,11 @@ def add_output_blocks(outputs_tf_path, module_name, output_names):
 
         logger.debug(f"✅ Added/updated outputs for module '{module_name}'")
     else:
-        logger.debug(f"⚠️ No new outputs to add or update in {outputs_tf_path}.")
\ No newline at end of file
+        logger.debug(f"⚠️ No new outputs to add or update in {outputs_tf_path}.")
+
+
+def module_output_name(module_name, output_name):
+    """
+    Name of the root output exposing `output_name` of `module_name`.
+    """
+    return f"{module_name}__{output_name}"
@@ -0,0 +1,436 @@
+"""
+Timing of the phases and commands of node operations.
+
+Phases (preparing, initialising, planning, applying, reading outputs...) and
+every command run are wrapped in spans. Spans nest, and inherit the cluster,
+node, cloud and role attributes of their enclosing span. When telemetry is
+enabled each finished span is:
+
+- observed in a Prometheus-style histogram per phase, see `MetricsRegistry`
+- handed to the registered span listeners, as structured events
+- mirrored to an OpenTelemetry tracer if one is configured, or any object
+  with a compatible `start_as_current_span(name, attributes=...)` method
+
+Telemetry is disabled by default, in which case `span` returns a shared no-op
+context manager. It is enabled with `configure_telemetry` or by setting the
+CLUSTER_BUILDER_TELEMETRY environment variable to 1.
+"""
+
+import bisect
+import contextvars
+import functools
+import inspect
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger("swarmchestrate")
+
+# Attributes a span inherits from its enclosing span
+INHERITED_ATTRIBUTES = ("cluster", "node", "cloud", "role")
+
+# Attributes used as metric labels; cluster and node are left out as every
+# cluster would otherwise create its own time series
+METRIC_LABELS = ("phase", "cloud", "role", "status")
+
+# Histogram buckets in seconds, from quick commands to slow cloud applies
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0
+)
+
+PHASE_HISTOGRAM = "cluster_builder_phase_duration_seconds"
+
+# Callback receiving each finished span
+SpanListener = Callable[["Span"], None]
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "cluster_builder_span", default=None
+)
+
+
+class Span:
+    """A timed phase of a node operation."""
+
+    __slots__ = ("name", "attributes", "parent", "start_time", "duration", "status", "error", "_start", "_otel_span")
+
+    def __init__(self, name: str, attributes: dict[str, Any], parent: Optional["Span"] = None):
+        self.name = name
+        self.attributes = attributes
+        self.parent = parent
+        self.start_time = time.time()
+        self.duration = None
+        self.status = "ok"
+        self.error = None
+        self._start = time.perf_counter()
+        self._otel_span = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Set an attribute, also inherited by the spans started afterwards inside this one."""
+        if value is None:
+            return
+        self.attributes[key] = value
+        if self._otel_span is not None:
+            self._otel_span.set_attribute(key, value)
+
+    def set_attributes(self, **attributes) -> None:
+        """Set several attributes, see `set_attribute`."""
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+    def to_dict(self) -> dict:
+        """Return the span as a structured event."""
+        return {
+            "name": self.name,
+            "parent": self.parent.name if self.parent else None,
+            "start_time": self.start_time,
+            "duration": self.duration,
+            "status": self.status,
+            "error": self.error,
+            "attributes": dict(self.attributes),
+        }
+
+
+class _NoopSpan:
+    """Span handed out while telemetry is disabled."""
+
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, **attributes) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _SpanContext:
+    """Context manager timing one span."""
+
+    __slots__ = ("telemetry", "name", "attributes", "span", "token", "otel_context")
+
+    def __init__(self, telemetry: "Telemetry", name: str, attributes: dict[str, Any]):
+        self.telemetry = telemetry
+        self.name = name
+        self.attributes = attributes
+        self.otel_context = None
+
+    def __enter__(self) -> Span:
+        parent = _current_span.get()
+        attributes = {}
+        if parent is not None:
+            attributes = {k: parent.attributes[k] for k in INHERITED_ATTRIBUTES if k in parent.attributes}
+        attributes.update((k, v) for k, v in self.attributes.items() if v is not None)
+
+        self.span = Span(self.name, attributes, parent)
+        tracer = self.telemetry.tracer
+        if tracer is not None:
+            try:
+                self.otel_context = tracer.start_as_current_span(self.name, attributes=dict(attributes))
+                self.span._otel_span = self.otel_context.__enter__()
+            except Exception as e:
+                self.otel_context = None
+                logger.warning(f"⚠️ Tracer failed to start span '{self.name}': {e}")
+        self.token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        span = self.span
+        span.duration = time.perf_counter() - span._start
+        if exc is not None:
+            span.status = "error"
+            span.error = str(exc)
+        _current_span.reset(self.token)
+
+        if self.otel_context is not None:
+            try:
+                # OpenTelemetry records the exception and error status itself
+                self.otel_context.__exit__(exc_type, exc, tb)
+            except Exception as e:
+                logger.warning(f"⚠️ Tracer failed to end span '{self.name}': {e}")
+        self.telemetry.finish(span)
+        return False
+
+
+class Histogram:
+    """A Prometheus-style histogram, with one set of buckets per label values."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: tuple[str, ...],
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        """
+        Initialise the Histogram.
+
+        Args:
+            name: Metric name
+            documentation: Help text of the metric
+            label_names: Names of the labels, in the order their values are observed
+            buckets: Upper bounds of the buckets, in increasing order
+        """
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, label_values: tuple = ()) -> None:
+        """
+        Record a value.
+
+        Args:
+            value: Observed value
+            label_values: Values of the labels, in the order of `label_names`
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # Counts per bucket (the last one being +Inf), then the sum
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def snapshot(self) -> dict[tuple, dict]:
+        """
+        Get the current values of every series.
+
+        Returns:
+            Per label values: the cumulative "buckets" counts keyed by upper bound,
+            the "count" and the "sum" of the observed values
+        """
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        snapshot = {}
+        for labels, values in series.items():
+            cumulative, buckets = 0, {}
+            for bound, count in zip(self.buckets + (float("inf"),), values[:-1]):
+                cumulative += count
+                buckets[bound] = cumulative
+            snapshot[labels] = {"buckets": buckets, "count": cumulative, "sum": values[-1]}
+        return snapshot
+
+    def render(self) -> list[str]:
+        """Return the histogram in the Prometheus text exposition format."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for label_values, series in sorted(self.snapshot().items()):
+            labels = [f'{k}="{_escape_label(str(v))}"' for k, v in zip(self.label_names, label_values)]
+            for bound, count in series["buckets"].items():
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                bucket_labels = ",".join(labels + [f'le="{le}"'])
+                lines.append(f"{self.name}_bucket{{{bucket_labels}}} {count}")
+            suffix = f"{{{','.join(labels)}}}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {series['sum']}")
+            lines.append(f"{self.name}_count{suffix} {series['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """A set of metrics, rendered together for scraping."""
+
+    def __init__(self):
+        self._metrics: dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        label_names: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """
+        Get a histogram, created on first use.
+
+        Args:
+            name: Metric name
+            documentation: Help text of the metric
+            label_names: Names of the labels
+            buckets: Upper bounds of the buckets
+
+        Returns:
+            The histogram registered under the name
+        """
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = Histogram(name, documentation, label_names, buckets)
+            return metric
+
+    def get(self, name: str) -> Optional[Histogram]:
+        """Get a registered metric by name."""
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+class Telemetry:
+    """Telemetry settings and the destinations of finished spans."""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.tracer = None
+        self.registry = MetricsRegistry()
+        self.listeners: list[SpanListener] = []
+
+    def finish(self, span: Span) -> None:
+        histogram = self.registry.histogram(
+            PHASE_HISTOGRAM, "Duration of the phases and commands of node operations", METRIC_LABELS
+        )
+        histogram.observe(
+            span.duration,
+            (span.name, span.attributes.get("cloud", ""), span.attributes.get("role", ""), span.status),
+        )
+        for listener in self.listeners:
+            try:
+                listener(span)
+            except Exception as e:
+                logger.warning(f"⚠️ Span listener failed for '{span.name}': {e}")
+
+
+_telemetry = Telemetry(
+    enabled=os.getenv("CLUSTER_BUILDER_TELEMETRY", "").lower() in ("1", "true", "yes")
+)
+
+
+def configure_telemetry(
+    enabled: bool = True,
+    tracer: Optional[Any] = None,
+    registry: Optional[MetricsRegistry] = None,
+    listeners: Optional[list[SpanListener]] = None,
+) -> None:
+    """
+    Configure or reconfigure telemetry.
+
+    Args:
+        enabled: Whether spans are recorded at all
+        tracer: Optional OpenTelemetry tracer, e.g. `trace.get_tracer("cluster_builder")`,
+            every span is mirrored to
+        registry: Registry the phase histograms are recorded in, defaults to
+            the current one
+        listeners: Functions called with every finished span, replacing the
+            current ones
+    """
+    _telemetry.enabled = enabled
+    _telemetry.tracer = tracer
+    if registry is not None:
+        _telemetry.registry = registry
+    if listeners is not None:
+        _telemetry.listeners = list(listeners)
+
+
+def add_span_listener(listener: SpanListener) -> None:
+    """
+    Register a function called with every finished span.
+
+    Args:
+        listener: Function receiving the `Span`, see `Span.to_dict` for a
+            structured event
+    """
+    _telemetry.listeners.append(listener)
+
+
+def span(name: str, **attributes) -> "_SpanContext | _NoopSpan":
+    """
+    Time a phase.
+
+    Args:
+        name: Name of the phase, e.g. "plan"
+        **attributes: Span attributes such as cluster, node, cloud and role,
+            None values are left out
+
+    Returns:
+        A context manager yielding the `Span`, or a no-op span when telemetry
+        is disabled
+    """
+    if not _telemetry.enabled:
+        return _NOOP_SPAN
+    return _SpanContext(_telemetry, name, attributes)
+
+
+def traced(name: str, **arguments: str) -> Callable:
+    """
+    Decorator timing every call of a function in a span.
+
+    Args:
+        name: Name of the phase
+        **arguments: Span attributes mapped to the name of the function
+            argument holding their value, e.g. cluster="cluster_name"
+
+    Returns:
+        The decorator
+    """
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _telemetry.enabled:
+                return func(*args, **kwargs)
+            bound = signature.bind_partial(*args, **kwargs).arguments
+            attributes = {attribute: bound.get(argument) for attribute, argument in arguments.items()}
+            with _SpanContext(_telemetry, name, attributes):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def current_span() -> "Span | _NoopSpan":
+    """Get the innermost span being timed, or a no-op span if there is none."""
+    return _current_span.get() or _NOOP_SPAN
+
+
+def get_registry() -> MetricsRegistry:
+    """Get the registry the phase histograms are recorded in."""
+    return _telemetry.registry
+
+
+def is_enabled() -> bool:
+    """Whether telemetry is enabled."""
+    return _telemetry.enabled
+
+
+def command_phase(command: list) -> str:
+    """
+    Name the span of a command, e.g. "tofu apply" or "tofu workspace select".
+
+    Args:
+        command: List containing the command and its arguments
+
+    Returns:
+        The program and its subcommands, without arguments
+    """
+    words = [command[0]] if command else []
+    for arg in command[1:3]:
+        if arg.startswith("-"):
+            break
+        words.append(arg)
+        if arg != "workspace":
+            break
+    return " ".join(words)
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
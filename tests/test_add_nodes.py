@@ -0,0 +1,166 @@
+import os
+import shutil
+import stat
+import tempfile
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+from cluster_builder import Swarmchestrate
+from cluster_builder.config import ClusterDocument
+from cluster_builder.infrastructure import FloatingIPAllocator
+from cluster_builder.orchestration import OrchestrationEngine
+from cluster_builder.testing import install_emulator
+
+# Set up logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), "..", "cluster_builder", "templates")
+
+# Records when every OpenTofu command starts and ends, with its workspace
+TOFU_WRAPPER = """#!/bin/sh
+echo "start ${TF_WORKSPACE:--} $*" >> "$TOFU_LOG"
+"$TOFU_EMULATOR" "$@"
+status=$?
+echo "end ${TF_WORKSPACE:--} $*" >> "$TOFU_LOG"
+exit $status
+"""
+
+
+class FakeOpenStack:
+    """OpenStack connection whose project has unattached floating IPs."""
+
+    def __init__(self, count):
+        self.floating_ips = [
+            SimpleNamespace(id=f"fip-{n}", floating_ip_address=f"203.0.113.{n}", port_id=None)
+            for n in range(1, count + 1)
+        ]
+        self.listings = 0
+        self.network = self
+
+    def __call__(self):
+        return self
+
+    def ips(self, **filters):
+        self.listings += 1
+        return self.floating_ips
+
+
+def _orchestrator(temp_dir, monkeypatch, emulator_config=None):
+    emulator = install_emulator(os.path.join(temp_dir, "emulator"), emulator_config)
+    bin_dir = os.path.join(temp_dir, "bin")
+    os.makedirs(bin_dir)
+    tofu = os.path.join(bin_dir, "tofu")
+    with open(tofu, "w") as f:
+        f.write(TOFU_WRAPPER)
+    os.chmod(tofu, os.stat(tofu).st_mode | stat.S_IEXEC)
+
+    log = os.path.join(temp_dir, "calls.log")
+    monkeypatch.setenv("PATH", bin_dir + os.pathsep + os.environ["PATH"])
+    monkeypatch.setenv("TOFU_LOG", log)
+    monkeypatch.setenv("TOFU_EMULATOR", emulator)
+    monkeypatch.setenv("TOFU_EMULATOR_ROOT", os.path.join(temp_dir, "states"))
+    monkeypatch.setenv("CLUSTER_BUILDER_CACHE_DIR", os.path.join(temp_dir, "cache"))
+    monkeypatch.delenv("CLUSTER_BUILDER_K3S_VERSION", raising=False)
+    for name in ("POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_HOST", "POSTGRES_DATABASE"):
+        monkeypatch.setenv(name, "test")
+
+    # Role scripts are copied next to the cloud templates, keep them out of the package
+    templates_dir = os.path.join(temp_dir, "templates")
+    shutil.copytree(TEMPLATES_DIR, templates_dir)
+    orchestrator = Swarmchestrate(templates_dir, os.path.join(temp_dir, "output"), state_access="cli")
+    orchestrator.template_manager.templates_dir = templates_dir
+    return orchestrator, log
+
+
+def _calls(log, event="start"):
+    with open(log) as f:
+        return [line.split(" ", 1)[1] for line in f.read().splitlines() if line.startswith(event)]
+
+
+def _edge_config(resource_name, ip):
+    return {
+        "cloud": "edge",
+        "k3s_role": "worker",
+        "cluster_name": "test",
+        "resource_name": resource_name,
+        "master_ip": "192.0.2.1",
+        "edge_device_ip": ip,
+        "ssh_user": "test",
+        "ssh_auth_method": "key",
+        "ssh_key": "/dev/null",
+    }
+
+
+def _openstack_config(resource_name):
+    return {
+        "cloud": "openstack",
+        "k3s_role": "worker",
+        "cluster_name": "test",
+        "resource_name": resource_name,
+        "master_ip": "192.0.2.1",
+        "k3s_token": "token",
+        "volume_size": 10,
+        "openstack_image_id": "image",
+        "openstack_flavor_id": "flavor",
+        "network_id": "network",
+        "ssh_user": "ubuntu",
+        "ssh_key": "/dev/null",
+    }
+
+
+def test_batch_shares_one_init_and_applies_concurrently(monkeypatch):
+    """Nodes of a batch are applied side by side in their own workspaces after a single init."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        orchestrator, log = _orchestrator(temp_dir, monkeypatch, {"apply": {"latency": 0.5}})
+        configs = [_edge_config(f"node-{n}", f"192.0.2.{10 + n}") for n in range(3)]
+
+        results = orchestrator.add_nodes(configs, parallelism=3)
+
+        started = _calls(log)
+        assert len([call for call in started if " init " in call]) == 1, started
+        applies = [call for call in started if " apply " in call]
+        assert sorted(call.split()[0] for call in applies) == ["node-0", "node-1", "node-2"]
+
+        # Every apply started before the first one ended
+        with open(log) as f:
+            events = [line for line in f.read().splitlines() if " apply " in line]
+        assert [line.split()[0] for line in events[:3]] == ["start"] * 3, events
+
+        # Each node reads its own outputs, namespaced by its module
+        assert [r["resource_name"] for r in results] == ["node-0", "node-1", "node-2"]
+        assert [r["worker_ip"] for r in results] == ["192.0.2.10", "192.0.2.11", "192.0.2.12"]
+        document = ClusterDocument.load(orchestrator.get_cluster_output_dir("test"))
+        assert document.outputs["node-1__worker_ip"] == {"value": "${module.node-1.worker_ip}"}
+
+
+def test_batch_hands_out_floating_ips_up_front(monkeypatch):
+    """OpenStack nodes of a batch get distinct floating IPs from a single lookup."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        orchestrator, log = _orchestrator(temp_dir, monkeypatch)
+        openstack = FakeOpenStack(3)
+        orchestrator.floating_ips = FloatingIPAllocator(connect=openstack)
+
+        orchestrator.add_nodes([_openstack_config("os-0"), _openstack_config("os-1")], parallelism=2)
+
+        assert openstack.listings == 1, "Floating IPs were looked up per node"
+        modules = ClusterDocument.load(orchestrator.get_cluster_output_dir("test")).modules
+        assert [modules[name]["floating_ip"] for name in ("os-0", "os-1")] == ["203.0.113.1", "203.0.113.2"]
+        assert [modules[name]["floating_ip_id"] for name in ("os-0", "os-1")] == ["fip-1", "fip-2"]
+        assert [ip["id"] for ip in orchestrator.floating_ips.available()] == ["fip-3"]
+
+
+def test_missing_tofu_logging_settings_fail_the_job(monkeypatch):
+    """A misconfigured environment fails the job instead of exiting its worker thread."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        orchestrator, _ = _orchestrator(temp_dir, monkeypatch)
+        monkeypatch.setenv("TF_LOG", "")
+
+        with OrchestrationEngine(orchestrator) as engine:
+            job = engine.submit_add_nodes([_edge_config("node-0", "192.0.2.10")])
+            with pytest.raises(RuntimeError, match="TF_LOG"):
+                job.result(timeout=30)
+
+        assert job.status == "failed"
@@ -0,0 +1,131 @@
+import hashlib
+import logging
+import os
+import platform
+import re
+import subprocess
+
+import pytest
+
+from cluster_builder import Swarmchestrate
+from cluster_builder.infrastructure import K3sArtifactCache
+
+# Set up logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), "..", "cluster_builder", "templates")
+
+RELEASE_URL = "https://releases.example.com/k3s"
+VERSION = "v1.31.4+k3s1"
+BINARY = b"\x7fELF k3s binary"
+
+
+class FakeDownloads:
+    """Serves release assets from memory and records the fetched URLs."""
+
+    def __init__(self, files):
+        self.files = files
+        self.urls = []
+
+    def __call__(self, url, path):
+        self.urls.append(url)
+        if url not in self.files:
+            raise OSError(f"404 Not Found: {url}")
+        with open(path, "wb") as f:
+            f.write(self.files[url])
+
+
+def _release(binary_name="k3s", checksum_name="sha256sum-amd64.txt", binary=BINARY):
+    base = f"{RELEASE_URL}/v1.31.4%2Bk3s1"
+    checksum = hashlib.sha256(BINARY).hexdigest()
+    return {
+        f"{base}/{checksum_name}": f"{checksum}  {binary_name}\n0000  k3s-airgap-images.tar\n".encode(),
+        f"{base}/{binary_name}": binary,
+        "https://scripts.example.com/v1.31.4%2Bk3s1/install.sh": b"#!/bin/sh\necho install\n",
+    }
+
+
+def _cache(tmp_path, downloads):
+    return K3sArtifactCache(
+        str(tmp_path),
+        release_url=RELEASE_URL,
+        install_script_url="https://scripts.example.com/{version}/install.sh",
+        download=downloads,
+    )
+
+
+def test_artifacts_are_downloaded_once(tmp_path):
+    """A pinned version is fetched and verified once, then served from the cache."""
+    downloads = FakeDownloads(_release())
+    cache = _cache(tmp_path, downloads)
+
+    paths = cache.ensure(VERSION)
+    assert paths == cache.paths(VERSION, "amd64")
+    assert paths["binary"].startswith(os.path.join(str(tmp_path), "k3s", VERSION, "amd64"))
+    with open(paths["binary"], "rb") as f:
+        assert f.read() == BINARY
+    assert os.access(paths["install_script"], os.X_OK)
+    assert len(downloads.urls) == 3
+
+    assert cache.ensure(VERSION) == paths
+    assert len(downloads.urls) == 3, "Cached artifacts were downloaded again"
+    logger.info("k3s artifacts are cached per version and architecture")
+
+
+def test_arm_release_assets(tmp_path):
+    downloads = FakeDownloads(_release("k3s-armhf", "sha256sum-arm.txt"))
+    paths = _cache(tmp_path, downloads).ensure(VERSION, "arm")
+    assert paths["binary"].endswith(os.path.join("arm", "k3s"))
+
+    with pytest.raises(ValueError, match="Unsupported k3s architecture"):
+        _cache(tmp_path, downloads).ensure(VERSION, "riscv64")
+
+
+def test_checksum_mismatch_is_not_cached(tmp_path):
+    """A corrupted download fails and leaves nothing behind for later nodes."""
+    cache = _cache(tmp_path, FakeDownloads(_release(binary=b"truncated")))
+    with pytest.raises(RuntimeError, match="Checksum mismatch"):
+        cache.ensure(VERSION)
+    assert not any(os.path.exists(path) for path in cache.paths(VERSION).values())
+
+    cache = _cache(tmp_path, FakeDownloads({}))
+    with pytest.raises(RuntimeError, match="Failed to download k3s"):
+        cache.ensure(VERSION)
+
+
+def test_edge_devices_must_name_their_architecture(tmp_path, monkeypatch):
+    """An edge device is not assumed to be amd64 when a pinned binary is uploaded to it."""
+    monkeypatch.setenv("CLUSTER_BUILDER_CACHE_DIR", str(tmp_path / "cache"))
+    for name in ("POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_HOST", "POSTGRES_DATABASE"):
+        monkeypatch.setenv(name, "test")
+    orchestrator = Swarmchestrate("templates", str(tmp_path / "output"), state_access="cli")
+    orchestrator.k3s_artifacts = _cache(tmp_path, FakeDownloads(_release("k3s-arm64", "sha256sum-arm64.txt")))
+
+    config = {"cloud": "edge", "resource_name": "edge-pi", "k3s_version": VERSION}
+    with pytest.raises(ValueError, match="must set k3s_arch"):
+        orchestrator._add_k3s_artifacts(dict(config))
+
+    config["k3s_arch"] = "arm64"
+    orchestrator._add_k3s_artifacts(config)
+    assert config["k3s_binary_path"].endswith(os.path.join("arm64", "k3s"))
+
+
+@pytest.mark.parametrize("role", ["master", "ha", "worker"])
+def test_uploaded_binary_for_another_architecture_is_not_installed(role, tmp_path):
+    machines = {"x86_64": b"\x3e\x00", "aarch64": b"\xb7\x00"}
+    if platform.machine() not in machines:
+        pytest.skip(f"No ELF machine for {platform.machine()}")
+    with open(os.path.join(TEMPLATES_DIR, f"{role}_user_data.sh.tpl")) as f:
+        function = re.search(r"^binary_matches_node\(\) \{.*?^\}$", f.read(), re.M | re.S).group(0)
+
+    def matches(machine):
+        binary = tmp_path / "k3s"
+        binary.write_bytes(b"\x7fELF\x02\x01\x01" + b"\x00" * 11 + machine + b"\x00" * 46)
+        script = f'log_message() {{ echo "$1"; }}\n{function}\nbinary_matches_node {binary}'
+        return subprocess.run(["bash", "-c", script], capture_output=True, text=True)
+
+    assert matches(machines[platform.machine()]).returncode == 0
+    other = matches(b"\x28\x00")
+    assert other.returncode == 1
+    assert "built for arm" in other.stdout
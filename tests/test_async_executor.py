@@ -0,0 +1,78 @@
+import asyncio
+import os
+import sys
+import tempfile
+import logging
+
+from cluster_builder.infrastructure import AsyncCommandExecutor
+
+# Set up logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+
+def test_run_command_hands_every_line_to_callbacks():
+    lines = []
+    script = "import sys\nfor i in range(1000): print(f'line {i}')\nprint('warn', file=sys.stderr)"
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output = asyncio.run(
+            AsyncCommandExecutor.run_command(
+                [sys.executable, "-c", script],
+                cwd=temp_dir,
+                callbacks=[lambda stream, line: lines.append((stream, line))],
+            )
+        )
+
+    assert len([line for stream, line in lines if stream == "stdout"]) == 1000
+    assert ("stderr", "warn") in lines
+    assert output.splitlines()[-1] == "line 999"
+
+
+def test_run_command_reports_failure():
+    script = "import sys\nprint('boom', file=sys.stderr)\nsys.exit(2)"
+    with tempfile.TemporaryDirectory() as temp_dir:
+        try:
+            asyncio.run(
+                AsyncCommandExecutor.run_command([sys.executable, "-c", script], cwd=temp_dir)
+            )
+            assert False, "Exception was not raised"
+        except RuntimeError as e:
+            assert "boom" in str(e)
+
+
+def test_cancellation_stops_the_child_process():
+    # The child ignores SIGINT, so it has to be killed after the grace period
+    script = (
+        "import os, signal, sys, time\n"
+        "signal.signal(signal.SIGINT, signal.SIG_IGN)\n"
+        "print(os.getpid(), flush=True)\n"
+        "time.sleep(60)"
+    )
+    pids = []
+
+    async def scenario():
+        task = asyncio.create_task(
+            AsyncCommandExecutor.run_command(
+                [sys.executable, "-c", script],
+                cwd=temp_dir,
+                callbacks=[lambda stream, line: pids.append(int(line))],
+                kill_grace_period=0.5,
+            )
+        )
+        while not pids:
+            await asyncio.sleep(0.05)
+        task.cancel()
+        try:
+            await task
+            assert False, "Task was not cancelled"
+        except asyncio.CancelledError:
+            pass
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        asyncio.run(asyncio.wait_for(scenario(), timeout=20))
+
+    try:
+        os.kill(pids[0], 0)
+        assert False, "Child process is still running"
+    except ProcessLookupError:
+        pass
@@ -0,0 +1,112 @@
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import logging
+
+from cluster_builder import AsyncSwarmchestrate
+from cluster_builder.config import ClusterDocument
+from cluster_builder.testing import install_emulator
+
+# Set up logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), "..", "cluster_builder", "templates")
+
+
+def _orchestrator(temp_dir, monkeypatch, emulator_config=None, **kwargs):
+    bin_dir = os.path.dirname(install_emulator(os.path.join(temp_dir, "bin"), emulator_config))
+    monkeypatch.setenv("PATH", bin_dir + os.pathsep + os.environ["PATH"])
+    monkeypatch.setenv("TOFU_EMULATOR_ROOT", os.path.join(temp_dir, "states"))
+    monkeypatch.setenv("CLUSTER_BUILDER_CACHE_DIR", os.path.join(temp_dir, "cache"))
+    monkeypatch.delenv("TF_WORKSPACE", raising=False)
+    monkeypatch.delenv("CLUSTER_BUILDER_K3S_VERSION", raising=False)
+    for name in ("POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_HOST", "POSTGRES_DATABASE"):
+        monkeypatch.setenv(name, "test")
+    # Role scripts are copied next to the cloud templates, keep them out of the package
+    templates_dir = os.path.join(temp_dir, "templates")
+    shutil.copytree(TEMPLATES_DIR, templates_dir)
+    orchestrator = AsyncSwarmchestrate(
+        templates_dir, os.path.join(temp_dir, "output"), state_access="cli", **kwargs
+    )
+    orchestrator.swarmchestrate.template_manager.templates_dir = templates_dir
+    return orchestrator
+
+
+def _edge_config(resource_name, ip):
+    return {
+        "cloud": "edge",
+        "k3s_role": "worker",
+        "cluster_name": "test",
+        "resource_name": resource_name,
+        "master_ip": "192.0.2.1",
+        "edge_device_ip": ip,
+        "ssh_user": "test",
+        "ssh_auth_method": "key",
+        "ssh_key": "/dev/null",
+    }
+
+
+def _applied_modules(temp_dir):
+    """Modules recorded in the emulated state of each workspace of the cluster."""
+    schema_dir = os.path.join(temp_dir, "states", "test")
+    modules = {}
+    for name in sorted(os.listdir(schema_dir)):
+        if name.endswith(".json") and not name.startswith("."):
+            with open(os.path.join(schema_dir, name)) as f:
+                modules[name[: -len(".json")]] = [r["module"] for r in json.load(f)["resources"]]
+    return modules
+
+
+def test_remove_node_applies_no_other_module(monkeypatch):
+    """Removing a node must not create the remaining nodes in its workspace."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        orchestrator = _orchestrator(temp_dir, monkeypatch)
+
+        async def scenario():
+            await orchestrator.add_node(_edge_config("node-a", "192.0.2.10"))
+            await orchestrator.add_node(_edge_config("node-b", "192.0.2.11"))
+            assert _applied_modules(temp_dir) == {"node-a": ["module.node-a"], "node-b": ["module.node-b"]}
+
+            lines = []
+            orchestrator.output_callbacks.append(lambda stream, line: lines.append(line))
+            await orchestrator.remove_node("test", "node-a")
+            return lines
+
+        lines = asyncio.run(scenario())
+
+        assert not [line for line in lines if "Creation complete" in line], lines
+        modules = _applied_modules(temp_dir)
+        assert "node-a" not in modules, "Workspace of the removed node was not deleted"
+        assert modules.get("node-b") == ["module.node-b"]
+        assert not [ws for ws, applied in modules.items() if ws != "node-b" and applied], modules
+        outputs = ClusterDocument.load(orchestrator.get_cluster_output_dir("test")).outputs
+        assert "node-b__worker_ip" in outputs, "Outputs of the remaining node were removed"
+        assert not [name for name in outputs if name.startswith("node-a__")]
+
+
+def test_adding_a_node_does_not_wait_for_a_removal(monkeypatch):
+    """Only the cluster file edits of a removal are serialised, not its destroy."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        orchestrator = _orchestrator(
+            temp_dir, monkeypatch, {"destroy": {"latency": 1.5}}, per_cluster_concurrency=2
+        )
+
+        async def scenario():
+            await orchestrator.add_node(_edge_config("node-a", "192.0.2.10"))
+            finished = []
+
+            async def timed(name, operation):
+                await operation
+                finished.append(name)
+
+            await asyncio.gather(
+                timed("remove", orchestrator.remove_node("test", "node-a")),
+                timed("add", orchestrator.add_node(_edge_config("node-b", "192.0.2.11"))),
+            )
+            return finished
+
+        assert asyncio.run(scenario()) == ["add", "remove"], "Adding a node waited for the destroy"
+        assert _applied_modules(temp_dir) == {"node-b": ["module.node-b"]}
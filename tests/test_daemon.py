@@ -0,0 +1,166 @@
+import json
+import logging
+import os
+import stat
+import threading
+
+import pytest
+
+from cluster_builder.cli import main
+from cluster_builder.daemon import ClusterBuilderClient
+from cluster_builder.daemon import ClusterBuilderServer
+from cluster_builder.daemon.client import _UnixHTTPConnection
+from cluster_builder.daemon.server import token_path
+from cluster_builder.infrastructure import NodeRecord
+from cluster_builder.orchestration import OrchestrationEngine
+
+# Set up logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+
+class FakeClusterConfig:
+    def generate_random_name(self):
+        return "generated-cluster"
+
+
+class FakeSwarmchestrate:
+    """Stands in for the warm orchestrator held by the daemon."""
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.cluster_config = FakeClusterConfig()
+        self.calls = []
+
+    def get_cluster_output_dir(self, cluster_name):
+        return os.path.join(self.output_dir, f"cluster_{cluster_name}")
+
+    def add_node(self, config, dryrun=False):
+        self.calls.append(("add_node", config["cluster_name"], dryrun))
+        return {"cluster_name": config["cluster_name"], "master_ip": "10.0.0.1"}
+
+    def remove_node(self, cluster_name, resource_name, dryrun=False):
+        self.calls.append(("remove_node", cluster_name, resource_name))
+        raise RuntimeError(f"Node '{resource_name}' not found")
+
+    def inventory(self):
+        return {"alpha": [NodeRecord("alpha", "master-1", "master", "aws", public_ip="1.2.3.4")]}
+
+    def cluster_inventory(self, cluster_name):
+        return self.inventory().get(cluster_name, [])
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    swarmchestrate = FakeSwarmchestrate(str(tmp_path / "output"))
+    engine = OrchestrationEngine(swarmchestrate, max_workers=2, max_finished_jobs=2)
+    server = ClusterBuilderServer(engine, str(tmp_path / "daemon.sock"))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, swarmchestrate
+    server.shutdown()
+    server.close()
+    thread.join(timeout=5)
+
+
+def test_client_forwards_operations_to_daemon(daemon):
+    """Operations run on the daemon's orchestrator and return their results."""
+    server, swarmchestrate = daemon
+    client = ClusterBuilderClient(server.address, timeout=10)
+
+    assert client.health()["status"] == "ok"
+    outputs = client.add_node({"cloud": "aws", "k3s_role": "master"})
+    assert outputs == {"cluster_name": "generated-cluster", "master_ip": "10.0.0.1"}
+    assert swarmchestrate.calls == [("add_node", "generated-cluster", False)]
+
+    inventory = client.inventory()
+    assert inventory["alpha"][0]["public_ip"] == "1.2.3.4"
+    assert client.inventory("alpha")[0]["resource_name"] == "master-1"
+
+    with pytest.raises(RuntimeError, match="not found"):
+        client.remove_node("alpha", "worker-9")
+    assert [job["status"] for job in client.jobs()] == ["succeeded", "failed"]
+    logger.info("Client calls are served by the daemon")
+
+
+def test_daemon_rejects_bad_requests(daemon):
+    """Unknown routes and missing fields are reported to the client."""
+    server, _ = daemon
+    client = ClusterBuilderClient(server.address, timeout=10)
+
+    with pytest.raises(RuntimeError, match="No route"):
+        client._request("GET", "/nothing")
+    with pytest.raises(RuntimeError, match="Missing field 'config'"):
+        client._request("POST", "/nodes", {})
+    with pytest.raises(RuntimeError, match="Unknown or expired job"):
+        client.job("missing")
+
+
+def _raw_request(server, method, path, body=b"", headers=None):
+    connection = _UnixHTTPConnection(server.address, timeout=10)
+    try:
+        connection.request(method, path, body=body, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+def test_daemon_rejects_requests_a_web_page_could_send(daemon):
+    """Simple cross-origin requests and rebound host names do not reach the orchestrator."""
+    server, swarmchestrate = daemon
+    authorization = {"Authorization": f"Bearer {server.token}"}
+    body = json.dumps({"config": {"cluster_name": "a"}}).encode()
+
+    status, _ = _raw_request(server, "POST", "/nodes", body, {**authorization, "Content-Type": "text/plain"})
+    assert status == 415
+    status, _ = _raw_request(server, "POST", "/nodes", body, {"Content-Type": "application/json"})
+    assert status == 401
+    status, _ = _raw_request(
+        server, "POST", "/nodes", body, {"Authorization": "Bearer wrong", "Content-Type": "application/json"}
+    )
+    assert status == 401
+    status, _ = _raw_request(server, "GET", "/inventory", headers={**authorization, "Host": "attacker.example:80"})
+    assert status == 403
+    assert swarmchestrate.calls == []
+
+    status, payload = _raw_request(server, "GET", "/inventory", headers=authorization)
+    assert status == 200 and "alpha" in payload
+
+
+def test_daemon_socket_and_token_are_private(daemon):
+    server, _ = daemon
+    for path in (server.address, token_path(server.address)):
+        assert not stat.S_IMODE(os.stat(path).st_mode) & 0o077, f"{path} is accessible to others"
+    with open(token_path(server.address)) as f:
+        assert f.read() == server.token
+
+
+def test_daemon_forgets_finished_jobs(daemon):
+    """The daemon does not keep every job and its result forever."""
+    server, _ = daemon
+    client = ClusterBuilderClient(server.address, timeout=10)
+
+    first = client._request("POST", "/nodes", {"config": {"cluster_name": "a"}, "wait": 5})
+    for name in ("b", "c"):
+        client.add_node({"cluster_name": name})
+
+    assert len(client.jobs()) == 2
+    with pytest.raises(RuntimeError, match="Unknown or expired job"):
+        client.job(first["id"])
+
+
+def test_cli_prints_results_of_daemon(daemon, tmp_path, capsys):
+    """The CLI is a thin client printing the JSON results of the daemon."""
+    server, _ = daemon
+    config_path = tmp_path / "node.json"
+    config_path.write_text(json.dumps({"cloud": "aws", "cluster_name": "alpha"}))
+
+    assert main(["--address", server.address, "add-node", str(config_path)]) == 0
+    assert json.loads(capsys.readouterr().out)["cluster_name"] == "alpha"
+
+    assert main(["--address", server.address, "remove-node", "alpha", "worker-9"]) == 1
+    assert "not found" in capsys.readouterr().err
+
+    assert main(["--address", str(tmp_path / "missing.sock"), "health"]) == 1
+    assert "Cannot reach" in capsys.readouterr().err
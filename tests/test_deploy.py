@@ -0,0 +1,102 @@
+import os
+import shutil
+import stat
+import tempfile
+import logging
+
+from cluster_builder import Swarmchestrate
+from cluster_builder.config import TofuConfig
+
+# Set up logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), "..", "cluster_builder", "templates")
+
+FAKE_TOFU = """#!/bin/sh
+echo "${TF_WORKSPACE:--} $@" >> "$FAKE_TOFU_LOG"
+mkdir -p .terraform
+touch .terraform.lock.hcl
+case "$1 $2" in
+  "workspace list") echo "* default" ;;
+  "output -json") echo "{}" ;;
+esac
+for arg in "$@"; do
+  case "$arg" in
+    -out=*) touch "${arg#-out=}" ;;
+  esac
+done
+"""
+
+
+def _orchestrator(temp_dir, monkeypatch):
+    bin_dir = os.path.join(temp_dir, "bin")
+    os.makedirs(bin_dir)
+    tofu = os.path.join(bin_dir, "tofu")
+    with open(tofu, "w") as f:
+        f.write(FAKE_TOFU)
+    os.chmod(tofu, os.stat(tofu).st_mode | stat.S_IEXEC)
+    log = os.path.join(temp_dir, "calls.log")
+    monkeypatch.setenv("PATH", bin_dir + os.pathsep + os.environ["PATH"])
+    monkeypatch.setenv("FAKE_TOFU_LOG", log)
+    monkeypatch.setenv("CLUSTER_BUILDER_CACHE_DIR", os.path.join(temp_dir, "cache"))
+    for name in ("POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_HOST", "POSTGRES_DATABASE"):
+        monkeypatch.setenv(name, "test")
+
+    templates_dir = os.path.join(temp_dir, "templates")
+    shutil.copytree(TEMPLATES_DIR, templates_dir)
+    orchestrator = Swarmchestrate(templates_dir, os.path.join(temp_dir, "output"), state_access="cli")
+    orchestrator.template_manager.templates_dir = templates_dir
+    return orchestrator, log
+
+
+def _edge_config(resource_name, role="worker"):
+    return {
+        "cloud": "edge",
+        "k3s_role": role,
+        "cluster_name": "test",
+        "resource_name": resource_name,
+        "master_ip": "192.0.2.1",
+        "edge_device_ip": "192.0.2.10",
+        "ssh_user": "test",
+        "ssh_auth_method": "key",
+        "ssh_key": "/dev/null",
+    }
+
+
+def test_deploy_applies_the_saved_targeted_plan(monkeypatch):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        orchestrator, log = _orchestrator(temp_dir, monkeypatch)
+
+        orchestrator.add_node(_edge_config("node-a"))
+        orchestrator.add_nodes([_edge_config("node-b"), _edge_config("node-c")], parallelism=2)
+
+        with open(log) as f:
+            calls = f.read().splitlines()
+        plans = [call for call in calls if " plan " in call]
+        applies = [call for call in calls if " apply " in call]
+        # Only the module of the node is planned, without refreshing the new workspace
+        assert "- plan -input=false -target=module.node-a -out=node-a.tfplan -refresh=false" in plans
+        assert "- apply -input=false node-a.tfplan" in applies
+        # Batched nodes are planned and applied in their own workspaces
+        assert (
+            "node-b plan -input=false -target=module.node-b -out=node-b.tfplan -parallelism=2 -refresh=false"
+            in plans
+        )
+        assert "node-b apply -input=false -parallelism=2 node-b.tfplan" in applies
+        assert len(plans) == 3 and len(applies) == 3, calls
+
+        cluster_dir = orchestrator.get_cluster_output_dir("test")
+        assert not [f for f in os.listdir(cluster_dir) if f.endswith(".tfplan")], "Saved plans left behind"
+
+
+def test_tofu_timeouts_scale_with_modules(monkeypatch):
+    monkeypatch.setenv("CLUSTER_BUILDER_PLAN_TIMEOUT", "30")
+    monkeypatch.setenv("CLUSTER_BUILDER_APPLY_TIMEOUT", "600")
+    monkeypatch.setenv("CLUSTER_BUILDER_TIMEOUT_PER_MODULE", "0.1")
+    config = TofuConfig.from_env()
+
+    assert config.plan_timeout_for(1000) == 130
+    assert config.apply_timeout_for(0) == 600
+    assert TofuConfig().apply_timeout_for(1000) is None, "Applies should not time out by default"
+    assert not config.refresh_new_workspaces
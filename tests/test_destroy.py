@@ -0,0 +1,90 @@
+import os
+import stat
+import tempfile
+import logging
+
+import pytest
+
+from cluster_builder import Swarmchestrate
+from cluster_builder.orchestration import OrchestrationEngine
+
+# Set up logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+FAKE_TOFU = """#!/bin/sh
+echo "${TF_WORKSPACE:--} $@" >> "$FAKE_TOFU_LOG"
+mkdir -p .terraform
+touch .terraform.lock.hcl
+case "$1 $2" in
+  "workspace list") printf '* default\\n  node-a\\n  node-b\\n  node-bad\\n' ;;
+esac
+if [ "$1" = "destroy" ] && [ "$TF_WORKSPACE" = "node-bad" ]; then
+  echo "Error: destroy failed" >&2
+  exit 1
+fi
+"""
+
+
+def _setup(temp_dir, monkeypatch):
+    bin_dir = os.path.join(temp_dir, "bin")
+    os.makedirs(bin_dir)
+    tofu = os.path.join(bin_dir, "tofu")
+    with open(tofu, "w") as f:
+        f.write(FAKE_TOFU)
+    os.chmod(tofu, os.stat(tofu).st_mode | stat.S_IEXEC)
+    log = os.path.join(temp_dir, "calls.log")
+    monkeypatch.setenv("PATH", bin_dir + os.pathsep + os.environ["PATH"])
+    monkeypatch.setenv("FAKE_TOFU_LOG", log)
+    monkeypatch.setenv("CLUSTER_BUILDER_CACHE_DIR", os.path.join(temp_dir, "cache"))
+    for name in ("POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_HOST", "POSTGRES_DATABASE"):
+        monkeypatch.setenv(name, "test")
+    return log
+
+
+def test_destroy_reports_each_node_and_keeps_state_on_failure(monkeypatch):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        log = _setup(temp_dir, monkeypatch)
+        output_dir = os.path.join(temp_dir, "output")
+        orchestrator = Swarmchestrate(
+            os.path.join(temp_dir, "templates"), output_dir, state_access="cli"
+        )
+        dropped = []
+        orchestrator.remove_cluster_schema_from_db = dropped.append
+        cluster_dir = orchestrator.get_cluster_output_dir("test")
+        os.makedirs(cluster_dir)
+
+        with pytest.raises(RuntimeError, match="Failed to destroy 1 of 3 nodes") as error:
+            orchestrator.destroy("test", parallelism=3)
+
+        report = error.value.report
+        assert sorted(report["destroyed"]) == ["node-a", "node-b"]
+        assert list(report["failed"]) == ["node-bad"]
+        assert "destroy failed" in report["failed"]["node-bad"]
+        assert dropped == [], "Schema dropped despite a failed node"
+        assert os.path.exists(cluster_dir), "Cluster directory removed despite a failed node"
+
+        with open(log) as f:
+            calls = f.read().splitlines()
+        # Every destroy is driven through TF_WORKSPACE rather than workspace select
+        assert "node-a destroy -auto-approve -input=false" in calls
+        assert not any("workspace select node" in call for call in calls)
+        assert "- workspace delete -force node-bad" not in calls
+
+
+def test_partly_failed_destroy_fails_its_job(monkeypatch):
+    """Jobs, and so the daemon, must not report a partial teardown as succeeded."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        _setup(temp_dir, monkeypatch)
+        orchestrator = Swarmchestrate(
+            os.path.join(temp_dir, "templates"), os.path.join(temp_dir, "output"), state_access="cli"
+        )
+        orchestrator.remove_cluster_schema_from_db = lambda cluster_name: None
+        os.makedirs(orchestrator.get_cluster_output_dir("test"))
+
+        with OrchestrationEngine(orchestrator, max_workers=1) as engine:
+            job = engine.submit_destroy("test")
+            with pytest.raises(RuntimeError, match="node-bad"):
+                job.result(timeout=30)
+            assert job.status == "failed"
+            assert list(job.future.exception().report["failed"]) == ["node-bad"]
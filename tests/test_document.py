@@ -0,0 +1,84 @@
+import json
+import os
+import tempfile
+import logging
+
+from cluster_builder.config import ClusterDocument
+from cluster_builder.infrastructure import TofuInitializer
+from cluster_builder.utils.hcl import add_backend_config, add_module_block, add_output_blocks
+
+# Set up logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+
+def _node(name, **extra):
+    return {"module_source": "/templates/aws/", "resource_name": name, "ha": False, **extra}
+
+
+def test_document_round_trips_through_json():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        document = ClusterDocument.load(temp_dir)
+        document.set_backend("postgres://db", "my-cluster")
+        assert document.add_module("node-a", _node("node-a", ports=[22], token="${oops}"))
+        assert document.add_module("node-b", _node("node-b", skipped=None))
+        assert not document.add_module("node-a", _node("node-a")), "Duplicate module was added"
+        document.set_outputs("node-b", ["worker_ip"])
+        document.add_module_outputs("node-a", ["worker_ip"])
+        document.save()
+
+        with open(os.path.join(temp_dir, "main.tf.json")) as f:
+            data = json.load(f)
+        assert data["terraform"]["backend"]["pg"]["schema_name"] == "my-cluster"
+        assert list(data["module"]) == ["node-a", "node-b"]
+        assert data["module"]["node-a"]["source"] == "/templates/aws/"
+        assert data["module"]["node-a"]["ports"] == [22]
+        assert data["module"]["node-a"]["token"] == "$${oops}", "Template sequence was not escaped"
+        assert "skipped" not in data["module"]["node-b"]
+        assert data["output"]["worker_ip"]["value"] == "${module.node-b.worker_ip}"
+        assert data["output"]["node-a__worker_ip"]["value"] == "${module.node-a.worker_ip}"
+
+        # The backend is kept as is unless overwritten
+        document = ClusterDocument.load(temp_dir)
+        document.set_backend("postgres://other", "other")
+        assert document.backend["pg"]["conn_str"] == "postgres://db"
+
+        assert document.remove_module("node-a")
+        assert not document.remove_module("node-a")
+        assert list(document.outputs) == ["worker_ip"], "Outputs of the removed module were kept"
+
+
+def test_legacy_hcl_files_are_migrated_once():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        add_backend_config(os.path.join(temp_dir, "backend.tf"), "postgres://db", "legacy")
+        add_module_block(os.path.join(temp_dir, "main.tf"), "node-a", _node("node-a", count=2))
+        add_output_blocks(os.path.join(temp_dir, "outputs.tf"), "node-a", ["worker_ip"])
+
+        document = ClusterDocument.load(temp_dir)
+
+        for name in ("backend.tf", "main.tf", "outputs.tf"):
+            assert not os.path.exists(os.path.join(temp_dir, name)), f"{name} was not removed"
+        assert os.path.exists(os.path.join(temp_dir, "main.tf.json"))
+        assert document.backend["pg"]["schema_name"] == "legacy"
+        assert document.modules["node-a"]["count"] == 2
+        assert document.modules["node-a"]["ha"] is False
+        assert document.outputs["worker_ip"]["value"] == "${module.node-a.worker_ip}"
+        assert ClusterDocument.load(temp_dir).module_names() == ["node-a"]
+
+
+def test_init_fingerprint_ignores_module_arguments_and_outputs():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        document = ClusterDocument.load(temp_dir)
+        document.set_backend("postgres://db", "c")
+        document.add_module("node-a", _node("node-a", ami="ami-1"))
+        document.save()
+        before = TofuInitializer.fingerprint(temp_dir, [])
+
+        document.replace_module("node-a", _node("node-a", ami="ami-2"))
+        document.set_outputs("node-a", ["worker_ip"])
+        document.save()
+        assert TofuInitializer.fingerprint(temp_dir, []) == before
+
+        document.add_module("node-b", _node("node-b"))
+        document.save()
+        assert TofuInitializer.fingerprint(temp_dir, []) != before
@@ -0,0 +1,66 @@
+import sys
+import tempfile
+import logging
+
+from cluster_builder.infrastructure import CommandExecutor, TofuProgressParser
+
+# Set up logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+
+def test_stream_command_hands_every_line_to_callbacks():
+    lines = []
+    script = "import sys\nfor i in range(1000): print(f'line {i}')\nprint('warn', file=sys.stderr)"
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output = CommandExecutor.stream_command(
+            [sys.executable, "-c", script],
+            cwd=temp_dir,
+            callbacks=[lambda stream, line: lines.append((stream, line))],
+            tail_lines=10,
+        )
+
+    assert len([line for stream, line in lines if stream == "stdout"]) == 1000
+    assert ("stderr", "warn") in lines
+    # Only the tail is kept in memory
+    assert output.splitlines() == [f"line {i}" for i in range(990, 1000)]
+
+
+def test_stream_command_reports_stderr_tail_on_failure():
+    script = "import sys\nfor i in range(50): print(f'error {i}', file=sys.stderr)\nsys.exit(3)"
+    with tempfile.TemporaryDirectory() as temp_dir:
+        try:
+            CommandExecutor.stream_command(
+                [sys.executable, "-c", script], cwd=temp_dir, callbacks=[], tail_lines=5
+            )
+            assert False, "Exception was not raised"
+        except RuntimeError as e:
+            assert "error 49" in str(e)
+            assert "error 44" not in str(e), "More than the tail was kept"
+
+
+def test_stream_command_times_out():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        try:
+            CommandExecutor.stream_command(
+                [sys.executable, "-c", "import time; time.sleep(10)"],
+                cwd=temp_dir,
+                timeout=1,
+                callbacks=[],
+            )
+            assert False, "Exception was not raised"
+        except RuntimeError as e:
+            assert "timed out" in str(e)
+
+
+def test_progress_parser_counts_resource_events():
+    parser = TofuProgressParser()
+    for line in [
+        "module.aws-node.aws_instance.k3s_node: Creating...",
+        "module.aws-node.aws_instance.k3s_node: Still creating... [10s elapsed]",
+        "module.aws-node.aws_instance.k3s_node (remote-exec): Installing K3s",
+        "module.aws-node.aws_instance.k3s_node: Creation complete after 42s [id=i-123]",
+        "Apply complete! Resources: 1 added, 0 changed, 0 destroyed.",
+    ]:
+        parser("stdout", line)
+    assert parser.counts == {"Creating": 1, "Still creating": 1, "Creation complete": 1}
@@ -0,0 +1,137 @@
+import logging
+import os
+import shutil
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from cluster_builder import Swarmchestrate
+from cluster_builder.infrastructure import FloatingIPAllocator
+
+# Set up logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), "..", "cluster_builder", "templates")
+
+
+class _FakeNetwork:
+    """Stub of the network proxy of an OpenStack SDK connection."""
+
+    def __init__(self, ips):
+        self.ips_by_id = {ip.id: ip for ip in ips}
+        self.filters = []
+
+    def ips(self, **filters):
+        self.filters.append(filters)
+        return [
+            ip for ip in self.ips_by_id.values()
+            if all(getattr(ip, key) == value for key, value in filters.items())
+        ]
+
+
+def _ip(n, status="DOWN", port_id=None):
+    return SimpleNamespace(
+        id=f"fip-{n}", floating_ip_address=f"192.0.2.{n}", status=status, port_id=port_id
+    )
+
+
+def _allocator(ips, **kwargs):
+    network = _FakeNetwork(ips)
+    connections = []
+
+    def connect():
+        connections.append(SimpleNamespace(network=network))
+        return connections[-1]
+
+    return FloatingIPAllocator(connect=connect, **kwargs), network, connections
+
+
+def test_allocations_are_distinct_and_leased():
+    allocator, network, connections = _allocator(
+        [_ip(1), _ip(2), _ip(3, status="ACTIVE", port_id="p"), _ip(4), _ip(5, port_id="p")]
+    )
+
+    first = allocator.allocate(1)
+    batch = allocator.allocate(2)
+    assert [ip["address"] for ip in first + batch] == ["192.0.2.1", "192.0.2.2", "192.0.2.4"]
+    assert len(connections) == 1, "OpenStack connection was not reused"
+    assert network.filters == [{"status": "DOWN"}] * 2, "Unattached IPs were not filtered server-side"
+
+    with pytest.raises(RuntimeError, match="1 floating IPs required but only 0 unused"):
+        allocator.allocate(1)
+
+    allocator.release([batch[0]["id"], "unknown", None])
+    assert allocator.available() == [batch[0]]
+    assert allocator.allocate(1) == [batch[0]]
+
+
+def test_insufficient_ips_leases_nothing_and_leases_expire():
+    allocator, _, _ = _allocator([_ip(1), _ip(2)], lease_seconds=0)
+
+    with pytest.raises(RuntimeError):
+        allocator.allocate(3)
+    assert len(allocator.allocate(2)) == 2
+
+    # Expired leases make the IPs available again
+    assert len(allocator.available()) == 2
+
+
+def test_concurrent_allocations_get_distinct_ips():
+    allocator, _, _ = _allocator([_ip(n) for n in range(1, 21)])
+    allocated = []
+
+    def allocate():
+        allocated.extend(ip["id"] for ip in allocator.allocate(2))
+
+    threads = [threading.Thread(target=allocate) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(allocated) == 20 and len(set(allocated)) == 20, "An IP was handed out twice"
+
+
+def _openstack_config(resource_name):
+    return {
+        "cloud": "openstack",
+        "k3s_role": "worker",
+        "cluster_name": "test",
+        "resource_name": resource_name,
+        "master_ip": "192.0.2.1",
+        "k3s_token": "token",
+        "volume_size": 10,
+        "openstack_image_id": "image",
+        "openstack_flavor_id": "flavor",
+        "network_id": "network",
+        "ssh_user": "ubuntu",
+        "ssh_key": "/dev/null",
+    }
+
+
+def test_failed_preparation_releases_the_lease(tmp_path, monkeypatch):
+    """An IP leased while validating a node is handed out again when preparation fails."""
+    monkeypatch.setenv("CLUSTER_BUILDER_CACHE_DIR", str(tmp_path / "cache"))
+    for name in ("POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_HOST", "POSTGRES_DATABASE"):
+        monkeypatch.setenv(name, "test")
+    # Role scripts are copied next to the cloud templates, keep them out of the package
+    templates_dir = str(tmp_path / "templates")
+    shutil.copytree(TEMPLATES_DIR, templates_dir)
+    orchestrator = Swarmchestrate(templates_dir, str(tmp_path / "output"), state_access="cli")
+    orchestrator.template_manager.templates_dir = templates_dir
+    orchestrator.floating_ips, _, _ = _allocator([_ip(1), _ip(2)])
+
+    def broken_provider_config(cluster_dir, cloud):
+        raise OSError("No space left on device")
+
+    orchestrator.template_manager.create_provider_config = broken_provider_config
+
+    for dryrun in (False, True):
+        with pytest.raises(RuntimeError, match="No space left"):
+            orchestrator.add_node(_openstack_config("os-0"), dryrun=dryrun)
+        assert len(orchestrator.floating_ips.available()) == 2, f"Lease kept (dryrun={dryrun})"
+
+    with pytest.raises(RuntimeError, match="No space left"):
+        orchestrator.add_nodes([_openstack_config("os-1"), _openstack_config("os-2")])
+    assert len(orchestrator.floating_ips.available()) == 2, "Batch leases kept"
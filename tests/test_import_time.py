@@ -0,0 +1,48 @@
+import json
+import logging
+import re
+import subprocess
+import sys
+
+# Set up logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+HEAVY_MODULES = ["openstack", "psycopg2", "hcl2", "lark", "yaspin", "names_generator"]
+
+
+def run_python(code, *flags):
+    result = subprocess.run(
+        [sys.executable, *flags, "-c", code], capture_output=True, text=True, check=True
+    )
+    return result
+
+
+def test_import_defers_heavy_dependencies():
+    """Importing the package leaves the SDKs and parsers unloaded until they are used."""
+    code = f"""
+import json, sys
+import cluster_builder
+before = [m for m in {HEAVY_MODULES!r} if m in sys.modules]
+orchestrator = cluster_builder.Swarmchestrate
+print(json.dumps({{"before": before, "name": orchestrator.__name__}}))
+"""
+    output = json.loads(run_python(code).stdout.strip().splitlines()[-1])
+
+    assert output["before"] == [], f"Loaded on import: {output['before']}"
+    assert output["name"] == "Swarmchestrate"
+    logger.info("Heavy dependencies are deferred until first use")
+
+
+def test_import_time_is_small():
+    """`import cluster_builder` stays well below 100ms, best of three runs."""
+    timings = []
+    for _ in range(3):
+        stderr = run_python("import cluster_builder", "-X", "importtime").stderr
+        match = re.search(r"\|\s*(\d+)\s*\|\s*cluster_builder$", stderr, re.MULTILINE)
+        assert match, "No import time reported for cluster_builder"
+        timings.append(int(match.group(1)))
+
+    best_ms = min(timings) / 1000
+    logger.info(f"import cluster_builder took {best_ms:.1f}ms")
+    assert best_ms < 100, f"import cluster_builder took {best_ms:.1f}ms"
@@ -0,0 +1,89 @@
+import os
+import stat
+import tempfile
+import logging
+
+from cluster_builder.infrastructure import TofuInitializer
+
+# Set up logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+FAKE_TOFU = """#!/bin/sh
+echo "$@" >> "$FAKE_TOFU_LOG"
+mkdir -p .terraform
+if [ ! -f .terraform.lock.hcl ]; then
+  printf 'provider "registry.opentofu.org/hashicorp/aws" {\\n}\\n' > .terraform.lock.hcl
+fi
+"""
+
+
+def _setup(temp_dir, monkeypatch):
+    bin_dir = os.path.join(temp_dir, "bin")
+    os.makedirs(bin_dir)
+    tofu = os.path.join(bin_dir, "tofu")
+    with open(tofu, "w") as f:
+        f.write(FAKE_TOFU)
+    os.chmod(tofu, os.stat(tofu).st_mode | stat.S_IEXEC)
+    log = os.path.join(temp_dir, "calls.log")
+    monkeypatch.setenv("PATH", bin_dir + os.pathsep + os.environ["PATH"])
+    monkeypatch.setenv("FAKE_TOFU_LOG", log)
+    return log
+
+
+def _write_main(cluster_dir, modules):
+    with open(os.path.join(cluster_dir, "main.tf"), "w") as f:
+        for name, arg in modules:
+            f.write(f'module "{name}" {{\n  source = "/templates/aws/"\n  ami = "{arg}"\n}}\n\n')
+
+
+def _calls(log):
+    if not os.path.exists(log):
+        return 0
+    with open(log) as f:
+        return len(f.readlines())
+
+
+def test_init_is_skipped_until_modules_change(monkeypatch):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        log = _setup(temp_dir, monkeypatch)
+        cluster_dir = os.path.join(temp_dir, "cluster_a")
+        os.makedirs(cluster_dir)
+        _write_main(cluster_dir, [("node-1", "ami-1")])
+        initializer = TofuInitializer(os.path.join(temp_dir, "cache"))
+
+        assert initializer.init(cluster_dir, dict(os.environ), "cluster") is False
+        assert initializer.init(cluster_dir, dict(os.environ), "cluster") is True
+        # Init arguments which do not change the result are ignored
+        assert initializer.init(cluster_dir, dict(os.environ), "cluster", ["-reconfigure"]) is True
+        assert _calls(log) == 1
+
+        # Module arguments do not affect init, new modules do
+        _write_main(cluster_dir, [("node-1", "ami-2")])
+        assert initializer.init(cluster_dir, dict(os.environ), "cluster") is True
+        _write_main(cluster_dir, [("node-1", "ami-2"), ("node-2", "ami-2")])
+        assert initializer.init(cluster_dir, dict(os.environ), "cluster") is False
+        assert _calls(log) == 2
+
+
+def test_lock_file_is_shared_between_directories(monkeypatch):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        _setup(temp_dir, monkeypatch)
+        initializer = TofuInitializer(os.path.join(temp_dir, "cache"))
+
+        first = os.path.join(temp_dir, "cluster_a")
+        os.makedirs(first)
+        initializer.init(first, dict(os.environ), "cluster")
+
+        # Pretend the shared lock file was resolved differently
+        shared = os.path.join(temp_dir, "cache", "locks", "cluster.terraform.lock.hcl")
+        assert os.path.exists(shared), "Lock file was not shared"
+        with open(shared, "a") as f:
+            f.write("# shared\n")
+
+        second = os.path.join(temp_dir, "cluster_b")
+        os.makedirs(second)
+        initializer.init(second, dict(os.environ), "cluster")
+        with open(os.path.join(second, ".terraform.lock.hcl")) as f:
+            assert "# shared" in f.read(), "Shared lock file was not reused"
+        assert os.path.isdir(os.path.join(temp_dir, "cache", "plugins"))
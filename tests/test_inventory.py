@@ -0,0 +1,158 @@
+import json
+import logging
+
+import psycopg2
+
+from cluster_builder.config.postgres import PostgresConfig
+from cluster_builder.config.postgres import PostgresConnectionPool
+from cluster_builder.infrastructure import FleetInventory
+from cluster_builder.infrastructure import NodeRecord
+
+# Set up logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+
+class _FakeConnection:
+    """Connection serving the states tables of several cluster schemas."""
+
+    def __init__(self, schemas):
+        self.schemas = schemas
+        self.queries = []
+        self.closed = 0
+
+    def cursor(self):
+        return _FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class _FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params):
+        self.connection.queries.append(params)
+        if not params:
+            self.rows = [(schema,) for schema in self.connection.schemas]
+            return
+        self.rows = []
+        for schema in params:
+            if schema not in self.connection.schemas:
+                raise psycopg2.errors.UndefinedTable(f'relation "{schema}.states" does not exist')
+            for name, data in self.connection.schemas[schema].items():
+                self.rows.append((schema, name, json.dumps(data)))
+
+    def fetchall(self):
+        return self.rows
+
+
+def _aws_state(module, role, ip, namespaced=False):
+    outputs = {"master_ip": "1.1.1.1", f"{role}_ip": ip}
+    if namespaced:
+        outputs = {f"{module}__{k}": v for k, v in outputs.items()}
+    return {
+        "serial": 1,
+        "outputs": {k: {"value": v} for k, v in outputs.items()},
+        "resources": [{
+            "module": f"module.{module}",
+            "mode": "managed",
+            "type": "aws_instance",
+            "name": "k3s_node",
+            "instances": [{"attributes": {
+                "id": "i-123",
+                "public_ip": ip,
+                "private_ip": "10.0.0.5",
+                "instance_state": "running",
+                "tags": {"Role": role},
+            }}],
+        }],
+    }
+
+
+def _edge_state(module, ip):
+    return {
+        "serial": 1,
+        "outputs": {f"{module}__worker_ip": {"value": ip}},
+        "resources": [{
+            "module": f"module.{module}",
+            "mode": "managed",
+            "type": "null_resource",
+            "name": "deploy_k3s_edge",
+            "instances": [{"attributes": {"id": "42"}}],
+        }],
+    }
+
+
+def _inventory(schemas, ttl=0.0):
+    config = PostgresConfig(user="u", password="p", host="h", database="d")
+    connection = _FakeConnection(schemas)
+    pool = PostgresConnectionPool("dsn", connect=lambda: connection)
+    return FleetInventory(config, pool, ttl=ttl), connection
+
+
+def test_inventory_reads_all_clusters_in_bulk():
+    inventory, connection = _inventory({
+        "alpha": {
+            "default": {"serial": 1, "resources": []},
+            "aws-a": _aws_state("aws-a", "master", "1.1.1.1"),
+            "edge-b": _edge_state("edge-b", "2.2.2.2"),
+        },
+        "beta": {"aws-c": _aws_state("aws-c", "worker", "3.3.3.3", namespaced=True)},
+        "empty": {},
+    })
+
+    fleet = inventory.inventory()
+
+    assert len(connection.queries) == 2, "Inventory was not read in bulk"
+    assert sorted(fleet) == ["alpha", "beta", "empty"]
+    assert fleet["alpha"][0] == NodeRecord(
+        cluster_name="alpha",
+        resource_name="aws-a",
+        role="master",
+        cloud="aws",
+        public_ip="1.1.1.1",
+        private_ip="10.0.0.5",
+        master_ip="1.1.1.1",
+        instance_id="i-123",
+        power_state="running",
+    )
+    assert (fleet["alpha"][1].cloud, fleet["alpha"][1].role) == ("edge", "worker")
+    assert fleet["beta"][0].public_ip == "3.3.3.3", "Namespaced outputs were not read"
+    assert fleet["empty"] == []
+
+
+def test_inventory_cache_and_dropped_schema(monkeypatch):
+    inventory, connection = _inventory(
+        {"alpha": {"aws-a": _aws_state("aws-a", "master", "1.1.1.1")}}, ttl=60
+    )
+    assert [n.resource_name for n in inventory.cluster_inventory("alpha")] == ["aws-a"]
+    inventory.cluster_inventory("alpha")
+    assert len(connection.queries) == 1, "Cached result was not reused"
+
+    assert inventory.cluster_inventory("missing") == []
+
+    # A schema listed but dropped before its states are read is skipped
+    inventory.invalidate()
+    connection.schemas["gone"] = {}
+    original_execute = _FakeCursor.execute
+
+    def drop_after_listing(cursor, query, params):
+        original_execute(cursor, query, params)
+        if not params:
+            connection.schemas.pop("gone", None)
+
+    monkeypatch.setattr(_FakeCursor, "execute", drop_after_listing)
+    fleet = inventory.inventory()
+    assert list(fleet["alpha"]) and fleet["gone"] == []
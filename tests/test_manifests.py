@@ -0,0 +1,168 @@
+import os
+import stat
+import sys
+import tempfile
+import threading
+import logging
+
+import hcl2
+import pytest
+
+from cluster_builder import Swarmchestrate
+
+# Set up logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), "..", "cluster_builder", "templates")
+
+# Stand-in for `tofu` following deploy_manifest.tf: one resource per manifest
+# file, replaced when the hash of the file changes
+FAKE_TOFU = """
+import hashlib, json, os, sys, time
+
+args = sys.argv[1:]
+master = os.path.basename(os.getcwd())
+
+
+def log(line):
+    with open(os.environ["FAKE_TOFU_LOG"], "a") as f:
+        f.write(f"{master} {line}\\n")
+
+
+log("start " + " ".join(args))
+if args[0] == "init":
+    os.makedirs(".terraform", exist_ok=True)
+    open(".terraform.lock.hcl", "a").close()
+elif args[0] == "apply":
+    if os.environ.get("FAKE_TOFU_FAIL"):
+        sys.exit("Error: connection refused")
+    variables = dict(arg[len("-var="):].split("=", 1) for arg in args if arg.startswith("-var="))
+    folder = variables["manifest_folder"]
+    try:
+        with open("terraform.tfstate") as f:
+            state = json.load(f)
+    except OSError:
+        state = {}
+    resources = {}
+    for root, _, files in os.walk(folder):
+        for name in files:
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                resources[os.path.relpath(path, folder)] = hashlib.sha256(f.read()).hexdigest()
+    for key, sha256 in sorted(resources.items()):
+        if state.get(key) != sha256:
+            log("upload " + key)
+    with open("terraform.tfstate", "w") as f:
+        json.dump(resources, f)
+    time.sleep(float(os.environ.get("FAKE_TOFU_APPLY_SECONDS", "0")))
+log("end " + args[0])
+"""
+
+
+def _orchestrator(temp_dir, monkeypatch):
+    bin_dir = os.path.join(temp_dir, "bin")
+    os.makedirs(bin_dir)
+    tofu = os.path.join(bin_dir, "tofu")
+    with open(tofu, "w") as f:
+        f.write(f"#!{sys.executable}\n{FAKE_TOFU}")
+    os.chmod(tofu, os.stat(tofu).st_mode | stat.S_IEXEC)
+    log = os.path.join(temp_dir, "calls.log")
+    monkeypatch.setenv("PATH", bin_dir + os.pathsep + os.environ["PATH"])
+    monkeypatch.setenv("FAKE_TOFU_LOG", log)
+    monkeypatch.setenv("TF_LOG_PATH", os.path.join(temp_dir, "opentofu.log"))
+    monkeypatch.setenv("CLUSTER_BUILDER_CACHE_DIR", os.path.join(temp_dir, "cache"))
+    for name in ("POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_HOST", "POSTGRES_DATABASE"):
+        monkeypatch.setenv(name, "test")
+
+    orchestrator = Swarmchestrate(TEMPLATES_DIR, os.path.join(temp_dir, "output"), transport="tofu")
+    return orchestrator, log
+
+
+def _manifests(temp_dir, files):
+    folder = os.path.join(temp_dir, "manifests")
+    for name, content in files.items():
+        path = os.path.join(folder, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+    return folder
+
+
+def _lines(log):
+    with open(log) as f:
+        return f.read().splitlines()
+
+
+def test_warm_workspace_skips_init_and_unchanged_manifests(monkeypatch):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        orchestrator, log = _orchestrator(temp_dir, monkeypatch)
+        folder = _manifests(temp_dir, {"app.yaml": "kind: Deployment", "db/db.yaml": "kind: StatefulSet"})
+
+        orchestrator.deploy_manifests(folder, "192.0.2.1", "key.pem", "ubuntu")
+        _manifests(temp_dir, {"app.yaml": "kind: Deployment\nreplicas: 2"})
+        orchestrator.deploy_manifests(folder, "192.0.2.1", "key.pem", "ubuntu")
+
+        lines = _lines(log)
+        assert [line for line in lines if "start init" in line] == [
+            "master_192.0.2.1 start init -input=false"
+        ], "The warm manifest workspace was initialised again"
+        uploads = [line.split()[-1] for line in lines if " upload " in line]
+        assert uploads == ["app.yaml", "db/db.yaml", "app.yaml"], "Unchanged manifests were uploaded again"
+        assert os.path.isdir(orchestrator.get_manifest_workspace_dir("192.0.2.1"))
+
+
+def test_deploy_manifest_template_tracks_each_file_by_hash():
+    """The stub above relies on the template replacing a manifest only when its content changes."""
+    with open(os.path.join(TEMPLATES_DIR, "deploy_manifest.tf")) as f:
+        template = hcl2.load(f)
+    resource = template["resource"][0]["null_resource"]["copy_manifests"]
+    assert template["locals"][0]["manifest_files"] == '${fileset(var.manifest_folder, "**")}'
+    assert resource["for_each"] == "${local.manifest_files}"
+    assert resource["triggers"] == {"sha256": '${filesha256("${var.manifest_folder}/${each.value}")}'}
+
+
+def test_deployments_to_one_master_are_serialised(monkeypatch):
+    """Pushes to the same master take turns, pushes to different masters do not wait."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        orchestrator, log = _orchestrator(temp_dir, monkeypatch)
+        monkeypatch.setenv("FAKE_TOFU_APPLY_SECONDS", "0.3")
+        folder = _manifests(temp_dir, {"app.yaml": "kind: Deployment"})
+
+        threads = [
+            threading.Thread(
+                target=orchestrator.deploy_manifests, args=(folder, master_ip, "key.pem", "ubuntu")
+            )
+            for master_ip in ("192.0.2.1", "192.0.2.1", "192.0.2.2")
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        running = {}
+        overlaps = set()
+        for line in _lines(log):
+            master, event = line.split()[:2]
+            if event == "start" and "apply" in line:
+                if running.get(master):
+                    raise AssertionError(f"Concurrent applies in the workspace of {master}")
+                running[master] = True
+                overlaps.update(m for m, busy in running.items() if busy and m != master)
+            elif event == "end" and line.endswith("apply"):
+                running[master] = False
+        assert overlaps, "Deployments to different masters waited for each other"
+        assert len([line for line in _lines(log) if "start apply" in line]) == 3
+
+
+def test_failed_deployment_is_logged_not_printed(monkeypatch, capsys, caplog):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        orchestrator, _ = _orchestrator(temp_dir, monkeypatch)
+        monkeypatch.setenv("FAKE_TOFU_FAIL", "1")
+        folder = _manifests(temp_dir, {"app.yaml": "kind: Deployment"})
+
+        with pytest.raises(RuntimeError):
+            orchestrator.deploy_manifests(folder, "192.0.2.1", "key.pem", "ubuntu")
+
+        assert "ERROR" not in capsys.readouterr().out
+        assert "Failed to apply manifests on 192.0.2.1" in caplog.text
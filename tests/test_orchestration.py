@@ -0,0 +1,127 @@
+import os
+import tempfile
+import threading
+import time
+import logging
+
+from cluster_builder.infrastructure import ClusterLock
+from cluster_builder.orchestration import OrchestrationEngine
+
+# Set up logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+
+class FakeClusterConfig:
+    def generate_random_name(self):
+        return "generated-cluster"
+
+
+class FakeSwarmchestrate:
+    """Records which clusters are being worked on at the same time."""
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.cluster_config = FakeClusterConfig()
+        self.active = {}
+        self.max_active = {}
+        self.peak_total = 0
+        self.lock = threading.Lock()
+
+    def get_cluster_output_dir(self, cluster_name):
+        return os.path.join(self.output_dir, f"cluster_{cluster_name}")
+
+    def _work(self, cluster_name):
+        with self.lock:
+            self.active[cluster_name] = self.active.get(cluster_name, 0) + 1
+            self.max_active[cluster_name] = max(
+                self.max_active.get(cluster_name, 0), self.active[cluster_name]
+            )
+            self.peak_total = max(self.peak_total, sum(self.active.values()))
+        time.sleep(0.1)
+        with self.lock:
+            self.active[cluster_name] -= 1
+
+    def add_node(self, config, dryrun=False):
+        self._work(config["cluster_name"])
+        return {"cluster_name": config["cluster_name"]}
+
+    def remove_node(self, cluster_name, resource_name, dryrun=False):
+        self._work(cluster_name)
+
+    def destroy(self, cluster_name, dryrun=False, parallelism=10):
+        self._work(cluster_name)
+        raise RuntimeError("destroy failed")
+
+
+def test_jobs_on_same_cluster_are_serialised():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        fake = FakeSwarmchestrate(temp_dir)
+        with OrchestrationEngine(fake, max_workers=4) as engine:
+            jobs = [
+                engine.submit_add_node({"cluster_name": "a", "k3s_role": "worker"}),
+                engine.submit_remove_node("a", "node-1"),
+                engine.submit_add_node({"cluster_name": "b", "k3s_role": "worker"}),
+                engine.submit_remove_node("b", "node-2"),
+            ]
+            for job in jobs:
+                job.result(timeout=10)
+
+        assert fake.max_active == {"a": 1, "b": 1}, "Jobs on one cluster overlapped"
+        assert fake.peak_total == 2, "Jobs on different clusters did not overlap"
+        assert all(job.status == "succeeded" for job in jobs)
+
+
+def test_add_node_without_cluster_name_gets_one():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        fake = FakeSwarmchestrate(temp_dir)
+        with OrchestrationEngine(fake) as engine:
+            job = engine.submit_add_node({"k3s_role": "master"})
+            assert job.cluster_name == "generated-cluster"
+            assert job.result(timeout=10) == {"cluster_name": "generated-cluster"}
+
+
+def test_failed_job_reports_failure():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        fake = FakeSwarmchestrate(temp_dir)
+        with OrchestrationEngine(fake) as engine:
+            job = engine.submit_destroy("a")
+            try:
+                job.result(timeout=10)
+                assert False, "Exception was not propagated"
+            except RuntimeError as e:
+                assert "destroy failed" in str(e)
+            assert job.status == "failed"
+            assert engine.get_job(job.id) is job
+
+
+def test_cluster_lock_times_out_when_held():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cluster_dir = os.path.join(temp_dir, "cluster_a")
+        with ClusterLock(cluster_dir):
+            try:
+                ClusterLock(cluster_dir, timeout=0.2).acquire()
+                assert False, "Lock was acquired twice"
+            except TimeoutError:
+                pass
+        # Released locks can be taken again
+        with ClusterLock(cluster_dir, timeout=0.2):
+            pass
+
+
+def test_finished_jobs_are_forgotten():
+    """A long-running engine keeps a bounded number of finished jobs for a limited time."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        fake = FakeSwarmchestrate(temp_dir)
+        with OrchestrationEngine(fake, job_ttl=0.5, max_finished_jobs=2) as engine:
+            jobs = [engine.submit_remove_node("a", f"node-{n}") for n in range(3)]
+            for job in jobs:
+                job.result(timeout=10)
+
+            # Only the most recent finished jobs are kept
+            assert [job.id for job in engine.jobs()] == [job.id for job in jobs[1:]]
+            assert engine.get_job(jobs[0].id) is None
+
+            time.sleep(0.6)
+            assert engine.get_job(jobs[2].id) is None, "Expired job was kept"
+            assert engine.jobs() == []
@@ -0,0 +1,121 @@
+import logging
+import threading
+import time
+
+import pytest
+
+from cluster_builder.config.postgres import PostgresConfig
+from cluster_builder.config.postgres import PostgresConnectionPool
+
+# Set up logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+
+class _FakeConnection:
+    def __init__(self, log):
+        self.log = log
+        self.closed = 0
+        self.broken = False
+
+    def cursor(self):
+        return _FakeCursor(self)
+
+    def commit(self):
+        self.log.append("commit")
+
+    def rollback(self):
+        self.log.append("rollback")
+
+    def close(self):
+        self.closed = 1
+
+
+class _FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        if self.connection.broken:
+            raise OSError("server closed the connection unexpectedly")
+        self.connection.log.append(str(query))
+
+
+def _pool(**kwargs):
+    log, connections = [], []
+
+    def connect():
+        connections.append(_FakeConnection(log))
+        return connections[-1]
+
+    return PostgresConnectionPool("dsn", connect=connect, **kwargs), connections, log
+
+
+def test_pool_reuses_connections_and_wraps_transactions():
+    pool, connections, log = _pool(max_size=2)
+
+    for _ in range(3):
+        with pool.connection() as connection, connection.cursor() as cursor:
+            cursor.execute("DROP SCHEMA a")
+    assert len(connections) == 1, "Connection was not reused"
+    assert log.count("commit") == 3
+
+    with pytest.raises(ValueError):
+        with pool.connection():
+            raise ValueError("boom")
+    assert log[-1] == "rollback", "Failed block was not rolled back"
+    assert len(connections) == 1
+
+
+def test_pool_limits_size_and_replaces_broken_connections():
+    pool, connections, _ = _pool(max_size=2, health_check_interval=0)
+
+    with pool.connection() as first, pool.connection():
+        with pytest.raises(RuntimeError, match="Timed out"):
+            with pool.connection(timeout=0.05):
+                pass
+        first.broken = True
+
+    # The broken connection fails its health check and is replaced
+    with pool.connection() as a, pool.connection() as b:
+        assert not a.broken and not b.broken
+    assert len(connections) == 3
+    assert connections[0].closed
+
+    # Borrowers wait for a connection to be returned
+    in_use = []
+
+    def borrow():
+        with pool.connection() as connection:
+            in_use.append(connection)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=borrow) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(in_use) == 8 and len(connections) == 3
+
+
+def test_pool_closes_surplus_idle_connections():
+    pool, connections, _ = _pool(min_size=1, max_size=3, idle_timeout=0)
+    with pool.connection(), pool.connection(), pool.connection():
+        pass
+
+    with pool.connection():
+        pass
+    assert sum(c.closed for c in connections) == 2, "Surplus idle connections were kept"
+
+
+def test_config_owns_a_single_pool():
+    config = PostgresConfig(user="u", password="p", host="h", database="d", pool_max_size=4)
+    assert config.pool() is config.pool()
+    assert config.pool().max_size == 4
+    assert config == PostgresConfig(user="u", password="p", host="h", database="d", pool_max_size=4)
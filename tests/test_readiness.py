@@ -0,0 +1,129 @@
+import logging
+import os
+import re
+import stat
+import subprocess
+import threading
+
+import pytest
+
+from cluster_builder.config import ClusterConfig
+from cluster_builder.infrastructure import ReadinessTracker
+
+# Set up logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), "..", "cluster_builder", "templates")
+
+# Instance metadata answering only the paths listed in IMDS_PATHS
+FAKE_CURL = """#!/bin/sh
+for arg in "$@"; do url="$arg"; done
+for path in $IMDS_PATHS; do
+  case "$url" in
+    */"$path") echo "192.0.2.7"; exit 0 ;;
+  esac
+done
+exit 22
+"""
+
+
+class FakeTransport:
+    """SSH transport whose master answers kubectl with canned Ready states."""
+
+    def __init__(self, answers, connect_errors=()):
+        self.answers = list(answers)
+        self.connect_errors = list(connect_errors)
+        self.commands = []
+        self.pool = self
+
+    def get(self, host, user, key_path):
+        if self.connect_errors:
+            raise self.connect_errors.pop(0)
+        return host
+
+    def run(self, client, command):
+        self.commands.append(command)
+        answer = self.answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+def test_track_returns_before_node_is_ready():
+    """The handle is returned at once and resolves once the master reports Ready."""
+    release = threading.Event()
+    checks = []
+
+    def check(node_name, master_ip, ssh_user, ssh_key_path):
+        checks.append(node_name)
+        return release.is_set()
+
+    tracker = ReadinessTracker(interval=0.01, timeout=10, check=check)
+    handle = tracker.track("aws-worker-1", "10.0.0.1", "ubuntu", "key.pem")
+    assert handle.status == "pending"
+    assert not handle.done()
+
+    release.set()
+    assert handle.result(timeout=5) >= 0
+    assert handle.status == "ready"
+    assert set(checks) == {"aws-worker-1"}
+    tracker.shutdown()
+    logger.info("Readiness is tracked without blocking the caller")
+
+
+def test_wait_gives_up_after_timeout():
+    tracker = ReadinessTracker(interval=0.01, timeout=0.05, check=lambda *args: False)
+    with pytest.raises(TimeoutError, match="was not ready"):
+        tracker.wait("aws-worker-1", "10.0.0.1", "ubuntu", "key.pem")
+
+    handle = tracker.track("aws-worker-2", "10.0.0.1", "ubuntu", "key.pem")
+    with pytest.raises(TimeoutError):
+        handle.result(timeout=5)
+    assert handle.status == "failed"
+    tracker.shutdown()
+
+
+def test_unreachable_master_counts_as_not_ready():
+    """A master still booting or installing k3s is retried rather than failing the node."""
+    transport = FakeTransport(
+        [RuntimeError("nodes not found"), "False", "True"], connect_errors=[OSError("Connection refused")]
+    )
+    tracker = ReadinessTracker(transport, interval=0.01, timeout=10)
+
+    assert tracker.wait("aws-worker-1", "10.0.0.1", "ubuntu", "key.pem") >= 0
+    assert len(transport.commands) == 3
+    assert "k3s kubectl get node aws-worker-1" in transport.commands[-1]
+
+
+def test_cloud_init_is_rejected_for_edge_devices(tmp_path):
+    cluster_config = ClusterConfig(template_manager=None, output_dir=str(tmp_path))
+    with pytest.raises(ValueError, match="cloud-init"):
+        cluster_config.prepare({"cloud": "edge", "k3s_role": "worker", "provisioning": "cloud-init"})
+    with pytest.raises(ValueError, match="Unsupported provisioning"):
+        cluster_config.prepare({"cloud": "aws", "k3s_role": "worker", "provisioning": "ansible"})
+
+
+@pytest.mark.parametrize("role", ["master", "ha", "worker"])
+def test_cloud_init_without_public_ip_is_reported(role, tmp_path):
+    """The IP lookup neither aborts silently under set -e nor goes on without an IP."""
+    with open(os.path.join(TEMPLATES_DIR, f"{role}_user_data.sh.tpl")) as f:
+        template = f.read()
+    lookup = re.search(
+        r'^PUBLIC_IP="\$\{public_ip\}"$.*?^log_message "Using public IP.*?$', template, re.M | re.S
+    ).group(0)
+    curl = tmp_path / "curl"
+    curl.write_text(FAKE_CURL)
+    curl.chmod(curl.stat().st_mode | stat.S_IEXEC)
+    script = "set -euo pipefail\nlog_message() { echo \"$1\"; }\n" + lookup.replace("${public_ip}", "")
+
+    def run(paths):
+        env = dict(os.environ, PATH=f"{tmp_path}{os.pathsep}{os.environ['PATH']}", IMDS_PATHS=paths)
+        return subprocess.run(["bash", "-c", script], capture_output=True, text=True, env=env)
+
+    assert "Using public IP: 192.0.2.7" in run("public-ipv4").stdout
+    private = run("local-ipv4")
+    assert private.returncode == 0 and "Using public IP: 192.0.2.7" in private.stdout
+    missing = run("")
+    assert missing.returncode == 1
+    assert "ERROR: Could not detect the IP" in missing.stdout
@@ -0,0 +1,108 @@
+import json
+import logging
+import os
+import re
+import subprocess
+
+import hcl2
+import pytest
+
+from cluster_builder import Swarmchestrate
+from cluster_builder.config import ClusterConfig
+from cluster_builder.config import ClusterDocument
+from cluster_builder.config import RegistryCredentials
+
+# Set up logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), "..", "cluster_builder", "templates")
+
+
+class FakeTemplateManager:
+    def get_module_source_path(self, cloud):
+        return f"templates/{cloud}"
+
+    def copy_user_data_template(self, role, cloud):
+        pass
+
+
+@pytest.fixture
+def registry_env(monkeypatch):
+    monkeypatch.setenv("DOCKER_REGISTRIES", "registry.example.com,docker.io")
+    monkeypatch.setenv("DOCKER_USERNAMES", "alice,bob")
+    monkeypatch.setenv("DOCKER_PASSWORDS", "secret1,secret2")
+
+
+def test_registry_credentials_stay_out_of_the_cluster_configuration(registry_env, monkeypatch, tmp_path):
+    """Nodes with the registry mirror enabled get the credentials of the registry secrets when applied."""
+    cluster_config = ClusterConfig(FakeTemplateManager(), str(tmp_path))
+    _, prepared = cluster_config.prepare(
+        {"cloud": "aws", "k3s_role": "worker", "cluster_name": "alpha", "embedded_registry": True}
+    )
+    assert "registry_auths" not in prepared
+    with pytest.raises(ValueError, match="DOCKER_REGISTRIES"):
+        cluster_config.prepare({"cloud": "aws", "k3s_role": "worker", "registry_auths": []})
+
+    document = ClusterDocument.load(str(tmp_path))
+    document.add_module("mirrored", prepared)
+    document.add_module("plain", dict(prepared, embedded_registry=False))
+    document.save()
+    with open(document.path) as f:
+        saved = f.read()
+    assert "secret1" not in saved and "secret2" not in saved, "Registry passwords were saved"
+    assert document.modules["mirrored"]["registry_auths"] == "${var.registry_auths}"
+    assert "registry_auths" not in document.modules["plain"]
+    assert document.variables["registry_auths"]["sensitive"] is True
+
+    for name in ("POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_HOST", "POSTGRES_DATABASE"):
+        monkeypatch.setenv(name, "test")
+    env = Swarmchestrate(TEMPLATES_DIR, str(tmp_path / "output"), state_access="cli")._tofu_env()
+    assert json.loads(env["TF_VAR_registry_auths"]) == [
+        {"registry": "registry.example.com", "username": "alice", "password": "secret1"},
+        {"registry": "docker.io", "username": "bob", "password": "secret2"},
+    ]
+
+
+def test_edge_user_data_is_uploaded_without_a_local_copy():
+    """The rendered script of an edge node, registry credentials included, is never written locally."""
+    with open(os.path.join(TEMPLATES_DIR, "edge", "main.tf")) as f:
+        template = hcl2.load(f)
+    resources = {
+        (type_, name): body
+        for resource in template["resource"]
+        for type_, blocks in resource.items()
+        for name, body in blocks.items()
+    }
+    assert ("local_file", "rendered_user_data") not in resources
+    uploads = [p["file"] for p in resources[("null_resource", "deploy_k3s_edge")]["provisioner"] if "file" in p]
+    assert [u["content"] for u in uploads if u["destination"] == "/tmp/edge_user_data.sh"] == ["${local.user_data}"]
+
+
+def test_registry_credentials_must_match(monkeypatch):
+    monkeypatch.setenv("DOCKER_REGISTRIES", "registry.example.com,docker.io")
+    monkeypatch.setenv("DOCKER_USERNAMES", "alice")
+    monkeypatch.setenv("DOCKER_PASSWORDS", "secret1")
+    with pytest.raises(RuntimeError, match="Mismatch"):
+        RegistryCredentials.from_env()
+
+    monkeypatch.delenv("DOCKER_REGISTRIES")
+    monkeypatch.delenv("DOCKER_USERNAMES")
+    monkeypatch.delenv("DOCKER_PASSWORDS")
+    assert RegistryCredentials.from_env().auths() == []
+
+
+@pytest.mark.parametrize("role", ["master", "ha", "worker"])
+def test_user_data_templates_render_valid_scripts(role):
+    """The user data scripts stay valid shell once the template variables are filled in."""
+    with open(os.path.join(TEMPLATES_DIR, f"{role}_user_data.sh.tpl")) as f:
+        template = f.read()
+    values = {
+        "embedded_registry": "true",
+        "registries_yaml": '"mirrors":\n  "docker.io": {}\n',
+        "ha": "false",
+    }
+    script = re.sub(r"\$\{(\w+)\}", lambda m: values.get(m.group(1), "value"), template)
+
+    assert "registries.yaml" in script
+    subprocess.run(["bash", "-n"], input=script, text=True, check=True)
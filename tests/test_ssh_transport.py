@@ -0,0 +1,199 @@
+import io
+import os
+import tempfile
+import threading
+import logging
+
+from cluster_builder.infrastructure.ssh import SSHConnectionPool, SSHTransport
+
+# Set up logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+
+class FakeChannel:
+    def __init__(self, exit_status):
+        self.exit_status = exit_status
+
+    def recv_exit_status(self):
+        return self.exit_status
+
+    def shutdown_write(self):
+        pass
+
+
+class FakeStream(io.BytesIO):
+    def __init__(self, data=b"", exit_status=0):
+        super().__init__(data)
+        self.channel = FakeChannel(exit_status)
+
+
+class FakeStdin(io.StringIO):
+    def __init__(self, client):
+        super().__init__()
+        self.client = client
+        self.channel = FakeChannel(0)
+
+    def write(self, data):
+        self.client.stdin_data.append(data)
+        return super().write(data)
+
+
+class FakeSFTP:
+    def __init__(self, client):
+        self.client = client
+
+    def put(self, local_path, remote_path):
+        with open(local_path, "rb") as f:
+            self.client.uploads[remote_path] = f.read()
+
+    def close(self):
+        pass
+
+
+class FakeTransport:
+    def __init__(self):
+        self.active = True
+
+    def is_active(self):
+        return self.active
+
+
+class FakeClient:
+    """In-process stand-in for a connected paramiko SSHClient."""
+
+    def __init__(self, exit_status=0):
+        self.commands = []
+        self.stdin_data = []
+        self.uploads = {}
+        self.exit_status = exit_status
+        self.transport = FakeTransport()
+
+    def exec_command(self, command):
+        self.commands.append(command)
+        return (
+            FakeStdin(self),
+            FakeStream(b"", self.exit_status),
+            FakeStream(b"boom", self.exit_status),
+        )
+
+    def open_sftp(self):
+        return FakeSFTP(self)
+
+    def get_transport(self):
+        return self.transport
+
+    def close(self):
+        self.transport.active = False
+
+
+def _transport():
+    connections = []
+
+    def connect(host, user, key_path, timeout):
+        client = FakeClient()
+        connections.append(client)
+        return client
+
+    return SSHTransport(SSHConnectionPool(connect=connect)), connections
+
+
+def test_deploy_manifests_uploads_only_changed_files():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        manifests = os.path.join(temp_dir, "manifests")
+        os.makedirs(os.path.join(manifests, "apps"))
+        for name, content in [("a.yaml", "a: 1"), ("apps/b.yaml", "b: 1")]:
+            with open(os.path.join(manifests, name), "w") as f:
+                f.write(content)
+        index_path = os.path.join(temp_dir, "index.json")
+        transport, connections = _transport()
+
+        uploaded = transport.deploy_manifests(manifests, "10.0.0.1", "/key.pem", "ubuntu", index_path)
+        assert uploaded == ["a.yaml", "apps/b.yaml"]
+        client = connections[0]
+        assert client.uploads["/tmp/manifests_temp/apps/b.yaml"] == b"b: 1"
+        assert "/var/lib/rancher/k3s/server/manifests/apps/b.yaml" in client.stdin_data[-1]
+
+        # Nothing changed, nothing is uploaded
+        assert transport.deploy_manifests(manifests, "10.0.0.1", "/key.pem", "ubuntu", index_path) == []
+
+        with open(os.path.join(manifests, "a.yaml"), "w") as f:
+            f.write("a: 2")
+        uploaded = transport.deploy_manifests(manifests, "10.0.0.1", "/key.pem", "ubuntu", index_path)
+        assert uploaded == ["a.yaml"]
+        assert len(connections) == 1, "Connection was not reused"
+
+
+def test_registry_secrets_use_one_remote_invocation():
+    transport, connections = _transport()
+    names = transport.create_registry_secrets(
+        ["docker.io", "ghcr.io"],
+        ["user1", "user2"],
+        ["pa$$", "secret"],
+        "10.0.0.1",
+        "ubuntu",
+        "/key.pem",
+    )
+    assert names == ["regcred-0", "regcred-1"]
+    client = connections[0]
+    assert client.commands == ["sudo bash -s"]
+    script = client.stdin_data[0]
+    assert "--docker-server=ghcr.io" in script
+    assert "'pa$$'" in script, "Password was not quoted"
+    assert "pa$$" not in client.commands[0], "Credentials leaked onto the command line"
+
+
+def test_pool_reconnects_closed_connections():
+    transport, connections = _transport()
+    first = transport.pool.get("10.0.0.1", "ubuntu", "/key.pem")
+    first.close()
+    second = transport.pool.get("10.0.0.1", "ubuntu", "/key.pem")
+    assert first is not second
+    assert len(connections) == 2
+
+
+def test_failed_remote_command_raises():
+    transport = SSHTransport(SSHConnectionPool(connect=lambda *args: FakeClient(exit_status=1)))
+    try:
+        transport.create_registry_secrets(["docker.io"], ["u"], ["p"], "10.0.0.1", "ubuntu", "/key.pem")
+        assert False, "Exception was not raised"
+    except RuntimeError as e:
+        assert "boom" in str(e)
+
+
+class WindowedChannel:
+    """Channel of a command which only exits once its full output was read."""
+
+    def __init__(self):
+        self.stdout_read = threading.Event()
+        self.stderr_read = threading.Event()
+
+    def recv_exit_status(self):
+        if not (self.stdout_read.is_set() and self.stderr_read.is_set()):
+            raise AssertionError("Waited for the exit status with unread output, the command would hang")
+        return 0
+
+
+class WindowedStream:
+    def __init__(self, data, read_event, blocked_by=None):
+        self.data = data
+        self.read_event = read_event
+        self.blocked_by = blocked_by
+
+    def read(self):
+        # The command writes to the other stream too, which blocks it until drained
+        if self.blocked_by is not None and not self.blocked_by.wait(timeout=5):
+            raise AssertionError("stderr was not drained while reading stdout")
+        self.read_event.set()
+        return self.data
+
+
+def test_large_output_is_drained_before_waiting_for_exit():
+    channel = WindowedChannel()
+    stdout = WindowedStream(b"x" * 4 * 1024 * 1024, channel.stdout_read, blocked_by=channel.stderr_read)
+    stderr = WindowedStream(b"warning: " * 10000, channel.stderr_read)
+    stdout.channel = stderr.channel = channel
+
+    client = FakeClient()
+    client.exec_command = lambda command: (FakeStdin(client), stdout, stderr)
+    assert len(SSHTransport().run(client, "sudo k3s kubectl apply -f -")) == 4 * 1024 * 1024
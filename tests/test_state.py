@@ -0,0 +1,122 @@
+import json
+import logging
+
+import psycopg2
+
+from cluster_builder.config.postgres import PostgresConfig
+from cluster_builder.config.postgres import PostgresConnectionPool
+from cluster_builder.infrastructure import PostgresStateReader
+
+# Set up logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+
+class _FakeConnection:
+    """Connection serving rows of a single states table."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+        self.closed = 0
+
+    def cursor(self):
+        return _FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+class _FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.row = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params):
+        kind = "serial" if "serial" in repr(query) else "data"
+        self.connection.queries.append(kind)
+        if "missing" in repr(query):
+            raise psycopg2.errors.UndefinedTable("relation does not exist")
+        data = self.connection.rows.get(params[0])
+        if data is None:
+            self.row = None
+        elif kind == "serial":
+            self.row = (json.loads(data)["serial"],)
+        else:
+            self.row = (data,)
+
+    def fetchone(self):
+        return self.row
+
+
+def _state(serial, worker_ip):
+    return json.dumps({
+        "version": 4,
+        "serial": serial,
+        "outputs": {"worker_ip": {"value": worker_ip, "type": "string"}},
+        "resources": [
+            {
+                "module": "module.node-a",
+                "mode": "managed",
+                "type": "aws_instance",
+                "name": "k3s_node",
+                "instances": [{"attributes": {"public_ip": worker_ip}}],
+            },
+            {
+                "module": "module.node-a",
+                "mode": "data",
+                "type": "aws_ami",
+                "name": "ubuntu",
+                "instances": [{"attributes": {}}],
+            },
+        ],
+    })
+
+
+def _reader(rows):
+    config = PostgresConfig(user="u", password="p", host="h", database="d")
+    connection = _FakeConnection(rows)
+    pool = PostgresConnectionPool("dsn", connect=lambda: connection)
+    return PostgresStateReader(config, pool), connection
+
+
+def test_outputs_are_cached_by_serial():
+    reader, connection = _reader({"node-a": _state(3, "10.0.0.1")})
+
+    assert reader.outputs("cluster", "node-a")["worker_ip"]["value"] == "10.0.0.1"
+    assert reader.outputs("cluster", "node-a")["worker_ip"]["value"] == "10.0.0.1"
+    assert connection.queries == ["data", "serial"], "Unchanged state was fetched again"
+
+    connection.rows["node-a"] = _state(4, "10.0.0.2")
+    assert reader.outputs("cluster", "node-a")["worker_ip"]["value"] == "10.0.0.2"
+    assert connection.queries[2:] == ["serial", "data"]
+
+    assert reader.resource_attributes("cluster", "node-a") == {
+        "module.node-a.aws_instance.k3s_node": {"public_ip": "10.0.0.2"}
+    }
+    assert reader.resource_attributes("cluster", "node-a", module_name="other") == {}
+
+
+def test_missing_state_raises():
+    reader, _ = _reader({})
+
+    assert reader.read_state("cluster", "node-a") is None
+    assert reader.read_state("missing", "node-a") is None, "Missing schema should mean no state"
+    try:
+        reader.outputs("cluster", "node-a")
+    except RuntimeError as e:
+        assert "No state found" in str(e)
+    else:
+        assert False, "Missing state did not raise"
@@ -0,0 +1,99 @@
+import logging
+from contextlib import contextmanager
+
+import pytest
+
+from cluster_builder.infrastructure import CommandExecutor
+from cluster_builder.utils import telemetry
+
+# Set up logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+
+class FakeTracer:
+    """Tracer with the OpenTelemetry `start_as_current_span` interface."""
+
+    def __init__(self):
+        self.spans = []
+
+    @contextmanager
+    def start_as_current_span(self, name, attributes=None):
+        span = {"name": name, "attributes": dict(attributes or {}), "exception": None}
+        self.spans.append(span)
+
+        class Handle:
+            def set_attribute(self, key, value):
+                span["attributes"][key] = value
+
+        try:
+            yield Handle()
+        except Exception as e:
+            span["exception"] = e
+            raise
+
+
+@pytest.fixture
+def spans():
+    events = []
+    tracer = FakeTracer()
+    telemetry.configure_telemetry(
+        tracer=tracer, registry=telemetry.MetricsRegistry(), listeners=[events.append]
+    )
+    yield events, tracer
+    telemetry.configure_telemetry(enabled=False, listeners=[])
+
+
+def test_disabled_telemetry_records_nothing():
+    telemetry.configure_telemetry(enabled=False, registry=telemetry.MetricsRegistry(), listeners=[])
+
+    with telemetry.span("add_node", cluster="test") as span:
+        span.set_attribute("cloud", "aws")
+    assert telemetry.current_span().set_attributes(role="master") is None
+    assert telemetry.get_registry().render() == "", "Metrics recorded while disabled"
+
+
+def test_spans_nest_and_feed_metrics_and_tracer(spans):
+    events, tracer = spans
+
+    with telemetry.span("add_node", cluster="test", node="node-a") as span:
+        span.set_attributes(cloud="aws", role="master")
+        CommandExecutor.run_command(["true"], ".", "no-op")
+        with pytest.raises(RuntimeError):
+            CommandExecutor.run_command(["false"], ".", "failing command")
+
+    names = [event.name for event in events]
+    assert names == ["true", "false", "add_node"]
+    command = events[0].to_dict()
+    assert command["parent"] == "add_node"
+    assert command["attributes"]["node"] == "node-a"
+    assert command["attributes"]["role"] == "master", "Attribute set on the parent not inherited"
+    assert events[1].status == "error"
+    assert events[2].status == "ok"
+
+    assert [s["name"] for s in tracer.spans] == ["add_node", "true", "false"]
+    assert tracer.spans[0]["attributes"]["cloud"] == "aws"
+    assert isinstance(tracer.spans[2]["exception"], RuntimeError)
+
+    histogram = telemetry.get_registry().get(telemetry.PHASE_HISTOGRAM)
+    series = histogram.snapshot()
+    assert series[("add_node", "aws", "master", "ok")]["count"] == 1
+    assert series[("false", "aws", "master", "error")]["count"] == 1
+    metrics = telemetry.get_registry().render()
+    assert 'phase="add_node",cloud="aws",role="master",status="ok",le="+Inf"} 1' in metrics
+    assert "# TYPE cluster_builder_phase_duration_seconds histogram" in metrics
+
+
+def test_traced_takes_attributes_from_arguments(spans):
+    events, _ = spans
+
+    @telemetry.traced("remove_node", cluster="cluster_name", node="resource_name")
+    def remove_node(cluster_name, resource_name, dryrun=False):
+        return telemetry.current_span()
+
+    span = remove_node("test", resource_name="node-a")
+
+    assert span is events[0]
+    assert span.attributes == {"cluster": "test", "node": "node-a"}
+    assert telemetry.command_phase(["tofu", "workspace", "select", "node-a"]) == "tofu workspace select"
+    assert telemetry.command_phase(["tofu", "apply", "-auto-approve"]) == "tofu apply"
@@ -0,0 +1,73 @@
+import os
+import tempfile
+import logging
+
+from cluster_builder.infrastructure import templates
+from cluster_builder.infrastructure import TemplateManager
+
+# Set up logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+
+def _write_template(templates_dir, cloud, variables):
+    os.makedirs(os.path.join(templates_dir, cloud), exist_ok=True)
+    with open(os.path.join(templates_dir, cloud, "main.tf"), "w") as f:
+        for name in variables:
+            f.write(f'variable "{name}" {{\n  type = string\n}}\n\n')
+
+
+def _count_parses(monkeypatch):
+    parses = []
+    original = templates.extract_template_variables
+
+    def counting(path):
+        parses.append(path)
+        return original(path)
+
+    monkeypatch.setattr(templates, "extract_template_variables", counting)
+    return parses
+
+
+def test_required_variables_are_parsed_once(monkeypatch):
+    parses = _count_parses(monkeypatch)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        manager = TemplateManager()
+        manager.templates_dir = temp_dir
+        _write_template(temp_dir, "aws", ["ami", "instance_type"])
+
+        for _ in range(5):
+            assert set(manager.get_required_variables("aws")) == {"ami", "instance_type"}
+        assert len(parses) == 1, "Template was parsed more than once"
+
+        # A changed template is parsed again
+        _write_template(temp_dir, "aws", ["ami", "instance_type", "key_name"])
+        os.utime(os.path.join(temp_dir, "aws", "main.tf"), ns=(1, 1))
+        assert "key_name" in manager.get_required_variables("aws")
+        assert len(parses) == 2
+
+        # A touched but identical template is not
+        os.utime(os.path.join(temp_dir, "aws", "main.tf"), ns=(2, 2))
+        manager.get_required_variables("aws")
+        assert len(parses) == 2, "Unchanged template content was parsed again"
+
+
+def test_schema_cache_is_persisted_and_precompiled(monkeypatch):
+    parses = _count_parses(monkeypatch)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        templates_dir = os.path.join(temp_dir, "templates")
+        cache_path = os.path.join(temp_dir, "cache", "template-schemas.json")
+        _write_template(templates_dir, "aws", ["ami"])
+        _write_template(templates_dir, "openstack", ["flavor"])
+        os.makedirs(os.path.join(templates_dir, "not-a-cloud"))
+
+        manager = TemplateManager(schema_cache_path=cache_path)
+        manager.templates_dir = templates_dir
+        assert manager.precompile_templates() == ["aws", "openstack"]
+        assert len(parses) == 2
+        assert os.path.exists(cache_path), "Schema cache was not persisted"
+
+        restarted = TemplateManager(schema_cache_path=cache_path)
+        restarted.templates_dir = templates_dir
+        assert list(restarted.get_required_variables("openstack")) == ["flavor"]
+        assert len(parses) == 2, "Persisted schema was not reused"
@@ -0,0 +1,100 @@
+import json
+import os
+import subprocess
+import tempfile
+import logging
+
+from cluster_builder.testing import install_emulator
+from cluster_builder.testing.soak import run_soak
+
+# Set up logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+MAIN_TF_JSON = {
+    "terraform": {"backend": {"pg": {"conn_str": "postgres://test", "schema_name": "test"}}},
+    "module": {
+        "master": {
+            "source": "/templates/edge/",
+            "k3s_role": "master",
+            "cluster_name": "test",
+            "resource_name": "master",
+            "edge_device_ip": "192.0.2.10",
+            "k3s_token": "token",
+        }
+    },
+    "output": {
+        "master_ip": {"value": "${module.master.master_ip}"},
+        "cluster_name": {"value": "${module.master.cluster_name}"},
+    },
+}
+
+
+def _tofu(tofu, cwd, *args, **env):
+    return subprocess.run(
+        [tofu, *args], cwd=cwd, capture_output=True, text=True, env=dict(os.environ, **env)
+    )
+
+
+def _setup(temp_dir, config=None):
+    tofu = install_emulator(os.path.join(temp_dir, "bin"), config)
+    cluster_dir = os.path.join(temp_dir, "cluster")
+    os.makedirs(cluster_dir)
+    with open(os.path.join(cluster_dir, "main.tf.json"), "w") as f:
+        json.dump(MAIN_TF_JSON, f)
+    return tofu, cluster_dir
+
+
+def test_emulator_keeps_state_per_workspace():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        tofu, cluster_dir = _setup(temp_dir)
+
+        assert _tofu(tofu, cluster_dir, "init", "-input=false").returncode == 0
+        assert _tofu(tofu, cluster_dir, "workspace", "new", "master").returncode == 0
+        assert _tofu(tofu, cluster_dir, "workspace", "new", "master").returncode == 1, "Duplicate workspace created"
+        listing = _tofu(tofu, cluster_dir, "workspace", "list").stdout.splitlines()
+        assert [line.strip("* ") for line in listing if line] == ["default", "master"]
+
+        applied = _tofu(tofu, cluster_dir, "apply", "-auto-approve", "-target=module.master")
+        assert applied.returncode == 0, applied.stderr
+        outputs = json.loads(_tofu(tofu, cluster_dir, "output", "-json").stdout)
+        assert outputs["master_ip"]["value"] == "192.0.2.10"
+        assert outputs["cluster_name"]["value"] == "test"
+
+        # Other workspaces have their own state
+        default_outputs = _tofu(tofu, cluster_dir, "output", "-json", TF_WORKSPACE="default").stdout
+        assert json.loads(default_outputs) == {}
+
+        # Deleting a workspace tracking resources needs -force
+        _tofu(tofu, cluster_dir, "workspace", "select", "default")
+        assert _tofu(tofu, cluster_dir, "workspace", "delete", "master").returncode == 1
+        assert _tofu(tofu, cluster_dir, "workspace", "delete", "-force", "master").returncode == 0
+        listing = _tofu(tofu, cluster_dir, "workspace", "list").stdout
+        assert "master" not in listing
+
+
+def test_emulator_failures_are_configurable_and_deterministic():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config = {"seed": 1, "apply": {"failure_rate": 1.0}, "plan": {"output_bytes": 1000}}
+        tofu, cluster_dir = _setup(temp_dir, config)
+        _tofu(tofu, cluster_dir, "init")
+
+        failed = _tofu(tofu, cluster_dir, "apply", "-auto-approve")
+        assert failed.returncode == 1
+        assert "emulated failure of 'apply'" in failed.stderr
+        assert json.loads(_tofu(tofu, cluster_dir, "output", "-json").stdout) == {}, "Failed apply changed the state"
+
+        planned = _tofu(tofu, cluster_dir, "plan", "-input=false")
+        assert planned.returncode == 0
+        assert len(planned.stdout) >= 1000, "Plan output not padded to the configured size"
+
+
+def test_soak_runs_the_cluster_lifecycle():
+    report = run_soak(clusters=2, workers_per_cluster=1, concurrency=2)
+
+    assert report.failures == {}, report.failures
+    summary = report.summary()
+    assert set(summary["operations"]) == {"add_master", "add_workers", "remove_node", "destroy"}
+    for stats in summary["operations"].values():
+        assert stats["count"] == 2
+        assert stats["p50"] <= stats["p99"] <= stats["max"]
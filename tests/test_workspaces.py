@@ -0,0 +1,175 @@
+import json
+import os
+import shutil
+import stat
+import tempfile
+import logging
+
+import psycopg2
+
+from cluster_builder import Swarmchestrate
+from cluster_builder.config import ClusterDocument
+from cluster_builder.config.postgres import PostgresConnectionPool
+from cluster_builder.infrastructure import PostgresStateReader
+from cluster_builder.infrastructure import PostgresWorkspaces
+
+# Set up logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), "..", "cluster_builder", "templates")
+
+# Writes the state of the workspace on plan/apply/destroy, as the pg backend does
+FAKE_TOFU = """#!/bin/sh
+echo "${TF_WORKSPACE:--} $@" >> "$FAKE_TOFU_LOG"
+mkdir -p .terraform
+touch .terraform.lock.hcl
+case "$1" in
+  plan|apply|destroy)
+    [ -n "$TF_WORKSPACE" ] && echo '{"serial": 1, "outputs": {}}' > "$FAKE_STATES/$TF_WORKSPACE"
+    ;;
+esac
+for arg in "$@"; do
+  case "$arg" in
+    -out=*) touch "${arg#-out=}" ;;
+  esac
+done
+"""
+
+
+class _FakeConnection:
+    """Connection serving a states table kept as one file per workspace."""
+
+    def __init__(self, states_dir):
+        self.states_dir = states_dir
+        self.closed = 0
+
+    def cursor(self):
+        return _FakeCursor(self.states_dir)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+class _FakeCursor:
+    def __init__(self, states_dir):
+        self.states_dir = states_dir
+        self.rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        query = repr(query)
+        if "missing" in query:
+            raise psycopg2.errors.UndefinedTable("relation does not exist")
+        names = sorted(os.listdir(self.states_dir))
+        if "SELECT name" in query:
+            self.rows = [(name,) for name in names]
+        elif "DELETE" in query:
+            if params[0] in names:
+                os.remove(os.path.join(self.states_dir, params[0]))
+        elif params[0] not in names:
+            self.rows = []
+        elif "SELECT 1" in query:
+            self.rows = [(1,)]
+        else:
+            with open(os.path.join(self.states_dir, params[0])) as f:
+                data = f.read()
+            self.rows = [(json.loads(data)["serial"],)] if "serial" in query else [(data,)]
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+
+def _pool(states_dir):
+    return PostgresConnectionPool("dsn", connect=lambda: _FakeConnection(states_dir))
+
+
+def test_workspaces_are_listed_and_deleted_with_sql():
+    with tempfile.TemporaryDirectory() as states_dir:
+        for name in ("node-b", "node-a"):
+            with open(os.path.join(states_dir, name), "w") as f:
+                f.write("{}")
+        workspaces = PostgresWorkspaces(None, _pool(states_dir))
+
+        assert workspaces.list("test") == ["default", "node-a", "node-b"]
+        assert workspaces.list("missing") == ["default"], "Uninitialised backend should only have default"
+        assert workspaces.exists("test", "node-a")
+        assert not workspaces.exists("test", "node-c")
+
+        workspaces.delete("test", "node-a")
+        workspaces.delete("test", "node-a")
+        assert workspaces.list("test") == ["default", "node-b"]
+
+
+def test_node_lifecycle_runs_no_workspace_commands(monkeypatch):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        bin_dir = os.path.join(temp_dir, "bin")
+        states_dir = os.path.join(temp_dir, "states")
+        os.makedirs(bin_dir)
+        os.makedirs(states_dir)
+        tofu = os.path.join(bin_dir, "tofu")
+        with open(tofu, "w") as f:
+            f.write(FAKE_TOFU)
+        os.chmod(tofu, os.stat(tofu).st_mode | stat.S_IEXEC)
+        log = os.path.join(temp_dir, "calls.log")
+        monkeypatch.setenv("PATH", bin_dir + os.pathsep + os.environ["PATH"])
+        monkeypatch.setenv("FAKE_TOFU_LOG", log)
+        monkeypatch.setenv("FAKE_STATES", states_dir)
+        monkeypatch.setenv("CLUSTER_BUILDER_CACHE_DIR", os.path.join(temp_dir, "cache"))
+        for name in ("POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_HOST", "POSTGRES_DATABASE"):
+            monkeypatch.setenv(name, "test")
+
+        templates_dir = os.path.join(temp_dir, "templates")
+        shutil.copytree(TEMPLATES_DIR, templates_dir)
+        orchestrator = Swarmchestrate(templates_dir, os.path.join(temp_dir, "output"), state_access="sql")
+        orchestrator.template_manager.templates_dir = templates_dir
+        pool = _pool(states_dir)
+        orchestrator.workspaces = PostgresWorkspaces(orchestrator.pg_config, pool)
+        orchestrator.state_reader = PostgresStateReader(orchestrator.pg_config, pool)
+
+        config = {
+            "cloud": "edge",
+            "k3s_role": "worker",
+            "cluster_name": "test",
+            "master_ip": "192.0.2.1",
+            "edge_device_ip": "192.0.2.10",
+            "ssh_user": "test",
+            "ssh_auth_method": "key",
+            "ssh_key": "/dev/null",
+        }
+        orchestrator.add_node(dict(config, resource_name="node-a"))
+        with open(log) as f:
+            first_calls = f.read().splitlines()
+        orchestrator.add_node(dict(config, resource_name="node-b"))
+        with open(log) as f:
+            second_calls = f.read().splitlines()[len(first_calls):]
+
+        # Adding a node needs no workspace commands nor `tofu output`; init only
+        # runs because the new module call has to be installed
+        assert second_calls == [
+            "- init -input=false",
+            "node-b plan -input=false -target=module.node-b -out=node-b.tfplan -refresh=false",
+            "node-b apply -input=false node-b.tfplan",
+        ]
+
+        orchestrator.remove_node("test", "node-a")
+        with open(log) as f:
+            remove_calls = f.read().splitlines()[len(first_calls) + len(second_calls):]
+        assert remove_calls == ["node-a destroy -auto-approve"]
+        assert sorted(os.listdir(states_dir)) == ["node-b"], "Workspace of the removed node not deleted"
+        outputs = ClusterDocument.load(orchestrator.get_cluster_output_dir("test")).outputs
+        assert outputs["worker_ip"] == {"value": "${module.node-b.worker_ip}"}, "Outputs of the remaining node were removed"